@@ -36,7 +36,8 @@ etl_stack = GenAiVirtualAssistantEtlLambdaStack(app,
 extraction_stack = DataExtractionLambdaStack(app,
                                              "DataExtractionLambdaStack",
                                              env=env_aws_settings,
-                                             input_s3_bucket_arn=s3_stack.bucket.bucket_arn)
+                                             input_s3_bucket_arn=s3_stack.bucket.bucket_arn,
+                                             input_metadata=env_context_params)
 
 
 
@@ -69,6 +70,7 @@ chat_stack_runner = ChatRunnerNodeStack(app,
                                  env=env_aws_settings,
                                  conversations_table=conversation_stack.conversations_table,
                                  sessions_table=conversation_stack.sessions_table,
+                                 store_directory_table=conversation_stack.store_directory_table,
                                  agent_id="G7LSHMCB2H",
                                  input_metadata=env_context_params)
 
@@ -79,8 +81,7 @@ sync_stack = VectorialSyncLambdaStack(app,
                                       input_metadata=env_context_params,
                                       input_s3_bucket_arn=s3_stack.bucket.bucket_arn,
                                       kb_id="LQAKZNJMP9",
-                                      agent_id="G7LSHMCB2H",
-                                      chat_lambda_fn=chat_stack.lambda_fn)
+                                      agent_id="G7LSHMCB2H")
 
 # Step Functions Orchestrator with EventBridge
 orchestrator_stack = DataPipelineOrchestratorStack(app,
@@ -88,14 +89,22 @@ orchestrator_stack = DataPipelineOrchestratorStack(app,
                                                    env=env_aws_settings,
                                                    extraction_lambda=extraction_stack.lambda_fn,
                                                    etl_lambda=etl_stack.lambda_fn,
-                                                   sync_lambda=sync_stack.lambda_fn)
+                                                   sync_lambda=sync_stack.lambda_fn,
+                                                   fused_etl=env_context_params.get('fused_etl', False),
+                                                   ingestion_wait=env_context_params.get('ingestion_wait', 'lambda'),
+                                                   kb_id="LQAKZNJMP9",
+                                                   agent_id="G7LSHMCB2H",
+                                                   kb_ids=env_context_params.get('knowledge_base_ids') or None,
+                                                   pipeline_mode=env_context_params.get('pipeline_mode', 'sequential'),
+                                                   faq_fast_path=env_context_params.get('faq_fast_path', False),
+                                                   data_bucket_name=s3_stack.bucket.bucket_name,
+                                                   kb_s3_prefix=env_context_params['s3_knowledge_base_prefixes'][0])
 
 # Hard Dependencies
 bedrock_stack.add_dependency(s3_stack)
 etl_stack.add_dependency(s3_stack)
 extraction_stack.add_dependency(s3_stack)
 sync_stack.add_dependency(s3_stack)
-sync_stack.add_dependency(chat_stack)  # Agregado para que sync_stack tenga acceso al lambda de chat
 orchestrator_stack.add_dependency(extraction_stack)
 orchestrator_stack.add_dependency(etl_stack)
 orchestrator_stack.add_dependency(sync_stack)
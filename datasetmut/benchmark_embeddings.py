@@ -0,0 +1,145 @@
+"""
+Comparación offline de dimensiones de embedding para el Knowledge Base
+Titan v2 admite 256, 512 y 1024 dimensiones (kb_embedding_dimensions en cdk.json)
+Cambiar la dimensión del KB desplegado requiere un KB con otro nombre, un
+índice de Pinecone nuevo con esa dimensión y una re-sincronización completa
+
+Con el mismo set dorado, ETL y chunking que benchmark_retrieval.py, indexa los
+chunks en el índice local (local_vector_store.py) por cada dimensión y reporta:
+- Tamaño del índice: vectores float32 (lo que ocupa cada registro en Pinecone)
+  y texto/metadata que se guarda junto a ellos
+- Latencia por consulta p50 / p99 (embedding de la consulta + búsqueda exacta)
+- recall@k y MRR, y la diferencia contra 1024 dimensiones
+
+El embedding es el sustituto local determinista de local_vector_store.py
+(hashing en N dimensiones): menos dimensiones implica más colisiones, una
+aproximación a la pérdida de Titan al reducir dimensiones. La búsqueda usa
+numpy si está instalado; sin numpy, Python puro (más lento, mismo resultado).
+
+USO (desde la raíz del repo):
+    python datasetmut/benchmark_embeddings.py
+    python datasetmut/benchmark_embeddings.py --vectorial-dir dataset/vectorial --k 3,5,10
+    python datasetmut/benchmark_embeddings.py --dimensions 256,512,1024 --repeat 5 --output-json dims.json
+"""
+
+import sys
+import json
+import time
+import argparse
+
+import benchmark_retrieval as br
+from local_vector_store import LocalVectorStore, np
+
+
+TITAN_V2_DIMENSIONS = (256, 512, 1024)
+
+
+def evaluar_dimension(chunks, consultas, dimensions, ks, repeat):
+    """Métricas de una dimensión: tamaño, latencia p50/p99 y recall@k / MRR por k."""
+    inicio = time.perf_counter()
+    indice = LocalVectorStore(dimensions).add_many(
+        {'text': c['text'], 'metadata': {'docs': c['docs']}} for c in chunks
+    ).build()
+    build_ms = (time.perf_counter() - inicio) * 1000
+
+    max_k = max(ks)
+    latencias = []
+    rangos = []
+    for consulta in consultas:
+        for _ in range(repeat):
+            inicio = time.perf_counter()
+            resultados = indice.search(consulta['query'], max_k, 'SEMANTIC')
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        rangos.append(next(
+            (pos + 1 for pos, r in enumerate(resultados) if r['metadata']['docs'] & consulta['expected']),
+            None
+        ))
+
+    metricas = {}
+    for k in ks:
+        aciertos = [r for r in rangos if r is not None and r <= k]
+        metricas[k] = {
+            'recall': len(aciertos) / len(rangos),
+            'mrr': sum(1 / r for r in aciertos) / len(rangos)
+        }
+
+    stats = indice.stats()
+    return {
+        'dimensions': dimensions,
+        'chunks': len(chunks),
+        'vector_mb': stats['vector_bytes'] / 1024 / 1024,
+        'text_mb': stats['text_bytes'] / 1024 / 1024,
+        'build_ms': build_ms,
+        'latency_p50_ms': br.percentil(latencias, 50),
+        'latency_p99_ms': br.percentil(latencias, 99),
+        'by_k': metricas
+    }
+
+
+def imprimir_resultados(resultados, ks, consultas, args):
+    base = next((r for r in resultados if r['dimensions'] == 1024), resultados[-1])
+    print("\n" + "=" * 100)
+    print(f"📐 DIMENSIONES DE EMBEDDING - {len(consultas)} consultas, max_tokens={args.max_tokens} "
+          f"overlap={args.overlap}%, kb_output_mode={args.output_mode}, "
+          f"{'numpy' if np is not None else 'python puro'}")
+    print("=" * 100)
+    print(f"   {'dims':>5}{'chunks':>8}{'vect MB':>10}{'texto MB':>10}{'p50 ms':>9}{'p99 ms':>9}"
+          + ''.join(f"{f'R@{k}':>8}{f'MRR@{k}':>9}" for k in ks) + f"{'Δ R@' + str(max(ks)):>10}")
+    for r in resultados:
+        delta = r['by_k'][max(ks)]['recall'] - base['by_k'][max(ks)]['recall']
+        print(f"   {r['dimensions']:>5}{r['chunks']:>8}{r['vector_mb']:>10.3f}{r['text_mb']:>10.3f}"
+              f"{r['latency_p50_ms']:>9.3f}{r['latency_p99_ms']:>9.3f}"
+              + ''.join(f"{r['by_k'][k]['recall']:>8.3f}{r['by_k'][k]['mrr']:>9.3f}" for k in ks)
+              + f"{delta:>+10.3f}")
+    print("=" * 100)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara dimensiones de embedding con el set dorado offline")
+    parser.add_argument('--preguntas', default=str(br.PREGUNTAS_CSV),
+                        help="CSV de preguntas frecuentes (default: datasetmut/preguntas.csv)")
+    parser.add_argument('--whatsapp', default=str(br.WHATSAPP_CSV),
+                        help="CSV de conversaciones de WhatsApp para el set dorado")
+    parser.add_argument('--parafrasis', default=str(br.PARAFRASIS_CSV),
+                        help="CSV consulta;pregunta de paráfrasis para el set dorado")
+    parser.add_argument('--vectorial-dir',
+                        help="Carpeta con *_vectorial.csv (tiendas, restaurantes, eventos) para indexar también")
+    parser.add_argument('--dimensions', type=br.lista_enteros, default=list(TITAN_V2_DIMENSIONS),
+                        help="Dimensiones separadas por coma (default: 256,512,1024)")
+    parser.add_argument('--output-mode', choices=['chunks', 'documents'], default='chunks',
+                        help="kb_output_mode a simular (default: chunks)")
+    parser.add_argument('--max-tokens', type=int, default=300,
+                        help="Tamaño de chunk; 0 = chunking NONE (default: 300)")
+    parser.add_argument('--overlap', type=int, default=15,
+                        help="Porcentaje de solapamiento (default: 15)")
+    parser.add_argument('--k', type=br.lista_enteros, default=[5, 10],
+                        help="numberOfResults a evaluar separados por coma (default: 5,10)")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Repeticiones de cada consulta para la latencia (default: 3)")
+    parser.add_argument('--output-json', help="Guarda los resultados en un archivo JSON")
+    args = parser.parse_args(argv)
+
+    print("🔄 Cargando documentos...")
+    documentos = br.cargar_documentos(args.preguntas, args.vectorial_dir)
+    consultas = br.construir_set_dorado(documentos, args.whatsapp, args.parafrasis)
+    if not consultas:
+        print("❌ El set dorado quedó vacío")
+        return 1
+    chunks = br.dividir_en_chunks(br.construir_archivos(documentos, args.output_mode), args.max_tokens, args.overlap)
+    print(f"✅ {len(chunks)} chunks, {len(consultas)} consultas")
+
+    resultados = []
+    for dimensions in args.dimensions:
+        print(f"   📐 {dimensions} dimensiones...")
+        resultados.append(evaluar_dimension(chunks, consultas, dimensions, args.k, args.repeat))
+    imprimir_resultados(resultados, args.k, consultas, args)
+
+    if args.output_json:
+        with open(args.output_json, 'w', encoding='utf-8') as f:
+            json.dump({'queries': len(consultas), 'results': resultados}, f, ensure_ascii=False, indent=2)
+        print(f"💾 Resultados en {args.output_json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
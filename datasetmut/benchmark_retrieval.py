@@ -0,0 +1,444 @@
+"""
+Benchmark offline de recuperación para el Knowledge Base
+Mide chunking y parámetros de búsqueda sin AWS ni red
+
+Los valores actuales de stack_backend_bedrock.py (max_tokens=300,
+overlap_percentage=15, numberOfResults=10, búsqueda HYBRID) se eligieron sin
+medir. Este script:
+- Arma un set dorado consulta → documento(s) esperado(s) con consultas que no
+  son el texto indexado: preguntas de WhatsApp que no están en preguntas.csv
+  (esperado: el FAQ de respuesta similar), paráfrasis escritas a mano
+  (consultas_parafraseadas.csv) y, si se indica --vectorial-dir, los nombres
+  de tiendas y restaurantes ("dónde está <titulo>")
+- Transforma los documentos con el mismo ETL que escribe el KB (etl_stdlib) y
+  los agrupa en archivos igual que kb_output_mode (chunks: N filas por JSONL;
+  documents: un archivo por documento)
+- Divide cada archivo en chunks de tamaño fijo (max_tokens / overlap), como
+  FIXED_SIZE de Bedrock (max_tokens=0 simula chunking NONE: un chunk por
+  archivo, con --output-mode documents y el límite KB_MAX_DOCUMENT_TOKENS del
+  ETL), y los indexa en el índice local en memoria (local_vector_store.py):
+  * SEMANTIC: coseno sobre un embedding local determinista (hashing de
+    palabras y trigramas de caracteres), sustituto de Titan sin red
+  * HYBRID: fusión por rango recíproco del coseno y BM25 sobre palabras
+- Reporta recall@k, MRR y latencia por consulta para cada combinación
+
+Los números absolutos no son los de Titan + Pinecone: sirven para comparar
+configuraciones entre sí, no para estimar la calidad en producción.
+
+USO (desde la raíz del repo):
+    python datasetmut/benchmark_retrieval.py
+    python datasetmut/benchmark_retrieval.py --vectorial-dir dataset/vectorial
+    python datasetmut/benchmark_retrieval.py --max-tokens 150,300,500 --overlap 0,15,30 --k 3,5,10
+    python datasetmut/benchmark_retrieval.py --output-mode documents --output-json benchmark.json
+    python datasetmut/benchmark_retrieval.py --output-mode documents --max-tokens 0,300 --max-document-tokens 512
+"""
+
+import re
+import sys
+import csv
+import json
+import time
+import argparse
+import unicodedata
+from difflib import SequenceMatcher
+from pathlib import Path
+from collections import Counter, defaultdict
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "stack_backend_lambda_light_etl"))
+
+import etl_stdlib  # noqa: E402
+from etl_datasets import DATASET_CONFIGS, NUM_ROWS_PER_FILE, VECTORIAL_FILENAMES  # noqa: E402
+from local_vector_store import LocalVectorStore, normalizar  # noqa: E402
+
+
+PREGUNTAS_CSV = Path(__file__).resolve().parent / "preguntas.csv"
+WHATSAPP_CSV = Path(__file__).resolve().parent / "whatsapp visitantes04-12-2025.csv"
+PARAFRASIS_CSV = Path(__file__).resolve().parent / "consultas_parafraseadas.csv"
+
+# Configuración desplegada hoy (stack_backend_bedrock.py)
+CURRENT_CONFIG = {'max_tokens': 300, 'overlap': 15, 'k': 10, 'search': 'HYBRID'}
+
+# Similitud mínima entre la respuesta de WhatsApp y la de un documento FAQ
+# para contarlo como esperado (las respuestas se editan levemente al copiarlas)
+UMBRAL_RESPUESTA = 0.85
+
+
+# ============================================================================
+# TEXTO
+# ============================================================================
+
+def limpiar_texto(texto):
+    """Misma limpieza que la Lambda de extracción, sin pandas."""
+    texto = str(texto or '').strip()
+    texto = unicodedata.normalize('NFKD', texto)
+    texto = texto.replace('\r', ' ').replace('\n', ' ').replace('\t', ' ')
+    texto = re.sub(r'\s+', ' ', texto)
+    texto = re.sub(r'<[^>]+>', '', texto)
+    return unicodedata.normalize('NFC', texto).strip()
+
+
+def tokenizar(texto):
+    """Aproximación a los tokens del chunking de Bedrock: palabras y signos."""
+    return re.findall(r'\w+|[^\w\s]', texto)
+
+
+# ============================================================================
+# DATOS
+# ============================================================================
+
+def leer_csv_punto_y_coma(path):
+    """Filas de un CSV exportado de Excel (UTF-8 con BOM, separador ';')."""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f, delimiter=';')
+        reader.fieldnames = [col.strip().lower() for col in reader.fieldnames]
+        return [{k: (v or '') for k, v in row.items() if k} for row in reader]
+
+
+def construir_preguntas(path):
+    """Filas vectoriales de preguntas, igual que preparar_datos_vectoriales de la extracción."""
+    rows = []
+    for row in leer_csv_punto_y_coma(path):
+        pregunta = limpiar_texto(row.get('pregunta'))
+        respuesta = limpiar_texto(row.get('respuesta'))
+        if not pregunta or not respuesta:
+            continue
+        categoria_completa = limpiar_texto(row.get('categoria_completa'))
+        categoria_nombre = re.sub(r'^\d+\s+', '', categoria_completa)
+
+        partes = []
+        if categoria_nombre:
+            partes.append(f"CATEGORIA: {categoria_nombre}")
+        partes.append(f"PREGUNTA: {pregunta}")
+        partes.append(f"RESPUESTA: {respuesta}")
+
+        rows.append({
+            'pregunta': pregunta,
+            'respuesta': respuesta,
+            'categoria_completa': categoria_completa,
+            'categoria_nombre': categoria_nombre,
+            'texto_embedding': " | ".join(partes),
+            'document_type': 'pregunta_frecuente',
+            'search_category': 'faqs_y_ayuda'
+        })
+    return rows
+
+
+def cargar_documentos(preguntas_path, vectorial_dir=None):
+    """
+    {file_type: [docs]} transformados con etl_stdlib. Cada doc lleva 'key'
+    (file_type:índice), estable entre configuraciones.
+    """
+    fuentes = {'preguntas': construir_preguntas(preguntas_path)}
+
+    if vectorial_dir:
+        for file_type, filename in VECTORIAL_FILENAMES.items():
+            path = Path(vectorial_dir) / filename
+            if file_type == 'preguntas' or not path.exists():
+                continue
+            fuentes[file_type] = list(etl_stdlib.iter_csv_rows(path.read_text(encoding='utf-8'), file_type))
+
+    documentos = {}
+    for file_type, rows in fuentes.items():
+        print(f"📄 {file_type}: {len(rows)} filas")
+        docs = etl_stdlib.transform_for_bedrock_kb(rows, file_type, DATASET_CONFIGS[file_type])
+        for idx, doc in enumerate(docs):
+            doc['key'] = f"{file_type}:{idx}"
+        documentos[file_type] = docs
+    return documentos
+
+
+def agregar_consulta(consultas, texto, esperados, origen):
+    """Agrega una consulta al set dorado; las repetidas suman sus documentos esperados."""
+    clave = normalizar(texto)
+    if not clave or not esperados:
+        return
+    if clave in consultas:
+        consultas[clave]['expected'].update(esperados)
+        return
+    consultas[clave] = {'query': texto, 'expected': set(esperados), 'source': origen}
+
+
+def construir_set_dorado(documentos, whatsapp_path=None, parafrasis_path=None):
+    """
+    Lista de {query, expected, source}, solo con consultas que no son el texto
+    de un documento (si lo fueran, cualquier configuración acierta):
+    - whatsapp: preguntas reales que no están en preguntas.csv, con los
+      documentos FAQ cuya respuesta se parece a la del agente de WhatsApp
+      (difflib >= UMBRAL_RESPUESTA sobre el texto normalizado)
+    - parafrasis: consultas escritas como las haría un visitante
+      (consultas_parafraseadas.csv) → documento de la pregunta que reformulan
+    - directorio: "dónde está <titulo>" → tiendas/restaurantes con ese nombre
+    """
+    consultas = {}
+    faqs = documentos.get('preguntas', [])
+
+    por_pregunta = defaultdict(set)
+    for doc in faqs:
+        por_pregunta[normalizar(doc.get('pregunta'))].add(doc['key'])
+
+    if whatsapp_path and Path(whatsapp_path).exists():
+        respuestas = [(normalizar(doc.get('respuesta')), doc['key']) for doc in faqs]
+        for row in leer_csv_punto_y_coma(whatsapp_path):
+            pregunta = limpiar_texto(row.get('pregunta'))
+            if normalizar(pregunta) in por_pregunta:
+                continue
+            respuesta = normalizar(limpiar_texto(row.get('respuesta')))
+            esperados = {
+                key for texto, key in respuestas
+                if SequenceMatcher(None, respuesta, texto).ratio() >= UMBRAL_RESPUESTA
+            }
+            agregar_consulta(consultas, pregunta, esperados, 'whatsapp')
+
+    if parafrasis_path and Path(parafrasis_path).exists():
+        for row in leer_csv_punto_y_coma(parafrasis_path):
+            consulta = limpiar_texto(row.get('consulta'))
+            pregunta = normalizar(limpiar_texto(row.get('pregunta')))
+            if pregunta not in por_pregunta:
+                print(f"⚠️ Paráfrasis sin pregunta en preguntas.csv: {row.get('pregunta')}")
+                continue
+            if normalizar(consulta) == pregunta:
+                continue
+            agregar_consulta(consultas, consulta, por_pregunta[pregunta], 'parafrasis')
+
+    por_titulo = defaultdict(set)
+    for file_type in ('stores', 'restaurantes'):
+        for doc in documentos.get(file_type, []):
+            if doc.get('titulo'):
+                por_titulo[doc['titulo']].add(doc['key'])
+    for titulo, esperados in por_titulo.items():
+        agregar_consulta(consultas, f"dónde está {titulo}", esperados, 'directorio')
+
+    return list(consultas.values())
+
+
+# ============================================================================
+# CHUNKING
+# ============================================================================
+
+def construir_archivos(documentos, output_mode, max_document_tokens=0):
+    """
+    Archivos tal como los escribe el ETL: lista de [(texto, doc key)] por
+    archivo. En modo chunks las filas de un archivo se concatenan como JSONL,
+    así que un chunk puede abarcar varios documentos. En modo documents se
+    aplica el mismo límite de tamaño por documento que el ETL.
+    """
+    archivos = []
+    for file_type, docs in documentos.items():
+        config = DATASET_CONFIGS[file_type]
+        if output_mode == 'documents' and max_document_tokens:
+            docs = etl_stdlib.split_oversized_documents(docs, max_document_tokens)
+        size = 1 if output_mode == 'documents' else NUM_ROWS_PER_FILE.get(file_type, 10)
+        for grupo in etl_stdlib.iter_chunks(docs, size):
+            if output_mode == 'documents':
+                archivos.append([(doc['bedrock_text'], doc['key']) for doc in grupo])
+            else:
+                archivos.append([
+                    (json.dumps(etl_stdlib.build_jsonl_doc(doc, config), ensure_ascii=False), doc['key'])
+                    for doc in grupo
+                ])
+    return archivos
+
+
+def dividir_en_chunks(archivos, max_tokens, overlap):
+    """
+    Chunks de tamaño fijo con solapamiento: [{text, docs}] (docs: keys que abarca).
+    max_tokens=0 equivale a chunking NONE: cada archivo es un chunk.
+    """
+    paso = max(1, max_tokens - round(max_tokens * overlap / 100))
+    chunks = []
+    for archivo in archivos:
+        tokens, duenos = [], []
+        for texto, key in archivo:
+            partes = tokenizar(texto)
+            tokens.extend(partes)
+            duenos.extend([key] * len(partes))
+
+        if not max_tokens:
+            chunks.append({'text': ' '.join(tokens), 'docs': set(duenos)})
+            continue
+
+        inicio = 0
+        while inicio < len(tokens):
+            fin = min(inicio + max_tokens, len(tokens))
+            chunks.append({'text': ' '.join(tokens[inicio:fin]), 'docs': set(duenos[inicio:fin])})
+            if fin == len(tokens):
+                break
+            inicio += paso
+    return chunks
+
+
+# ============================================================================
+# EVALUACIÓN
+# ============================================================================
+
+def percentil(valores, p):
+    """Percentil p (0-100) por el método del rango más cercano."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def evaluar(indice, consultas, ks, search_type):
+    """recall@k y MRR@k por k (global y por origen), y latencia por consulta en ms."""
+    max_k = max(ks)
+    primeros = []
+    latencias = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        resultados = indice.search(consulta['query'], max_k, search_type)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+        rango = next(
+            (pos + 1 for pos, r in enumerate(resultados) if r['metadata']['docs'] & consulta['expected']),
+            None
+        )
+        primeros.append((consulta['source'], rango))
+
+    metricas = {}
+    for k in ks:
+        por_origen = defaultdict(list)
+        for origen, rango in primeros:
+            por_origen[origen].append(rango if rango is not None and rango <= k else None)
+        todos = [r for rangos in por_origen.values() for r in rangos]
+        metricas[k] = {
+            'recall': sum(1 for r in todos if r) / len(todos),
+            'mrr': sum(1 / r for r in todos if r) / len(todos),
+            'recall_by_source': {
+                origen: sum(1 for r in rangos if r) / len(rangos) for origen, rangos in por_origen.items()
+            }
+        }
+
+    return metricas, {
+        'latency_p50_ms': percentil(latencias, 50),
+        'latency_p95_ms': percentil(latencias, 95)
+    }
+
+
+def ejecutar_grid(documentos, consultas, max_tokens_grid, overlap_grid, ks, search_types, output_mode,
+                  max_document_tokens=0):
+    """Una fila de resultados por (max_tokens, overlap, search, k)."""
+    archivos = construir_archivos(documentos, output_mode, max_document_tokens)
+    resultados = []
+
+    for max_tokens in max_tokens_grid:
+        # Sin chunking el solapamiento no aplica
+        for overlap in (overlap_grid if max_tokens else [0]):
+            chunks = dividir_en_chunks(archivos, max_tokens, overlap)
+            inicio = time.perf_counter()
+            indice = LocalVectorStore().add_many(
+                {'text': c['text'], 'metadata': {'docs': c['docs']}} for c in chunks
+            ).build()
+            build_ms = (time.perf_counter() - inicio) * 1000
+            docs_por_chunk = sum(len(c['docs']) for c in chunks) / len(chunks)
+            print(f"   🧩 max_tokens={max_tokens} overlap={overlap}%: {len(chunks)} chunks "
+                  f"({docs_por_chunk:.1f} docs/chunk), índice en {build_ms:.0f} ms")
+
+            for search_type in search_types:
+                metricas, latencia = evaluar(indice, consultas, ks, search_type)
+                for k in ks:
+                    resultados.append({
+                        'max_tokens': max_tokens,
+                        'overlap': overlap,
+                        'search': search_type,
+                        'k': k,
+                        'chunks': len(chunks),
+                        'docs_per_chunk': round(docs_por_chunk, 2),
+                        **metricas[k],
+                        **latencia
+                    })
+    return resultados
+
+
+def es_config_actual(fila):
+    return all(fila[campo] == valor for campo, valor in CURRENT_CONFIG.items())
+
+
+def imprimir_resultados(resultados, consultas, output_mode):
+    origenes = Counter(c['source'] for c in consultas)
+    print("\n" + "=" * 100)
+    print(f"📊 BENCHMARK DE RECUPERACIÓN - kb_output_mode={output_mode}, {len(consultas)} consultas "
+          f"({', '.join(f'{o}={n}' for o, n in origenes.items())})")
+    print("=" * 100)
+    print(f"   {'max_tok':>7}{'overlap':>8}{'search':>10}{'k':>4}{'chunks':>8}"
+          f"{'recall@k':>10}{'MRR':>8}{'p50 ms':>9}{'p95 ms':>9}")
+
+    ordenados = sorted(resultados, key=lambda r: (r['k'], -r['recall'], -r['mrr']))
+    for fila in ordenados:
+        marca = ' ⭐ actual' if es_config_actual(fila) else ''
+        print(f"   {fila['max_tokens']:>7}{fila['overlap']:>7}%{fila['search']:>10}{fila['k']:>4}"
+              f"{fila['chunks']:>8}{fila['recall']:>10.3f}{fila['mrr']:>8.3f}"
+              f"{fila['latency_p50_ms']:>9.2f}{fila['latency_p95_ms']:>9.2f}{marca}")
+
+    mejor = max(resultados, key=lambda r: (r['recall'], r['mrr'], -r['k'], -r['latency_p50_ms']))
+    print(f"\n🏆 Mejor: max_tokens={mejor['max_tokens']} overlap={mejor['overlap']}% "
+          f"{mejor['search']} k={mejor['k']} → recall@k={mejor['recall']:.3f} MRR={mejor['mrr']:.3f}")
+    actual = next((r for r in resultados if es_config_actual(r)), None)
+    if actual:
+        por_origen = ', '.join(f"{o}={v:.3f}" for o, v in actual['recall_by_source'].items())
+        print(f"⭐ Actual: recall@k={actual['recall']:.3f} MRR={actual['mrr']:.3f} ({por_origen})")
+    print("=" * 100)
+
+
+def lista_enteros(valor):
+    return [int(v) for v in valor.split(',') if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline de chunking y búsqueda del Knowledge Base")
+    parser.add_argument('--preguntas', default=str(PREGUNTAS_CSV),
+                        help="CSV de preguntas frecuentes (default: datasetmut/preguntas.csv)")
+    parser.add_argument('--whatsapp', default=str(WHATSAPP_CSV),
+                        help="CSV de conversaciones de WhatsApp para el set dorado")
+    parser.add_argument('--parafrasis', default=str(PARAFRASIS_CSV),
+                        help="CSV consulta;pregunta de paráfrasis para el set dorado")
+    parser.add_argument('--vectorial-dir',
+                        help="Carpeta con *_vectorial.csv (tiendas, restaurantes, eventos) para indexar también")
+    parser.add_argument('--output-mode', choices=['chunks', 'documents'], default='chunks',
+                        help="kb_output_mode a simular (default: chunks)")
+    parser.add_argument('--max-tokens', type=lista_enteros, default=[150, 300, 500],
+                        help="Tamaños de chunk separados por coma; 0 = chunking NONE (default: 150,300,500)")
+    parser.add_argument('--max-document-tokens', type=int, default=0,
+                        help="Límite por documento del ETL en modo documents (KB_MAX_DOCUMENT_TOKENS, default: 0)")
+    parser.add_argument('--overlap', type=lista_enteros, default=[0, 15, 30],
+                        help="Porcentajes de solapamiento separados por coma (default: 0,15,30)")
+    parser.add_argument('--k', type=lista_enteros, default=[3, 5, 10],
+                        help="numberOfResults a evaluar separados por coma (default: 3,5,10)")
+    parser.add_argument('--search', default='SEMANTIC,HYBRID',
+                        help="Tipos de búsqueda separados por coma (default: SEMANTIC,HYBRID)")
+    parser.add_argument('--output-json', help="Guarda los resultados en un archivo JSON")
+    args = parser.parse_args(argv)
+
+    search_types = [s.strip().upper() for s in args.search.split(',') if s.strip()]
+    invalidos = set(search_types) - {'SEMANTIC', 'HYBRID'}
+    if invalidos:
+        parser.error(f"Tipos de búsqueda no soportados: {', '.join(sorted(invalidos))}")
+
+    print("🔄 Cargando documentos...")
+    documentos = cargar_documentos(args.preguntas, args.vectorial_dir)
+    consultas = construir_set_dorado(documentos, args.whatsapp, args.parafrasis)
+    if not consultas:
+        print("❌ El set dorado quedó vacío")
+        return 1
+    print(f"✅ {sum(len(d) for d in documentos.values())} documentos, {len(consultas)} consultas")
+
+    print("\n🔎 Evaluando grid...")
+    resultados = ejecutar_grid(
+        documentos, consultas, args.max_tokens, args.overlap, args.k, search_types, args.output_mode,
+        args.max_document_tokens
+    )
+    imprimir_resultados(resultados, consultas, args.output_mode)
+
+    if args.output_json:
+        with open(args.output_json, 'w', encoding='utf-8') as f:
+            json.dump({'output_mode': args.output_mode, 'queries': len(consultas), 'results': resultados},
+                      f, ensure_ascii=False, indent=2)
+        print(f"💾 Resultados en {args.output_json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""
+Índice vectorial local en memoria, sustituto del Knowledge Base (Titan + Pinecone)
+Permite probar y medir la recuperación sin AWS ni red
+
+- Embedding local determinista: hashing de palabras y trigramas de caracteres
+  (sin acentos) en N dimensiones, tf sublineal y norma L2. Mismo texto, mismo
+  vector, en cualquier máquina
+- Búsqueda SEMANTIC (coseno) o HYBRID (fusión por rango recíproco del coseno
+  y BM25 sobre palabras), como overrideSearchType del Retrieve de Bedrock
+- Filtros por metadata: {campo: valor} o {campo: [valores]} (equals / in)
+- Carga directa de la salida del ETL: JSONL de kb_output_mode chunks (un
+  registro por línea) y .txt + .metadata.json de kb_output_mode documents
+
+Con numpy los vectores se guardan en una matriz float32 y la búsqueda es un
+producto matriz-vector; sin numpy se usa Python puro con vectores dispersos
+(más lento, mismo resultado). La búsqueda es exacta: con los pocos miles de
+registros de MUT no hace falta un índice aproximado.
+
+USO (desde la raíz del repo):
+    python datasetmut/local_vector_store.py --path out/ --query "dónde está nike"
+    python datasetmut/local_vector_store.py --path out/ --query "sushi" --filter document_type=restaurante --k 3
+"""
+
+import re
+import sys
+import json
+import math
+import time
+import zlib
+import argparse
+import unicodedata
+from pathlib import Path
+from collections import Counter, defaultdict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+EMBEDDING_DIMENSIONS = 1024
+
+SEARCH_TYPES = ('SEMANTIC', 'HYBRID')
+
+# Constante de la fusión por rango recíproco (HYBRID)
+RRF_K = 60
+
+
+def normalizar(texto):
+    """Minúsculas, sin acentos ni signos: para comparar y para el índice."""
+    texto = unicodedata.normalize('NFKD', str(texto or '').lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9ñ]+', ' ', texto).strip()
+
+
+def embedding_local(texto, dimensions=EMBEDDING_DIMENSIONS):
+    """
+    Embedding determinista sin red: hashing de palabras y trigramas de
+    caracteres (sin acentos), tf sublineal y norma L2. Vector disperso {dim: peso}.
+    """
+    normalizado = normalizar(texto)
+    features = Counter(f"w:{palabra}" for palabra in normalizado.split())
+    for palabra in normalizado.split():
+        marcada = f" {palabra} "
+        features.update(f"c:{marcada[i:i + 3]}" for i in range(len(marcada) - 2))
+
+    vector = defaultdict(float)
+    for feature, count in features.items():
+        h = zlib.crc32(feature.encode('utf-8'))
+        signo = 1.0 if h & 1 else -1.0
+        vector[(h >> 1) % dimensions] += signo * (1 + math.log(count))
+
+    norma = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {dim: v / norma for dim, v in vector.items() if v}
+
+
+def cumple_filtros(metadata, filters):
+    """True si la metadata cumple todos los filtros (valor exacto o lista de valores)."""
+    for campo, esperado in (filters or {}).items():
+        valor = metadata.get(campo)
+        if isinstance(esperado, (list, tuple, set)):
+            if valor not in esperado:
+                return False
+        elif valor != esperado:
+            return False
+    return True
+
+
+def ordenar(scores):
+    """Posiciones por score descendente; los empates, por posición (determinista)."""
+    return sorted(scores, key=lambda i: (-scores[i], i))
+
+
+class LocalVectorStore:
+    """
+    Índice en memoria con coseno sobre el embedding local y BM25.
+    Cada registro es {id, text, metadata}; search retorna los registros con
+    su posición (index) y score.
+    """
+
+    def __init__(self, dimensions=EMBEDDING_DIMENSIONS, k1=1.2, b=0.75):
+        self.dimensions = dimensions
+        self.k1 = k1
+        self.b = b
+        self.records = []
+        self.vectors = []
+        self.matrix = None
+        self.term_postings = defaultdict(list)
+        self.lengths = []
+        self.idf = {}
+        self.avg_length = 0
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, text, metadata=None, record_id=None):
+        """Agrega un registro; el índice se reconstruye en la siguiente búsqueda."""
+        self.records.append({
+            'id': record_id if record_id is not None else str(len(self.records)),
+            'text': text,
+            'metadata': metadata or {}
+        })
+        self.vectors.append(embedding_local(text, self.dimensions))
+        self.dirty = True
+        return self
+
+    def add_many(self, records):
+        """Agrega registros {text, metadata?, id?}."""
+        for record in records:
+            self.add(record['text'], record.get('metadata'), record.get('id'))
+        return self
+
+    def build(self):
+        """Matriz de vectores (numpy) y estadísticas BM25."""
+        if np is not None:
+            self.matrix = np.zeros((len(self.vectors), self.dimensions), dtype=np.float32)
+            for i, vector in enumerate(self.vectors):
+                if vector:
+                    self.matrix[i, list(vector)] = list(vector.values())
+
+        self.term_postings = defaultdict(list)
+        self.lengths = []
+        for i, record in enumerate(self.records):
+            term_freqs = Counter(normalizar(record['text']).split())
+            self.lengths.append(sum(term_freqs.values()))
+            for term, freq in term_freqs.items():
+                self.term_postings[term].append((i, freq))
+
+        n = len(self.records)
+        self.avg_length = (sum(self.lengths) / n) if n else 0
+        self.idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.term_postings.items()
+        }
+        self.dirty = False
+        return self
+
+    def semantic(self, query, candidates=None):
+        """{posición: coseno} de los registros con algún componente en común con la consulta."""
+        query_vector = embedding_local(query, self.dimensions)
+        if np is not None:
+            dense = np.zeros(self.dimensions, dtype=np.float32)
+            if query_vector:
+                dense[list(query_vector)] = list(query_vector.values())
+            scores = self.matrix @ dense
+            positions = np.flatnonzero(scores) if candidates is None else [i for i in candidates if scores[i]]
+            return {int(i): float(scores[i]) for i in positions}
+
+        scores = {}
+        for i in (range(len(self.records)) if candidates is None else candidates):
+            vector = self.vectors[i]
+            score = sum(peso * vector.get(dim, 0.0) for dim, peso in query_vector.items())
+            if score:
+                scores[i] = score
+        return scores
+
+    def bm25(self, query, candidates=None):
+        """{posición: score BM25} sobre las palabras normalizadas de la consulta."""
+        scores = defaultdict(float)
+        for term in set(normalizar(query).split()):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, freq in self.term_postings[term]:
+                if candidates is not None and i not in candidates:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                scores[i] += idf * freq * (self.k1 + 1) / (freq + norm)
+        return scores
+
+    def search(self, query, k=10, search_type='HYBRID', filters=None):
+        """
+        Los k registros más relevantes: [{index, id, text, metadata, score}].
+        En HYBRID el score es el de la fusión por rango recíproco.
+        """
+        if search_type not in SEARCH_TYPES:
+            raise ValueError(f"search_type must be one of {SEARCH_TYPES}, got {search_type}")
+        if self.dirty:
+            self.build()
+
+        candidates = None
+        if filters:
+            candidates = {i for i, record in enumerate(self.records) if cumple_filtros(record['metadata'], filters)}
+
+        scores = self.semantic(query, candidates)
+        if search_type == 'HYBRID':
+            fused = defaultdict(float)
+            for ranking in (scores, self.bm25(query, candidates)):
+                for rank, i in enumerate(ordenar(ranking)):
+                    fused[i] += 1 / (RRF_K + rank + 1)
+            scores = fused
+
+        top = ordenar(scores)[:k]
+        return [{'index': i, **self.records[i], 'score': scores[i]} for i in top]
+
+    def stats(self):
+        """Tamaño del índice: registros, bytes de vectores float32 y de texto."""
+        return {
+            'records': len(self.records),
+            'dimensions': self.dimensions,
+            'vector_bytes': len(self.records) * self.dimensions * 4,
+            'text_bytes': sum(len(record['text'].encode('utf-8')) for record in self.records)
+        }
+
+    @classmethod
+    def from_etl_output(cls, path, dimensions=EMBEDDING_DIMENSIONS):
+        """Índice con la salida del ETL en path (carpeta, recursivo, o un archivo)."""
+        return cls(dimensions).add_many(cargar_salida_etl(path)).build()
+
+
+def leer_metadata_sidecar(path):
+    """metadataAttributes del .metadata.json de un archivo, o {}."""
+    sidecar = Path(f"{path}.metadata.json")
+    if not sidecar.exists():
+        return {}
+    return json.loads(sidecar.read_text(encoding='utf-8')).get('metadataAttributes', {})
+
+
+def cargar_salida_etl(path):
+    """
+    Registros {id, text, metadata} de la salida del ETL:
+    - *.jsonl (kb_output_mode chunks): un registro por línea, con su metadata
+      sobre los metadataAttributes del archivo
+    - *.txt (kb_output_mode documents): un registro por archivo con su sidecar
+    """
+    path = Path(path)
+    files = [path] if path.is_file() else sorted(p for p in path.rglob('*') if p.suffix in ('.jsonl', '.txt'))
+    records = []
+    for file in files:
+        file_metadata = leer_metadata_sidecar(file)
+        if file.suffix == '.txt':
+            records.append({'id': file.stem, 'text': file.read_text(encoding='utf-8'), 'metadata': file_metadata})
+            continue
+        with open(file, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                doc = json.loads(line)
+                records.append({
+                    'id': doc.get('document_id'),
+                    'text': doc.get('content', ''),
+                    'metadata': {**file_metadata, **doc.get('metadata', {})}
+                })
+    return records
+
+
+def parsear_filtro(valor):
+    """campo=valor o campo=v1,v2."""
+    campo, _, valores = valor.partition('=')
+    valores = [v for v in valores.split(',') if v]
+    if not campo or not valores:
+        raise argparse.ArgumentTypeError(f"Filtro inválido: {valor} (usar campo=valor o campo=v1,v2)")
+    return campo, valores[0] if len(valores) == 1 else valores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta un índice vectorial local con la salida del ETL")
+    parser.add_argument('--path', required=True, help="Carpeta o archivo de salida del ETL (JSONL / .txt)")
+    parser.add_argument('--query', required=True, help="Consulta")
+    parser.add_argument('--k', type=int, default=5, help="Cantidad de resultados (default: 5)")
+    parser.add_argument('--search', choices=SEARCH_TYPES, default='HYBRID', help="Tipo de búsqueda (default: HYBRID)")
+    parser.add_argument('--filter', type=parsear_filtro, action='append', default=[],
+                        help="Filtro por metadata campo=valor o campo=v1,v2 (repetible)")
+    parser.add_argument('--dimensions', type=int, default=EMBEDDING_DIMENSIONS,
+                        help=f"Dimensiones del embedding local (default: {EMBEDDING_DIMENSIONS})")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    store = LocalVectorStore.from_etl_output(args.path, args.dimensions)
+    if not len(store):
+        print(f"❌ No se encontraron registros en {args.path}")
+        return 1
+    stats = store.stats()
+    print(f"✅ {stats['records']} registros indexados en {(time.perf_counter() - inicio) * 1000:.0f} ms "
+          f"({stats['vector_bytes'] / 1024:.0f} KB de vectores, {'numpy' if np is not None else 'python puro'})")
+
+    inicio = time.perf_counter()
+    resultados = store.search(args.query, args.k, args.search, dict(args.filter))
+    print(f"🔎 {len(resultados)} resultados en {(time.perf_counter() - inicio) * 1000:.2f} ms\n")
+    for pos, resultado in enumerate(resultados, start=1):
+        tipo = resultado['metadata'].get('document_type', '')
+        print(f"{pos:>2}. [{resultado['score']:.4f}] {tipo} {resultado['id']}")
+        print(f"    {resultado['text'][:160]}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
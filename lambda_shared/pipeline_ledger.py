@@ -0,0 +1,68 @@
+"""
+Ledger de ejecución de las Lambdas del pipeline (extracción, ETL y sincronización)
+
+Se empaqueta como capa (/opt/python) en cada Lambda. Cuenta las llamadas a APIs
+y los bytes escritos en S3 de la invocación y arma el resumen que la state
+machine guarda en la tabla mut-pipeline-run-ledger (ver ledger_report.py).
+"""
+
+import os
+import time
+from datetime import datetime
+
+# Contadores de la invocación en curso; bytes en None = no se mide en esta Lambda
+LEDGER = {'api_calls': 0, 'bytes': 0, 'records_in': 0, 'records_out': 0}
+
+# Precio Lambda (USD por GB-segundo y por invocación) para el costo estimado
+LAMBDA_GB_SECOND_USD = 0.0000166667
+LAMBDA_REQUEST_USD = 0.0000002
+
+
+def contar_llamada(**kwargs):
+    LEDGER['api_calls'] += 1
+
+
+def contar_bytes(params, **kwargs):
+    body = params.get('Body')
+    if isinstance(body, (bytes, str)) and LEDGER['bytes'] is not None:
+        LEDGER['bytes'] += len(body)
+
+
+def registrar_contadores(events, evento='provide-client-params', medir_bytes=True):
+    """
+    Registra los contadores en los eventos de un cliente o sesión boto3.
+    evento acota las llamadas contadas (p. ej. 'provide-client-params.s3');
+    con medir_bytes se suma el Body de cada PutObject.
+    """
+    events.register(evento, contar_llamada)
+    if medir_bytes:
+        events.register('provide-client-params.s3.PutObject', contar_bytes)
+
+
+def iniciar_ledger(medir_bytes=True):
+    """Reinicia los contadores al comienzo de la invocación; retorna (inicio, started_at)"""
+    LEDGER.update(api_calls=0, bytes=0 if medir_bytes else None, records_in=0, records_out=0)
+    return time.time(), datetime.utcnow().isoformat()
+
+
+def resumen_ledger(context, inicio, started_at, records_in=None, records_out=None):
+    """
+    Métricas de la etapa: tiempos, registros (por defecto los de LEDGER),
+    bytes escritos (solo si se miden), llamadas a APIs y costo estimado.
+    """
+    duration_ms = int((time.time() - inicio) * 1000)
+    memory_mb = int(getattr(context, 'memory_limit_in_mb', 0) or os.environ.get('AWS_LAMBDA_FUNCTION_MEMORY_SIZE', 0))
+    costo = duration_ms / 1000 * memory_mb / 1024 * LAMBDA_GB_SECOND_USD + LAMBDA_REQUEST_USD
+    resumen = {
+        'started_at': started_at,
+        'ended_at': datetime.utcnow().isoformat(),
+        'duration_ms': duration_ms,
+        'records_in': LEDGER['records_in'] if records_in is None else records_in,
+        'records_out': LEDGER['records_out'] if records_out is None else records_out,
+        'api_calls': LEDGER['api_calls'],
+        'memory_mb': memory_mb,
+        'estimated_cost_usd': round(costo, 8)
+    }
+    if LEDGER['bytes'] is not None:
+        resumen['bytes'] = LEDGER['bytes']
+    return resumen
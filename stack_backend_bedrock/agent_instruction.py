@@ -0,0 +1,98 @@
+"""
+Agent instruction compiler.
+
+The agent instruction is sent on every agent turn, so each token costs
+latency and money on every message. The instruction is declared as sections
+(menu, terminology, examples, rules...) and compiled into a compact prompt:
+whitespace is minified, lines repeated across sections are dropped and the
+estimated token count is checked against agent_instruction_max_tokens
+(cdk.json) at synth time.
+"""
+
+import re
+import unicodedata
+from math import ceil
+from typing import List
+from dataclasses import dataclass, field
+
+
+@dataclass
+class InstructionSection:
+    """
+    One section of the agent instruction.
+
+    title: rendered as a "## TITLE" heading (no heading when empty)
+    lines: one instruction per line; a line may contain "\\n" (e.g. P:/R: examples)
+    bullet: prefix added to every line, e.g. "- " for rule lists
+    dedupe: drop lines already present earlier in the instruction
+    """
+    title: str
+    lines: List[str] = field(default_factory=list)
+    bullet: str = ""
+    dedupe: bool = True
+
+
+@dataclass
+class CompiledInstruction:
+    """Compiled instruction and its token accounting"""
+    text: str
+    tokens: int
+    source_tokens: int  # before removing duplicates
+    removed_duplicates: List[str]
+
+
+def estimate_tokens(text: str) -> int:
+    """Conservative token estimate: words and symbols, or 1 token every 4 characters"""
+    return max(len(re.findall(r'\w+|[^\w\s]', text)), ceil(len(text) / 4))
+
+
+def minify(line: str) -> str:
+    """Single spaces, no indentation and no trailing whitespace"""
+    return re.sub(r'\s+', ' ', line).strip()
+
+
+def dedupe_key(line: str) -> str:
+    """Lines that only differ in case, accents, emojis or punctuation are duplicates"""
+    text = unicodedata.normalize('NFKD', line.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9]+', ' ', text).strip()
+
+
+def compile_instruction(sections: List[InstructionSection], max_tokens: int = 0) -> CompiledInstruction:
+    """
+    Builds the agent instruction from sections. Raises ValueError when the
+    estimated token count exceeds max_tokens (0 = no budget).
+    """
+    seen = set()
+    removed = []
+    output = []
+    source = []
+
+    for section in sections:
+        if section.title:
+            output.append(f"## {minify(section.title)}")
+            source.append(f"## {section.title}")
+        for line in section.lines:
+            source.append(f"{section.bullet}{line}")
+            key = dedupe_key(line)
+            if section.dedupe and key in seen:
+                removed.append(minify(line))
+                continue
+            seen.add(key)
+            output.extend(
+                f"{section.bullet if i == 0 else ''}{minify(part)}"
+                for i, part in enumerate(line.split('\n')) if part.strip()
+            )
+
+    text = '\n'.join(output)
+    compiled = CompiledInstruction(
+        text=text,
+        tokens=estimate_tokens(text),
+        source_tokens=estimate_tokens('\n'.join(source)),
+        removed_duplicates=removed
+    )
+    if max_tokens and compiled.tokens > max_tokens:
+        raise ValueError(
+            f"Agent instruction has ~{compiled.tokens} tokens, over agent_instruction_max_tokens={max_tokens}"
+        )
+    return compiled
@@ -5,6 +5,7 @@ from aws_cdk import (
     Stack,
     CfnOutput,
     Aws,
+    Fn,
     Duration,
     aws_iam as iam,
     aws_ssm as ssm,
@@ -12,16 +13,42 @@ from aws_cdk import (
     custom_resources as cr
 )
 from constructs import Construct
+from stack_backend_bedrock.agent_instruction import InstructionSection, compile_instruction
+
+
+# Output dimensions supported by amazon.titan-embed-text-v2:0
+TITAN_V2_DIMENSIONS = (256, 512, 1024)
+# Titan v2 default, used by the deployed Knowledge Base (no embedding_model_configuration)
+TITAN_V2_DEFAULT_DIMENSIONS = 1024
+
+# Chunking strategies supported by the data sources (kb_chunking_strategy in cdk.json)
+CHUNKING_STRATEGIES = ("FIXED_SIZE", "NONE", "SEMANTIC", "HIERARCHICAL")
 
 
 @dataclass
 class DataSourceConfig:
-    """Configuration for a Knowledge Base data source"""
+    """
+    Configuration for a Knowledge Base data source.
+
+    chunking_strategy:
+    - FIXED_SIZE: max_tokens / overlap_percentage
+    - NONE: each file is one chunk. Requires kb_output_mode "documents" (one file
+      per record) so the ETL document size limit bounds every chunk
+    - SEMANTIC: max_tokens, buffer_size, breakpoint_percentile_threshold
+    - HIERARCHICAL: parent_max_tokens / max_tokens (child) and overlap_tokens
+    """
     name: str
     inclusion_prefixes: List[str]
-    max_tokens: int
-    overlap_percentage: int
+    max_tokens: int = 300
+    overlap_percentage: int = 15
     description: str = ""
+    # Shard key when kb_sharding is "per_type" (one Knowledge Base per document type)
+    document_type: str = ""
+    chunking_strategy: str = "FIXED_SIZE"
+    buffer_size: int = 0
+    breakpoint_percentile_threshold: int = 95
+    parent_max_tokens: int = 1500
+    overlap_tokens: int = 60
 
 
 @dataclass
@@ -36,11 +63,23 @@ class KnowledgeBaseConfig:
     pinecone_secret_arn: str
     pinecone_namespace: str = "mut-kb-prod"
 
+    def namespace_for(self, document_type: str = "") -> str:
+        """Pinecone namespace of a document type shard, or the shared namespace"""
+        return f"{self.pinecone_namespace}-{document_type}" if document_type else self.pinecone_namespace
+
 
 class GenAiVirtualAssistantBedrockStack(Stack):
     """
     Stack for Virtual Assistant with Bedrock Agent, Knowledge Base and Guardrails.
     Optimized for shopping mall/e-commerce use case with multiple data sources.
+
+    kb_sharding (cdk.json):
+    - "single" (default): one Knowledge Base with one data source per document type
+    - "per_type": one Knowledge Base per document type, each in its own Pinecone
+      namespace. Bedrock allows one ingestion job per Knowledge Base, so shards
+      can be synced in parallel. The agent is associated with every shard and
+      picks one per question from the association description; the chat
+      runner can route its own Retrieve calls with knowledge_base_routes.
     """
 
     def __init__(self, scope: Construct, construct_id: str, input_metadata, input_s3_bucket_arn, **kwargs) -> None:
@@ -51,14 +90,25 @@ class GenAiVirtualAssistantBedrockStack(Stack):
         self.kb_config = self._get_knowledge_base_config()
         self.data_source_configs = self._get_data_source_configs()
         self.s3_bucket_arn = input_s3_bucket_arn
+        self.kb_sharding = input_metadata.get('kb_sharding', 'single')
 
         """
         @ Knowledge Base Setup
         """
-        # Create Knowledge Base with Pinecone vector store and multiple data sources
-        kb = self._create_knowledge_base()
-        self._create_data_sources(kb)
-        # Note: KB permissions are now configured within _create_knowledge_base()
+        self.kb_role = self._create_knowledge_base_role()
+
+        if self.kb_sharding == 'per_type':
+            # One Knowledge Base per document type: (kb, association description, shard)
+            self.knowledge_bases = [
+                (self._create_knowledge_base_shard(config), config.description, config.document_type)
+                for config in self.data_source_configs
+            ]
+        else:
+            # Create Knowledge Base with Pinecone vector store and multiple data sources
+            single_kb = self._create_knowledge_base()
+            self._create_data_sources(single_kb, self.data_source_configs)
+            self.knowledge_bases = [(single_kb, "Knowledge base del centro comercial MUT con citations habilitadas", None)]
+        kb = self.knowledge_bases[0][0]
 
         """
         @ Guardrails Setup
@@ -68,7 +118,7 @@ class GenAiVirtualAssistantBedrockStack(Stack):
         """
         @ Bedrock Agent Setup
         """
-        agent = self._create_agent(kb, guardrail)
+        agent = self._create_agent(self.knowledge_bases, guardrail)
 
         """
         @ Agent Alias
@@ -79,6 +129,7 @@ class GenAiVirtualAssistantBedrockStack(Stack):
         self.agent_id = agent.agent_id
         self.agent_alias_id = agent_alias.alias_id
         self.kb = kb  # Expose Knowledge Base for sync lambda
+        self.knowledge_base_ids = [shard_kb.attr_knowledge_base_id for shard_kb, _, _ in self.knowledge_bases]
 
         """
         @ Outputs
@@ -94,12 +145,28 @@ class GenAiVirtualAssistantBedrockStack(Stack):
             name="VirtualAssistantKnowledgeBase",
             description="Knowledge base de MUT (Mercado Urbano Tobalaba): eventos, FAQs, tiendas, restaurantes y espacios de colaboración",
             embedding_model_arn=f"arn:aws:bedrock:{Aws.REGION}::foundation-model/amazon.titan-embed-text-v2:0",
-            embedding_dimensions=1024,
+            embedding_dimensions=self._get_embedding_dimensions(),
             pinecone_connection_string=self.input_metadata['pinecone_connection_string'],
             pinecone_secret_arn=f"arn:aws:secretsmanager:{Aws.REGION}:{Aws.ACCOUNT_ID}:secret:pinecone/{self.input_metadata['pinecone_secret_arn']}",
             pinecone_namespace="mut-kb-prod"
         )
 
+    def _get_embedding_dimensions(self) -> int:
+        """
+        Titan v2 output dimensions (kb_embedding_dimensions in cdk.json).
+        Compare options offline with datasetmut/benchmark_embeddings.py.
+
+        The embedding configuration can only be set when the Knowledge Base is
+        created: CloudFormation replaces the KB, which fails while it keeps its
+        custom name, and the replacement gets a new KB ID (pinned in app.py).
+        Changing it needs a new KB name, a new Pinecone index with the same
+        dimension, updating the KB ID in app.py and a full re-sync.
+        """
+        dimensions = int(self.input_metadata.get('kb_embedding_dimensions', TITAN_V2_DEFAULT_DIMENSIONS))
+        if dimensions not in TITAN_V2_DIMENSIONS:
+            raise ValueError(f"kb_embedding_dimensions must be one of {TITAN_V2_DIMENSIONS}, got {dimensions}")
+        return dimensions
+
     def _get_data_source_configs(self) -> List[DataSourceConfig]:
         """
         Returns list of data source configurations for:
@@ -109,6 +176,7 @@ class GenAiVirtualAssistantBedrockStack(Stack):
         - restaurantes (restaurants)
         """
         base_path = self.input_metadata['s3_knowledge_base_prefixes'][0].rstrip('/')+"/"
+        chunking_strategy = self._get_chunking_strategy()
 
         return [
             # DataSourceConfig(
@@ -116,33 +184,53 @@ class GenAiVirtualAssistantBedrockStack(Stack):
             #     inclusion_prefixes=[f"{base_path}eventos/"],
             #     max_tokens=300,
             #     overlap_percentage=20,
-            #     description="Fuente de datos para eventos y actividades del centro comercial"
+            #     description="Fuente de datos para eventos y actividades del centro comercial",
+            #     document_type="eventos"
             # ),
             # DataSourceConfig(
             #     name="preguntas-datasource",
             #     inclusion_prefixes=[f"{base_path}preguntas/"],
             #     max_tokens=400,
             #     overlap_percentage=10,
-            #     description="Fuente de datos para preguntas frecuentes (FAQs)"
+            #     description="Fuente de datos para preguntas frecuentes (FAQs)",
+            #     document_type="preguntas"
             # ),
             DataSourceConfig(
                 name="stores-datasource",
                 inclusion_prefixes=[f"{base_path}stores/"],
                 max_tokens=300,
                 overlap_percentage=15,
-                description="Fuente de datos para tiendas y comercios"
+                description="Fuente de datos para tiendas y comercios",
+                document_type="stores",
+                chunking_strategy=chunking_strategy
             ),
             DataSourceConfig(
                 name="restaurantes-datasource",
                 inclusion_prefixes=[f"{base_path}restaurantes/"],
                 max_tokens=300,
                 overlap_percentage=15,
-                description="Fuente de datos para restaurantes y gastronomía"
+                description="Fuente de datos para restaurantes y gastronomía",
+                document_type="restaurantes",
+                chunking_strategy=chunking_strategy
             )
         ]
 
-    def _create_knowledge_base(self) -> bedrock_l1.CfnKnowledgeBase:
-        """Creates the Knowledge Base with Pinecone Serverless vector store"""
+    def _get_chunking_strategy(self) -> str:
+        """
+        Chunking strategy of every data source (kb_chunking_strategy in cdk.json).
+        Bedrock does not allow changing the chunking of an existing data source:
+        switching strategies replaces the data sources and needs a full re-sync.
+        """
+        strategy = self.input_metadata.get('kb_chunking_strategy', 'FIXED_SIZE').upper()
+        if strategy not in CHUNKING_STRATEGIES:
+            raise ValueError(f"kb_chunking_strategy must be one of {CHUNKING_STRATEGIES}, got {strategy}")
+        if strategy == "NONE" and self.input_metadata.get('kb_output_mode', 'chunks') != 'documents':
+            # With "chunks" output a whole JSONL file of records would become a single chunk
+            raise ValueError('kb_chunking_strategy "NONE" requires kb_output_mode "documents"')
+        return strategy
+
+    def _create_knowledge_base_role(self) -> iam.Role:
+        """Creates the IAM Role shared by every Knowledge Base of the stack"""
 
         # 1. Create IAM Role for Knowledge Base with inline policies
         # Using inline_policies ensures they're created atomically with the role
@@ -193,17 +281,40 @@ class GenAiVirtualAssistantBedrockStack(Stack):
             }
         )
 
+        return kb_role
+
+    def _create_knowledge_base(
+        self,
+        construct_id: str = "VirtualAssistantKnowledgeBase",
+        name: str = None,
+        description: str = None,
+        namespace: str = None
+    ) -> bedrock_l1.CfnKnowledgeBase:
+        """Creates a Knowledge Base with Pinecone Serverless vector store"""
+        kb_role = self.kb_role
+
+        # Only emitted for non-default dimensions: adding the property to the
+        # deployed Knowledge Base forces its replacement (see _get_embedding_dimensions)
+        embedding_model_configuration = None
+        if self.kb_config.embedding_dimensions != TITAN_V2_DEFAULT_DIMENSIONS:
+            embedding_model_configuration = bedrock_l1.CfnKnowledgeBase.EmbeddingModelConfigurationProperty(
+                bedrock_embedding_model_configuration=bedrock_l1.CfnKnowledgeBase.BedrockEmbeddingModelConfigurationProperty(
+                    dimensions=self.kb_config.embedding_dimensions
+                )
+            )
+
         # 5. Create Knowledge Base with Pinecone configuration
         kb = bedrock_l1.CfnKnowledgeBase(
             self,
-            "VirtualAssistantKnowledgeBase",
-            name=self.kb_config.name,
-            description=self.kb_config.description,
+            construct_id,
+            name=name or self.kb_config.name,
+            description=description or self.kb_config.description,
             role_arn=kb_role.role_arn,
             knowledge_base_configuration=bedrock_l1.CfnKnowledgeBase.KnowledgeBaseConfigurationProperty(
                 type="VECTOR",
                 vector_knowledge_base_configuration=bedrock_l1.CfnKnowledgeBase.VectorKnowledgeBaseConfigurationProperty(
-                    embedding_model_arn=self.kb_config.embedding_model_arn
+                    embedding_model_arn=self.kb_config.embedding_model_arn,
+                    embedding_model_configuration=embedding_model_configuration
                 )
             ),
             storage_configuration=bedrock_l1.CfnKnowledgeBase.StorageConfigurationProperty(
@@ -211,7 +322,7 @@ class GenAiVirtualAssistantBedrockStack(Stack):
                 pinecone_configuration=bedrock_l1.CfnKnowledgeBase.PineconeConfigurationProperty(
                     connection_string=self.kb_config.pinecone_connection_string,
                     credentials_secret_arn=self.kb_config.pinecone_secret_arn,
-                    namespace=self.kb_config.pinecone_namespace,
+                    namespace=namespace or self.kb_config.pinecone_namespace,
                     field_mapping=bedrock_l1.CfnKnowledgeBase.PineconeFieldMappingProperty(
                         text_field="text",
                         metadata_field="metadata"
@@ -224,16 +335,27 @@ class GenAiVirtualAssistantBedrockStack(Stack):
         # This prevents the "not authorized to perform: secretsmanager:GetSecretValue" error
         kb.node.add_dependency(kb_role)
 
-        # Store role for potential later use
-        self.kb_role = kb_role
+        return kb
 
+    def _create_knowledge_base_shard(self, config: DataSourceConfig) -> bedrock_l1.CfnKnowledgeBase:
+        """
+        Creates the Knowledge Base of one document type with its single data source.
+        Shards share the Pinecone index but each one writes to its own namespace.
+        """
+        kb = self._create_knowledge_base(
+            construct_id=f"VirtualAssistantKnowledgeBase-{config.document_type}",
+            name=f"{self.kb_config.name}-{config.document_type}",
+            description=config.description,
+            namespace=self.kb_config.namespace_for(config.document_type)
+        )
+        self._create_data_sources(kb, [config])
         return kb
 
-    def _create_data_sources(self, kb: bedrock_l1.CfnKnowledgeBase) -> None:
+    def _create_data_sources(self, kb: bedrock_l1.CfnKnowledgeBase, configs: List[DataSourceConfig]) -> None:
         """Creates multiple S3 data sources with specific chunking configurations using L1 constructs"""
 
         # Create a data source for each configuration
-        for config in self.data_source_configs:
+        for config in configs:
             data_source = bedrock_l1.CfnDataSource(
                 self,
                 config.name,
@@ -248,19 +370,53 @@ class GenAiVirtualAssistantBedrockStack(Stack):
                     )
                 ),
                 vector_ingestion_configuration=bedrock_l1.CfnDataSource.VectorIngestionConfigurationProperty(
-                    chunking_configuration=bedrock_l1.CfnDataSource.ChunkingConfigurationProperty(
-                        chunking_strategy="FIXED_SIZE",
-                        fixed_size_chunking_configuration=bedrock_l1.CfnDataSource.FixedSizeChunkingConfigurationProperty(
-                            max_tokens=config.max_tokens,
-                            overlap_percentage=config.overlap_percentage
-                        )
-                    )
+                    chunking_configuration=self._chunking_configuration(config)
                 )
             )
 
             # Ensure data source waits for Knowledge Base to be created
             data_source.add_dependency(kb)
 
+    def _chunking_configuration(self, config: DataSourceConfig) -> bedrock_l1.CfnDataSource.ChunkingConfigurationProperty:
+        """Chunking configuration of a data source for its chunking_strategy"""
+        if config.chunking_strategy == "NONE":
+            # The ETL already writes one self-contained document per file
+            return bedrock_l1.CfnDataSource.ChunkingConfigurationProperty(chunking_strategy="NONE")
+
+        if config.chunking_strategy == "SEMANTIC":
+            return bedrock_l1.CfnDataSource.ChunkingConfigurationProperty(
+                chunking_strategy="SEMANTIC",
+                semantic_chunking_configuration=bedrock_l1.CfnDataSource.SemanticChunkingConfigurationProperty(
+                    max_tokens=config.max_tokens,
+                    buffer_size=config.buffer_size,
+                    breakpoint_percentile_threshold=config.breakpoint_percentile_threshold
+                )
+            )
+
+        if config.chunking_strategy == "HIERARCHICAL":
+            return bedrock_l1.CfnDataSource.ChunkingConfigurationProperty(
+                chunking_strategy="HIERARCHICAL",
+                hierarchical_chunking_configuration=bedrock_l1.CfnDataSource.HierarchicalChunkingConfigurationProperty(
+                    level_configurations=[
+                        bedrock_l1.CfnDataSource.HierarchicalChunkingLevelConfigurationProperty(
+                            max_tokens=config.parent_max_tokens
+                        ),
+                        bedrock_l1.CfnDataSource.HierarchicalChunkingLevelConfigurationProperty(
+                            max_tokens=config.max_tokens
+                        )
+                    ],
+                    overlap_tokens=config.overlap_tokens
+                )
+            )
+
+        return bedrock_l1.CfnDataSource.ChunkingConfigurationProperty(
+            chunking_strategy="FIXED_SIZE",
+            fixed_size_chunking_configuration=bedrock_l1.CfnDataSource.FixedSizeChunkingConfigurationProperty(
+                max_tokens=config.max_tokens,
+                overlap_percentage=config.overlap_percentage
+            )
+        )
+
 
     def _configure_agent_permissions(self, agent: bedrock.Agent, kb: bedrock_l1.CfnKnowledgeBase) -> None:
         """
@@ -411,109 +567,118 @@ class GenAiVirtualAssistantBedrockStack(Stack):
         return guardrail
 
     def _get_agent_instruction(self) -> str:
+        """
+        Compiles the agent instruction from its sections and prints its token
+        count at synth time. Fails when it exceeds agent_instruction_max_tokens
+        (cdk.json, 0 = no budget).
+        """
+        max_tokens = int(self.input_metadata.get('agent_instruction_max_tokens', 0))
+        compiled = compile_instruction(self._get_agent_instruction_sections(), max_tokens)
+        budget = f"/{max_tokens}" if max_tokens else ""
+        print(f"Agent instruction: ~{compiled.tokens}{budget} tokens, {len(compiled.text)} chars "
+              f"({len(compiled.removed_duplicates)} duplicated lines removed, ~{compiled.source_tokens} before)")
+        return compiled.text
+
+    def _get_agent_instruction_sections(self) -> List[InstructionSection]:
+        """Agent instruction sections. Each rule belongs to one section only."""
+        menu_options = [
+            "Búsqueda de tiendas",
+            "Ubicación de baños",
+            "Búsqueda de sectores para sentarse a comer",
+            "Jardín de MUT",
+            "Cómo llegar al metro desde MUT",
+            "Salidas de MUT",
+            "Ubicación de oficinas MUT",
+            "Estacionamientos",
+            "Bicihub MUT",
+            "Emergencias",
+            "Otras preguntas"
+        ]
+        examples = [
+            ("¿Dónde hay comida?",
+             "🍴 *El Mercado* en pisos *-3 y -2* ofrece variedad gastronómica con múltiples opciones. "
+             "También encuentras restaurantes en pisos *3, 4 y 5* con diferentes estilos culinarios."),
+            ("¿Dónde está Nike?",
+             "📍 *Nike* está ubicada en piso *2*, sector deportes, acceso norte. Horario: _lun-dom 10:00-22:00 hrs._"),
+            ("Contacto de seguridad",
+             "Para contacto de seguridad visita *SAC* en piso *-3* donde te brindarán la información directamente."),
+            ("¿Cómo llego al metro?",
+             "🚇 Acceso directo al *Metro Tobalaba* por piso *-3*. Conexión con Línea 1 y Línea 4."),
+            ("Información Bicihub",
+             "🚲 *Bicihub* en piso *-3*: _2000 estacionamientos_ disponibles para bicicletas, scooters y vehículos de electromovilidad."),
+            ("¿Dónde están los baños?",
+             "🚻 Baños disponibles en todos los pisos de *MUT* con fácil acceso desde cualquier punto."),
+            ("Eventos hoy",
+             "[Consulta eventos-datasource] *[Nombre del evento]*: _fecha y hora específica_, ubicado en [piso y zona exacta de MUT]."),
+            ("Local en arriendo / información comercial",
+             "Para consultas sobre arriendo de locales o información comercial, escribe a: contacto@mut.cl 📧"),
+            ("¿Tienen estacionamiento?",
+             "[Consulta preguntas-datasource sobre estacionamiento] Estacionamiento disponible con accesos por "
+             "[ubicaciones]. Tarifas e información en *SAC piso -3*.")
+        ]
+
+        return [
+            InstructionSection("", [
+                "Eres el asistente virtual de *MUT (Mercado Urbano Tobalaba)*. "
+                "Responde en máximo *50 palabras* NO MÁS, directo al punto."
+            ]),
+            InstructionSection("FORMATO WhatsApp", [
+                "*Texto*: nombres, pisos, ubicaciones",
+                "_Texto_: horarios",
+                "Emojis: 📍🕐🍴🚇🚲🌳🚻"
+            ], bullet="- "),
+            InstructionSection("IDENTIDAD", [
+                "Tono directo y cálido. Sin disculpas. Multiidioma: ES/EN/PT."
+            ]),
+            InstructionSection("BIENVENIDA (Solo al saludar)", [
+                "\"¡Bienvenid@ a MUT! Soy tu asistente virtual durante tu visita a MUT.",
+                "A continuación, selecciona el tipo de ayuda que necesitas:",
+                *[f"{number}.- {option}" for number, option in enumerate(menu_options, start=1)],
+                "💬 Escribe el número o tu pregunta.\""
+            ], dedupe=False),
+            InstructionSection("TERMINOLOGÍA PROHIBIDA", [
+                "❌ NUNCA usar: \"mall\", \"centro comercial\", \"shopping\", \"food court\", \"versus\"",
+                "✅ USAR: \"*MUT*\", \"*El Mercado*\" (pisos -3,-2)"
+            ]),
+            InstructionSection("BASE DE CONOCIMIENTO", [
+                "Fuentes: eventos-datasource, preguntas-datasource, stores-datasource, restaurantes-datasource",
+                "Tipos: evento, faq, tienda, restaurante"
+            ]),
+            InstructionSection("RESPUESTAS", [
+                "Estructura: *Ubicación* + datos clave + emoji"
+            ]),
+            InstructionSection("EJEMPLOS", [
+                f"P: {question}\nR: {answer}" for question, answer in examples
+            ]),
+            InstructionSection("ÁREAS PRINCIPALES", [
+                "*Tiendas*: piso, sector, horario",
+                "*Navegación*: baños, jardín, metro, salidas, oficinas",
+                "*Gastronomía*: El Mercado (-3,-2), restaurantes (3,4,5)",
+                "*Estacionamiento*: accesos, tarifas",
+                "*Bicihub*: 2000 estacionamientos",
+                "*SAC*: piso -3 para consultas generales"
+            ], bullet="- "),
+            InstructionSection("REGLAS CRÍTICAS", [
+                "Consultar base de conocimiento SIEMPRE antes de responder",
+                "Sin preguntas de seguimiento (\"¿necesitas algo más?\", \"¿algo específico?\", \"¿te ayudo con algo más?\")",
+                "Sin frases de cierre ni ofrecer ayuda adicional",
+                "Sin comparaciones ni palabra \"versus\"",
+                "Sin información no solicitada (protocolos de seguridad, políticas de humo, normativas)",
+                "NUNCA decir \"No sé\" o \"No tengo información\" - alternativas: SAC piso -3, sitio web, o email de contacto",
+                f"Si usuario menciona número del menú (1-{len(menu_options)}), responde esa categoría directamente",
+                "Detecta saludos (hola/hi/olá) para mostrar mensaje de bienvenida completo"
+            ], bullet="✅ ")
+        ]
 
-        return """
-            Eres el asistente virtual de *MUT (Mercado Urbano Tobalaba)*. Responde en máximo *50 palabras* NO MÁS, directo al punto.
-
-            ## FORMATO WhatsApp
-            - *Texto*: nombres, pisos, ubicaciones
-            - _Texto_: horarios
-            - Emojis: 📍🕐🍴🚇🚲🌳🚻
-
-            ## IDENTIDAD
-            Tono directo y cálido. Sin disculpas. Sin preguntas de seguimiento. Multiidioma: ES/EN/PT.
-
-            ## BIENVENIDA (Solo al saludar)
-            "¡Bienvenid@ a MUT! Soy tu asistente virtual durante tu visita a MUT.
-            A continuación, selecciona el tipo de ayuda que necesitas:
-
-            1️.- Búsqueda de tiendas  
-            2️.- Ubicación de baños
-            3️.- Búsqueda de sectores para sentarse a comer
-            4️.- Jardín de MUT
-            5️.- Cómo llegar al metro desde MUT
-            6️.- Salidas de MUT
-            7️.- Ubicación de oficinas MUT
-            8️.- Estacionamientos
-            9️.- Bicihub MUT
-            10.- Emergencias
-            1️1.- Otras preguntas
-
-            💬 Escribe el número o tu pregunta."
-
-            ## TERMINOLOGÍA PROHIBIDA
-            ❌ NUNCA usar: "mall", "centro comercial", "shopping", "food court", "versus"
-            ✅ USAR: "*MUT*", "*El Mercado*" (pisos -3,-2)
-
-            ## BASE DE CONOCIMIENTO
-            **Fuentes:** eventos-datasource, preguntas-datasource, stores-datasource, restaurantes-datasource
-
-            **Tipos:** evento, faq, tienda, restaurante
-
-            ## RESPUESTAS
-            Estructura: *Ubicación* + datos clave + emoji
-            Máximo 50 palabras NO MÁS. Sin frases de cierre. Sin ofrecer ayuda adicional.
-
-            ## EJEMPLOS
-
-            **P:** ¿Dónde hay comida?
-            **R:** 🍴 *El Mercado* en pisos *-3 y -2* ofrece variedad gastronómica con múltiples opciones. También encuentras restaurantes en pisos *3, 4 y 5* con diferentes estilos culinarios.
-
-            **P:** ¿Dónde está Nike?
-            **R:** 📍 *Nike* está ubicada en piso *2*, sector deportes, acceso norte. Horario: _lun-dom 10:00-22:00 hrs._
- 
-            **P:** Contacto de seguridad
-            **R:** Para contacto de seguridad visita *SAC* en piso *-3* donde te brindarán la información directamente.
-
-            **P:** ¿Cómo llego al metro?
-            **R:** 🚇 Acceso directo al *Metro Tobalaba* por piso *-3*. Conexión con Línea 1 y Línea 4.
-
-            **P:** Información Bicihub
-            **R:** 🚲 *Bicihub* en piso *-3*: _2000 estacionamientos_ disponibles para bicicletas, scooters y vehículos de electromovilidad.
-
-            **P:** ¿Dónde están los baños?
-            **R:** 🚻 Baños disponibles en todos los pisos de *MUT* con fácil acceso desde cualquier punto.
-
-            **P:** Eventos hoy
-            **R:** [Consulta eventos-datasource]
-            *[Nombre del evento]*: _fecha y hora específica_, ubicado en [piso y zona exacta de MUT].
-
-            **P:** Local en arriendo / información comercial
-            **R:** Para consultas sobre arriendo de locales o información comercial, escribe a: contacto@mut.cl 📧
-
-            **P:** ¿Tienen estacionamiento?
-            **R:** [Consulta preguntas-datasource sobre estacionamiento]
-            Estacionamiento disponible con accesos por [ubicaciones]. Tarifas e información en *SAC piso -3*.
-
-            ## ÁREAS PRINCIPALES
-            1. *Tiendas*: piso, sector, horario
-            2. *Navegación*: baños, jardín, metro, salidas, oficinas
-            3. *Gastronomía*: El Mercado (-3,-2), restaurantes (3,4,5)
-            4. *Estacionamiento*: accesos, tarifas
-            6. *Bicihub*: 2000 estacionamientos
-            7. *SAC*: piso -3 para consultas generales
-
-            ## REGLAS CRÍTICAS
-            ✅ Consultar base de conocimiento SIEMPRE antes de responder
-            ✅ Máximo 80 palabras por respuesta
-            ✅ Respuesta directa: ubicación + datos clave
-            ✅ Sin preguntas de seguimiento ("¿necesitas algo más?", "¿algo específico?", "¿te ayudo con algo más?")
-            ✅ Sin frases de cierre innecesarias
-            ✅ Sin comparaciones ni palabra "versus"
-            ✅ Sin información no solicitada (protocolos de seguridad, políticas de humo, normativas)
-            ✅ NUNCA decir "No sé" o "No tengo información" - alternativas: SAC piso -3, sitio web, o email de contacto
-            ✅ Prohibido: "mall", "shopping", "centro comercial", "food court"
-            ✅ Formato WhatsApp obligatorio: *negritas*, _cursivas_, emojis
-            ✅ Si usuario menciona número del menú (1-9), responde esa categoría directamente
-            ✅ Detecta saludos (hola/hi/olá) para mostrar mensaje de bienvenida completo
-            """
-
-    def _create_agent(self, kb: bedrock_l1.CfnKnowledgeBase, guardrail: bedrock.Guardrail) -> bedrock.Agent:
+    def _create_agent(self, knowledge_bases: list, guardrail: bedrock.Guardrail) -> bedrock.Agent:
         """Creates the Bedrock Agent with Knowledge Base and Guardrails with Citations enabled
 
         Note: We use L2 Agent construct but need to manually associate the L1 Knowledge Base.
         The L2 construct doesn't directly support L1 KB, so we create the agent without KB
         and manually configure the association with retrieval configuration to enable citations.
+
+        knowledge_bases: list of (kb, association description, shard). With
+        sharding the agent chooses the Knowledge Base from its description.
         """
         agent = bedrock.Agent(
             self,
@@ -527,59 +692,70 @@ class GenAiVirtualAssistantBedrockStack(Stack):
         )
 
         # Configure agent permissions
-        self._configure_agent_permissions(agent, kb)
+        self._configure_agent_permissions(agent, knowledge_bases[0][0])
+
+        # Each shard returns fewer results so the combined context stays similar
+        number_of_results = 10 if len(knowledge_bases) == 1 else 5
+
+        previous_association = None
+        for kb, description, shard in knowledge_bases:
+            kb_association = self._associate_knowledge_base(
+                agent, kb, description, shard, number_of_results
+            )
+            # Associations update the same DRAFT agent: create them one at a time
+            if previous_association is not None:
+                kb_association.node.add_dependency(previous_association)
+            previous_association = kb_association
+
+        return agent
+
+    def _associate_knowledge_base(
+        self,
+        agent: bedrock.Agent,
+        kb: bedrock_l1.CfnKnowledgeBase,
+        description: str,
+        shard: str,
+        number_of_results: int
+    ) -> cr.AwsCustomResource:
+        """Associates one Knowledge Base with the agent DRAFT, with citations enabled"""
+        construct_id = "AgentKnowledgeBaseAssociation" if shard is None else f"AgentKnowledgeBaseAssociation-{shard}"
+        physical_id = f"kb-assoc-{agent.agent_id}" if shard is None else f"kb-assoc-{agent.agent_id}-{shard}"
+
+        association_parameters = {
+            "agentId": agent.agent_id,
+            "agentVersion": "DRAFT",
+            "knowledgeBaseId": kb.attr_knowledge_base_id,
+            "description": description,
+            "knowledgeBaseState": "ENABLED",
+            # ⭐ CRITICAL: Enable citations/attributions with retrieval configuration
+            "knowledgeBaseConfiguration": {
+                "type": "VECTOR",
+                "vectorKnowledgeBaseConfiguration": {
+                    "retrievalConfiguration": {
+                        "vectorSearchConfiguration": {
+                            "numberOfResults": number_of_results,
+                            "overrideSearchType": "HYBRID"  # HYBRID for better retrieval in Pinecone
+                        }
+                    }
+                }
+            }
+        }
 
         # Manually associate Knowledge Base with Agent using Custom Resource
-        # WITH CITATIONS ENABLED via retrieval configuration
         kb_association = cr.AwsCustomResource(
             self,
-            "AgentKnowledgeBaseAssociation",
+            construct_id,
             on_create=cr.AwsSdkCall(
                 service="bedrock-agent",
                 action="associateAgentKnowledgeBase",
-                parameters={
-                    "agentId": agent.agent_id,
-                    "agentVersion": "DRAFT",
-                    "knowledgeBaseId": kb.attr_knowledge_base_id,
-                    "description": "Knowledge base del centro comercial MUT con citations habilitadas",
-                    "knowledgeBaseState": "ENABLED",
-                    # ⭐ CRITICAL: Enable citations/attributions with retrieval configuration
-                    "knowledgeBaseConfiguration": {
-                        "type": "VECTOR",
-                        "vectorKnowledgeBaseConfiguration": {
-                            "retrievalConfiguration": {
-                                "vectorSearchConfiguration": {
-                                    "numberOfResults": 10,
-                                    "overrideSearchType": "HYBRID"  # HYBRID for better retrieval in Pinecone
-                                }
-                            }
-                        }
-                    }
-                },
-                physical_resource_id=cr.PhysicalResourceId.of(f"kb-assoc-{agent.agent_id}")
+                parameters=association_parameters,
+                physical_resource_id=cr.PhysicalResourceId.of(physical_id)
             ),
             on_update=cr.AwsSdkCall(
                 service="bedrock-agent",
                 action="associateAgentKnowledgeBase",
-                parameters={
-                    "agentId": agent.agent_id,
-                    "agentVersion": "DRAFT",
-                    "knowledgeBaseId": kb.attr_knowledge_base_id,
-                    "description": "Knowledge base del centro comercial MUT con citations habilitadas",
-                    "knowledgeBaseState": "ENABLED",
-                    "knowledgeBaseConfiguration": {
-                        "type": "VECTOR",
-                        "vectorKnowledgeBaseConfiguration": {
-                            "retrievalConfiguration": {
-                                "vectorSearchConfiguration": {
-                                    "numberOfResults": 10,
-                                    "overrideSearchType": "HYBRID"
-                                }
-                            }
-                        }
-                    }
-                },
-                physical_resource_id=cr.PhysicalResourceId.of(f"kb-assoc-{agent.agent_id}")
+                parameters=association_parameters,
+                physical_resource_id=cr.PhysicalResourceId.of(physical_id)
             ),
             on_delete=cr.AwsSdkCall(
                 service="bedrock-agent",
@@ -610,7 +786,7 @@ class GenAiVirtualAssistantBedrockStack(Stack):
         kb_association.node.add_dependency(agent)
         kb_association.node.add_dependency(kb)
 
-        return agent
+        return kb_association
 
     def _create_agent_alias(self, agent: bedrock.Agent) -> bedrock.AgentAlias:
         """Creates an alias for the agent to enable versioning"""
@@ -653,6 +829,25 @@ class GenAiVirtualAssistantBedrockStack(Stack):
             export_name=f"{Stack.of(self).stack_name}-KnowledgeBaseId"
         )
 
+        # One output per shard when kb_sharding is "per_type"
+        if self.kb_sharding == 'per_type':
+            for shard_kb, _, shard in self.knowledge_bases:
+                CfnOutput(
+                    self,
+                    f"output-knowledge-base-id-{shard}",
+                    value=shard_kb.attr_knowledge_base_id,
+                    description=f"Bedrock Knowledge Base ID for {shard} (Pinecone namespace {self.kb_config.namespace_for(shard)})",
+                    export_name=f"{Stack.of(self).stack_name}-KnowledgeBaseId-{shard}"
+                )
+
+            # Routing table for the chat runner: copy into knowledge_base_routes (cdk.json)
+            CfnOutput(
+                self,
+                "output-knowledge-base-routes",
+                value=Fn.to_json_string({shard: shard_kb.attr_knowledge_base_id for shard_kb, _, shard in self.knowledge_bases}),
+                description="Knowledge Base ID per document type for routed retrieval (knowledge_base_routes in cdk.json)"
+            )
+
         # Pinecone Configuration Info
         CfnOutput(
             self,
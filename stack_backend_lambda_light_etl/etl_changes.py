@@ -0,0 +1,212 @@
+"""
+Manifiesto de cambios del ETL para la ingesta directa en Bedrock KB
+
+Cada ejecución registra los archivos KB escritos por dataset con un hash
+estable de su contenido (bedrock_text + metadata, sin document_id ni
+processing_date, que cambian en cada corrida). Al terminar:
+- Compara contra el estado de la ejecución anterior: added / updated / deleted
+  (si el dataset se escribió con otro kb_output_mode, todos sus archivos
+  anteriores quedan en deleted)
+- Borra de S3 los archivos que ya no se generan (y su .metadata.json)
+- Escribe el manifiesto en ETL_CHANGE_MANIFEST_KEY, fuera del prefijo del KB
+
+La Lambda de sincronización lo lee para enviar solo los documentos cambiados
+con la API de ingesta directa del Knowledge Base.
+
+El manifiesto guarda además el hash de cada CSV vectorial procesado (sources,
+metadata content-sha256 que escribe la extracción): la extracción lo compara
+para que Step Functions omita ETL y sincronización cuando nada cambió.
+
+En el pipeline por dataset (Map de Step Functions) cada rama guarda sus
+archivos como pendientes (save_pending) y el paso final del Map los consolida
+en un solo manifiesto (load_pending + finish), sin carreras entre ramas.
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+
+from etl_stdlib import document_file_stem, iter_chunks
+
+
+ETL_CHANGE_MANIFEST_KEY = os.environ.get('ETL_CHANGE_MANIFEST_KEY', 'sync-state/etl_change_manifest.json')
+
+# Campos que dependen del momento de ejecución, no del contenido
+VOLATILE_FIELDS = ('document_id',)
+
+
+def document_hash(row, file_config):
+    """Hash del contenido indexable de un documento."""
+    stable = {
+        'bedrock_text': str(row.get('bedrock_text', '')),
+        'document_type': str(row.get('document_type', '')),
+        'search_category': str(row.get('search_category', ''))
+    }
+    for field in file_config.get('metadata_fields', []) + file_config.get('filter_fields', []):
+        if field in row and field not in VOLATILE_FIELDS:
+            stable[field] = str(row[field])
+
+    payload = json.dumps(stable, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def has_changes(summary):
+    """True si el resumen de finish() tiene algún cambio; sin resumen (error) se asume que sí."""
+    if summary is None:
+        return True
+    return any(count for counts in summary.values() for count in counts.values())
+
+
+def describe_outputs(records, file_type, file_config, output_s3_key, output_mode, num_rows_per_file):
+    """
+    {key S3 del archivo KB: hash} con los mismos nombres que escriben
+    write_bedrock_kb_documents y write_bedrock_kb_format.
+    """
+    if output_mode == 'documents':
+        used_names = set()
+        return {
+            f"{output_s3_key}/{document_file_stem(row, file_type, file_config, used_names)}.txt":
+                document_hash(row, file_config)
+            for row in records
+        }
+
+    extension = 'jsonl' if file_config.get('format', 'csv') == 'jsonl' else 'csv'
+    outputs = {}
+    for i, chunk in enumerate(iter_chunks(records, num_rows_per_file)):
+        digest = hashlib.sha256()
+        for row in chunk:
+            digest.update(document_hash(row, file_config).encode('ascii'))
+        outputs[f"{output_s3_key}/{file_type}_chunk_{i+1:03d}.{extension}"] = digest.hexdigest()
+    return outputs
+
+
+class ChangeTracker:
+    """Acumula los archivos escritos por dataset y genera el manifiesto al final."""
+
+    def __init__(self, s3_client, s3_bucket, output_mode, manifest_key=ETL_CHANGE_MANIFEST_KEY):
+        self.s3_client = s3_client
+        self.s3_bucket = s3_bucket
+        self.output_mode = output_mode
+        self.manifest_key = manifest_key
+        self.outputs = {}
+        self.sources = {}
+        self.pending_loaded = []
+
+    def record(self, file_type, outputs):
+        self.outputs[file_type] = outputs
+
+    def record_source(self, file_type, source_hash):
+        """Hash del CSV vectorial de entrada (None si no lo informó la extracción)."""
+        if source_hash:
+            self.sources[file_type] = source_hash
+
+    def pending_key(self, file_type):
+        """Archivos de un dataset procesado en una rama del Map, aún sin consolidar."""
+        return f"{self.manifest_key.rsplit('.', 1)[0]}.pending/{file_type}.json"
+
+    def save_pending(self):
+        """Guarda los archivos registrados por dataset; retorna {file_type: archivos}."""
+        for file_type, outputs in self.outputs.items():
+            self.s3_client.put_object(
+                Bucket=self.s3_bucket,
+                Key=self.pending_key(file_type),
+                Body=json.dumps({
+                    'output_mode': self.output_mode,
+                    'source': self.sources.get(file_type),
+                    'outputs': outputs
+                }).encode('utf-8'),
+                ContentType='application/json'
+            )
+        return {file_type: len(outputs) for file_type, outputs in self.outputs.items()}
+
+    def load_pending(self, file_types):
+        """Carga los pendientes de file_types; los datasets sin pendiente conservan su estado."""
+        for file_type in file_types:
+            try:
+                response = self.s3_client.get_object(Bucket=self.s3_bucket, Key=self.pending_key(file_type))
+                pending = json.loads(response['Body'].read())
+            except Exception:
+                print(f"   ℹ️  Sin cambios pendientes de {file_type}")
+                continue
+            if pending.get('output_mode') != self.output_mode:
+                print(f"   ⚠️  Pendiente de {file_type} con otro modo de salida; se ignora")
+                continue
+            self.outputs[file_type] = pending['outputs']
+            self.record_source(file_type, pending.get('source'))
+            self.pending_loaded.append(file_type)
+
+    def load_previous(self):
+        """Manifiesto de la ejecución anterior, o {} si no existe."""
+        try:
+            response = self.s3_client.get_object(Bucket=self.s3_bucket, Key=self.manifest_key)
+            return json.loads(response['Body'].read())
+        except Exception:
+            print(f"   ℹ️  Sin manifiesto de cambios previo en {self.manifest_key}")
+            return {}
+
+    def finish(self):
+        """Calcula cambios, borra archivos obsoletos y guarda el manifiesto."""
+        previous = self.load_previous()
+        previous_documents = previous.get('documents', {})
+        # Modo de salida con que se escribió cada dataset (antes: uno global)
+        previous_modes = previous.get('output_modes') or {
+            file_type: previous.get('output_mode') for file_type in previous_documents
+        }
+
+        # Los datasets no procesados en esta ejecución conservan su estado
+        documents = dict(previous_documents)
+        output_modes = dict(previous_modes)
+        changes = {}
+        for file_type, current in self.outputs.items():
+            before = previous_documents.get(file_type, {})
+            # Con otro modo de salida cambian todos los nombres: los archivos
+            # anteriores se eliminan y los actuales son nuevos
+            base = before if previous_modes.get(file_type) == self.output_mode else {}
+            changes[file_type] = {
+                'added': sorted(key for key in current if key not in base),
+                'updated': sorted(key for key in current if key in base and base[key] != current[key]),
+                'deleted': sorted(key for key in before if key not in current)
+            }
+            documents[file_type] = current
+            output_modes[file_type] = self.output_mode
+
+        sources = dict(previous.get('sources', {}))
+        # Un dataset aún escrito con otro modo se reprocesa en la próxima ejecución
+        for file_type, mode in output_modes.items():
+            if mode != self.output_mode:
+                sources.pop(file_type, None)
+        sources.update(self.sources)
+
+        deleted = [key for change in changes.values() for key in change['deleted']]
+        for key in deleted:
+            for obsolete in (key, f"{key}.metadata.json"):
+                self.s3_client.delete_object(Bucket=self.s3_bucket, Key=obsolete)
+
+        manifest = {
+            'generated_at': datetime.utcnow().isoformat(),
+            # Ejecución contra la que se calcularon los cambios (None: primera)
+            'base_generated_at': previous.get('generated_at'),
+            'bucket': self.s3_bucket,
+            'output_mode': self.output_mode,
+            'output_modes': output_modes,
+            'changes': changes,
+            'sources': sources,
+            'documents': documents
+        }
+        self.s3_client.put_object(
+            Bucket=self.s3_bucket,
+            Key=self.manifest_key,
+            Body=json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'),
+            ContentType='application/json'
+        )
+        for file_type in self.pending_loaded:
+            self.s3_client.delete_object(Bucket=self.s3_bucket, Key=self.pending_key(file_type))
+
+        summary = {
+            file_type: {kind: len(keys) for kind, keys in change.items()}
+            for file_type, change in changes.items()
+        }
+        for file_type, counts in summary.items():
+            print(f"   🧾 {file_type}: +{counts['added']} ~{counts['updated']} -{counts['deleted']}")
+        return summary
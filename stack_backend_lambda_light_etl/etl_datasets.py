@@ -0,0 +1,223 @@
+"""
+Configuración de datasets y escritura Bedrock KB compartidas
+
+Usado por:
+- lambda_function.lambda_handler: lee vectorial/*.csv desde S3
+- Lambda de extracción en modo fusionado (FUSED_ETL=true): importa este módulo
+  desde una capa y entrega sus DataFrames vectoriales en memoria, sin escribir
+  ni releer los CSV intermedios (run_fused_etl)
+
+Con un etl_changes.ChangeTracker, write_dataset registra además los archivos
+escritos para el manifiesto de cambios que usa la ingesta directa. Para el
+dataset de preguntas publica también el índice de respuestas del chat
+(etl_faq_index.py), y para tiendas y restaurantes el directorio de ubicaciones
+(etl_directory.py).
+"""
+
+import os
+from math import ceil
+
+import etl_local
+import etl_stdlib
+import etl_changes
+import etl_directory
+import etl_faq_index
+
+
+# Archivo vectorial (nombre fijo) de cada dataset
+VECTORIAL_FILENAMES = {
+    'eventos': 'eventos_vectorial.csv',
+    'preguntas': 'preguntas_vectorial.csv',
+    'stores': 'stores_vectorial.csv',
+    'restaurantes': 'restaurantes_vectorial.csv'
+}
+
+DATASET_CONFIGS = {
+    'eventos': {
+        'encoding': 'utf-8',
+        'text_fields': ['texto_embedding'],  # ← Campo ya optimizado
+        'metadata_fields': [
+            'titulo', 'descripcion', 'fecha_texto', 'hora_texto', 'lugar',
+            'organizador', 'tipo', 'horas', 'link', 'document_type', 'search_category'
+        ],
+        'filter_fields': ['titulo', 'tipo', 'lugar', 'fecha_texto'],
+        'id_field': 'titulo',
+        # Campos que identifican el registro (nombre de su archivo en modo documents)
+        'identity_fields': ['titulo', 'fecha_texto', 'hora_texto', 'lugar'],
+        'format': 'jsonl'
+    },
+    'preguntas': {
+        'encoding': 'utf-8',
+        'text_fields': ['texto_embedding'],  # ← Campo ya optimizado
+        'metadata_fields': ['pregunta', 'respuesta', 'categoria_nombre', 'categoria_completa'],
+        'filter_fields': ['categoria_nombre'],
+        'id_field': 'pregunta',
+        'identity_fields': ['pregunta'],
+        'format': 'jsonl'
+    },
+    'stores': {
+        'encoding': 'utf-8',
+        'text_fields': ['texto_embedding'],  # ← Campo ya optimizado
+        'metadata_fields': [
+            'titulo', 'lugar', 'horario', 'nivel', 'local', 'telefono',
+            'mail', 'tipo', 'web', 'url_web', 'link', 'document_type', 'search_category'
+        ],
+        'filter_fields': ['titulo', 'nivel', 'local', 'tipo'],
+        'id_field': 'titulo',
+        'identity_fields': ['titulo', 'nivel', 'local'],
+        'format': 'jsonl'
+    },
+    'restaurantes': {
+        'encoding': 'utf-8',
+        'text_fields': ['texto_embedding'],  # ← Campo ya optimizado
+        'metadata_fields': [
+            'titulo', 'lugar', 'horario', 'nivel', 'local', 'telefono',
+            'mail', 'tipo', 'web', 'url_web', 'link', 'document_type', 'search_category'
+        ],
+        'filter_fields': ['titulo', 'nivel', 'local', 'tipo'],
+        'id_field': 'titulo',
+        'identity_fields': ['titulo', 'nivel', 'local'],
+        'format': 'jsonl'
+    }
+}
+
+# Tamaño máximo por documento (tokens estimados) en el modo documents; 0 = sin
+# límite. Con chunking NONE en Bedrock cada documento es un chunk completo
+KB_MAX_DOCUMENT_TOKENS = int(os.environ.get('KB_MAX_DOCUMENT_TOKENS', '0'))
+
+# Chunks optimizados para base vectorial
+NUM_ROWS_PER_FILE = {
+    'preguntas': 10,     # ~75 FAQs → ~8 archivos
+    'eventos': 8,        # ~26 eventos → ~4 archivos
+    'stores': 20,        # ~127 tiendas → ~7 archivos
+    'restaurantes': 15   # ~79 restaurantes → ~6 archivos
+}
+
+
+def write_dataset(engine, df, file_type, file_config, s3_bucket, output_s3_key, output_mode, tracker=None):
+    """
+    Escribe un dataset ya transformado en el modo de salida indicado.
+    Retorna (documentos escritos, chunks creados).
+    """
+    num_rows_per_file = NUM_ROWS_PER_FILE.get(file_type, 15)
+
+    records = engine.to_records(df)
+
+    if file_type == 'preguntas':
+        etl_faq_index.publish_faq_index(etl_stdlib.get_s3_client(), s3_bucket, records)
+    elif file_type in etl_directory.DIRECTORY_DATASETS:
+        etl_directory.publish_directory(file_type, records)
+
+    if output_mode == 'documents' and KB_MAX_DOCUMENT_TOKENS:
+        records = etl_stdlib.split_oversized_documents(records, KB_MAX_DOCUMENT_TOKENS)
+
+    outputs = etl_changes.describe_outputs(
+        records, file_type, file_config, output_s3_key, output_mode, num_rows_per_file
+    )
+    if tracker is not None:
+        tracker.record(file_type, outputs)
+
+    # put_object se mide aparte como 'write'
+    with etl_local.stage('serialize'):
+        if output_mode == 'documents':
+            # Un archivo por documento: cada uno cuenta como chunk
+            rows_written = etl_stdlib.write_bedrock_kb_documents(
+                docs=records,
+                file_type=file_type,
+                file_config=file_config,
+                s3_bucket=s3_bucket,
+                output_s3_key=output_s3_key
+            )
+            chunks_created = rows_written
+        else:
+            rows_written = engine.write_bedrock_kb_format(
+                df=df,
+                file_type=file_type,
+                file_config=file_config,
+                s3_bucket=s3_bucket,
+                output_s3_key=output_s3_key,
+                num_rows_per_file=num_rows_per_file
+            )
+            chunks_created = ceil(len(df) / num_rows_per_file)
+
+    # El prefijo del dataset queda solo con lo escrito, haya o no manifiesto
+    # previo; un error no invalida la salida ya escrita
+    try:
+        etl_stdlib.delete_stale_outputs(s3_bucket, output_s3_key, outputs)
+    except Exception as e:
+        print(f"   ⚠️  Error al borrar archivos obsoletos de {output_s3_key}: {str(e)}")
+
+    return rows_written, chunks_created
+
+
+def run_fused_etl(frames, s3_bucket, base_output_path, output_mode='chunks', defer_changes=False):
+    """
+    Transforma y escribe datasets recibidos en memoria con el motor stdlib.
+
+    frames: {file_type: lista de dict} (p. ej. DataFrame.to_dict('records')),
+    con las mismas columnas que los CSV vectoriales.
+    Retorna results, statistics y changes con el mismo formato que lambda_handler.
+    Con defer_changes los cambios quedan pendientes (ver finish_changes).
+    """
+    tracker = etl_changes.ChangeTracker(etl_stdlib.get_s3_client(), s3_bucket, output_mode)
+    results = {}
+    stats = {
+        'total_documents': 0,
+        'total_chunks': 0,
+        'by_type': {}
+    }
+
+    for file_type, records in frames.items():
+        # data_source en la metadata indica que no hubo CSV intermedio
+        file_config = dict(
+            DATASET_CONFIGS[file_type],
+            filename=f"fused:{VECTORIAL_FILENAMES[file_type]}"
+        )
+        output_s3_key = f"{base_output_path}/{file_type}"
+
+        rows = list(etl_stdlib.iter_record_rows(records, file_type))
+        if not rows:
+            print(f"   ⚠️  {file_type} vacío")
+            results[file_type] = 0
+            continue
+
+        with etl_local.stage('transform'):
+            docs = etl_stdlib.transform_for_bedrock_kb(rows, file_type, file_config)
+
+        rows_written, chunks_created = write_dataset(
+            engine=etl_stdlib,
+            df=docs,
+            file_type=file_type,
+            file_config=file_config,
+            s3_bucket=s3_bucket,
+            output_s3_key=output_s3_key,
+            output_mode=output_mode,
+            tracker=tracker
+        )
+
+        results[file_type] = rows_written
+        stats['total_documents'] += rows_written
+        stats['total_chunks'] += chunks_created
+        stats['by_type'][file_type] = {
+            'documents': rows_written,
+            'chunks': chunks_created,
+            'avg_text_length': int(etl_stdlib.mean_text_length(docs))
+        }
+        print(f"   ✓ {file_type}: {rows_written} documentos en {chunks_created} chunks → {output_s3_key}")
+
+    return {'results': results, 'statistics': stats, 'changes': finish_changes(tracker, defer_changes)}
+
+
+def finish_changes(tracker, defer=False):
+    """
+    Cierra el manifiesto de cambios; un error no invalida la salida KB ya escrita.
+    Con defer=True (rama del Map por dataset) solo guarda los pendientes.
+    """
+    try:
+        if defer:
+            return {'pending': tracker.save_pending()}
+        return tracker.finish()
+    except Exception as e:
+        # Sin manifiesto nuevo la sincronización usa el ingestion job completo
+        print(f"   ⚠️  Error al generar manifiesto de cambios: {str(e)}")
+        return None
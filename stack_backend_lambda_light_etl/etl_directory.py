@@ -0,0 +1,164 @@
+"""
+Directorio de tiendas y restaurantes para consultas de ubicación
+
+Preguntas como "¿Dónde está Nike?" solo necesitan titulo → nivel / local /
+lugar / horario / teléfono. Al transformar stores y restaurantes el ETL
+publica esos campos en la tabla DynamoDB DIRECTORY_TABLE_NAME
+(StackConversationDynamoDB), con clave name_key = nombre normalizado y
+dataset, así una tienda y un restaurante con el mismo nombre no se pisan:
+- Un ítem por nombre; varios locales con el mismo nombre van en locations
+- Un ítem por alias (sin acentos/signos, sin espacios, '&' → 'y', sin
+  artículo inicial ni sufijo entre paréntesis o tras " - ") con una copia de
+  los datos y alias_of = nombre principal, para responder con un solo Query
+- Los alias que apuntan a más de un nombre del dataset se descartan por
+  ambiguos; entre datasets la ambigüedad la resuelve el chat con la misma
+  regla (storeDirectory.js: el nombre principal gana, alias de nombres
+  distintos se descartan)
+
+Cada publicación marca sus ítems con build_id y borra los nombres del mismo
+dataset que ya no se generan (GSI dataset-index). Como el GSI es
+eventualmente consistente, el borrado es condicional (build_id distinto al
+de esta publicación): nunca borra un ítem recién escrito. La normalización
+es la del índice FAQ (etl_faq_index.normalize_question), igual a la del chat.
+"""
+
+import os
+import re
+import uuid
+from datetime import datetime
+
+from etl_stdlib import clean_value, is_local_mode
+from etl_faq_index import normalize_question
+
+
+DIRECTORY_TABLE_NAME = os.environ.get('DIRECTORY_TABLE_NAME', '')
+
+# Datasets del directorio → tipo que ve el chat
+DIRECTORY_DATASETS = {
+    'stores': 'tienda',
+    'restaurantes': 'restaurante'
+}
+
+LOCATION_FIELDS = ('nivel', 'local', 'lugar', 'horario', 'telefono', 'mail', 'tipo', 'link')
+
+ARTICLES = ('el ', 'la ', 'los ', 'las ', 'the ')
+
+
+def clean_field(value):
+    """Texto limpio; los números que pandas leyó como float vuelven a entero ("-3.0" → "-3")."""
+    value = clean_value(value)
+    return re.sub(r'^(-?\d+)\.0$', r'\1', value)
+
+
+def name_aliases(titulo):
+    """Variantes normalizadas del nombre, sin el nombre principal."""
+    canonical = normalize_question(titulo)
+    variants = {
+        canonical.replace(' ', ''),
+        normalize_question(titulo.replace('&', ' y ')),
+        normalize_question(re.sub(r'\s*\(.*?\)\s*', ' ', titulo)),
+        normalize_question(titulo.split(' - ')[0])
+    }
+    for variant in list(variants) + [canonical]:
+        for article in ARTICLES:
+            if variant.startswith(article):
+                variants.add(variant[len(article):])
+    variants.discard(canonical)
+    return {variant for variant in variants if len(variant) > 1}
+
+
+def build_directory_items(records, dataset, build_id):
+    """Ítems del directorio (principales y alias) a partir de filas de stores/restaurantes."""
+    updated_at = datetime.utcnow().isoformat()
+    entries = {}
+    for row in records:
+        titulo = clean_field(row.get('titulo'))
+        name_key = normalize_question(titulo)
+        if not name_key:
+            continue
+        location = {field: clean_field(row.get(field)) for field in LOCATION_FIELDS}
+        location = {field: value for field, value in location.items() if value}
+        entry = entries.setdefault(name_key, {'titulo': titulo, 'aliases': set(), 'locations': []})
+        entry['aliases'].update(name_aliases(titulo))
+        if location not in entry['locations']:
+            entry['locations'].append(location)
+
+    owners = {}
+    for name_key, entry in entries.items():
+        for alias in entry['aliases']:
+            owners.setdefault(alias, set()).add(name_key)
+
+    def item(name_key, entry, alias_of=None):
+        data = {
+            'name_key': name_key,
+            'titulo': entry['titulo'],
+            'dataset': dataset,
+            'document_type': DIRECTORY_DATASETS[dataset],
+            'locations': entry['locations'],
+            'build_id': build_id,
+            'updated_at': updated_at
+        }
+        if alias_of:
+            data['alias_of'] = alias_of
+        return data
+
+    items = [item(name_key, entry) for name_key, entry in entries.items()]
+    for alias, names in owners.items():
+        if len(names) == 1 and alias not in entries:
+            name_key = next(iter(names))
+            items.append(item(alias, entries[name_key], alias_of=name_key))
+    return items
+
+
+def publish_directory(dataset, records, table_name=DIRECTORY_TABLE_NAME):
+    """
+    Reemplaza los ítems de dataset en la tabla del directorio. Un error no
+    invalida la salida KB ya escrita. Retorna la cantidad de ítems o None.
+    """
+    if dataset not in DIRECTORY_DATASETS or not table_name or is_local_mode():
+        return None
+
+    # Import diferido: las herramientas offline (benchmarks) no requieren boto3
+    import boto3
+    from boto3.dynamodb.conditions import Attr, Key
+
+    try:
+        table = boto3.resource('dynamodb').Table(table_name)
+        build_id = uuid.uuid4().hex
+        items = build_directory_items(records, dataset, build_id)
+
+        with table.batch_writer(overwrite_by_pkeys=['name_key', 'dataset']) as batch:
+            for item in items:
+                batch.put_item(Item=item)
+
+        # El GSI es eventualmente consistente: puede no mostrar aún lo recién escrito
+        # (se descarta por clave) y el borrado exige un build_id anterior
+        current = {item['name_key'] for item in items}
+        stale = []
+        kwargs = {'IndexName': 'dataset-index', 'KeyConditionExpression': Key('dataset').eq(dataset)}
+        while True:
+            response = table.query(**kwargs)
+            stale.extend(i['name_key'] for i in response.get('Items', []) if i['name_key'] not in current)
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        deleted = 0
+        for name_key in stale:
+            try:
+                table.delete_item(
+                    Key={'name_key': name_key, 'dataset': dataset},
+                    ConditionExpression=Attr('build_id').ne(build_id)
+                )
+                deleted += 1
+            except table.meta.client.exceptions.ConditionalCheckFailedException:
+                # Lo reescribió esta publicación
+                pass
+
+        aliases = sum(1 for i in items if 'alias_of' in i)
+        print(f"   📇 Directorio {dataset}: {len(items) - aliases} nombres + {aliases} alias "
+              f"(-{deleted} obsoletos) → {table_name}")
+        return len(items)
+    except Exception as e:
+        print(f"   ⚠️  Error al publicar directorio de {dataset}: {str(e)}")
+        return None
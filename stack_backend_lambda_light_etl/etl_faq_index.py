@@ -0,0 +1,92 @@
+"""
+Índice de respuestas de preguntas frecuentes para el chat (sin LLM)
+
+Muchas consultas de visitantes coinciden literalmente o casi con una fila de
+preguntas.csv ("Dónde está Adidas"). Al transformar el dataset de preguntas el
+ETL publica en FAQ_INDEX_KEY (fuera del prefijo del KB, para que Bedrock no lo
+ingeste) un JSON compacto con, por pregunta:
+- normalized: pregunta en minúsculas, sin acentos ni signos
+- signature: n-gramas de caracteres de normalized (similitud de Jaccard)
+- answer y category
+
+El chat (stack_chat_runner/runner/faqIndex.js) lo carga con cache TTL y responde
+las coincidencias exactas y de alta confianza sin invocar al agente. Ambos lados
+deben normalizar igual: cualquier cambio en normalize_question o NGRAM_SIZE
+exige subir INDEX_VERSION y ajustar faqIndex.js.
+"""
+
+import os
+import re
+import json
+import unicodedata
+from datetime import datetime
+
+
+FAQ_INDEX_KEY = os.environ.get('FAQ_INDEX_KEY', 'faq-index/faq_index.json')
+
+INDEX_VERSION = 1
+NGRAM_SIZE = 3
+
+
+def normalize_question(text):
+    """Minúsculas, sin acentos (ñ → n) y solo letras/dígitos separados por un espacio."""
+    text = unicodedata.normalize('NFKD', str(text or '').lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9]+', ' ', text).strip()
+
+
+def signature(normalized, n=NGRAM_SIZE):
+    """N-gramas de caracteres (con un espacio de borde) ordenados y sin repetir."""
+    padded = f" {normalized} "
+    return sorted({padded[i:i + n] for i in range(len(padded) - n + 1)})
+
+
+def build_faq_index(records):
+    """
+    Índice a partir de filas de preguntas (pregunta, respuesta, categoria_nombre).
+    Las preguntas repetidas conservan la primera respuesta.
+    """
+    entries = []
+    seen = set()
+    for row in records:
+        question = str(row.get('pregunta') or '').strip()
+        answer = str(row.get('respuesta') or '').strip()
+        normalized = normalize_question(question)
+        if not normalized or not answer or answer in ('nan', 'None') or normalized in seen:
+            continue
+        seen.add(normalized)
+        entries.append({
+            'question': question,
+            'normalized': normalized,
+            'signature': signature(normalized),
+            'answer': answer,
+            'category': str(row.get('categoria_nombre') or '').strip()
+        })
+
+    return {
+        'version': INDEX_VERSION,
+        'generated_at': datetime.utcnow().isoformat(),
+        'ngram_size': NGRAM_SIZE,
+        'count': len(entries),
+        'entries': entries
+    }
+
+
+def publish_faq_index(s3_client, s3_bucket, records, key=FAQ_INDEX_KEY):
+    """
+    Escribe el índice en S3. Un error no invalida la salida KB ya escrita:
+    el chat conserva el índice anterior. Retorna la cantidad de preguntas o None.
+    """
+    try:
+        index = build_faq_index(records)
+        s3_client.put_object(
+            Bucket=s3_bucket,
+            Key=key,
+            Body=json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+            ContentType='application/json'
+        )
+        print(f"   ⚡ Índice FAQ: {index['count']} preguntas → s3://{s3_bucket}/{key}")
+        return index['count']
+    except Exception as e:
+        print(f"   ⚠️  Error al publicar índice FAQ: {str(e)}")
+        return None
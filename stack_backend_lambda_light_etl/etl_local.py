@@ -0,0 +1,221 @@
+"""
+Ejecución local y profiling del ETL de Bedrock Knowledge Base
+
+Corre lambda_function.lambda_handler contra directorios locales (estilo
+datasetmut/) usando el mismo código que en Lambda: todas las llamadas S3 pasan
+por etl_stdlib.get_s3_client(), que con ETL_LOCAL_ROOT devuelve LocalS3Client.
+
+USO (desde la raíz del repo):
+    python stack_backend_lambda_light_etl/etl_local.py \
+        --input-dir datasetmut/vectorial --output-dir datasetmut/kb_output --profile
+
+ETAPAS MEDIDAS CON --profile:
+- read:      lectura y parseo de los CSV vectoriales
+- transform: transform_for_bedrock_kb
+- serialize: armado de JSONL/CSV/metadata (excluye el tiempo de put_object)
+- write:     put_object al árbol de salida
+"""
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import argparse
+from io import BytesIO
+from contextlib import contextmanager, nullcontext
+from collections import defaultdict
+
+
+# Profiler activo; None en Lambda (las etapas no tienen costo)
+ACTIVE_PROFILER = None
+
+STAGES = ('read', 'transform', 'serialize', 'write')
+
+
+def stage(name):
+    """Marca una etapa del ETL para el profiler activo, si existe."""
+    if ACTIVE_PROFILER is None:
+        return nullcontext()
+    return ACTIVE_PROFILER.stage(name)
+
+
+# ============================================================================
+# PROFILER POR ETAPA
+# ============================================================================
+
+class StageProfiler:
+    """
+    Acumula tiempo de reloj y un cProfile por etapa.
+    Las etapas anidadas pausan a la etapa padre, así cada tiempo es exclusivo
+    (p. ej. serialize no incluye los put_object medidos como write).
+    """
+
+    def __init__(self):
+        self.wall = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.profiles = {}
+        self._stack = []
+        self._started_at = None
+
+    @contextmanager
+    def stage(self, name):
+        self._pause_current()
+        self._stack.append(name)
+        self.calls[name] += 1
+        self._resume_current()
+        try:
+            yield
+        finally:
+            self._pause_current()
+            self._stack.pop()
+            self._resume_current()
+
+    def _pause_current(self):
+        if not self._stack:
+            return
+        current = self._stack[-1]
+        self.profiles[current].disable()
+        self.wall[current] += time.perf_counter() - self._started_at
+
+    def _resume_current(self):
+        if not self._stack:
+            return
+        current = self._stack[-1]
+        self.profiles.setdefault(current, cProfile.Profile()).enable()
+        self._started_at = time.perf_counter()
+
+    def report(self, total_seconds, top=15):
+        """Imprime el desglose por etapa y las funciones más costosas de cada una."""
+        print("\n" + "="*80)
+        print("⏱️  PROFILE POR ETAPA")
+        print("="*80)
+        print(f"   {'Etapa':<12}{'Llamadas':>10}{'Segundos':>12}{'% total':>10}")
+        for name in list(STAGES) + sorted(set(self.wall) - set(STAGES)):
+            if name not in self.wall:
+                continue
+            share = (self.wall[name] / total_seconds * 100) if total_seconds else 0
+            print(f"   {name:<12}{self.calls[name]:>10}{self.wall[name]:>12.4f}{share:>9.1f}%")
+        other = total_seconds - sum(self.wall.values())
+        print(f"   {'(otros)':<12}{'':>10}{other:>12.4f}")
+        print(f"   {'TOTAL':<12}{'':>10}{total_seconds:>12.4f}")
+
+        for name, profile in self.profiles.items():
+            print(f"\n{'-'*80}")
+            print(f"🔍 cProfile: {name}")
+            print(f"{'-'*80}")
+            pstats.Stats(profile, stream=sys.stdout).sort_stats('cumulative').print_stats(top)
+
+
+# ============================================================================
+# CLIENTE S3 SOBRE DISCO LOCAL
+# ============================================================================
+
+class LocalS3Client:
+    """
+    Implementa head_object/get_object/put_object/delete_object/list_objects_v2 sobre el sistema de archivos.
+    La key se resuelve como ruta relativa a `root` (el bucket se ignora).
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    def head_object(self, Bucket, Key):
+        path = self._path(Key)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(path)
+        return {'ContentLength': os.path.getsize(path)}
+
+    def get_object(self, Bucket, Key):
+        with open(self._path(Key), 'rb') as f:
+            return {'Body': BytesIO(f.read())}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        with stage('write'):
+            path = self._path(Key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if isinstance(Body, str):
+                Body = Body.encode('utf-8')
+            with open(path, 'wb') as f:
+                f.write(Body)
+        return {'ETag': f'"{len(Body)}"'}
+
+    def delete_object(self, Bucket, Key):
+        path = self._path(Key)
+        if os.path.isfile(path):
+            os.remove(path)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix='', ContinuationToken=None):
+        """Todas las keys bajo Prefix en una sola página."""
+        directory = os.path.dirname(self._path(Prefix))
+        keys = []
+        for folder, _, files in os.walk(directory):
+            for name in files:
+                key = os.path.relpath(os.path.join(folder, name), self.root).replace(os.sep, '/')
+                if key.startswith(Prefix):
+                    keys.append(key)
+        return {'Contents': [{'Key': key} for key in sorted(keys)], 'IsTruncated': False}
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ejecuta el ETL de Bedrock KB contra directorios locales")
+    parser.add_argument('--input-dir', default='datasetmut/vectorial',
+                        help="Directorio con *_vectorial.csv (default: datasetmut/vectorial)")
+    parser.add_argument('--output-dir', default='datasetmut/kb_output',
+                        help="Directorio de salida para los documentos KB (default: datasetmut/kb_output)")
+    parser.add_argument('--engine', choices=['stdlib', 'pandas'], default='stdlib',
+                        help="Motor ETL a usar (default: stdlib)")
+    parser.add_argument('--output-mode', choices=['chunks', 'documents'], default='chunks',
+                        help="Modo de salida KB (default: chunks)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Imprime cProfile y tiempo de reloj por etapa")
+    parser.add_argument('--top', type=int, default=15,
+                        help="Funciones a mostrar por etapa en el cProfile (default: 15)")
+    args = parser.parse_args(argv)
+
+    # La configuración se lee al importar lambda_function
+    os.environ.update({
+        'ETL_LOCAL_ROOT': os.getcwd(),
+        'S3_BUCKET_NAME': 'local',
+        'S3_VECTORIAL_PREFIX': args.input_dir.rstrip('/\\') + '/',
+        'KB_S3_ECOMM_PATH': args.output_dir.rstrip('/\\'),
+        'ETL_ENGINE': args.engine,
+        'KB_OUTPUT_MODE': args.output_mode,
+    })
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    # pipeline_ledger llega en Lambda como capa (/opt/python)
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda_shared'))
+    # Importar por nombre: al correr como script este archivo es __main__ y
+    # lambda_function usa el módulo etl_local
+    import etl_local
+    import lambda_function
+
+    profiler = StageProfiler() if args.profile else None
+    etl_local.ACTIVE_PROFILER = profiler
+
+    started = time.perf_counter()
+    result = lambda_function.lambda_handler({}, None)
+    total_seconds = time.perf_counter() - started
+
+    etl_local.ACTIVE_PROFILER = None
+
+    print(f"📦 Resultado: statusCode={result['statusCode']} en {total_seconds:.3f}s")
+    print(f"📤 Salida: {os.path.abspath(args.output_dir)}")
+
+    if profiler:
+        profiler.report(total_seconds, top=args.top)
+
+    return 0 if result['statusCode'] == 200 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
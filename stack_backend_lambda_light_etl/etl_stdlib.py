@@ -0,0 +1,616 @@
+"""
+Motor ETL liviano para Bedrock Knowledge Base (sin pandas / awswrangler)
+
+Implementa las mismas entradas y salidas que el motor pandas de
+lambda_function.py (read_csv_robust, transform_for_bedrock_kb,
+write_bedrock_kb_format), usando solo el módulo csv de la librería estándar
+y generadores. Permite desplegar la Lambda sin la capa AWS SDK for Pandas.
+
+DIFERENCIAS CONOCIDAS CON EL MOTOR PANDAS:
+- No hay inferencia de tipos: columnas numéricas (nivel, local) conservan su
+  texto original ("-3") en vez del float de pandas ("-3.0")
+"""
+
+import os
+import re
+import csv
+import json
+import hashlib
+from io import StringIO
+from math import ceil
+from itertools import islice
+from datetime import datetime
+
+
+# Valores que pandas deja como texto al convertir nulos con astype(str)
+EMPTY_VALUES = ('nan', 'None', 'NaN', '')
+
+CATEGORY_MAP = {
+    'eventos': 'eventos_y_actividades',
+    'preguntas': 'preguntas_frecuentes',
+    'stores': 'comercios_y_tiendas',
+    'restaurantes': 'gastronomia'
+}
+
+
+# ============================================================================
+# ACCESO A S3
+# ============================================================================
+
+def is_local_mode():
+    """True si el ETL corre contra el sistema de archivos local (etl_local.py)."""
+    return bool(os.environ.get('ETL_LOCAL_ROOT'))
+
+
+def get_s3_client():
+    """Cliente S3 real, o uno sobre disco local cuando ETL_LOCAL_ROOT está definido."""
+    if is_local_mode():
+        from etl_local import LocalS3Client
+        return LocalS3Client(os.environ['ETL_LOCAL_ROOT'])
+    # Import diferido: las herramientas offline (benchmarks) no requieren boto3
+    import boto3
+    return boto3.client('s3')
+
+
+# ============================================================================
+# LECTURA DE CSV
+# ============================================================================
+
+def read_csv_robust(s3_path, encoding, file_type, separator=','):
+    """Lee CSV desde S3 y retorna una lista de filas (dict) o None si falla."""
+    try:
+        s3_client = get_s3_client()
+        bucket, key = s3_path.replace('s3://', '').split('/', 1)
+
+        obj = s3_client.get_object(Bucket=bucket, Key=key)
+        content = obj['Body'].read().decode(encoding)
+
+        return list(iter_csv_rows(content, file_type, separator))
+
+    except Exception as e:
+        print(f"❌ Lectura CSV falló: {str(e)}")
+        return None
+
+
+def iter_csv_rows(content, file_type, separator=','):
+    """
+    Genera filas (dict) desde el texto de un CSV.
+    Igual que pandas con on_bad_lines='skip': descarta filas con columnas de más
+    y completa con vacío las filas con columnas de menos.
+    """
+    reader = csv.reader(StringIO(content), delimiter=separator, quotechar='"', escapechar='\\')
+
+    header = next(reader, None)
+    if not header:
+        return
+    header = [col.replace('\ufeff', '').strip() for col in header]
+
+    for values in reader:
+        if not values:
+            continue
+        if len(values) > len(header):
+            continue
+        values = values + [''] * (len(header) - len(values))
+        yield normalize_row(dict(zip(header, values)), file_type)
+
+
+def iter_record_rows(records, file_type):
+    """
+    Genera filas (dict de texto) desde registros en memoria (p. ej.
+    DataFrame.to_dict('records') de la Lambda de extracción), con los mismos
+    valores que se obtendrían al escribir y releer el CSV vectorial.
+    """
+    for record in records:
+        row = {}
+        for key, value in record.items():
+            if value is None or (isinstance(value, float) and value != value):
+                row[key] = ''
+            else:
+                row[key] = str(value)
+        yield normalize_row(row, file_type)
+
+
+def normalize_row(row, file_type):
+    """Limpieza específica por tipo aplicada a cada fila leída."""
+    if file_type == 'restaurantes' and 'telefono' in row:
+        row['telefono'] = row['telefono'].replace('.0', '').replace('nan', '')
+    return row
+
+
+def get_columns(rows):
+    """Columnas presentes en las filas leídas."""
+    return list(rows[0].keys()) if rows else []
+
+
+def mean_text_length(rows):
+    """Largo promedio de bedrock_text."""
+    return sum(len(row['bedrock_text']) for row in rows) / len(rows) if rows else 0
+
+
+def to_records(rows):
+    """Las filas ya son dict."""
+    return rows
+
+
+# ============================================================================
+# TRANSFORMACIÓN PARA BEDROCK KB
+# ============================================================================
+
+def transform_for_bedrock_kb(rows, file_type, file_config):
+    """
+    Transforma filas a formato Bedrock KB.
+    Mismo contrato que la versión pandas: agrega bedrock_text, document_type,
+    search_category y document_id, y descarta documentos vacíos.
+    """
+    docs = list(iter_bedrock_docs(rows, file_type, file_config))
+
+    removed = len(rows) - len(docs)
+    if removed > 0:
+        print(f"   ⚠️  Removidos {removed} documentos vacíos")
+
+    return docs
+
+
+def iter_bedrock_docs(rows, file_type, file_config):
+    """Genera documentos Bedrock KB a partir de filas crudas."""
+    columns = get_columns(rows)
+
+    if 'texto_embedding' in columns:
+        build_text = lambda row: row['texto_embedding']
+        print(f"   ✅ Usando campo 'texto_embedding' directo del CSV")
+    else:
+        print(f"   ⚠️  Campo 'texto_embedding' no encontrado, generando...")
+        build_text = TEXT_BUILDERS.get(file_type, lambda row: '')
+
+    defaults = FALLBACK_DEFAULTS.get(file_type, {}) if 'texto_embedding' not in columns else {}
+    timestamp = int(datetime.utcnow().timestamp())
+    id_field = file_config['id_field']
+
+    for idx, raw in enumerate(rows):
+        row = {col: clean_value(value) for col, value in raw.items()}
+        row['bedrock_text'] = build_text(row)
+        row.update(defaults)
+        row.setdefault('document_type', file_type)
+        row.setdefault('search_category', CATEGORY_MAP.get(file_type, file_type))
+        row['document_id'] = f"{file_type}_{timestamp}_{idx}_{sanitize_text(str(row.get(id_field, ''))[:30])}"
+
+        if len(row['bedrock_text']) > 20:
+            yield row
+
+
+def clean_value(value):
+    """Limpia un valor de texto igual que el motor pandas."""
+    value = str(value).strip()
+    return '' if value in EMPTY_VALUES else value
+
+
+# ============================================================================
+# CREACIÓN DE TEXTO PARA EMBEDDINGS (compartido con el motor pandas)
+# ============================================================================
+
+def build_preguntas_text(row):
+    """Texto de embedding para preguntas frecuentes."""
+    # Usar directamente la columna texto_embedding
+    if row.get('texto_embedding'):
+        return str(row['texto_embedding']).strip()
+
+    # Fallback si no existe (no debería pasar)
+    return f"Pregunta: {row.get('pregunta', '')}\nRespuesta: {row.get('respuesta', '')}"
+
+
+def build_eventos_text(row):
+    """Texto de embedding para eventos."""
+    parts = []
+    if row.get('keywords') and row.get('keywords') != '':
+        parts.append(f"🔑 KEYWORDS: {row['keywords']}")
+    if row.get('tipo'):
+        parts.append(f"📌 TIPO: {row['tipo']}")
+    if row.get('titulo'):
+        parts.append(f"🎯 EVENTO: {row['titulo']}")
+    if row.get('descripcion'):
+        parts.append(f"📝 {row['descripcion']}")
+    if row.get('contenido'):
+        parts.append(row['contenido'])
+
+    info_practica = []
+    if row.get('fecha_texto'):
+        info_practica.append(f"📅 {row['fecha_texto']}")
+    if row.get('hora_texto'):
+        info_practica.append(f"🕐 {row['hora_texto']}")
+    if row.get('lugar'):
+        info_practica.append(f"📍 {row['lugar']}")
+    if info_practica:
+        parts.append(" | ".join(info_practica))
+
+    if row.get('publico_objetivo') and row.get('publico_objetivo') != '':
+        parts.append(f"👨‍👩‍👧 PÚBLICO: {row['publico_objetivo']}")
+    if row.get('entrada') and row.get('entrada') != '':
+        parts.append(f"🎟️ ENTRADA: {row['entrada']}")
+    if row.get('organizador'):
+        parts.append(f"👥 ORGANIZA: {row['organizador']}")
+
+    return "\n\n".join(parts)
+
+
+def build_stores_text(row):
+    """Texto de embedding para tiendas."""
+    parts = []
+    if row.get('titulo'):
+        parts.append(f"🏪 TIENDA: {row['titulo']}")
+    if row.get('tipo'):
+        parts.append(f"📌 CATEGORÍA: {row['tipo']}")
+    if row.get('content'):
+        content_text = row['content'][:600]
+        if content_text:
+            parts.append(content_text)
+
+    ubicacion_parts = []
+    if row.get('lugar'):
+        ubicacion_parts.append(row['lugar'])
+    if row.get('nivel'):
+        ubicacion_parts.append(f"Nivel {row['nivel']}")
+    if row.get('local'):
+        ubicacion_parts.append(f"Local {row['local']}")
+    if ubicacion_parts:
+        parts.append(f"📍 UBICACIÓN: {' - '.join(ubicacion_parts)}")
+
+    if row.get('horario'):
+        parts.append(f"🕐 HORARIO: {row['horario']}")
+
+    contacto_parts = []
+    telefono = str(row.get('telefono', ''))
+    if telefono and telefono not in ['nan', '', 'None']:
+        contacto_parts.append(f"📞 {telefono}")
+    if row.get('mail'):
+        contacto_parts.append(f"📧 {row['mail']}")
+    if contacto_parts:
+        parts.append(f"CONTACTO: {' | '.join(contacto_parts)}")
+
+    if row.get('web') and row.get('web') not in ['nan', '', 'None']:
+        parts.append(f"🌐 WEB: {row['web']}")
+
+    return " | ".join(parts)
+
+
+def build_restaurantes_text(row):
+    """Texto de embedding para restaurantes."""
+    parts = []
+    if row.get('titulo'):
+        parts.append(f"🍽️ RESTAURANTE: {row['titulo']}")
+    if row.get('tipo'):
+        parts.append(f"👨‍🍳 COCINA: {row['tipo']}")
+    if row.get('content'):
+        content_text = row['content'][:600]
+        if content_text:
+            parts.append(content_text)
+
+    ubicacion_parts = []
+    if row.get('lugar'):
+        ubicacion_parts.append(row['lugar'])
+    if row.get('nivel'):
+        ubicacion_parts.append(f"Nivel {row['nivel']}")
+    if row.get('local'):
+        ubicacion_parts.append(f"Local {row['local']}")
+    if ubicacion_parts:
+        parts.append(f"📍 UBICACIÓN: {' - '.join(ubicacion_parts)}")
+
+    if row.get('horario'):
+        parts.append(f"🕐 HORARIO: {row['horario']}")
+
+    contacto_parts = []
+    telefono = str(row.get('telefono', ''))
+    if telefono and telefono not in ['nan', '', 'None', '0']:
+        contacto_parts.append(f"📞 {telefono}")
+    if row.get('mail'):
+        contacto_parts.append(f"📧 {row['mail']}")
+    if contacto_parts:
+        parts.append(f"CONTACTO: {' | '.join(contacto_parts)}")
+
+    if row.get('web') and row.get('web') not in ['nan', '', 'None']:
+        parts.append(f"🌐 WEB: {row['web']}")
+
+    return " | ".join(parts)
+
+
+TEXT_BUILDERS = {
+    'eventos': build_eventos_text,
+    'preguntas': build_preguntas_text,
+    'stores': build_stores_text,
+    'restaurantes': build_restaurantes_text
+}
+
+# document_type / search_category que fijan los generadores de texto de respaldo
+FALLBACK_DEFAULTS = {
+    'eventos': {'document_type': 'evento', 'search_category': 'eventos_y_actividades'},
+    'preguntas': {'document_type': 'faq', 'search_category': 'preguntas_frecuentes'},
+    'stores': {'document_type': 'tienda', 'search_category': 'comercios_y_tiendas'},
+    'restaurantes': {'document_type': 'restaurante', 'search_category': 'gastronomia'}
+}
+
+
+# ============================================================================
+# ESCRITURA EN FORMATO BEDROCK KB
+# ============================================================================
+
+def write_bedrock_kb_format(df, file_type, file_config, s3_bucket, output_s3_key, num_rows_per_file):
+    """Escribe documentos en formato Bedrock KB (mismos archivos que el motor pandas)."""
+    s3_client = get_s3_client()
+    docs = df
+    num_files = ceil(len(docs) / num_rows_per_file)
+    total_rows = 0
+    output_format = file_config.get('format', 'csv')
+
+    print(f"   📝 Creando {num_files} chunks...")
+
+    for i, chunk in enumerate(iter_chunks(docs, num_rows_per_file)):
+        if output_format == 'jsonl':
+            file_name = f"{file_type}_chunk_{i+1:03d}.jsonl"
+            body = '\n'.join(
+                json.dumps(build_jsonl_doc(row, file_config), ensure_ascii=False) for row in chunk
+            ).encode('utf-8')
+            content_type = 'application/jsonlines'
+        else:
+            file_name = f"{file_type}_chunk_{i+1:03d}.csv"
+            body = build_csv_body(chunk, file_config).encode('utf-8')
+            content_type = 'text/csv'
+
+        s3_client.put_object(
+            Bucket=s3_bucket,
+            Key=f"{output_s3_key}/{file_name}",
+            Body=body,
+            ContentType=content_type
+        )
+
+        metadata_doc = {
+            "metadataAttributes": {
+                "document_type": file_type,
+                "search_category": chunk[0]['search_category'],
+                "chunk_number": i + 1,
+                "total_chunks": num_files,
+                "document_count": len(chunk),
+                "data_source": file_config['filename'],
+                "processing_date": datetime.utcnow().isoformat(),
+                "version": "v2_optimized",
+                "format": output_format
+            }
+        }
+
+        s3_client.put_object(
+            Bucket=s3_bucket,
+            Key=f"{output_s3_key}/{file_name}.metadata.json",
+            Body=json.dumps(metadata_doc, ensure_ascii=False, indent=2),
+            ContentType='application/json'
+        )
+
+        total_rows += len(chunk)
+        print(f"      ✓ {file_name} ({len(chunk)} docs)")
+
+    return total_rows
+
+
+def write_bedrock_kb_documents(docs, file_type, file_config, s3_bucket, output_s3_key):
+    """
+    Escribe un archivo de texto por documento con su sidecar .metadata.json.
+    Los metadataAttributes (document_type, search_category y filter_fields del
+    tipo) permiten filtrar por metadata en el Retrieve de Bedrock.
+    """
+    s3_client = get_s3_client()
+    used_names = set()
+
+    print(f"   📝 Creando {len(docs)} documentos individuales...")
+
+    for row in docs:
+        file_name = f"{document_file_stem(row, file_type, file_config, used_names)}.txt"
+
+        s3_client.put_object(
+            Bucket=s3_bucket,
+            Key=f"{output_s3_key}/{file_name}",
+            Body=row['bedrock_text'].encode('utf-8'),
+            ContentType='text/plain; charset=utf-8'
+        )
+
+        s3_client.put_object(
+            Bucket=s3_bucket,
+            Key=f"{output_s3_key}/{file_name}.metadata.json",
+            Body=json.dumps(build_document_metadata(row, file_config), ensure_ascii=False),
+            ContentType='application/json'
+        )
+
+    print(f"      ✓ {len(docs)} documentos + metadata escritos")
+
+    return len(docs)
+
+
+def delete_stale_outputs(s3_bucket, output_s3_key, keep_keys):
+    """
+    Borra del prefijo del dataset los archivos que esta ejecución no escribió
+    (filas eliminadas, chunks sobrantes o archivos de otro kb_output_mode) y
+    sus .metadata.json. Retorna las keys borradas.
+    """
+    s3_client = get_s3_client()
+    keep = set(keep_keys) | {f"{key}.metadata.json" for key in keep_keys}
+    prefix = f"{output_s3_key}/"
+
+    stale = []
+    request = {'Bucket': s3_bucket, 'Prefix': prefix}
+    while True:
+        response = s3_client.list_objects_v2(**request)
+        stale.extend(obj['Key'] for obj in response.get('Contents', []) if obj['Key'] not in keep)
+        if not response.get('IsTruncated'):
+            break
+        request['ContinuationToken'] = response['NextContinuationToken']
+
+    for key in stale:
+        s3_client.delete_object(Bucket=s3_bucket, Key=key)
+    if stale:
+        print(f"   🧹 {len(stale)} archivos obsoletos borrados de {prefix}")
+    return stale
+
+
+def estimate_tokens(text):
+    """Estimación conservadora de tokens: palabras y signos, o 1 token cada 4 caracteres."""
+    text = str(text)
+    return max(len(re.findall(r'\w+|[^\w\s]', text)), ceil(len(text) / 4))
+
+
+def split_oversized_documents(docs, max_tokens):
+    """
+    Garantiza documentos de a lo más max_tokens (estimados) para el modo
+    documents: con chunking NONE cada archivo es un chunk completo. Los
+    documentos más largos se parten en límites de sección (" | ", saltos de
+    línea, fin de oración); cada parte conserva la metadata del registro y
+    repite su primera sección (título) como contexto.
+    """
+    result = []
+    for row in docs:
+        text = row['bedrock_text']
+        if estimate_tokens(text) <= max_tokens:
+            result.append(row)
+            continue
+
+        segments = [seg.strip() for seg in re.split(r'(?<=[.!?])\s+|\s*\|\s*|\n+', text) if seg.strip()]
+        header = segments.pop(0) if len(segments) > 1 and estimate_tokens(segments[0]) <= max_tokens // 4 else ''
+        budget = max_tokens - estimate_tokens(header) - 1
+
+        parts = [[]]
+        for piece in (p for segment in segments for p in _pack(segment.split(), budget, ' ')):
+            if parts[-1] and estimate_tokens(' | '.join(parts[-1] + [piece])) > budget:
+                parts.append([])
+            parts[-1].append(piece)
+
+        for n, part in enumerate(parts, start=1):
+            if header:
+                part = [header] + part
+            result.append(dict(
+                row, bedrock_text=' | '.join(part), document_id=f"{row['document_id']}_p{n}", document_part=n
+            ))
+        print(f"   ✂️  {row.get('document_id')}: {estimate_tokens(text)} tokens → {len(parts)} partes")
+
+    return result
+
+
+def _pack(items, budget, separator):
+    """
+    Agrupa items consecutivos en textos de a lo más budget tokens estimados.
+    Un item que por sí solo supera budget (p. ej. una URL larga) se corta por caracteres.
+    """
+    groups = [[]]
+    for item in (piece for item in items for piece in _split_by_chars(item, budget)):
+        if groups[-1] and estimate_tokens(separator.join(groups[-1] + [item])) > budget:
+            groups.append([])
+        groups[-1].append(item)
+    return [separator.join(group) for group in groups if group]
+
+
+def _split_by_chars(item, budget):
+    """Corta item en prefijos de a lo más budget tokens estimados."""
+    pieces = []
+    while estimate_tokens(item) > budget:
+        # estimate_tokens crece con el largo del prefijo: búsqueda binaria del más largo
+        low, high = 1, len(item)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if estimate_tokens(item[:middle]) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        pieces.append(item[:low])
+        item = item[low:]
+    pieces.append(item)
+    return pieces
+
+
+def document_file_stem(row, file_type, file_config, used_names):
+    """
+    Nombre estable por documento (sin timestamp): id_field legible más un hash
+    corto de identity_fields (por defecto id_field), para que el mismo registro
+    reemplace su archivo en cada ejecución aunque cambie el orden de las filas.
+    Las partes de split_oversized_documents agregan _p{n}; solo filas con la
+    misma identidad se numeran (_2, _3) según su orden.
+    """
+    base = sanitize_text(str(row.get(file_config['id_field'], ''))[:60]) or 'documento'
+    # Los números que pandas leyó como float ("-3.0") valen lo mismo que en stdlib
+    identity = '\x1f'.join(
+        re.sub(r'^(-?\d+)\.0$', r'\1', clean_value(row.get(field, '')))
+        for field in file_config.get('identity_fields', [file_config['id_field']])
+    )
+    stem = f"{file_type}_{base}_{hashlib.sha1(identity.encode('utf-8')).hexdigest()[:8]}"
+    if row.get('document_part'):
+        stem = f"{stem}_p{row['document_part']}"
+
+    suffix = 2
+    candidate = stem
+    while candidate in used_names:
+        candidate = f"{stem}_{suffix}"
+        suffix += 1
+    used_names.add(candidate)
+
+    return candidate
+
+
+def build_document_metadata(row, file_config):
+    """Sidecar .metadata.json de un documento con atributos filtrables."""
+    attributes = {
+        "document_id": row['document_id'],
+        "document_type": row['document_type'],
+        "search_category": row['search_category']
+    }
+
+    for field in file_config.get('filter_fields', []):
+        value = str(row.get(field, ''))
+        if value and value not in ['nan', '', 'None']:
+            attributes[field] = value
+
+    return {"metadataAttributes": attributes}
+
+
+def iter_chunks(docs, size):
+    """Genera bloques consecutivos de `size` documentos."""
+    docs = iter(docs)
+    while True:
+        chunk = list(islice(docs, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def build_jsonl_doc(row, file_config):
+    """Documento JSONL con content y metadata, igual que el motor pandas."""
+    metadata = {
+        "document_type": row['document_type'],
+        "search_category": row['search_category']
+    }
+
+    for field in file_config['metadata_fields']:
+        if field in row:
+            value = str(row[field])
+            if value and value not in ['nan', '', 'None']:
+                metadata[field] = value
+
+    return {
+        "document_id": row['document_id'],
+        "content": row['bedrock_text'],
+        "metadata": metadata
+    }
+
+
+def build_csv_body(chunk, file_config):
+    """CSV con las columnas de salida presentes en el chunk."""
+    output_columns = ['document_id', 'bedrock_text', 'document_type', 'search_category']
+    for field in file_config['metadata_fields']:
+        if field in chunk[0]:
+            output_columns.append(field)
+
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=output_columns, extrasaction='ignore', lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(chunk)
+    return buffer.getvalue()
+
+
+def sanitize_text(text):
+    """Limpia texto para usar en IDs."""
+    text = str(text)
+    text = re.sub(r'[^a-zA-Z0-9]', '_', text)
+    text = re.sub(r'_+', '_', text)
+    return text.strip('_')
@@ -7,6 +7,7 @@ CAMBIOS EN ESTA VERSIÓN:
 - ✅ Fix nombres de columnas (pregunta, respuesta, texto_embedding, categoria_nombre)
 - ✅ Usa SOLO la columna 'texto_embedding' del CSV
 - ✅ No reconstruye el texto, usa directamente lo que viene en el CSV
+- ✅ Motor alternativo sin pandas (ETL_ENGINE=stdlib, ver etl_stdlib.py)
 
 CSV ENTRADA (PREGUNTAS_OPTIMIZADO_VECTORDB.csv):
 - pregunta (minúscula)
@@ -17,15 +18,51 @@ CSV ENTRADA (PREGUNTAS_OPTIMIZADO_VECTORDB.csv):
 - SEPARADOR: ; (punto y coma)
 """
 
-import re
 import os
+import sys
 import json
 import boto3
-import awswrangler as wr
-import pandas as pd
+import etl_local
+import etl_stdlib
+import etl_datasets
+import etl_changes
 from math import ceil
 from io import StringIO
 from datetime import datetime
+from etl_stdlib import (
+    sanitize_text,
+    build_eventos_text,
+    build_preguntas_text,
+    build_stores_text,
+    build_restaurantes_text,
+)
+from pipeline_ledger import iniciar_ledger, registrar_contadores, resumen_ledger
+
+# La capa AWS SDK for Pandas solo está presente con ETL_ENGINE=pandas
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+# awswrangler no es necesario en modo local (etl_local.py)
+try:
+    import awswrangler as wr
+except ImportError:
+    wr = None
+
+# Motor ETL: 'pandas' (capa AWS SDK for Pandas) o 'stdlib' (solo csv + generadores)
+ETL_ENGINE = os.environ.get('ETL_ENGINE', 'pandas')
+
+# Salida: 'chunks' (N documentos por JSONL) o 'documents' (un archivo por documento
+# con su .metadata.json filtrable por Bedrock)
+KB_OUTPUT_MODE = os.environ.get('KB_OUTPUT_MODE', 'chunks')
+
+# Contadores del ledger de ejecución (pipeline_ledger, capa compartida): los
+# clientes boto3 (también los de awswrangler) heredan los handlers registrados
+# en la sesión por defecto
+if boto3.DEFAULT_SESSION is None:
+    boto3.setup_default_session()
+registrar_contadores(boto3.DEFAULT_SESSION.events, 'provide-client-params.s3')
 
 
 # ============================================================================
@@ -36,7 +73,24 @@ def lambda_handler(event, context):
     """
     Transforma CSVs optimizados a formato Bedrock KB con chunks vectoriales.
     Versión 4.0 - Lectura dinámica desde variables de entorno
+    
+    Pipeline por dataset (Map de Step Functions):
+    - event['dataset']: transforma solo ese dataset, deja sus cambios pendientes
+      y propaga los errores para que Step Functions reintente la rama
+    - event['action'] == 'finish_changes': consolida los pendientes de
+      event['datasets'] en el manifiesto de cambios (paso final del Map)
     """
+    event = event if isinstance(event, dict) else {}
+    dataset = event.get('dataset')
+    inicio, started_at = iniciar_ledger()
+    
+    if event.get('action') == 'finish_changes':
+        response = consolidar_cambios(event.get('datasets') or list(etl_datasets.VECTORIAL_FILENAMES))
+        response['ledger'] = resumen_ledger(context, inicio, started_at)
+        return response
+    
+    records_in = 0
+    
     try:
         # Obtener configuración desde variables de entorno
         s3_bucket = os.environ.get('S3_BUCKET_NAME')
@@ -55,9 +109,16 @@ def lambda_handler(event, context):
         print(f"📦 Bucket S3: {s3_bucket}")
         print(f"📂 Prefix Vectorial: {s3_vectorial_prefix}")
         print(f"📤 Output Path: {base_output_path}")
+        print(f"⚙️  Motor ETL: {ETL_ENGINE}")
+        print(f"🗂️  Modo de salida: {KB_OUTPUT_MODE}")
+        
+        engine = get_etl_engine()
         
         # Buscar archivos vectoriales más recientes en S3
-        s3_client = boto3.client('s3')
+        s3_client = etl_stdlib.get_s3_client()
+        
+        # Hash del contenido escrito por la extracción (metadata content-sha256)
+        source_hashes = {}
         
         def get_latest_vectorial_file(filename):
             """
@@ -68,66 +129,35 @@ def lambda_handler(event, context):
             
             try:
                 # Verificar si el archivo existe
-                s3_client.head_object(Bucket=s3_bucket, Key=full_key)
+                response = s3_client.head_object(Bucket=s3_bucket, Key=full_key)
+                source_hashes[full_key] = response.get('Metadata', {}).get('content-sha256')
                 return full_key
             except:
                 print(f"   ⚠️  Archivo no encontrado: {full_key}")
                 return None
         
-        # Configuración actualizada para archivos vectoriales preparados
+        # Configuración para archivos vectoriales preparados (etl_datasets.py)
         # Ahora con nombres fijos (sin timestamp)
         csv_files = {
-            'eventos': {
-                'filename': get_latest_vectorial_file('eventos_vectorial.csv'),
-                's3_key': None,  # Se llenará dinámicamente
-                'encoding': 'utf-8',
-                'text_fields': ['texto_embedding'],  # ← Campo ya optimizado
-                'metadata_fields': [
-                    'titulo', 'descripcion', 'fecha_texto', 'hora_texto', 'lugar', 
-                    'organizador', 'tipo', 'horas', 'link', 'document_type', 'search_category'
-                ],
-                'id_field': 'titulo',
-                'format': 'jsonl'
-            },
-            'preguntas': {
-                'filename': get_latest_vectorial_file('preguntas_vectorial.csv'),
-                's3_key': None,  # Se llenará dinámicamente
-                'encoding': 'utf-8',
-                'text_fields': ['texto_embedding'],  # ← Campo ya optimizado
-                'metadata_fields': ['pregunta', 'respuesta', 'categoria_nombre', 'categoria_completa'],
-                'id_field': 'pregunta',
-                'format': 'jsonl'
-            },
-            'stores': {
-                'filename': get_latest_vectorial_file('stores_vectorial.csv'),
-                's3_key': None,  # Se llenará dinámicamente
-                'encoding': 'utf-8',
-                'text_fields': ['texto_embedding'],  # ← Campo ya optimizado
-                'metadata_fields': [
-                    'titulo', 'lugar', 'horario', 'nivel', 'local', 'telefono', 
-                    'mail', 'tipo', 'web', 'url_web', 'link', 'document_type', 'search_category'
-                ],
-                'id_field': 'titulo',
-                'format': 'jsonl'
-            },
-            'restaurantes': {
-                'filename': get_latest_vectorial_file('restaurantes_vectorial.csv'),
-                's3_key': None,  # Se llenará dinámicamente
-                'encoding': 'utf-8',
-                'text_fields': ['texto_embedding'],  # ← Campo ya optimizado
-                'metadata_fields': [
-                    'titulo', 'lugar', 'horario', 'nivel', 'local', 'telefono', 
-                    'mail', 'tipo', 'web', 'url_web', 'link', 'document_type', 'search_category'
-                ],
-                'id_field': 'titulo',
-                'format': 'jsonl'
-            }
+            file_type: dict(
+                etl_datasets.DATASET_CONFIGS[file_type],
+                filename=get_latest_vectorial_file(filename),
+                s3_key=None  # Se llenará dinámicamente
+            )
+            for file_type, filename in etl_datasets.VECTORIAL_FILENAMES.items()
         }
         
+        if dataset:
+            if dataset not in csv_files:
+                raise ValueError(f"Dataset no soportado: {dataset}")
+            csv_files = {dataset: csv_files[dataset]}
+        
         # Verificar que se encontraron todos los archivos
         missing_files = [k for k, v in csv_files.items() if v['filename'] is None]
         if missing_files:
             print(f"⚠️  Archivos vectoriales no encontrados para: {', '.join(missing_files)}")
+            if dataset:
+                raise FileNotFoundError(f"Archivo vectorial no encontrado para {dataset}")
             # Continuar solo con los archivos encontrados
             csv_files = {k: v for k, v in csv_files.items() if v['filename'] is not None}
         
@@ -135,13 +165,10 @@ def lambda_handler(event, context):
         for key in csv_files:
             csv_files[key]['s3_key'] = csv_files[key]['filename']
         
-        # Chunks optimizados para base vectorial
-        num_rows_per_file = {
-            'preguntas': 10,     # ~75 FAQs → ~8 archivos
-            'eventos': 8,        # ~26 eventos → ~4 archivos
-            'stores': 20,        # ~127 tiendas → ~7 archivos
-            'restaurantes': 15   # ~79 restaurantes → ~6 archivos
-        }
+        num_rows_per_file = etl_datasets.NUM_ROWS_PER_FILE
+        
+        # Archivos escritos por dataset → manifiesto de cambios (etl_changes.py)
+        tracker = etl_changes.ChangeTracker(s3_client, s3_bucket, KB_OUTPUT_MODE)
         
         results = {}
         stats = {
@@ -174,42 +201,46 @@ def lambda_handler(event, context):
             try:
                 # Leer CSV optimizado
                 separator = file_config.get('separator', ',')
-                df = read_csv_robust(s3_path, encoding, file_type, separator)
+                with etl_local.stage('read'):
+                    df = engine.read_csv_robust(s3_path, encoding, file_type, separator)
                 
                 if df is None or len(df) == 0:
                     print(f"⚠️  {file_type} vacío o no encontrado")
                     results[file_type] = 0
                     continue
                 
+                records_in += len(df)
+                columns = engine.get_columns(df)
                 print(f"✅ Leídos {len(df)} registros")
-                print(f"   Columnas: {list(df.columns)}")
+                print(f"   Columnas: {columns}")
                 
                 # Validar columnas requeridas
                 required = file_config['text_fields'] + [file_config['id_field']]
-                missing = [col for col in required if col not in df.columns]
+                missing = [col for col in required if col not in columns]
                 if missing:
                     print(f"⚠️  Columnas faltantes: {missing}")
                 
                 # Transformar para Bedrock KB
-                df = transform_for_bedrock_kb(df, file_type, file_config)
+                with etl_local.stage('transform'):
+                    df = engine.transform_for_bedrock_kb(df, file_type, file_config)
                 
                 # Estadísticas
-                avg_length = df['bedrock_text'].str.len().mean()
+                avg_length = engine.mean_text_length(df)
                 print(f"✅ {len(df)} documentos listos")
                 print(f"   Texto promedio: {avg_length:.0f} caracteres")
                 
                 # Escribir en formato Bedrock
-                rows_written = write_bedrock_kb_format(
+                rows_written, chunks_created = etl_datasets.write_dataset(
+                    engine=engine,
                     df=df,
                     file_type=file_type,
                     file_config=file_config,
                     s3_bucket=s3_bucket,
                     output_s3_key=output_s3_key,
-                    num_rows_per_file=num_rows_per_file.get(file_type, 15)
+                    output_mode=KB_OUTPUT_MODE,
+                    tracker=tracker
                 )
-                
-                # Calcular chunks creados
-                chunks_created = ceil(len(df) / num_rows_per_file.get(file_type, 15))
+                tracker.record_source(file_type, source_hashes.get(s3_key))
                 
                 results[file_type] = rows_written
                 stats['total_documents'] += rows_written
@@ -226,9 +257,14 @@ def lambda_handler(event, context):
                 print(f"❌ Error procesando {file_type}: {str(e)}")
                 import traceback
                 traceback.print_exc()
+                if dataset:
+                    raise
                 results[file_type] = f"Error: {str(e)}"
                 continue
         
+        print(f"\n🧾 Manifiesto de cambios: {tracker.manifest_key}")
+        changes = etl_datasets.finish_changes(tracker, defer=bool(dataset))
+        
         print("\n" + "="*80)
         print("✅ TRANSFORMACIÓN COMPLETADA")
         print("="*80)
@@ -244,14 +280,22 @@ def lambda_handler(event, context):
         
         return {
             "statusCode": 200,
+            # Step Functions omite la sincronización si no hubo cambios; los
+            # documentos cambiados viajan por referencia al manifiesto en S3
+            "changed": bool(dataset) or etl_changes.has_changes(changes),
+            "etl_manifest": {"bucket": s3_bucket, "key": tracker.manifest_key},
+            "ledger": resumen_ledger(context, inicio, started_at, records_in, stats['total_documents']),
             "body": {
                 "message": "Transformación exitosa a base vectorial",
                 "output_path": base_output_path,
                 "results": results,
                 "statistics": stats,
+                "changes": changes,
                 "timestamp": datetime.utcnow().isoformat(),
                 "version": "3.0",
-                "mode": "vectorial_preparado"
+                "mode": "vectorial_preparado",
+                "engine": ETL_ENGINE,
+                "output_mode": KB_OUTPUT_MODE
             }
         }
         
@@ -259,56 +303,77 @@ def lambda_handler(event, context):
         print(f"💥 Error crítico: {str(e)}")
         import traceback
         traceback.print_exc()
+        if dataset:
+            raise
         return {
             "statusCode": 500,
+            "ledger": resumen_ledger(context, inicio, started_at),
             "body": {"error": str(e)}
         }
 
 
+def consolidar_cambios(datasets):
+    """
+    Fan-in del pipeline por dataset: un solo manifiesto con los cambios
+    pendientes de cada rama del Map (las ramas fallidas conservan su estado).
+    """
+    s3_bucket = os.environ.get('S3_BUCKET_NAME', '').replace('arn:aws:s3:::', '')
+    if not s3_bucket:
+        raise ValueError("Variable de entorno S3_BUCKET_NAME no está configurada")
+    
+    tracker = etl_changes.ChangeTracker(etl_stdlib.get_s3_client(), s3_bucket, KB_OUTPUT_MODE)
+    tracker.load_pending(datasets)
+    print(f"🧾 Consolidando cambios de {', '.join(tracker.pending_loaded) or 'ningún dataset'} → {tracker.manifest_key}")
+    changes = etl_datasets.finish_changes(tracker)
+    
+    return {
+        "statusCode": 200,
+        "changed": etl_changes.has_changes(changes),
+        "etl_manifest": {"bucket": s3_bucket, "key": tracker.manifest_key},
+        "body": {
+            "message": "Manifiesto de cambios consolidado",
+            "datasets": tracker.pending_loaded,
+            "changes": changes,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    }
+
+
+def get_etl_engine():
+    """
+    Retorna el módulo que implementa el motor ETL configurado.
+    Ambos exponen read_csv_robust, get_columns, transform_for_bedrock_kb,
+    mean_text_length y write_bedrock_kb_format con el mismo contrato.
+    """
+    if ETL_ENGINE == 'stdlib':
+        return etl_stdlib
+    if ETL_ENGINE != 'pandas':
+        raise ValueError(f"ETL_ENGINE no soportado: {ETL_ENGINE}")
+    if pd is None:
+        raise ValueError("ETL_ENGINE=pandas requiere la capa AWS SDK for Pandas")
+    return sys.modules[__name__]
+
+
 # ============================================================================
 # LECTURA DE CSV
 # ============================================================================
 
 def read_csv_robust(s3_path, encoding, file_type, separator=','):
     """Lee CSV con manejo robusto y tipo específico para telefono."""
-    try:
-        dtype_specs = {'telefono': str} if file_type == 'restaurantes' else None
-        
-        df = wr.s3.read_csv(
-            path=s3_path,
-            header=0,
-            sep=separator,
-            quotechar='"',
-            encoding=encoding,
-            escapechar='\\',
-            on_bad_lines='skip',
-            engine='python',
-            dtype=dtype_specs
-        )
-        
-        if file_type == 'restaurantes' and 'telefono' in df.columns:
-            df['telefono'] = df['telefono'].astype(str).str.replace('.0', '', regex=False)
-            df['telefono'] = df['telefono'].str.replace('nan', '', regex=False)
-        
-        return df
-        
-    except Exception as e1:
-        print(f"⚠️  Método 1 falló: {str(e1)}")
-        
+    # En modo local (ETL_LOCAL_ROOT) awswrangler no aplica: se lee vía cliente
+    if not etl_stdlib.is_local_mode():
         try:
-            s3_client = boto3.client('s3')
-            bucket, key = s3_path.replace('s3://', '').split('/', 1)
+            # telefono como texto en todos los datasets: con celdas vacías
+            # pandas lo lee como float ("226543210.0"), distinto al motor stdlib
+            dtype_specs = {'telefono': str}
             
-            obj = s3_client.get_object(Bucket=bucket, Key=key)
-            content = obj['Body'].read().decode(encoding)
-            
-            dtype_specs = {'telefono': str} if file_type == 'restaurantes' else None
-            
-            df = pd.read_csv(
-                StringIO(content),
+            df = wr.s3.read_csv(
+                path=s3_path,
+                header=0,
                 sep=separator,
                 quotechar='"',
                 encoding=encoding,
+                escapechar='\\',
                 on_bad_lines='skip',
                 engine='python',
                 dtype=dtype_specs
@@ -320,9 +385,52 @@ def read_csv_robust(s3_path, encoding, file_type, separator=','):
             
             return df
             
-        except Exception as e2:
-            print(f"❌ Todas las estrategias fallaron: {str(e2)}")
-            return None
+        except Exception as e1:
+            print(f"⚠️  Método 1 falló: {str(e1)}")
+    
+    try:
+        s3_client = etl_stdlib.get_s3_client()
+        bucket, key = s3_path.replace('s3://', '').split('/', 1)
+        
+        obj = s3_client.get_object(Bucket=bucket, Key=key)
+        content = obj['Body'].read().decode(encoding)
+        
+        dtype_specs = {'telefono': str}
+        
+        df = pd.read_csv(
+            StringIO(content),
+            sep=separator,
+            quotechar='"',
+            encoding=encoding,
+            on_bad_lines='skip',
+            engine='python',
+            dtype=dtype_specs
+        )
+        
+        if file_type == 'restaurantes' and 'telefono' in df.columns:
+            df['telefono'] = df['telefono'].astype(str).str.replace('.0', '', regex=False)
+            df['telefono'] = df['telefono'].str.replace('nan', '', regex=False)
+        
+        return df
+        
+    except Exception as e2:
+        print(f"❌ Todas las estrategias fallaron: {str(e2)}")
+        return None
+
+
+def get_columns(df):
+    """Columnas presentes en el DataFrame leído."""
+    return list(df.columns)
+
+
+def mean_text_length(df):
+    """Largo promedio de bedrock_text."""
+    return df['bedrock_text'].str.len().mean()
+
+
+def to_records(df):
+    """Filas del DataFrame como lista de dict."""
+    return df.to_dict('records')
 
 
 # ============================================================================
@@ -408,15 +516,7 @@ def create_preguntas_bedrock_text(df):
     - categoria_completa
     """
     
-    def build_text(row):
-        # Usar directamente la columna texto_embedding
-        if row.get('texto_embedding'):
-            return str(row['texto_embedding']).strip()
-        
-        # Fallback si no existe (no debería pasar)
-        return f"Pregunta: {row.get('pregunta', '')}\nRespuesta: {row.get('respuesta', '')}"
-    
-    df['bedrock_text'] = df.apply(build_text, axis=1)
+    df['bedrock_text'] = df.apply(build_preguntas_text, axis=1)
     df['document_type'] = 'faq'
     df['search_category'] = 'preguntas_frecuentes'
     
@@ -429,39 +529,7 @@ def create_preguntas_bedrock_text(df):
 
 def create_eventos_bedrock_text(df):
     """Crea texto para embeddings de eventos."""
-    def build_text(row):
-        parts = []
-        if row.get('keywords') and row.get('keywords') != '':
-            parts.append(f"🔑 KEYWORDS: {row['keywords']}")
-        if row.get('tipo'):
-            parts.append(f"📌 TIPO: {row['tipo']}")
-        if row.get('titulo'):
-            parts.append(f"🎯 EVENTO: {row['titulo']}")
-        if row.get('descripcion'):
-            parts.append(f"📝 {row['descripcion']}")
-        if row.get('contenido'):
-            parts.append(row['contenido'])
-        
-        info_practica = []
-        if row.get('fecha_texto'):
-            info_practica.append(f"📅 {row['fecha_texto']}")
-        if row.get('hora_texto'):
-            info_practica.append(f"🕐 {row['hora_texto']}")
-        if row.get('lugar'):
-            info_practica.append(f"📍 {row['lugar']}")
-        if info_practica:
-            parts.append(" | ".join(info_practica))
-        
-        if row.get('publico_objetivo') and row.get('publico_objetivo') != '':
-            parts.append(f"👨‍👩‍👧 PÚBLICO: {row['publico_objetivo']}")
-        if row.get('entrada') and row.get('entrada') != '':
-            parts.append(f"🎟️ ENTRADA: {row['entrada']}")
-        if row.get('organizador'):
-            parts.append(f"👥 ORGANIZA: {row['organizador']}")
-        
-        return "\n\n".join(parts)
-    
-    df['bedrock_text'] = df.apply(build_text, axis=1)
+    df['bedrock_text'] = df.apply(build_eventos_text, axis=1)
     df['document_type'] = 'evento'
     df['search_category'] = 'eventos_y_actividades'
     return df
@@ -469,45 +537,7 @@ def create_eventos_bedrock_text(df):
 
 def create_stores_bedrock_text(df):
     """Crea texto para embeddings de tiendas."""
-    def build_text(row):
-        parts = []
-        if row.get('titulo'):
-            parts.append(f"🏪 TIENDA: {row['titulo']}")
-        if row.get('tipo'):
-            parts.append(f"📌 CATEGORÍA: {row['tipo']}")
-        if row.get('content'):
-            content_text = row['content'][:600]
-            if content_text:
-                parts.append(content_text)
-        
-        ubicacion_parts = []
-        if row.get('lugar'):
-            ubicacion_parts.append(row['lugar'])
-        if row.get('nivel'):
-            ubicacion_parts.append(f"Nivel {row['nivel']}")
-        if row.get('local'):
-            ubicacion_parts.append(f"Local {row['local']}")
-        if ubicacion_parts:
-            parts.append(f"📍 UBICACIÓN: {' - '.join(ubicacion_parts)}")
-        
-        if row.get('horario'):
-            parts.append(f"🕐 HORARIO: {row['horario']}")
-        
-        contacto_parts = []
-        telefono = str(row.get('telefono', ''))
-        if telefono and telefono not in ['nan', '', 'None']:
-            contacto_parts.append(f"📞 {telefono}")
-        if row.get('mail'):
-            contacto_parts.append(f"📧 {row['mail']}")
-        if contacto_parts:
-            parts.append(f"CONTACTO: {' | '.join(contacto_parts)}")
-        
-        if row.get('web') and row.get('web') not in ['nan', '', 'None']:
-            parts.append(f"🌐 WEB: {row['web']}")
-        
-        return " | ".join(parts)
-    
-    df['bedrock_text'] = df.apply(build_text, axis=1)
+    df['bedrock_text'] = df.apply(build_stores_text, axis=1)
     df['document_type'] = 'tienda'
     df['search_category'] = 'comercios_y_tiendas'
     return df
@@ -515,45 +545,7 @@ def create_stores_bedrock_text(df):
 
 def create_restaurantes_bedrock_text(df):
     """Crea texto para embeddings de restaurantes."""
-    def build_text(row):
-        parts = []
-        if row.get('titulo'):
-            parts.append(f"🍽️ RESTAURANTE: {row['titulo']}")
-        if row.get('tipo'):
-            parts.append(f"👨‍🍳 COCINA: {row['tipo']}")
-        if row.get('content'):
-            content_text = row['content'][:600]
-            if content_text:
-                parts.append(content_text)
-        
-        ubicacion_parts = []
-        if row.get('lugar'):
-            ubicacion_parts.append(row['lugar'])
-        if row.get('nivel'):
-            ubicacion_parts.append(f"Nivel {row['nivel']}")
-        if row.get('local'):
-            ubicacion_parts.append(f"Local {row['local']}")
-        if ubicacion_parts:
-            parts.append(f"📍 UBICACIÓN: {' - '.join(ubicacion_parts)}")
-        
-        if row.get('horario'):
-            parts.append(f"🕐 HORARIO: {row['horario']}")
-        
-        contacto_parts = []
-        telefono = str(row.get('telefono', ''))
-        if telefono and telefono not in ['nan', '', 'None', '0']:
-            contacto_parts.append(f"📞 {telefono}")
-        if row.get('mail'):
-            contacto_parts.append(f"📧 {row['mail']}")
-        if contacto_parts:
-            parts.append(f"CONTACTO: {' | '.join(contacto_parts)}")
-        
-        if row.get('web') and row.get('web') not in ['nan', '', 'None']:
-            parts.append(f"🌐 WEB: {row['web']}")
-        
-        return " | ".join(parts)
-    
-    df['bedrock_text'] = df.apply(build_text, axis=1)
+    df['bedrock_text'] = df.apply(build_restaurantes_text, axis=1)
     df['document_type'] = 'restaurante'
     df['search_category'] = 'gastronomia'
     return df
@@ -561,7 +553,7 @@ def create_restaurantes_bedrock_text(df):
 
 def write_bedrock_kb_format(df, file_type, file_config, s3_bucket, output_s3_key, num_rows_per_file):
     """Escribe datos en formato optimizado para Bedrock KB."""
-    s3_client = boto3.client('s3')
+    s3_client = etl_stdlib.get_s3_client()
     num_rows = len(df)
     num_files = ceil(num_rows / num_rows_per_file)
     total_rows = 0
@@ -607,7 +599,7 @@ def write_bedrock_kb_format(df, file_type, file_config, s3_bucket, output_s3_key
             
         else:
             file_name = f"{file_type}_chunk_{i+1:03d}.csv"
-            full_s3_path = f"s3://{s3_bucket}/{output_s3_key}/{file_name}"
+            full_s3_key = f"{output_s3_key}/{file_name}"
             
             output_columns = ['document_id', 'bedrock_text', 'document_type', 'search_category']
             for field in file_config['metadata_fields']:
@@ -616,7 +608,12 @@ def write_bedrock_kb_format(df, file_type, file_config, s3_bucket, output_s3_key
             output_columns = [col for col in output_columns if col in df_chunk.columns]
             
             df_output = df_chunk[output_columns].copy()
-            wr.s3.to_csv(df_output, full_s3_path, index=False, encoding='utf-8')
+            s3_client.put_object(
+                Bucket=s3_bucket,
+                Key=full_s3_key,
+                Body=df_output.to_csv(index=False).encode('utf-8'),
+                ContentType='text/csv'
+            )
         
         metadata_doc = {
             "metadataAttributes": {
@@ -645,10 +642,3 @@ def write_bedrock_kb_format(df, file_type, file_config, s3_bucket, output_s3_key
     
     return total_rows
 
-
-def sanitize_text(text):
-    """Limpia texto para usar en IDs."""
-    text = str(text)
-    text = re.sub(r'[^a-zA-Z0-9]', '_', text)
-    text = re.sub(r'_+', '_', text)
-    return text.strip('_')
\ No newline at end of file
@@ -6,6 +6,7 @@ from aws_cdk import (
     aws_lambda as _lambda,
     aws_lambda_python_alpha as _alambda,
     aws_s3 as s3,
+    aws_iam as iam,
 )
 from constructs import Construct
 
@@ -18,26 +19,49 @@ class GenAiVirtualAssistantEtlLambdaStack(Stack):
         @ Lambda function: same runtime vs Lambda version
         """
 
+        # ETL engine: "pandas" (SDK for Pandas layer) or "stdlib" (csv module only, no pandas layer)
+        etl_engine = input_metadata.get('etl_engine', 'pandas')
+
         # SDK for Pandas layer. Do not Change account ID. See docs at: https://aws-sdk-pandas.readthedocs.io/
         sdk_lambda_layer_arn = f"arn:aws:lambda:{Aws.REGION}:336392948345:layer:AWSSDKPandas-Python312:15"
 
+        if etl_engine == 'stdlib':
+            # A few hundred rows fit comfortably in the smallest memory tiers
+            layers = []
+            memory_size = 256
+        else:
+            layers = [
+                _alambda.PythonLayerVersion.from_layer_version_arn(
+                    self,
+                    'lambda-layer-sdkforpandas',
+                    sdk_lambda_layer_arn
+                    )
+                ]
+            memory_size = 1024
+
+        # Run ledger helpers shared with the extraction and sync Lambdas (pipeline_ledger.py)
+        layers.append(
+            _alambda.PythonLayerVersion(
+                self,
+                "pipeline-ledger-layer",
+                entry="./lambda_shared",
+                compatible_runtimes=[_lambda.Runtime.PYTHON_3_12],
+                description="Pipeline run ledger helpers (pipeline_ledger.py)",
+                bundling=_alambda.BundlingOptions(asset_excludes=["__pycache__"])
+            )
+        )
+
         # Create function using Layer with the same Python version
         self.lambda_fn = _alambda.PythonFunction(
             self,
             "virtual-assistant-lambda-etl-fn",
             entry="./stack_backend_lambda_light_etl/",
             runtime=_lambda.Runtime.PYTHON_3_12,
-            memory_size=1024,
+            memory_size=memory_size,
             description="Function to process the new incoming inventory",
             index="lambda_function.py",
             handler="lambda_handler",
-            layers=[
-                _alambda.PythonLayerVersion.from_layer_version_arn(
-                    self,
-                    'lambda-layer-sdkforpandas',
-                    sdk_lambda_layer_arn
-                    )
-                ],
+            layers=layers,
             timeout=Duration.seconds(600),
         )
 
@@ -55,6 +79,44 @@ class GenAiVirtualAssistantEtlLambdaStack(Stack):
             value="vectorial/"
         )
         
+        self.lambda_fn.add_environment(
+            key="ETL_ENGINE", 
+            value=etl_engine
+        )
+        
+        # "chunks" (JSONL files) or "documents" (one file per document with filterable metadata)
+        self.lambda_fn.add_environment(
+            key="KB_OUTPUT_MODE", 
+            value=input_metadata.get('kb_output_mode', 'chunks')
+        )
+        
+        # Max estimated tokens per document in "documents" mode (0 = no limit); with
+        # kb_chunking_strategy "NONE" every document is embedded as a single chunk
+        self.lambda_fn.add_environment(
+            key="KB_MAX_DOCUMENT_TOKENS", 
+            value=str(input_metadata.get('kb_max_document_tokens', 0))
+        )
+        
+        # Change manifest read by the sync Lambda for direct document ingestion
+        self.lambda_fn.add_environment(
+            key="ETL_CHANGE_MANIFEST_KEY", 
+            value="sync-state/etl_change_manifest.json"
+        )
+        
+        # FAQ answer index read by the chat runtime (outside the KB prefix)
+        self.lambda_fn.add_environment(
+            key="FAQ_INDEX_KEY", 
+            value=input_metadata.get('faq_index_key', 'faq-index/faq_index.json')
+        )
+        
+        # Store/restaurant directory table (StackConversationDynamoDB), by fixed name
+        # to avoid a dependency on that stack
+        directory_table_name = "mut-store-directory-v2"
+        self.lambda_fn.add_environment(
+            key="DIRECTORY_TABLE_NAME", 
+            value=directory_table_name
+        )
+        
         # KB output path
         self.lambda_fn.add_environment(
             key="KB_S3_ECOMM_PATH", 
@@ -69,6 +131,17 @@ class GenAiVirtualAssistantEtlLambdaStack(Stack):
         s3_bucket = s3.Bucket.from_bucket_attributes(self, "virtualAssitantS3Bucket", bucket_arn=input_s3_bucket_arn)
         s3_bucket.grant_read_write(self.lambda_fn)
 
+        # Rebuild the store/restaurant directory
+        self.lambda_fn.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=["dynamodb:BatchWriteItem", "dynamodb:PutItem", "dynamodb:DeleteItem", "dynamodb:Query"],
+                resources=[
+                    f"arn:aws:dynamodb:{Aws.REGION}:{Aws.ACCOUNT_ID}:table/{directory_table_name}",
+                    f"arn:aws:dynamodb:{Aws.REGION}:{Aws.ACCOUNT_ID}:table/{directory_table_name}/index/*"
+                ]
+            )
+        )
+
         """
         @ Outputs
         """
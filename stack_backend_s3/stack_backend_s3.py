@@ -20,6 +20,8 @@ class GenAiVirtualAssistantS3Stack(Stack):
             self.bucket = s3.Bucket(self, 
                                     "rawVirtualAssistantS3Bucket",
                                     bucket_name=f"raw-virtual-assistant-data-{Aws.ACCOUNT_ID}-{Aws.REGION}", 
+                                    # Eventos Object Created para el fast path de FAQs (raw/preguntas.csv)
+                                    event_bridge_enabled=bool(input_metadata.get('faq_fast_path', False)),
                                     removal_policy=RemovalPolicy.RETAIN)
         
         # Return bucket ARN
@@ -0,0 +1,75 @@
+import { SSMClient, GetParameterCommand } from '@aws-sdk/client-ssm';
+import logger from './logger.js';
+
+/**
+ * Alias activo del agente Bedrock, leído desde un parámetro SSM con cache TTL.
+ * La Lambda de sincronización publica el nuevo alias en el parámetro; las
+ * instancias en ejecución lo toman al expirar el TTL, sin redeploy ni reinicio.
+ */
+
+const ALIAS_CONFIG = {
+    PARAMETER_NAME: process.env.AGENT_ALIAS_PARAMETER || '',
+    FALLBACK_ALIAS_ID: process.env.AGENT_ALIAS_ID || '2XAY2JTZNH',
+    TTL_MS: Number(process.env.AGENT_ALIAS_TTL_SECONDS || 60) * 1000,
+    // Tras un error de SSM se reintenta antes, conservando el último valor
+    ERROR_RETRY_MS: 10 * 1000
+};
+
+const ssmClient = new SSMClient({ region: process.env.AWS_REGION || 'us-east-1' });
+
+// Variables globales (persisten mientras la instancia está viva)
+let ALIAS_CACHE = {
+    value: null,
+    expiresAt: 0
+};
+let pendingLookup = null;
+
+async function fetchAliasId() {
+    try {
+        const response = await ssmClient.send(new GetParameterCommand({
+            Name: ALIAS_CONFIG.PARAMETER_NAME
+        }));
+        const aliasId = response.Parameter?.Value;
+
+        if (aliasId && aliasId !== ALIAS_CACHE.value) {
+            logger.warn(`🏷️ Alias del agente actualizado: ${ALIAS_CACHE.value || '(inicial)'} → ${aliasId}`);
+        }
+
+        ALIAS_CACHE = {
+            value: aliasId || ALIAS_CACHE.value || ALIAS_CONFIG.FALLBACK_ALIAS_ID,
+            expiresAt: Date.now() + ALIAS_CONFIG.TTL_MS
+        };
+    } catch (error) {
+        logger.error(`Error leyendo parámetro ${ALIAS_CONFIG.PARAMETER_NAME}:`, error.name, error.message);
+        ALIAS_CACHE = {
+            value: ALIAS_CACHE.value || ALIAS_CONFIG.FALLBACK_ALIAS_ID,
+            expiresAt: Date.now() + ALIAS_CONFIG.ERROR_RETRY_MS
+        };
+    }
+    return ALIAS_CACHE.value;
+}
+
+/**
+ * Retorna el alias activo del agente.
+ * Sin AGENT_ALIAS_PARAMETER usa la variable de entorno AGENT_ALIAS_ID.
+ * Las consultas concurrentes con el cache expirado comparten una sola llamada a SSM.
+ * @returns {Promise<string>}
+ */
+async function getAgentAliasId() {
+    if (!ALIAS_CONFIG.PARAMETER_NAME) {
+        return ALIAS_CONFIG.FALLBACK_ALIAS_ID;
+    }
+
+    if (ALIAS_CACHE.value && Date.now() < ALIAS_CACHE.expiresAt) {
+        return ALIAS_CACHE.value;
+    }
+
+    if (!pendingLookup) {
+        pendingLookup = fetchAliasId().finally(() => {
+            pendingLookup = null;
+        });
+    }
+    return pendingLookup;
+}
+
+export { getAgentAliasId };
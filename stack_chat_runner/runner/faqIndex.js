@@ -0,0 +1,145 @@
+import { S3Client, GetObjectCommand } from '@aws-sdk/client-s3';
+import logger from './logger.js';
+
+/**
+ * Índice de respuestas de preguntas frecuentes publicado por el ETL
+ * (stack_backend_lambda_light_etl/etl_faq_index.py), leído desde S3 con cache TTL.
+ * Las preguntas que coinciden exactamente (tras normalizar) o con similitud de
+ * Jaccard de n-gramas >= FAQ_MATCH_THRESHOLD se responden sin invocar al LLM.
+ * La normalización debe ser la misma que normalize_question / signature del ETL.
+ */
+
+const FAQ_CONFIG = {
+    ENABLED: process.env.FAQ_ANSWER_FAST_PATH === 'true',
+    BUCKET: process.env.FAQ_INDEX_BUCKET || '',
+    KEY: process.env.FAQ_INDEX_KEY || 'faq-index/faq_index.json',
+    THRESHOLD: Number(process.env.FAQ_MATCH_THRESHOLD || 0.85),
+    TTL_MS: Number(process.env.FAQ_INDEX_TTL_SECONDS || 300) * 1000,
+    // Tras un error de S3 se reintenta antes, conservando el último índice
+    ERROR_RETRY_MS: 30 * 1000,
+    // Versión del formato que entiende este módulo (INDEX_VERSION del ETL)
+    VERSION: 1
+};
+
+const s3Client = new S3Client({ region: process.env.AWS_REGION || 'us-east-1' });
+
+// Variables globales (persisten mientras la instancia está viva)
+let FAQ_CACHE = {
+    index: null,
+    expiresAt: 0
+};
+let pendingLoad = null;
+
+function normalizeQuestion(text) {
+    return String(text || '')
+        .toLowerCase()
+        .normalize('NFKD')
+        .replace(/[\u0300-\u036f]/g, '')
+        .replace(/[^a-z0-9]+/g, ' ')
+        .trim();
+}
+
+function signature(normalized, n) {
+    const padded = ` ${normalized} `;
+    const grams = new Set();
+    for (let i = 0; i + n <= padded.length; i++) {
+        grams.add(padded.slice(i, i + n));
+    }
+    return grams;
+}
+
+function jaccard(a, b) {
+    let shared = 0;
+    for (const gram of a) {
+        if (b.has(gram)) shared++;
+    }
+    const union = a.size + b.size - shared;
+    return union ? shared / union : 0;
+}
+
+async function fetchIndex() {
+    try {
+        const response = await s3Client.send(new GetObjectCommand({
+            Bucket: FAQ_CONFIG.BUCKET,
+            Key: FAQ_CONFIG.KEY
+        }));
+        const data = JSON.parse(await response.Body.transformToString());
+
+        if (data.version !== FAQ_CONFIG.VERSION) {
+            throw new Error(`versión de índice no soportada: ${data.version}`);
+        }
+
+        const entries = data.entries.map(entry => ({ ...entry, grams: new Set(entry.signature) }));
+        FAQ_CACHE = {
+            index: {
+                ngramSize: data.ngram_size,
+                generatedAt: data.generated_at,
+                entries,
+                byNormalized: new Map(entries.map(entry => [entry.normalized, entry]))
+            },
+            expiresAt: Date.now() + FAQ_CONFIG.TTL_MS
+        };
+        logger.cache(`Índice FAQ cargado: ${entries.length} preguntas (generado ${data.generated_at})`);
+    } catch (error) {
+        logger.error(`Error leyendo índice FAQ s3://${FAQ_CONFIG.BUCKET}/${FAQ_CONFIG.KEY}:`, error.name, error.message);
+        FAQ_CACHE = {
+            index: FAQ_CACHE.index,
+            expiresAt: Date.now() + FAQ_CONFIG.ERROR_RETRY_MS
+        };
+    }
+    return FAQ_CACHE.index;
+}
+
+async function getIndex() {
+    // Vigente, o último intento fallido sin índice previo: espera al reintento
+    if (Date.now() < FAQ_CACHE.expiresAt) {
+        return FAQ_CACHE.index;
+    }
+    if (!pendingLoad) {
+        pendingLoad = fetchIndex().finally(() => {
+            pendingLoad = null;
+        });
+    }
+    return pendingLoad;
+}
+
+/**
+ * Busca la pregunta en el índice FAQ.
+ * @param {string} text - Mensaje del usuario
+ * @returns {Promise<{answer: string, question: string, score: number, exact: boolean} | null>}
+ *   null si el fast path está desactivado, no hay índice o no hay coincidencia confiable
+ */
+async function matchFaq(text) {
+    if (!FAQ_CONFIG.ENABLED || !FAQ_CONFIG.BUCKET) {
+        return null;
+    }
+
+    const index = await getIndex();
+    const normalized = normalizeQuestion(text);
+    if (!index || !normalized) {
+        return null;
+    }
+
+    const exact = index.byNormalized.get(normalized);
+    if (exact) {
+        return { answer: exact.answer, question: exact.question, score: 1, exact: true };
+    }
+
+    const grams = signature(normalized, index.ngramSize);
+    let best = null;
+    let bestScore = 0;
+    for (const entry of index.entries) {
+        const score = jaccard(grams, entry.grams);
+        if (score > bestScore) {
+            best = entry;
+            bestScore = score;
+        }
+    }
+
+    if (!best || bestScore < FAQ_CONFIG.THRESHOLD) {
+        return null;
+    }
+    return { answer: best.answer, question: best.question, score: bestScore, exact: false };
+}
+
+export { matchFaq, normalizeQuestion };
@@ -1,5 +1,6 @@
 import { BedrockAgentRuntimeClient, InvokeAgentCommand } from '@aws-sdk/client-bedrock-agent-runtime';
 import { ConversationService } from './conversationService.js';
+import { getAgentAliasId } from './agentAliasConfig.js';
 import util from 'util';
 
 /**
@@ -18,7 +19,8 @@ async function getAgente(userId, question, messageId) {
         //console.log(`************************** 2 *********************************************`);
         //console.log(`======================  mensajeId ${messageId}`);
         const AGENT_ID = process.env.AGENT_ID || 'G7LSHMCB2H';
-        const AGENT_ALIAS_ID = process.env.AGENT_ALIAS_ID || '2XAY2JTZNH';
+        // Alias activo publicado por la Lambda de sincronización (cache TTL)
+        const AGENT_ALIAS_ID = await getAgentAliasId();
         const REGION = process.env.AWS_REGION || 'us-east-1';
 
 
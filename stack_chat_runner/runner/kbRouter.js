@@ -0,0 +1,167 @@
+import { BedrockAgentRuntimeClient, RetrieveCommand } from '@aws-sdk/client-bedrock-agent-runtime';
+import { normalizeQuestion } from './faqIndex.js';
+import logger from './logger.js';
+
+/**
+ * Ruteo de la búsqueda por tipo de documento.
+ * Un clasificador de palabras clave (sin LLM) decide qué tipo(s) de documento
+ * responden la pregunta, para buscar solo sobre esos vectores:
+ * - Con KB_ROUTES (knowledge_base_routes en cdk.json, kb_sharding "per_type")
+ *   se hace Retrieve sobre el Knowledge Base del tipo, cada uno con su propio
+ *   namespace de Pinecone
+ * - Sin KB_ROUTES se filtra la categoría del índice vectorial local
+ * Si la pregunta es ambigua (varios tipos empatados o ninguno) y
+ * KB_ROUTING_FANOUT está activo, se consulta en paralelo y se mezcla por score.
+ */
+
+const ROUTER_CONFIG = {
+    ENABLED: process.env.KB_ROUTING === 'true',
+    FANOUT: process.env.KB_ROUTING_FANOUT === 'true',
+    ROUTES: parseRoutes(process.env.KB_ROUTES),
+    SEARCH_TYPE: 'HYBRID'
+};
+
+// Palabras clave por tipo de documento (document_type de los data sources), sobre texto normalizado
+const ROUTE_KEYWORDS = {
+    restaurantes: /\b(comer|comida\w*|restaura\w*|almuerz\w*|cena|cenar|desayun\w*|once|cafe\w*|cafeteria\w*|sushi|pizza\w*|hamburgues\w*|helad\w*|vegan\w*|vegetarian\w*|bar|bares|cerveza\w*|vino\w*|postre\w*|pasteleria\w*|panaderia\w*|brunch|gastronomi\w*|food)\b/g,
+    stores: /\b(tienda\w*|comprar|compras?|ropa|zapat\w*|moda|joya\w*|joyeria\w*|deporte\w*|deportiv\w*|tecnologia|celular\w*|libreria\w*|farmacia\w*|optica\w*|perfum\w*|regalo\w*|juguete\w*|vestuario|accesorios?|store\w*|shop\w*)\b/g,
+    eventos: /\b(evento\w*|taller\w*|concierto\w*|actividad\w*|exposicion\w*|feria\w*|show\w*|cartelera|panorama\w*|fin de semana)\b/g,
+    preguntas: /\b(estacionamiento\w*|estacionar|parking|bano\w*|metro|bicihub|bicicleta\w*|salida\w*|acceso\w*|sac|oficina\w*|mascota\w*|perro\w*|wifi|jardin|emergencia\w*|cajero\w*|arriendo|objetos perdidos)\b/g
+};
+
+// Tipos de documento del índice vectorial local (vectorial.service.js)
+const LOCAL_CATEGORIES = ['stores', 'restaurantes'];
+
+const client = new BedrockAgentRuntimeClient({ region: process.env.AWS_REGION || 'us-east-1' });
+
+function parseRoutes(value) {
+    try {
+        return value ? JSON.parse(value) : {};
+    } catch (error) {
+        logger.error('KB_ROUTES inválido, se ignora:', error.message);
+        return {};
+    }
+}
+
+/**
+ * Tipos de documento con coincidencias, de más a menos.
+ * @param {string} text - Mensaje del usuario
+ * @returns {Array<{type: string, score: number}>}
+ */
+function classifyQuery(text) {
+    const normalized = normalizeQuestion(text);
+    return Object.entries(ROUTE_KEYWORDS)
+        .map(([type, pattern]) => ({ type, score: (normalized.match(pattern) || []).length }))
+        .filter(match => match.score > 0)
+        .sort((a, b) => b.score - a.score);
+}
+
+/**
+ * Decide dónde buscar.
+ * @returns {{types: string[], fanOut: boolean} | null} null si el ruteo está desactivado
+ *   o la pregunta es ambigua sin fan-out (se busca como hasta ahora, sin ruteo)
+ */
+function routeQuery(text) {
+    if (!ROUTER_CONFIG.ENABLED) {
+        return null;
+    }
+
+    const matches = classifyQuery(text);
+    if (matches.length === 1 || (matches.length > 1 && matches[0].score > matches[1].score)) {
+        return { types: [matches[0].type], fanOut: false };
+    }
+    if (!ROUTER_CONFIG.FANOUT) {
+        return null;
+    }
+    // Empate: los tipos empatados; sin coincidencias: todos
+    const types = matches.length
+        ? matches.filter(match => match.score === matches[0].score).map(match => match.type)
+        : Object.keys(ROUTE_KEYWORDS);
+    return { types, fanOut: true };
+}
+
+/**
+ * Categoría del índice local a filtrar, o null para buscar en todo el índice.
+ */
+function localCategory(route) {
+    if (!route || route.types.length !== 1 || !LOCAL_CATEGORIES.includes(route.types[0])) {
+        return null;
+    }
+    return route.types[0];
+}
+
+async function retrieveFrom(type, knowledgeBaseId, text, numberOfResults) {
+    const response = await client.send(new RetrieveCommand({
+        knowledgeBaseId,
+        retrievalQuery: { text },
+        retrievalConfiguration: {
+            vectorSearchConfiguration: {
+                numberOfResults,
+                overrideSearchType: ROUTER_CONFIG.SEARCH_TYPE
+            }
+        }
+    }));
+    return (response.retrievalResults || []).map(result => ({
+        type,
+        text: result.content?.text || '',
+        score: result.score || 0,
+        metadata: result.metadata || {}
+    }));
+}
+
+/**
+ * Retrieve sobre los Knowledge Bases ruteados (en paralelo si hay fan-out),
+ * mezclados por score. Todos los shards usan el mismo modelo de embedding e
+ * índice de Pinecone, así que los scores son comparables entre sí.
+ * @param {string} text - Texto a buscar
+ * @param {number} numberOfResults - Resultados totales
+ * @param {{types: string[], fanOut: boolean} | null} route - Resultado de routeQuery
+ * @returns {Promise<Array<{type, text, score, metadata}> | null>} null si no hay
+ *   Knowledge Base para la ruta o fallan todos (se usa el índice local)
+ */
+async function retrieveRouted(text, numberOfResults, route) {
+    const targets = (route?.types || []).filter(type => ROUTER_CONFIG.ROUTES[type]);
+    if (!targets.length) {
+        return null;
+    }
+
+    const startTime = Date.now();
+    const settled = await Promise.allSettled(
+        targets.map(type => retrieveFrom(type, ROUTER_CONFIG.ROUTES[type], text, numberOfResults))
+    );
+
+    const results = [];
+    settled.forEach((outcome, index) => {
+        if (outcome.status === 'fulfilled') {
+            results.push(...outcome.value);
+        } else {
+            logger.error(`Error en Retrieve de ${targets[index]}:`, outcome.reason?.name, outcome.reason?.message);
+        }
+    });
+    if (settled.every(outcome => outcome.status === 'rejected')) {
+        return null;
+    }
+
+    results.sort((a, b) => b.score - a.score);
+    logger.info(`🧭 Retrieve ${route.fanOut ? 'fan-out' : 'ruteado'} [${targets.join(', ')}]: ` +
+        `${results.length} resultados en ${Date.now() - startTime} ms`);
+    return results.slice(0, numberOfResults);
+}
+
+/**
+ * Formatea los resultados de Retrieve para el contexto del LLM
+ */
+function formatRetrievedResults(results) {
+    if (!results || results.length === 0) {
+        return 'No se encontraron resultados relevantes.';
+    }
+
+    let formatted = 'Información encontrada:\n\n';
+    results.forEach((result, index) => {
+        formatted += `${index + 1}. [${result.type}] ${result.text}\n`;
+        formatted += `   Relevancia: ${(result.score * 100).toFixed(1)}%\n\n`;
+    });
+    return formatted;
+}
+
+export { classifyQuery, routeQuery, localCategory, retrieveRouted, formatRetrievedResults };
@@ -3,6 +3,9 @@ import { PROMPT_TEMPLATES } from './plantillas/prompts.js';
 import { searchVectorStore, formatSearchResults, isCacheActive, initAllVectorStores } from './vectorial.service.js';
 import { getEventosContexto } from './eventos.service.js';
 import { ConversationService } from './conversationService.js';
+import { matchFaq } from './faqIndex.js';
+import { lookupDirectory } from './storeDirectory.js';
+import { routeQuery, localCategory, retrieveRouted, formatRetrievedResults } from './kbRouter.js';
 import logger from './logger.js';
 
 // Ventana de memoria conversacional: cuántos turnos previos pasarle al LLM
@@ -124,10 +127,24 @@ ${contexto.eventosFormateados}`;
     return respuesta.trim();
 }
 
-async function vectorial(inputTextuser) {
-    // Buscar en base vectorial de restaurantes
-    const vectorResults = await searchVectorStore(inputTextuser, 3);
-    const vectorContext = formatSearchResults(vectorResults);
+async function vectorial(inputTextuser, currentMessage = inputTextuser) {
+    // Ruteo por tipo de documento con el mensaje actual (sin el historial):
+    // Knowledge Base del tipo si hay KB_ROUTES, si no la categoría del índice local
+    const route = routeQuery(currentMessage);
+    const routedResults = await retrieveRouted(inputTextuser, 3, route);
+
+    let vectorContext;
+    if (routedResults) {
+        vectorContext = formatRetrievedResults(routedResults);
+    } else {
+        // Buscar en base vectorial de restaurantes y tiendas
+        const category = localCategory(route);
+        if (category) {
+            logger.info(`🧭 Índice local ruteado a ${category}`);
+        }
+        const vectorResults = await searchVectorStore(inputTextuser, 3, category);
+        vectorContext = formatSearchResults(vectorResults);
+    }
 
     // Combinar el contexto vectorial con el system prompt
     const enrichedSystemPrompt = `${PROMPT_TEMPLATES.extractRestaurante.system}
@@ -176,6 +193,26 @@ async function inputLlm(inputTextuser, userId = null) {
         return respuestaFinal;
     }
 
+    // OPTIMIZACIÓN: Preguntas frecuentes exactas o casi exactas se responden
+    // desde el índice FAQ que publica el ETL, sin clasificar ni invocar al LLM
+    const faqMatch = await matchFaq(inputTextuser);
+    if (faqMatch) {
+        respuestaFinal = faqMatch.answer;
+        logger.info(`⚡ FAQ ${faqMatch.exact ? 'exacta' : `similar (${faqMatch.score.toFixed(2)})`}: "${faqMatch.question}"`);
+        logger.time(`⏱️ Tiempo total: ${((Date.now() - startTime) / 1000).toFixed(2)}s`);
+        return respuestaFinal;
+    }
+
+    // OPTIMIZACIÓN: "¿Dónde está X?" con X en el directorio de tiendas y
+    // restaurantes se responde con un Query, sin LLM ni búsqueda vectorial
+    const directoryMatch = await lookupDirectory(inputTextuser);
+    if (directoryMatch) {
+        respuestaFinal = directoryMatch.answer;
+        logger.info(`📇 Directorio: "${directoryMatch.titulo}"${directoryMatch.alias ? ' (alias)' : ''}`);
+        logger.time(`⏱️ Tiempo total: ${((Date.now() - startTime) / 1000).toFixed(2)}s`);
+        return respuestaFinal;
+    }
+
     // Cargar historial conversacional y construir input enriquecido
     // (en paralelo con la clasificación no se puede porque enrichedInput la alimenta)
     const memStart = Date.now();
@@ -216,7 +253,7 @@ async function inputLlm(inputTextuser, userId = null) {
     } else if (messagePreguntas.typeQuestions !== 'otros') {
         // Solo llamar a búsqueda vectorial si es restaurante/tienda
         logger.info(`🔎 Buscando en base vectorial (tipo: ${messagePreguntas.typeQuestions})...`);
-        const messageStore = await vectorial(enrichedInput);
+        const messageStore = await vectorial(enrichedInput, inputTextuser);
         if (messageStore.respuesta && messageStore.respuesta.trim()) {
             // Confiamos en la respuesta del LLM (esté isEncontrada o no): el prompt
             // extractRestaurante ya genera un texto personalizado cuando no encuentra
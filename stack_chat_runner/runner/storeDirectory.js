@@ -0,0 +1,108 @@
+import { DynamoDBClient } from '@aws-sdk/client-dynamodb';
+import { DynamoDBDocumentClient, QueryCommand } from '@aws-sdk/lib-dynamodb';
+import { normalizeQuestion } from './faqIndex.js';
+import logger from './logger.js';
+
+/**
+ * Directorio de tiendas y restaurantes publicado por el ETL
+ * (stack_backend_lambda_light_etl/etl_directory.py) en DIRECTORY_TABLE.
+ * Las preguntas de ubicación ("¿Dónde está Nike?", "horario de Starbucks")
+ * se responden con un Query por el nombre normalizado, sin LLM ni búsqueda
+ * vectorial. Si el nombre no está en el directorio sigue el flujo normal.
+ * Cada dataset (stores, restaurantes) publica sus propios ítems; el mismo
+ * nombre puede venir de ambos y se resuelve en resolveItems.
+ */
+
+const DIRECTORY_CONFIG = {
+    ENABLED: process.env.STORE_DIRECTORY_FAST_PATH === 'true',
+    TABLE: process.env.DIRECTORY_TABLE || ''
+};
+
+// Pregunta de ubicación/horario/contacto seguida del nombre (sobre texto normalizado)
+const LOCATION_QUESTION = /^(?:donde|en que (?:piso|nivel|local|parte)|ubicacion de|horarios? de|telefono de|a que hora (?:abre|cierra))\s+(?:(?:esta|estan|queda|quedan|se encuentra|se encuentran|encuentro|ubico|hay)\s+)?(?:(?:el|la|los|las)\s+)?(?:(?:tienda|local|restaurante|restaurant)\s+)?(.+?)(?:\s+en\s+mut|\s+mut)?$/;
+
+const client = DynamoDBDocumentClient.from(new DynamoDBClient({ region: process.env.AWS_REGION || 'us-east-1' }));
+
+function extractName(text) {
+    const match = normalizeQuestion(text).match(LOCATION_QUESTION);
+    return match ? match[1].trim() : null;
+}
+
+function formatLocation(location) {
+    const parts = [];
+    if (location.nivel) parts.push(`*Piso ${location.nivel}*`);
+    if (location.local) parts.push(`local ${location.local}`);
+    let text = parts.length ? parts.join(', ') : 'MUT';
+    if (location.lugar) text += ` (${location.lugar})`;
+
+    const lines = [text];
+    if (location.horario) lines.push(`🕐 Horario: ${location.horario}`);
+    if (location.telefono) lines.push(`📞 ${location.telefono}`);
+    return lines;
+}
+
+function formatAnswer(item) {
+    const locations = item.locations || [];
+    if (locations.length === 1) {
+        const [where, ...details] = formatLocation(locations[0]);
+        return [`📍 *${item.titulo}* está en ${where}`, ...details].join('\n');
+    }
+    const lines = [`📍 *${item.titulo}* tiene ${locations.length} locales en MUT:`];
+    for (const location of locations) {
+        lines.push(`- ${formatLocation(location).join(' · ')}`);
+    }
+    return lines.join('\n');
+}
+
+/**
+ * Un ítem a partir de los de todos los datasets con ese name_key, con la
+ * regla de alias del ETL: el nombre principal gana sobre los alias, y los
+ * alias de nombres distintos son ambiguos (null).
+ */
+function resolveItems(items) {
+    const withLocations = items.filter(item => (item.locations || []).length);
+    const principals = withLocations.filter(item => !item.alias_of);
+    if (principals.length) {
+        return {
+            ...principals[0],
+            locations: principals.flatMap(item => item.locations)
+        };
+    }
+    const names = new Set(withLocations.map(item => item.alias_of));
+    return names.size === 1 ? withLocations[0] : null;
+}
+
+/**
+ * Responde preguntas de ubicación desde el directorio.
+ * @param {string} text - Mensaje del usuario
+ * @returns {Promise<{answer: string, titulo: string, alias: boolean} | null>}
+ *   null si está desactivado, la pregunta no es de ubicación o el nombre no existe
+ */
+async function lookupDirectory(text) {
+    if (!DIRECTORY_CONFIG.ENABLED || !DIRECTORY_CONFIG.TABLE) {
+        return null;
+    }
+
+    const name = extractName(text);
+    if (!name) {
+        return null;
+    }
+
+    try {
+        const response = await client.send(new QueryCommand({
+            TableName: DIRECTORY_CONFIG.TABLE,
+            KeyConditionExpression: 'name_key = :name',
+            ExpressionAttributeValues: { ':name': name }
+        }));
+        const item = resolveItems(response.Items || []);
+        if (!item) {
+            return null;
+        }
+        return { answer: formatAnswer(item), titulo: item.titulo, alias: Boolean(item.alias_of) };
+    } catch (error) {
+        logger.error(`Error consultando directorio ${DIRECTORY_CONFIG.TABLE}:`, error.name, error.message);
+        return null;
+    }
+}
+
+export { lookupDirectory, extractName, resolveItems };
@@ -12,11 +12,13 @@ from aws_cdk import (
 from constructs import Construct
 import os
 import hashlib
+import json
 
 class ChatRunnerNodeStack(Stack):
 
     def __init__(self, scope: Construct, construct_id: str,
                  conversations_table=None, sessions_table=None,
+                 store_directory_table=None,
                  agent_id=None, input_metadata=None, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
@@ -58,6 +60,7 @@ class ChatRunnerNodeStack(Stack):
 
         # Default values for configuration
         DEFAULT_AGENT_ID = agent_id
+        alias_parameter_name = input_metadata.get("agent_alias_parameter_name", "")
 
         # Hash prompts file so any content change triggers a CloudFormation diff
         prompts_path = os.path.join(os.path.dirname(__file__), "runner", "plantillas", "prompts.js")
@@ -68,11 +71,26 @@ class ChatRunnerNodeStack(Stack):
         environment_vars = {
             # Bedrock Agent configuration
             "AGENT_ID": DEFAULT_AGENT_ID,
-            "AGENT_ALIAS_ID": 'change',
+            "AGENT_ALIAS_ID": input_metadata.get("agent_alias_id", "change"),
+            # Active alias published by the sync Lambda, read with a TTL cache
+            "AGENT_ALIAS_PARAMETER": alias_parameter_name,
+            "AGENT_ALIAS_TTL_SECONDS": "60",
             # Deploy fingerprint for prompt updates
             "PROMPTS_VERSION": prompts_version,
             # S3 Cache bucket
             "CACHE_BUCKET_NAME": self.cache_bucket.bucket_name,
+            # FAQ answer index published by the ETL: exact and high-confidence
+            # matches are answered without the agent (data bucket read access below)
+            "FAQ_ANSWER_FAST_PATH": str(input_metadata.get("faq_answer_fast_path", False)).lower(),
+            "FAQ_INDEX_BUCKET": f"raw-virtual-assistant-data-{Aws.ACCOUNT_ID}-{Aws.REGION}",
+            "FAQ_INDEX_KEY": input_metadata.get("faq_index_key", "faq-index/faq_index.json"),
+            "FAQ_MATCH_THRESHOLD": str(input_metadata.get("faq_match_threshold", 0.85)),
+            "FAQ_INDEX_TTL_SECONDS": "300",
+            # Per-document-type retrieval routing: keyword classifier picks the
+            # Knowledge Base shard (kb_sharding "per_type") or local index category
+            "KB_ROUTING": str(input_metadata.get("kb_routing", False)).lower(),
+            "KB_ROUTING_FANOUT": str(input_metadata.get("kb_routing_fanout", False)).lower(),
+            "KB_ROUTES": json.dumps(input_metadata.get("knowledge_base_routes") or {}),
             # Configure transformers to use /tmp for model cache
             "TRANSFORMERS_CACHE": "/tmp/.cache",
             "HF_HOME": "/tmp/.cache",
@@ -87,6 +105,13 @@ class ChatRunnerNodeStack(Stack):
             environment_vars["CONVERSATIONS_TABLE"] = conversations_table.table_name
         if sessions_table:
             environment_vars["SESSIONS_TABLE"] = sessions_table.table_name
+        if store_directory_table:
+            # Store/restaurant directory published by the ETL: location questions
+            # are answered with one Query
+            environment_vars["DIRECTORY_TABLE"] = store_directory_table.table_name
+            environment_vars["STORE_DIRECTORY_FAST_PATH"] = str(
+                input_metadata.get("store_directory_fast_path", False)
+            ).lower()
 
         # Build Docker image and push to ECR
         docker_image_asset = ecr_assets.DockerImageAsset(
@@ -112,6 +137,8 @@ class ChatRunnerNodeStack(Stack):
             conversations_table.grant_read_write_data(instance_role)
         if sessions_table:
             sessions_table.grant_read_write_data(instance_role)
+        if store_directory_table:
+            store_directory_table.grant_read_data(instance_role)
 
         # Grant permissions to read from Secrets Manager
         whatsapp_secret.grant_read(instance_role)
@@ -119,6 +146,18 @@ class ChatRunnerNodeStack(Stack):
         # Grant S3 permissions for cache bucket
         self.cache_bucket.grant_read_write(instance_role)
 
+        # Grant read access to the active agent alias parameter
+        if alias_parameter_name:
+            instance_role.add_to_policy(
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=["ssm:GetParameter"],
+                    resources=[
+                        f"arn:aws:ssm:{Aws.REGION}:{Aws.ACCOUNT_ID}:parameter{alias_parameter_name}"
+                    ]
+                )
+            )
+
         # Grant S3 permissions for data bucket
         instance_role.add_to_policy(
             iam.PolicyStatement(
@@ -303,6 +342,7 @@ class ChatRunnerNodeStack(Stack):
             iam.PolicyStatement(
                 effect=iam.Effect.ALLOW,
                 actions=[
+                    "bedrock:Retrieve",
                     "bedrock-agent-runtime:Retrieve",
                     "bedrock-agent-runtime:RetrieveAndGenerate"
                 ],
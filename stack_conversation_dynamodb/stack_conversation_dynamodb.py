@@ -11,7 +11,8 @@ from constructs import Construct
 class StackConversationDynamoDB(Stack):
     """
     Stack para el almacenamiento de conversaciones del asistente virtual MUT.
-    Incluye tablas para conversaciones completas y sesiones activas.
+    Incluye tablas para conversaciones completas y sesiones activas, y el
+    directorio de tiendas y restaurantes que publica el ETL.
     """
 
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
@@ -227,6 +228,44 @@ class StackConversationDynamoDB(Stack):
             # SIN time_to_live_attribute - se elimina manualmente al crear ticket
         )
 
+        # ============================================================================
+        # DIRECTORIO DE TIENDAS Y RESTAURANTES (consultas de ubicación sin LLM)
+        # ============================================================================
+        # Lo publica el ETL (etl_directory.py) a partir de stores/restaurantes.
+        # PK: name_key (nombre o alias normalizado: minúsculas, sin acentos ni signos)
+        # SK: dataset (stores/restaurantes): cada dataset publica y borra solo sus ítems,
+        # aunque una tienda y un restaurante tengan el mismo nombre
+        # Cada alias es una copia del ítem con alias_of, así el chat responde con un Query
+        # (v2: la clave cambió de name_key a name_key + dataset, lo que reemplaza la tabla)
+        self.store_directory_table = dynamodb.Table(
+            self, "StoreDirectoryTable",
+            table_name="mut-store-directory-v2",
+            partition_key=dynamodb.Attribute(
+                name="name_key",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="dataset",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            # Se regenera en cada ejecución del ETL
+            removal_policy=RemovalPolicy.DESTROY
+        )
+
+        # GSI para listar los ítems de un dataset (stores/restaurantes) y borrar los obsoletos
+        self.store_directory_table.add_global_secondary_index(
+            index_name="dataset-index",
+            partition_key=dynamodb.Attribute(
+                name="dataset",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="name_key",
+                type=dynamodb.AttributeType.STRING
+            )
+        )
+
         # Outputs para uso en otros stacks
         CfnOutput(
             self, "ConversationsTableName",
@@ -299,9 +338,17 @@ class StackConversationDynamoDB(Stack):
             export_name=f"{construct_id}-incidencia-sessions-table-arn"
         )
 
+        CfnOutput(
+            self, "StoreDirectoryTableName",
+            value=self.store_directory_table.table_name,
+            description="Nombre de la tabla del directorio de tiendas y restaurantes",
+            export_name=f"{construct_id}-store-directory-table-name"
+        )
+
         # Propiedades públicas para uso en otros stacks
         self.conversations_table_name = self.conversations_table.table_name
         self.sessions_table_name = self.sessions_table.table_name
         self.whatsapp_usuarios_table_name = self.whatsapp_usuarios_table.table_name
         self.whatsapp_tickets_table_name = self.whatsapp_tickets_table.table_name
-        self.incidencia_sessions_table_name = self.incidencia_sessions_table.table_name
\ No newline at end of file
+        self.incidencia_sessions_table_name = self.incidencia_sessions_table.table_name
+        self.store_directory_table_name = self.store_directory_table.table_name
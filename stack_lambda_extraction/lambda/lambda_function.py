@@ -9,23 +9,67 @@ import requests
 import pandas as pd
 import unicodedata
 import re
+import hashlib
 from datetime import datetime
 from io import StringIO, BytesIO
+from pipeline_ledger import LEDGER, iniciar_ledger, registrar_contadores, resumen_ledger
 
 s3_client = boto3.client('s3')
 
+# Contadores del ledger de ejecución (pipeline_ledger, capa compartida):
+# llamadas a APIs y bytes escritos en S3
+registrar_contadores(s3_client.meta.events, 'provide-client-params.s3')
+
 # Variables de entorno
 S3_BUCKET_NAME = os.environ['S3_BUCKET_NAME']
 S3_RAW_PREFIX = os.environ.get('S3_RAW_PREFIX', 'raw/')
 S3_VECTORIAL_PREFIX = os.environ.get('S3_VECTORIAL_PREFIX', 'vectorial/')
 API_BASE_URL = os.environ.get('API_BASE_URL', 'https://mut.cl/wp-json/wp/v2')
 
+# Modo fusionado: transforma a Bedrock KB en esta misma Lambda (capa ETL),
+# sin releer los CSV vectoriales desde la Lambda ETL
+FUSED_ETL = os.environ.get('FUSED_ETL', 'false').lower() == 'true'
+# Los CSV vectoriales pasan a ser artefactos opcionales en modo fusionado
+WRITE_VECTORIAL_CSV = os.environ.get('WRITE_VECTORIAL_CSV', 'true').lower() == 'true'
+KB_S3_ECOMM_PATH = os.environ.get('KB_S3_ECOMM_PATH', '')
+KB_OUTPUT_MODE = os.environ.get('KB_OUTPUT_MODE', 'chunks')
+
+# Manifiesto de cambios del ETL: su campo sources guarda el hash de cada CSV
+# vectorial ya transformado; si no cambió, Step Functions omite ETL y sync
+ETL_CHANGE_MANIFEST_KEY = os.environ.get('ETL_CHANGE_MANIFEST_KEY', 'sync-state/etl_change_manifest.json')
+
+# Datasets del pipeline (nombres ETL) → nombre del CSV raw
+# preguntas no se extrae de la API: se carga manualmente en raw/preguntas.csv
+DATASETS = {
+    'eventos': 'eventos',
+    'stores': 'tiendas',
+    'restaurantes': 'restaurantes',
+    'preguntas': None
+}
+
 def lambda_handler(event, context):
     """
     Main handler - Ejecuta extracción completa de datos
+    
+    Con event['dataset'] (eventos, stores, restaurantes o preguntas) procesa
+    solo ese dataset: es una rama del Map por dataset de Step Functions. En ese
+    modo no se limpia la carpeta datasets/ (los archivos KB obsoletos los borra
+    el manifiesto de cambios del ETL) y los errores se propagan para que Step
+    Functions reintente la rama.
+    
+    La respuesta incluye changed y changes ({dataset: {records, changed}}) para
+    que las Choice de la state machine omitan ETL y sincronización cuando
+    ningún dataset cambió. force_sync=true en el evento fuerza changed.
     """
+    event = event if isinstance(event, dict) else {}
+    dataset = event.get('dataset')
+    force = bool(event.get('force_sync', False))
+    inicio, started_at = iniciar_ledger()
+    
     print("=" * 80)
     print("🚀 Iniciando extracción de datos desde mut.cl")
+    if dataset:
+        print(f"   📦 Dataset: {dataset}")
     print("=" * 80)
     
     results = {
@@ -35,28 +79,47 @@ def lambda_handler(event, context):
     }
     
     try:
-        # 0. Limpiar carpeta datasets (primera ejecución)
-        print("\n🗑️  Limpiando carpeta datasets...")
-        eliminar_carpeta_datasets()
-        
-        # 1. Extraer Eventos
-        print("\n📅 Extrayendo eventos...")
-        eventos_df = extraer_eventos()
-        results['extractions']['eventos'] = upload_to_s3(eventos_df, 'eventos')
-        
-        # 2. Extraer Tiendas
-        print("\n🏪 Extrayendo tiendas...")
-        tiendas_df = extraer_tiendas()
-        results['extractions']['tiendas'] = upload_to_s3(tiendas_df, 'tiendas')
+        if dataset:
+            if dataset not in DATASETS:
+                raise ValueError(f"Dataset no soportado: {dataset}")
+            vectoriales = extraer_dataset(dataset, results)
+        else:
+            # 0. Limpiar carpeta datasets (primera ejecución)
+            print("\n🗑️  Limpiando carpeta datasets...")
+            eliminar_carpeta_datasets()
+            
+            # 1. Extraer Eventos
+            print("\n📅 Extrayendo eventos...")
+            eventos_df = extraer_eventos()
+            results['extractions']['eventos'] = upload_to_s3(eventos_df, 'eventos')
+            
+            # 2. Extraer Tiendas
+            print("\n🏪 Extrayendo tiendas...")
+            tiendas_df = extraer_tiendas()
+            results['extractions']['tiendas'] = upload_to_s3(tiendas_df, 'tiendas')
+            
+            # 3. Extraer Restaurantes
+            print("\n🍽️ Extrayendo restaurantes...")
+            restaurantes_df = extraer_restaurantes()
+            results['extractions']['restaurantes'] = upload_to_s3(restaurantes_df, 'restaurantes')
+            
+            # 4. Preparar datos vectoriales
+            print("\n🔄 Preparando datos vectoriales...")
+            vectoriales = preparar_datos_vectoriales(eventos_df, tiendas_df, restaurantes_df)
         
-        # 3. Extraer Restaurantes
-        print("\n🍽️ Extrayendo restaurantes...")
-        restaurantes_df = extraer_restaurantes()
-        results['extractions']['restaurantes'] = upload_to_s3(restaurantes_df, 'restaurantes')
+        # 5. ETL Bedrock KB en memoria (modo fusionado)
+        if FUSED_ETL:
+            print("\n🔗 Modo fusionado: transformando a Bedrock KB en memoria...")
+            # Por dataset, el manifiesto de cambios se consolida al final del Map
+            results['etl'] = ejecutar_etl_fusionado(vectoriales, defer_changes=bool(dataset))
         
-        # 4. Preparar datos vectoriales
-        print("\n🔄 Preparando datos vectoriales...")
-        preparar_datos_vectoriales(eventos_df, tiendas_df, restaurantes_df)
+        # 6. Resumen de cambios para las Choice de Step Functions
+        if FUSED_ETL:
+            cambios = resumir_cambios_fusionado(vectoriales, results['etl'], force)
+        else:
+            cambios = resumir_cambios(vectoriales, force)
+        changed = any(c['changed'] for c in cambios.values())
+        print(f"\n🧾 Cambios: {', '.join(t for t, c in cambios.items() if c['changed']) or 'ninguno'}")
         
         results['status'] = 'success'
         results['message'] = 'Extracción completada exitosamente'
@@ -67,20 +130,56 @@ def lambda_handler(event, context):
         
         return {
             'statusCode': 200,
+            'changed': changed,
+            'changes': cambios,
+            'ledger': resumen_ledger(
+                context, inicio, started_at,
+                records_in=sum(e['records'] for e in results['extractions'].values()),
+                records_out=sum(len(df) for df in vectoriales.values())
+            ),
             'body': json.dumps(results)
         }
         
     except Exception as e:
         print(f"\n❌ Error en el proceso: {str(e)}")
+        if dataset:
+            raise
         results['status'] = 'error'
         results['error'] = str(e)
         
         return {
             'statusCode': 500,
+            'ledger': resumen_ledger(context, inicio, started_at),
             'body': json.dumps(results)
         }
 
 
+def api_get(url):
+    """GET a la API de mut.cl (contado en el ledger)"""
+    LEDGER['api_calls'] += 1
+    return requests.get(url, timeout=30)
+
+
+def extraer_dataset(dataset, results):
+    """Extrae y prepara un solo dataset; retorna sus datos vectoriales."""
+    extractores = {
+        'eventos': extraer_eventos,
+        'tiendas': extraer_tiendas,
+        'restaurantes': extraer_restaurantes
+    }
+    raw_name = DATASETS[dataset]
+    frames = {'eventos_df': None, 'tiendas_df': None, 'restaurantes_df': None}
+    
+    if raw_name:
+        print(f"\n📥 Extrayendo {raw_name}...")
+        df = extractores[raw_name]()
+        results['extractions'][raw_name] = upload_to_s3(df, raw_name)
+        frames[f"{raw_name}_df"] = df
+    
+    print("\n🔄 Preparando datos vectoriales...")
+    return preparar_datos_vectoriales(incluir_preguntas=(dataset == 'preguntas'), **frames)
+
+
 def extraer_eventos():
     """Extrae eventos desde API de WordPress"""
     todos_eventos = []
@@ -89,7 +188,7 @@ def extraer_eventos():
         url = f"{API_BASE_URL}/event?per_page=100&page={i}"
         
         try:
-            response = requests.get(url, timeout=30)
+            response = api_get(url)
             response.raise_for_status()
             data = response.json()
             
@@ -157,7 +256,7 @@ def extraer_tiendas():
         url = f"{API_BASE_URL}/stores?per_page=100&page={i}"
         
         try:
-            response = requests.get(url, timeout=30)
+            response = api_get(url)
             response.raise_for_status()
             data = response.json()
             
@@ -236,7 +335,7 @@ def extraer_restaurantes():
         url = f"{API_BASE_URL}/restaurant?per_page=100&page={i}"
         
         try:
-            response = requests.get(url, timeout=30)
+            response = api_get(url)
             response.raise_for_status()
             data = response.json()
             
@@ -399,129 +498,213 @@ def eliminar_carpeta_datasets():
         # No lanzamos excepción para que el proceso continúe aunque falle la limpieza
 
 
-def preparar_datos_vectoriales(eventos_df, tiendas_df, restaurantes_df):
+def preparar_datos_vectoriales(eventos_df, tiendas_df, restaurantes_df, incluir_preguntas=True):
     """
     Prepara datos vectoriales y sube a S3 - Nombres constantes
     También procesa preguntas frecuentes si existen en S3 (cargadas manualmente)
+    Los DataFrames en None (extracción por dataset) se omiten.
+    
+    En la ejecución completa un preguntas.csv inválido solo se informa; si las
+    preguntas son lo único a procesar (extraer_dataset('preguntas')), el error
+    se propaga para que la ejecución falle en vez de terminar sin cambios.
+    
+    Retorna los DataFrames vectoriales por tipo de dataset ETL
+    (preguntas, eventos, stores, restaurantes) para el modo fusionado.
     """
+    vectoriales = {}
+    solo_preguntas = eventos_df is None and tiendas_df is None and restaurantes_df is None
     
     # Procesar preguntas frecuentes (cargadas manualmente)
-    print("   📋 Procesando preguntas frecuentes...")
-    try:
-        preguntas_key = f"{S3_RAW_PREFIX}preguntas.csv"
-        response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=preguntas_key)
+    if incluir_preguntas:
+        print("   📋 Procesando preguntas frecuentes...")
+        try:
+            preguntas_key = f"{S3_RAW_PREFIX}preguntas.csv"
+            response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=preguntas_key)
         
-        body_bytes = response['Body'].read()
-        preguntas_df = None
-        detected_encoding = None
-        for encoding_candidate in ('utf-8-sig', 'utf-8', 'latin-1', 'cp1252'):
-            try:
-                preguntas_df = pd.read_csv(BytesIO(body_bytes), sep=';', encoding=encoding_candidate)
-                detected_encoding = encoding_candidate
-                break
-            except UnicodeDecodeError:
-                continue
-        if preguntas_df is None:
-            raise UnicodeDecodeError("preguntas.csv", '', 0, "No fue posible decodificar archivo de preguntas")
-        preguntas_df.columns = [col.replace('\ufeff', '').strip() for col in preguntas_df.columns]
-        print(f"   ℹ️  Archivo preguntas decodificado como {detected_encoding}")
+            body_bytes = response['Body'].read()
+            preguntas_df = None
+            detected_encoding = None
+            for encoding_candidate in ('utf-8-sig', 'utf-8', 'latin-1', 'cp1252'):
+                try:
+                    preguntas_df = pd.read_csv(BytesIO(body_bytes), sep=';', encoding=encoding_candidate)
+                    detected_encoding = encoding_candidate
+                    break
+                except UnicodeDecodeError:
+                    continue
+            if preguntas_df is None:
+                raise UnicodeDecodeError("preguntas.csv", '', 0, "No fue posible decodificar archivo de preguntas")
+            preguntas_df.columns = [col.replace('\ufeff', '').strip() for col in preguntas_df.columns]
+            print(f"   ℹ️  Archivo preguntas decodificado como {detected_encoding}")
         
-        # Renombrar columnas si es necesario
-        if len(preguntas_df.columns) == 3:
-            preguntas_df.columns = ['pregunta', 'respuesta', 'categoria_completa']
+            # Renombrar columnas si es necesario
+            if len(preguntas_df.columns) == 3:
+                preguntas_df.columns = ['pregunta', 'respuesta', 'categoria_completa']
         
-        # Limpiar textos
-        for col in ['pregunta', 'respuesta', 'categoria_completa']:
-            if col in preguntas_df.columns:
-                preguntas_df[col] = preguntas_df[col].apply(limpiar_texto)
+            # Limpiar textos
+            for col in ['pregunta', 'respuesta', 'categoria_completa']:
+                if col in preguntas_df.columns:
+                    preguntas_df[col] = preguntas_df[col].apply(limpiar_texto)
         
-        # Extraer categoría
-        preguntas_df['categoria_nombre'] = preguntas_df['categoria_completa'].str.replace(r'^\d+\s+', '', regex=True)
+            # Extraer categoría
+            preguntas_df['categoria_nombre'] = preguntas_df['categoria_completa'].str.replace(r'^\d+\s+', '', regex=True)
         
-        # Crear texto embedding
-        preguntas_df['texto_embedding'] = preguntas_df.apply(crear_texto_embedding_pregunta, axis=1)
-        preguntas_df['document_type'] = 'pregunta_frecuente'
-        preguntas_df['search_category'] = 'faqs_y_ayuda'
+            # Crear texto embedding
+            preguntas_df['texto_embedding'] = preguntas_df.apply(crear_texto_embedding_pregunta, axis=1)
+            preguntas_df['document_type'] = 'pregunta_frecuente'
+            preguntas_df['search_category'] = 'faqs_y_ayuda'
         
-        # Filtrar registros válidos
-        preguntas_vectorial = preguntas_df[preguntas_df['texto_embedding'].str.len() > 20]
+            # Filtrar registros válidos
+            preguntas_vectorial = preguntas_df[preguntas_df['texto_embedding'].str.len() > 20]
         
-        if not preguntas_vectorial.empty:
-            csv_buffer = BytesIO()
-            preguntas_vectorial.to_csv(csv_buffer, index=False, encoding='utf-8-sig')
-            key = f"{S3_VECTORIAL_PREFIX}preguntas_vectorial.csv"
-            s3_client.put_object(
-                Bucket=S3_BUCKET_NAME, 
-                Key=key, 
-                Body=csv_buffer.getvalue(),
-                ContentType='text/csv; charset=utf-8'
-            )
-            print(f"   ✓ Preguntas vectoriales: s3://{S3_BUCKET_NAME}/{key} ({len(preguntas_vectorial)} registros)")
-        else:
-            print(f"   ⚠️  No hay preguntas válidas para procesar")
+            if not preguntas_vectorial.empty:
+                vectoriales['preguntas'] = preguntas_vectorial
+                subir_csv_vectorial(preguntas_vectorial, "preguntas_vectorial.csv", "Preguntas")
+            else:
+                print(f"   ⚠️  No hay preguntas válidas para procesar")
             
-    except s3_client.exceptions.NoSuchKey:
-        print(f"   ℹ️  No se encontró archivo de preguntas en {S3_RAW_PREFIX}preguntas.csv")
-        print(f"   ℹ️  Las preguntas deben cargarse manualmente a S3")
-    except Exception as e:
-        print(f"   ⚠️  Error procesando preguntas: {str(e)}")
+        except s3_client.exceptions.NoSuchKey:
+            print(f"   ℹ️  No se encontró archivo de preguntas en {S3_RAW_PREFIX}preguntas.csv")
+            print(f"   ℹ️  Las preguntas deben cargarse manualmente a S3")
+        except Exception as e:
+            print(f"   ⚠️  Error procesando preguntas: {str(e)}")
+            if solo_preguntas:
+                raise
     
     # Procesar eventos
-    if not eventos_df.empty:
+    if eventos_df is not None and not eventos_df.empty:
         print(f"   📅 Procesando {len(eventos_df)} eventos...")
         eventos_df['texto_embedding'] = eventos_df.apply(crear_texto_embedding_evento, axis=1)
         eventos_df['document_type'] = 'evento'
         eventos_df['search_category'] = 'eventos_y_actividades'
         eventos_vectorial = eventos_df[eventos_df['texto_embedding'].str.len() > 30]
         
-        csv_buffer = BytesIO()
-        eventos_vectorial.to_csv(csv_buffer, index=False, encoding='utf-8-sig')
-        key = f"{S3_VECTORIAL_PREFIX}eventos_vectorial.csv"
-        s3_client.put_object(
-            Bucket=S3_BUCKET_NAME, 
-            Key=key, 
-            Body=csv_buffer.getvalue(),
-            ContentType='text/csv; charset=utf-8'
-        )
-        print(f"   ✓ Eventos vectoriales: s3://{S3_BUCKET_NAME}/{key} ({len(eventos_vectorial)} registros)")
+        vectoriales['eventos'] = eventos_vectorial
+        subir_csv_vectorial(eventos_vectorial, "eventos_vectorial.csv", "Eventos")
     
     # Procesar tiendas
-    if not tiendas_df.empty:
+    if tiendas_df is not None and not tiendas_df.empty:
         print(f"   🏪 Procesando {len(tiendas_df)} tiendas...")
         tiendas_df['texto_embedding'] = tiendas_df.apply(crear_texto_embedding_tienda, axis=1)
         tiendas_df['document_type'] = 'tienda'
         tiendas_df['search_category'] = 'comercios_y_tiendas'
         tiendas_vectorial = tiendas_df[tiendas_df['texto_embedding'].str.len() > 30]
         
-        csv_buffer = BytesIO()
-        tiendas_vectorial.to_csv(csv_buffer, index=False, encoding='utf-8-sig')
-        key = f"{S3_VECTORIAL_PREFIX}stores_vectorial.csv"
-        s3_client.put_object(
-            Bucket=S3_BUCKET_NAME, 
-            Key=key, 
-            Body=csv_buffer.getvalue(),
-            ContentType='text/csv; charset=utf-8'
-        )
-        print(f"   ✓ Tiendas vectoriales: s3://{S3_BUCKET_NAME}/{key} ({len(tiendas_vectorial)} registros)")
+        vectoriales['stores'] = tiendas_vectorial
+        subir_csv_vectorial(tiendas_vectorial, "stores_vectorial.csv", "Tiendas")
     
     # Procesar restaurantes
-    if not restaurantes_df.empty:
+    if restaurantes_df is not None and not restaurantes_df.empty:
         print(f"   🍽️  Procesando {len(restaurantes_df)} restaurantes...")
         restaurantes_df['texto_embedding'] = restaurantes_df.apply(crear_texto_embedding_restaurante, axis=1)
         restaurantes_df['document_type'] = 'restaurante'
         restaurantes_df['search_category'] = 'gastronomia'
         restaurantes_vectorial = restaurantes_df[restaurantes_df['texto_embedding'].str.len() > 30]
         
-        csv_buffer = BytesIO()
-        restaurantes_vectorial.to_csv(csv_buffer, index=False, encoding='utf-8-sig')
-        key = f"{S3_VECTORIAL_PREFIX}restaurantes_vectorial.csv"
-        s3_client.put_object(
-            Bucket=S3_BUCKET_NAME, 
-            Key=key, 
-            Body=csv_buffer.getvalue(),
-            ContentType='text/csv; charset=utf-8'
-        )
-        print(f"   ✓ Restaurantes vectoriales: s3://{S3_BUCKET_NAME}/{key} ({len(restaurantes_vectorial)} registros)")
+        vectoriales['restaurantes'] = restaurantes_vectorial
+        subir_csv_vectorial(restaurantes_vectorial, "restaurantes_vectorial.csv", "Restaurantes")
+    
+    return vectoriales
+
+
+def subir_csv_vectorial(df, nombre_archivo, etiqueta):
+    """
+    Sube un CSV vectorial a S3 (opcional en modo fusionado con WRITE_VECTORIAL_CSV=false)
+    El hash del contenido queda en la metadata content-sha256 (lo registra el
+    ETL) y en df.attrs para el resumen de cambios.
+    """
+    key = f"{S3_VECTORIAL_PREFIX}{nombre_archivo}"
+    if not WRITE_VECTORIAL_CSV:
+        print(f"   ⏭️  {etiqueta} vectoriales: {len(df)} registros en memoria (sin escribir {key})")
+        return
+    
+    csv_buffer = BytesIO()
+    df.to_csv(csv_buffer, index=False, encoding='utf-8-sig')
+    content_sha256 = hashlib.sha256(csv_buffer.getvalue()).hexdigest()
+    df.attrs['content_sha256'] = content_sha256
+    s3_client.put_object(
+        Bucket=S3_BUCKET_NAME, 
+        Key=key, 
+        Body=csv_buffer.getvalue(),
+        ContentType='text/csv; charset=utf-8',
+        Metadata={'content-sha256': content_sha256}
+    )
+    print(f"   ✓ {etiqueta} vectoriales: s3://{S3_BUCKET_NAME}/{key} ({len(df)} registros)")
+
+
+def cargar_fuentes_etl():
+    """Hash de los CSV vectoriales que procesó el último ETL exitoso, o {}"""
+    try:
+        response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=ETL_CHANGE_MANIFEST_KEY)
+        return json.loads(response['Body'].read()).get('sources', {})
+    except Exception as e:
+        print(f"   ℹ️  Sin manifiesto de cambios del ETL ({str(e)}): se asume que todo cambió")
+        return {}
+
+
+def resumir_cambios(vectoriales, force=False):
+    """
+    {dataset: {records, changed}}: un dataset cambió si su CSV vectorial no
+    coincide con el último que transformó el ETL (o no hay hash con qué comparar).
+    """
+    fuentes = cargar_fuentes_etl()
+    resumen = {}
+    for tipo, df in vectoriales.items():
+        content_sha256 = df.attrs.get('content_sha256')
+        resumen[tipo] = {
+            'records': len(df),
+            'changed': force or not content_sha256 or fuentes.get(tipo) != content_sha256
+        }
+    return resumen
+
+
+def resumir_cambios_fusionado(vectoriales, etl_result, force=False):
+    """
+    En modo fusionado el ETL ya corrió: cambió lo que el manifiesto registró
+    como agregado, actualizado o eliminado. Con los cambios pendientes (Map
+    por dataset) decide el paso que consolida el manifiesto.
+    """
+    cambios = etl_result.get('changes')
+    resumen = {}
+    for tipo, df in vectoriales.items():
+        conteos = (cambios or {}).get(tipo)
+        resumen[tipo] = {
+            'records': len(df),
+            'changed': force or cambios is None or conteos is None or any(conteos.values())
+        }
+    return resumen
+
+
+def ejecutar_etl_fusionado(vectoriales, defer_changes=False):
+    """
+    Entrega los DataFrames vectoriales en memoria al transform y writer del ETL
+    (etl_datasets.py, provisto por la capa ETL) y escribe directo en la ruta KB
+    
+    defer_changes=True deja los cambios pendientes para que el paso final del
+    Map por dataset consolide un solo manifiesto.
+    """
+    if not KB_S3_ECOMM_PATH:
+        raise ValueError("Variable de entorno KB_S3_ECOMM_PATH no está configurada")
+    
+    # Solo disponible con la capa ETL (FUSED_ETL=true)
+    import etl_datasets
+    
+    frames = {tipo: df.to_dict('records') for tipo, df in vectoriales.items()}
+    etl_result = etl_datasets.run_fused_etl(
+        frames=frames,
+        s3_bucket=S3_BUCKET_NAME,
+        base_output_path=KB_S3_ECOMM_PATH.rstrip('/'),
+        output_mode=KB_OUTPUT_MODE,
+        defer_changes=defer_changes
+    )
+    
+    stats = etl_result['statistics']
+    print(f"   ✓ ETL fusionado: {stats['total_documents']} documentos en {stats['total_chunks']} chunks")
+    
+    return {
+        **etl_result,
+        'output_path': KB_S3_ECOMM_PATH,
+        'output_mode': KB_OUTPUT_MODE
+    }
 
 
 def crear_texto_embedding_pregunta(row):
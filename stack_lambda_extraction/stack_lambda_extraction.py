@@ -16,11 +16,63 @@ class DataExtractionLambdaStack(Stack):
     - Extrae eventos, tiendas y restaurantes
     - Prepara datos vectoriales
     - Guarda en S3 bucket raw-virtual-assistant-data
+    - Modo fusionado (fused_etl): transforma a Bedrock KB en la misma Lambda
     """
 
-    def __init__(self, scope: Construct, construct_id: str, input_s3_bucket_arn, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str, input_s3_bucket_arn, input_metadata=None, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        input_metadata = input_metadata or {}
+
+        # Modo fusionado: reutiliza transform/writer del ETL desde una capa y evita releer los CSV vectoriales
+        fused_etl = bool(input_metadata.get('fused_etl', False))
+
+        environment = {
+            "S3_BUCKET_NAME": f"raw-virtual-assistant-data-{Aws.ACCOUNT_ID}-{Aws.REGION}",
+            "S3_RAW_PREFIX": "raw/",
+            "S3_VECTORIAL_PREFIX": "vectorial/",
+            "API_BASE_URL": "https://mut.cl/wp-json/wp/v2",
+            # Hash de los CSV ya transformados por el ETL (resumen de cambios)
+            "ETL_CHANGE_MANIFEST_KEY": "sync-state/etl_change_manifest.json"
+        }
+        # Ledger de ejecución compartido con el ETL y la sincronización (pipeline_ledger.py)
+        layers = [
+            _alambda.PythonLayerVersion(
+                self,
+                "pipeline-ledger-layer",
+                entry="./lambda_shared",
+                compatible_runtimes=[_lambda.Runtime.PYTHON_3_12],
+                description="Ledger de ejecucion del pipeline (pipeline_ledger.py)",
+                bundling=_alambda.BundlingOptions(asset_excludes=["__pycache__"])
+            )
+        ]
+
+        if fused_etl:
+            # Módulos ETL (etl_datasets, etl_stdlib, etl_local) empaquetados como capa en /opt/python
+            layers.append(
+                _alambda.PythonLayerVersion(
+                    self,
+                    "etl-shared-layer",
+                    entry="./stack_backend_lambda_light_etl",
+                    compatible_runtimes=[_lambda.Runtime.PYTHON_3_12],
+                    description="Modulos ETL Bedrock KB para el modo fusionado",
+                    bundling=_alambda.BundlingOptions(
+                        asset_excludes=["lambda_function.py", "stack_backend_lambda_light_etl.py", "__pycache__"]
+                    )
+                )
+            )
+            environment.update({
+                "FUSED_ETL": "true",
+                "WRITE_VECTORIAL_CSV": str(input_metadata.get('write_vectorial_csv', False)).lower(),
+                "KB_S3_ECOMM_PATH": input_metadata['s3_knowledge_base_prefixes'][0].rstrip('/'),
+                "KB_OUTPUT_MODE": input_metadata.get('kb_output_mode', 'chunks'),
+                "KB_MAX_DOCUMENT_TOKENS": str(input_metadata.get('kb_max_document_tokens', 0)),
+                # Índice de respuestas FAQ que publica el ETL para el chat
+                "FAQ_INDEX_KEY": input_metadata.get('faq_index_key', 'faq-index/faq_index.json'),
+                # Directorio de tiendas y restaurantes (tabla de StackConversationDynamoDB)
+                "DIRECTORY_TABLE_NAME": "mut-store-directory-v2"
+            })
+
         """
         @ Lambda Function: Data Extraction
         """
@@ -34,12 +86,8 @@ class DataExtractionLambdaStack(Stack):
             memory_size=2048,
             timeout=Duration.seconds(900),  # 15 minutos para procesar todas las fuentes
             description="Extrae eventos, tiendas y restaurantes desde mut.cl y prepara datos vectoriales",
-            environment={
-                "S3_BUCKET_NAME": f"raw-virtual-assistant-data-{Aws.ACCOUNT_ID}-{Aws.REGION}",
-                "S3_RAW_PREFIX": "raw/",
-                "S3_VECTORIAL_PREFIX": "vectorial/",
-                "API_BASE_URL": "https://mut.cl/wp-json/wp/v2"
-            }
+            environment=environment,
+            layers=layers
         )
 
         """
@@ -56,6 +104,19 @@ class DataExtractionLambdaStack(Stack):
         """
         @ IAM Permissions adicionales si son necesarias
         """
+        if fused_etl:
+            # El ETL fusionado reconstruye el directorio de tiendas y restaurantes
+            directory_table_name = environment["DIRECTORY_TABLE_NAME"]
+            self.lambda_fn.add_to_role_policy(
+                iam.PolicyStatement(
+                    actions=["dynamodb:BatchWriteItem", "dynamodb:PutItem", "dynamodb:DeleteItem", "dynamodb:Query"],
+                    resources=[
+                        f"arn:aws:dynamodb:{Aws.REGION}:{Aws.ACCOUNT_ID}:table/{directory_table_name}",
+                        f"arn:aws:dynamodb:{Aws.REGION}:{Aws.ACCOUNT_ID}:table/{directory_table_name}/index/*"
+                    ]
+                )
+            )
+
         # Agregar permisos para poder hacer llamadas HTTPS externas
         self.lambda_fn.add_to_role_policy(
             iam.PolicyStatement(
@@ -0,0 +1,107 @@
+"""
+Polling adaptativo para ingestion jobs y preparación del agente Bedrock
+
+Reemplaza el sleep fijo de 10 s:
+- Empieza con intervalos cortos y crece con backoff exponencial hasta un máximo
+- Si el job reporta estadísticas (documentos procesados / escaneados), estima la
+  velocidad y acorta la próxima espera al término previsto
+- El reloj es inyectable: SystemClock en Lambda, ManualClock (bedrock_local.py)
+  para simular jobs sin esperar tiempo real
+"""
+
+import time
+
+
+class SystemClock:
+    """Reloj real (monotónico)."""
+
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+def ingestion_progress(statistics):
+    """
+    Progreso (procesados, total) desde las estadísticas de get_ingestion_job,
+    o None si aún no hay documentos escaneados.
+    """
+    if not statistics:
+        return None
+
+    total = statistics.get('numberOfDocumentsScanned', 0)
+    if total <= 0:
+        return None
+
+    done = (
+        statistics.get('numberOfNewDocumentsIndexed', 0)
+        + statistics.get('numberOfModifiedDocumentsIndexed', 0)
+        + statistics.get('numberOfDocumentsDeleted', 0)
+        + statistics.get('numberOfDocumentsFailed', 0)
+    )
+    return min(done, total), total
+
+
+class AdaptivePoller:
+    """
+    Ejecuta check() hasta que indique término o se alcance el timeout.
+
+    check() retorna (terminado, valor, progreso), donde progreso es
+    (procesados, total) o None. Tras wait() quedan disponibles polls, elapsed
+    y predicted (última estimación de segundos restantes).
+    """
+
+    def __init__(self, clock=None, initial_interval=2.0, max_interval=20.0, backoff=1.5, min_interval=1.0):
+        self.clock = clock or SystemClock()
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.min_interval = min_interval
+        self.polls = 0
+        self.elapsed = 0.0
+        self.predicted = None
+
+    def wait(self, check, timeout, timeout_value=None):
+        """Retorna el valor de check() al terminar, o timeout_value."""
+        start = self.clock.now()
+        interval = self.initial_interval
+        first_progress = None
+        self.polls = 0
+        self.predicted = None
+
+        while True:
+            self.elapsed = self.clock.now() - start
+            if self.elapsed > timeout:
+                return timeout_value
+
+            self.polls += 1
+            finished, value, progress = check(self.elapsed)
+            if finished:
+                return value
+
+            wait = interval
+
+            # Estimar término con la velocidad observada desde la primera medición
+            now = self.clock.now()
+            if progress:
+                if first_progress is None:
+                    first_progress = (now, progress[0])
+                else:
+                    self.predicted = self._predict_remaining(first_progress, now, progress)
+                    if self.predicted is not None:
+                        # La predicción solo acorta la espera; nunca la extiende
+                        wait = max(self.min_interval, min(wait, self.predicted))
+
+            self.clock.sleep(min(wait, max(timeout - self.elapsed, 0) + self.min_interval))
+            interval = min(interval * self.backoff, self.max_interval)
+
+    @staticmethod
+    def _predict_remaining(first_progress, now, progress):
+        """Segundos restantes según la velocidad media, o None si no hay avance."""
+        first_time, first_done = first_progress
+        done, total = progress
+        if now <= first_time or done <= first_done:
+            return None
+        rate = (done - first_done) / (now - first_time)
+        return (total - done) / rate
@@ -0,0 +1,311 @@
+"""
+Simulación local de bedrock-agent para la Lambda de sincronización
+
+ManualClock avanza el tiempo solo cuando se llama sleep(), y
+LocalBedrockAgentClient responde start/get_ingestion_job, la ingesta directa
+de documentos (ingest/delete/get_knowledge_base_documents), prepare_agent y
+get_agent según ese reloj. Así los waits de lambda_function.py se ejecutan en
+milisegundos y se puede medir cuántas consultas hacen y cuánto tardan en
+detectar el término.
+
+USO (desde la raíz del repo):
+    python stack_lambda_sync_vectorial/lambda/bedrock_local.py
+    python stack_lambda_sync_vectorial/lambda/bedrock_local.py --docs 50 300 1200 --docs-per-second 4
+    python stack_lambda_sync_vectorial/lambda/bedrock_local.py --docs 1200 --direct 1 10 50
+"""
+
+import os
+import sys
+import argparse
+from datetime import datetime, timezone
+
+
+class ManualClock:
+    """Reloj simulado: sleep() avanza el tiempo sin esperar."""
+
+    def __init__(self, start=0.0):
+        self.current = start
+        self.sleeps = []
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.current += seconds
+
+
+class LocalBedrockAgentClient:
+    """
+    Stand-in de boto3.client('bedrock-agent') para jobs simulados.
+
+    Cada ingestion job pasa por STARTING (startup_seconds), luego IN_PROGRESS
+    indexando a docs_per_second, y termina en COMPLETE. prepare_agent deja el
+    agente en PREPARING durante prepare_seconds.
+
+    La ingesta directa procesa cada lote tras startup_direct_seconds a
+    docs_per_second; los documentos eliminados pasan a NOT_FOUND.
+    """
+
+    def __init__(self, clock, documents=200, docs_per_second=2.0, startup_seconds=15.0,
+                 prepare_seconds=12.0, data_sources=None, startup_direct_seconds=3.0):
+        self.clock = clock
+        self.documents = documents
+        self.docs_per_second = docs_per_second
+        self.startup_seconds = startup_seconds
+        self.prepare_seconds = prepare_seconds
+        self.data_sources = data_sources or [
+            {'dataSourceId': 'LOCALDS001', 'name': 'eventos', 'status': 'AVAILABLE',
+             'inclusionPrefixes': ['datasets/eventos/']}
+        ]
+        self.startup_direct_seconds = startup_direct_seconds
+        self.jobs = {}
+        # uri -> (status final, momento en que lo alcanza)
+        self.kb_documents = {}
+        self.calls = {}
+        self.prepared_at = None
+
+    def _count(self, operation):
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    def job_duration(self):
+        """Segundos totales que tarda un job simulado."""
+        return self.startup_seconds + self.documents / self.docs_per_second
+
+    def start_ingestion_job(self, knowledgeBaseId, dataSourceId, description=None):
+        self._count('start_ingestion_job')
+        job_id = f"LOCALJOB{len(self.jobs) + 1:03d}"
+        self.jobs[job_id] = self.clock.now()
+        return {'ingestionJob': {'ingestionJobId': job_id, 'status': 'STARTING'}}
+
+    def _timestamp(self, seconds):
+        """Tiempo simulado → datetime, como startedAt/updatedAt de boto3."""
+        return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+    def get_ingestion_job(self, knowledgeBaseId, dataSourceId, ingestionJobId):
+        self._count('get_ingestion_job')
+        started = self.jobs[ingestionJobId]
+        elapsed = self.clock.now() - started
+        times = {
+            'startedAt': self._timestamp(started),
+            'updatedAt': self._timestamp(min(self.clock.now(), started + self.job_duration()))
+        }
+
+        if elapsed < self.startup_seconds:
+            return {'ingestionJob': {'ingestionJobId': ingestionJobId, 'status': 'STARTING', **times}}
+
+        indexed = min(self.documents, int((elapsed - self.startup_seconds) * self.docs_per_second))
+        status = 'COMPLETE' if indexed >= self.documents else 'IN_PROGRESS'
+        return {
+            'ingestionJob': {
+                'ingestionJobId': ingestionJobId,
+                'status': status,
+                **times,
+                'statistics': {
+                    'numberOfDocumentsScanned': self.documents,
+                    'numberOfNewDocumentsIndexed': indexed,
+                    'numberOfModifiedDocumentsIndexed': 0,
+                    'numberOfDocumentsDeleted': 0,
+                    'numberOfDocumentsFailed': 0
+                }
+            }
+        }
+
+    def _schedule_documents(self, uris, final_status):
+        start = self.clock.now() + self.startup_direct_seconds
+        for position, uri in enumerate(uris, 1):
+            self.kb_documents[uri] = (final_status, start + position / self.docs_per_second)
+
+    def _document_detail(self, dataSourceId, uri, status):
+        return {
+            'dataSourceId': dataSourceId,
+            'identifier': {'dataSourceType': 'S3', 's3': {'uri': uri}},
+            'status': status
+        }
+
+    def ingest_knowledge_base_documents(self, knowledgeBaseId, dataSourceId, documents):
+        self._count('ingest_knowledge_base_documents')
+        uris = [doc['content']['s3']['s3Location']['uri'] for doc in documents]
+        self._schedule_documents(uris, 'INDEXED')
+        return {'documentDetails': [self._document_detail(dataSourceId, uri, 'STARTING') for uri in uris]}
+
+    def delete_knowledge_base_documents(self, knowledgeBaseId, dataSourceId, documentIdentifiers):
+        self._count('delete_knowledge_base_documents')
+        uris = [identifier['s3']['uri'] for identifier in documentIdentifiers]
+        self._schedule_documents(uris, 'NOT_FOUND')
+        return {'documentDetails': [self._document_detail(dataSourceId, uri, 'DELETING') for uri in uris]}
+
+    def get_knowledge_base_documents(self, knowledgeBaseId, dataSourceId, documentIdentifiers):
+        self._count('get_knowledge_base_documents')
+        details = []
+        for identifier in documentIdentifiers:
+            uri = identifier['s3']['uri']
+            final_status, ready_at = self.kb_documents.get(uri, ('NOT_FOUND', 0))
+            if self.clock.now() >= ready_at:
+                status = final_status
+            else:
+                status = 'IN_PROGRESS' if final_status == 'INDEXED' else 'DELETE_IN_PROGRESS'
+            details.append(self._document_detail(dataSourceId, uri, status))
+        return {'documentDetails': details}
+
+    def list_data_sources(self, knowledgeBaseId, **kwargs):
+        self._count('list_data_sources')
+        # Data sources con knowledgeBaseId simulan Knowledge Bases por tipo
+        return {'dataSourceSummaries': [
+            ds for ds in self.data_sources if ds.get('knowledgeBaseId', knowledgeBaseId) == knowledgeBaseId
+        ]}
+
+    def get_paginator(self, operation):
+        """Paginador de una sola página para list_data_sources."""
+        client = self
+
+        class _Paginator:
+            def paginate(self, **kwargs):
+                yield getattr(client, operation)(**kwargs)
+
+        return _Paginator()
+
+    def get_data_source(self, knowledgeBaseId, dataSourceId):
+        self._count('get_data_source')
+        ds = next(d for d in self.data_sources if d['dataSourceId'] == dataSourceId)
+        return {
+            'dataSource': {
+                'dataSourceId': dataSourceId,
+                'name': ds['name'],
+                'dataSourceConfiguration': {
+                    'type': 'S3',
+                    's3Configuration': {
+                        'bucketArn': 'arn:aws:s3:::local',
+                        'inclusionPrefixes': ds.get('inclusionPrefixes', [])
+                    }
+                }
+            }
+        }
+
+    def prepare_agent(self, agentId):
+        self._count('prepare_agent')
+        self.prepared_at = self.clock.now()
+        return {'agentStatus': 'PREPARING', 'preparedAt': datetime.now().isoformat()}
+
+    def get_agent(self, agentId):
+        self._count('get_agent')
+        ready = self.prepared_at is None or self.clock.now() - self.prepared_at >= self.prepare_seconds
+        return {'agent': {'agentId': agentId, 'agentStatus': 'PREPARED' if ready else 'PREPARING'}}
+
+
+def load_sync_module():
+    """Importa lambda_function con variables de entorno de prueba."""
+    os.environ.setdefault('S3_BUCKET_NAME', 'local')
+    os.environ.setdefault('KNOWLEDGE_BASE_ID', 'LOCALKB')
+    os.environ.setdefault('AGENT_ID', 'LOCALAGENT')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    # pipeline_ledger llega en Lambda como capa (/opt/python)
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'lambda_shared'))
+    import lambda_function
+    return lambda_function
+
+
+def simulate_job(sync, documents, docs_per_second, startup_seconds, poller):
+    """Corre esperar_completacion_job contra un job simulado y retorna métricas."""
+    clock = poller.clock
+    client = LocalBedrockAgentClient(
+        clock,
+        documents=documents,
+        docs_per_second=docs_per_second,
+        startup_seconds=startup_seconds
+    )
+    sync.bedrock_agent_client = client
+
+    job_id = client.start_ingestion_job('LOCALKB', 'LOCALDS001')['ingestionJob']['ingestionJobId']
+    started = clock.now()
+    status, _ = sync.esperar_completacion_job('LOCALDS001', job_id, timeout=3600, poller=poller)
+
+    return {
+        'status': status,
+        'polls': client.calls.get('get_ingestion_job', 0),
+        'detected_at': clock.now() - started,
+        'lag': clock.now() - started - client.job_duration()
+    }
+
+
+def simulate_direct(sync, changed, docs_per_second, poller):
+    """Corre ingestar_documentos_directo con `changed` documentos actualizados."""
+    clock = poller.clock
+    client = LocalBedrockAgentClient(clock, docs_per_second=docs_per_second)
+    sync.bedrock_agent_client = client
+
+    ds = {'id': 'LOCALDS001', 'name': 'eventos', 'bucket': 'local'}
+    cambios = {
+        'added': [],
+        'updated': [f"datasets/eventos/eventos_{i:04d}.txt" for i in range(changed)],
+        'deleted': [],
+        'run_id': datetime.now().isoformat()
+    }
+    started = clock.now()
+    entry = sync.ingestar_documentos_directo(ds, cambios, poller=poller)
+
+    return {
+        'status': entry['status'],
+        'polls': client.calls.get('get_knowledge_base_documents', 0),
+        'detected_at': clock.now() - started
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara polling fijo vs adaptativo contra jobs simulados")
+    parser.add_argument('--docs', type=int, nargs='+', default=[20, 200, 1000],
+                        help="Tamaños de job a simular (documentos)")
+    parser.add_argument('--docs-per-second', type=float, default=2.0,
+                        help="Velocidad de indexación simulada (default: 2.0)")
+    parser.add_argument('--startup-seconds', type=float, default=15.0,
+                        help="Duración del estado STARTING (default: 15)")
+    parser.add_argument('--direct', type=int, nargs='*', default=[],
+                        help="Documentos cambiados a simular con ingesta directa (compara contra --docs)")
+    args = parser.parse_args(argv)
+
+    sync = load_sync_module()
+    from adaptive_polling import AdaptivePoller
+
+    strategies = {
+        'fijo 10s': lambda clock: AdaptivePoller(clock=clock, initial_interval=10, max_interval=10, backoff=1.0),
+        'adaptativo': lambda clock: AdaptivePoller(
+            clock=clock,
+            initial_interval=sync.POLL_INITIAL_INTERVAL,
+            max_interval=sync.POLL_MAX_INTERVAL
+        ),
+    }
+
+    rows = []
+    for documents in args.docs:
+        for name, build_poller in strategies.items():
+            metrics = simulate_job(
+                sync, documents, args.docs_per_second, args.startup_seconds, build_poller(ManualClock())
+            )
+            rows.append((documents, name, metrics))
+
+    print("\n" + "="*80)
+    print("⏱️  POLLING FIJO VS ADAPTATIVO (tiempo simulado)")
+    print("="*80)
+    print(f"   {'Docs':>6}  {'Estrategia':<12}{'Status':<10}{'Consultas':>10}{'Detectado':>12}{'Retraso':>10}")
+    for documents, name, m in rows:
+        print(f"   {documents:>6}  {name:<12}{m['status']:<10}{m['polls']:>10}"
+              f"{m['detected_at']:>11.1f}s{m['lag']:>9.1f}s")
+
+    if args.direct:
+        print("\n" + "="*80)
+        print("📨 INGESTA DIRECTA VS INGESTION JOB COMPLETO (tiempo simulado)")
+        print("="*80)
+        print(f"   {'Cambiados':>9}  {'Status':<10}{'Consultas':>10}{'Directa':>10}  vs job completo")
+        for changed in args.direct:
+            m = simulate_direct(sync, changed, args.docs_per_second, strategies['adaptativo'](ManualClock()))
+            full = ", ".join(
+                f"{documents} docs {metrics['detected_at']:.0f}s"
+                for documents, name, metrics in rows if name == 'adaptativo'
+            )
+            print(f"   {changed:>9}  {m['status']:<10}{m['polls']:>10}{m['detected_at']:>9.1f}s  ({full})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Historial y métricas de throughput de los ingestion jobs
+
+Por cada job terminado:
+- Calcula duración (startedAt → updatedAt del job) y documentos por segundo
+- Guarda estadísticas y tiempos en la tabla DynamoDB de historial
+  (partition key data_source_id, sort key started_at)
+- Emite métricas CloudWatch por data source en Embedded Metric Format: basta con
+  imprimir el JSON en los logs de la Lambda, sin llamadas extra a CloudWatch
+"""
+
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+
+
+METRICS_NAMESPACE = 'VirtualAssistant/KnowledgeBaseSync'
+
+# Días que se conserva cada registro del historial (atributo TTL de la tabla)
+HISTORY_TTL_DAYS = 365
+
+FINAL_STATUSES = ('COMPLETE', 'FAILED', 'STOPPED')
+
+# Estadísticas de get_ingestion_job que se guardan en el historial
+STATISTICS_FIELDS = (
+    'numberOfDocumentsScanned',
+    'numberOfMetadataDocumentsScanned',
+    'numberOfNewDocumentsIndexed',
+    'numberOfModifiedDocumentsIndexed',
+    'numberOfMetadataDocumentsModified',
+    'numberOfDocumentsDeleted',
+    'numberOfDocumentsFailed'
+)
+
+
+def _parse_time(value):
+    """startedAt/updatedAt llegan como datetime (boto3) o ISO 8601 (Step Functions)."""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+
+def calcular_metricas(job):
+    """
+    Retorna duration_seconds, documents_processed y docs_per_second de un job
+    con statistics, started_at y ended_at (las dos últimas pueden faltar).
+    """
+    statistics = job.get('statistics') or {}
+    processed = (
+        statistics.get('numberOfNewDocumentsIndexed', 0)
+        + statistics.get('numberOfModifiedDocumentsIndexed', 0)
+        + statistics.get('numberOfDocumentsDeleted', 0)
+        + statistics.get('numberOfDocumentsFailed', 0)
+    )
+
+    started_at = _parse_time(job.get('started_at'))
+    ended_at = _parse_time(job.get('ended_at'))
+    if started_at and ended_at:
+        duration = (ended_at - started_at).total_seconds()
+    else:
+        # Sin tiempos del job: lo que esperó el poller
+        duration = job.get('wait_seconds')
+
+    return {
+        'duration_seconds': round(duration, 1) if duration is not None else None,
+        'documents_processed': processed,
+        'docs_per_second': round(processed / duration, 3) if duration else None
+    }
+
+
+def _to_dynamodb(value):
+    """DynamoDB no acepta float: se convierten a Decimal."""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {k: _to_dynamodb(v) for k, v in value.items() if v is not None}
+    return value
+
+
+def guardar_historial(table, knowledge_base_id, jobs):
+    """
+    Guarda un registro por job terminado. Retorna la cantidad escrita.
+    knowledge_base_id aplica a los jobs que no indican su propio Knowledge Base.
+    """
+    expires_at = int(time.time()) + HISTORY_TTL_DAYS * 24 * 3600
+    written = 0
+
+    with table.batch_writer() as batch:
+        for job in jobs:
+            if job.get('status') not in FINAL_STATUSES:
+                continue
+
+            statistics = job.get('statistics') or {}
+            item = {
+                'data_source_id': job['data_source_id'],
+                'started_at': str(job.get('started_at') or job.get('completed_at') or datetime.now().isoformat()),
+                'ended_at': str(job['ended_at']) if job.get('ended_at') else None,
+                'data_source_name': job.get('data_source_name'),
+                'knowledge_base_id': job.get('knowledge_base_id') or knowledge_base_id,
+                'job_id': job.get('job_id'),
+                'status': job['status'],
+                'statistics': {field: statistics[field] for field in STATISTICS_FIELDS if field in statistics},
+                'duration_seconds': job.get('duration_seconds'),
+                'documents_processed': job.get('documents_processed'),
+                'docs_per_second': job.get('docs_per_second'),
+                'polls': job.get('polls'),
+                'ttl': expires_at
+            }
+            batch.put_item(Item=_to_dynamodb(item))
+            written += 1
+
+    return written
+
+
+def emitir_metricas(jobs, namespace=METRICS_NAMESPACE):
+    """Imprime un registro EMF por job terminado (dimensión DataSource)."""
+    for job in jobs:
+        if job.get('status') not in FINAL_STATUSES or job.get('duration_seconds') is None:
+            continue
+
+        statistics = job.get('statistics') or {}
+        metrics = {
+            'IngestionDurationSeconds': (job['duration_seconds'], 'Seconds'),
+            'DocumentsProcessed': (job.get('documents_processed', 0), 'Count'),
+            'DocumentsFailed': (statistics.get('numberOfDocumentsFailed', 0), 'Count'),
+            'IngestionJobFailed': (0 if job['status'] == 'COMPLETE' else 1, 'Count')
+        }
+        if job.get('docs_per_second') is not None:
+            metrics['DocumentsPerSecond'] = (job['docs_per_second'], 'Count/Second')
+
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': namespace,
+                    'Dimensions': [['DataSource']],
+                    'Metrics': [{'Name': name, 'Unit': unit} for name, (_, unit) in metrics.items()]
+                }]
+            },
+            'DataSource': job.get('data_source_name') or job['data_source_id'],
+            'JobId': job.get('job_id')
+        }
+        record.update({name: value for name, (value, _) in metrics.items()})
+        print(json.dumps(record))
@@ -5,21 +5,86 @@ Sincroniza los 4 data sources del Knowledge Base de Bedrock SECUENCIALMENTE
 """
 import os
 import json
-import boto3
 import time
+import boto3
+import hashlib
+import functools
+import threading
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from adaptive_polling import AdaptivePoller, SystemClock, ingestion_progress
+from ingestion_history import calcular_metricas, guardar_historial, emitir_metricas
+from pipeline_ledger import LEDGER, iniciar_ledger, registrar_contadores, resumen_ledger
 
 s3_client = boto3.client('s3')
 bedrock_agent_client = boto3.client('bedrock-agent')
-lambda_client = boto3.client('lambda')
+ssm_client = boto3.client('ssm')
+dynamodb = boto3.resource('dynamodb')
 
 # Variables de entorno
 S3_BUCKET_NAME = os.environ['S3_BUCKET_NAME']
 S3_VECTORIAL_PREFIX = os.environ.get('S3_VECTORIAL_PREFIX', 'vectorial/')
 KNOWLEDGE_BASE_ID = os.environ['KNOWLEDGE_BASE_ID']
+# Con kb_sharding=per_type hay un Knowledge Base por tipo de documento: se
+# sincronizan en paralelo (Bedrock limita a 1 ingestion job por Knowledge Base)
+KNOWLEDGE_BASE_IDS = [kb for kb in os.environ.get('KNOWLEDGE_BASE_IDS', '').split(',') if kb] or [KNOWLEDGE_BASE_ID]
 AGENT_ID = os.environ['AGENT_ID']
-CHAT_LAMBDA_FUNCTION_NAME = os.environ.get('CHAT_LAMBDA_FUNCTION_NAME', '')
+# Parámetro SSM con el alias activo; el chat lo lee con cache TTL
+AGENT_ALIAS_PARAMETER = os.environ.get('AGENT_ALIAS_PARAMETER', '')
+
+# Fingerprints del último ingestion job exitoso por data source
+SYNC_STATE_KEY = os.environ.get('SYNC_STATE_KEY', 'sync-state/data_source_fingerprints.json')
+
+# Interruptor del flujo completo (ingestion_wait=lambda): sin LAMBDA_SYNC_ENABLED=true
+# el handler retorna sin sincronizar, preparar el agente ni crear alias. Las
+# acciones de la state machine nativa (STEP_FUNCTIONS_ACTIONS) no dependen de él
+LAMBDA_SYNC_ENABLED = os.environ.get('LAMBDA_SYNC_ENABLED', 'false').lower() == 'true'
+
+# Manifiesto de cambios del ETL (etl_changes.py) para la ingesta directa de
+# documentos; sobre DIRECT_INGEST_MAX_DOCUMENTS cambios por data source (o con 0)
+# se usa el ingestion job completo del prefijo
+ETL_CHANGE_MANIFEST_KEY = os.environ.get('ETL_CHANGE_MANIFEST_KEY', 'sync-state/etl_change_manifest.json')
+DIRECT_INGEST_MAX_DOCUMENTS = int(os.environ.get('DIRECT_INGEST_MAX_DOCUMENTS', '50'))
+DIRECT_INGEST_BATCH_SIZE = int(os.environ.get('DIRECT_INGEST_BATCH_SIZE', '10'))
+
+# Tabla DynamoDB con estadísticas y throughput de cada ingestion job
+INGESTION_HISTORY_TABLE = os.environ.get('INGESTION_HISTORY_TABLE', '')
+
+# Listados S3 concurrentes (un prefijo por tarea)
+LIST_MAX_WORKERS = int(os.environ.get('LIST_MAX_WORKERS', '8'))
+
+# Polling adaptativo (segundos): intervalo inicial y máximo del backoff
+POLL_INITIAL_INTERVAL = float(os.environ.get('POLL_INITIAL_INTERVAL', '2'))
+POLL_MAX_INTERVAL = float(os.environ.get('POLL_MAX_INTERVAL', '20'))
+
+# Reloj usado por los waits; bedrock_local.py lo reemplaza por un ManualClock
+clock = SystemClock()
+
+# Los Knowledge Bases en paralelo comparten el archivo de fingerprints
+fingerprints_lock = threading.Lock()
 
+# Ledger de ejecución del pipeline (pipeline_ledger, capa compartida): llamadas
+# a APIs AWS. La sincronización no escribe datos, así que no informa bytes
+for _client in (s3_client, bedrock_agent_client, ssm_client, dynamodb.meta.client):
+    registrar_contadores(_client.meta.events, medir_bytes=False)
+
+
+def con_ledger(handler):
+    """
+    Agrega a la respuesta las métricas de la etapa para el ledger de
+    ejecuciones del pipeline (la state machine las guarda en DynamoDB)
+    """
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        inicio, started_at = iniciar_ledger(medir_bytes=False)
+        response = handler(event, context)
+        if isinstance(response, dict):
+            response['ledger'] = resumen_ledger(context, inicio, started_at)
+        return response
+    return wrapper
+
+
+@con_ledger
 def lambda_handler(event, context):
     """
     Main handler - Sincroniza base de datos vectorial y actualiza Knowledge Base
@@ -27,23 +92,54 @@ def lambda_handler(event, context):
     """
    
     
+    # Pasos invocados por la state machine cuando la espera de ingestion jobs y
+    # de preparación del agente corre en Step Functions (ingestion_wait=stepfunctions)
+    action = (event or {}).get('action')
+    if action in STEP_FUNCTIONS_ACTIONS:
+        return STEP_FUNCTIONS_ACTIONS[action](event)
+    
     results = {
         'timestamp': datetime.now().isoformat(),
         'knowledge_base_id': KNOWLEDGE_BASE_ID,
+        'knowledge_base_ids': KNOWLEDGE_BASE_IDS,
         'agent_id': AGENT_ID,
         'steps': {}
     }
 
-    return {
+    if not LAMBDA_SYNC_ENABLED:
+        print("   ⏸️  Sincronización deshabilitada (LAMBDA_SYNC_ENABLED != true)")
+        results['status'] = 'disabled'
+        return {
             'statusCode': 200,
             'body': json.dumps(results)
         }
-    
+
     try:
-        archivos = listar_archivos_vectoriales()
-        results['steps']['archivos_encontrados'] = len(archivos)
+        data_source_ids = obtener_data_source_ids()
         
-        if len(archivos) == 0:
+        if not data_source_ids or len(data_source_ids) == 0:
+            raise Exception("No se encontraron Data Sources en el Knowledge Base")
+        
+        # s3_prefixes limita la sincronización (p. ej. solo FAQs desde el fast path)
+        prefijos = (event or {}).get('s3_prefixes')
+        if prefijos:
+            data_source_ids = filtrar_por_prefijos(data_source_ids, prefijos)
+            if not data_source_ids:
+                print(f"   ⚠️  Ningún data source cubre {', '.join(prefijos)}")
+                results['status'] = 'no_data_source'
+                results['message'] = 'Ningún data source cubre los prefijos indicados'
+                return {
+                    'statusCode': 200,
+                    'body': json.dumps(results)
+                }
+        
+        # Manifiesto (key, ETag, tamaño, mtime) de los prefijos de cada data source
+        manifiesto = listar_archivos_vectoriales(data_source_ids)
+        total_archivos = sum(len(m['objects']) for m in manifiesto.values())
+        results['steps']['archivos_encontrados'] = total_archivos
+        LEDGER['records_in'] = total_archivos
+        
+        if total_archivos == 0:
             print("   ⚠️  No hay archivos para sincronizar")
             results['status'] = 'no_data'
             results['message'] = 'No hay archivos vectoriales para sincronizar'
@@ -52,21 +148,42 @@ def lambda_handler(event, context):
                 'body': json.dumps(results)
             }
         
-        data_source_ids = obtener_data_source_ids()
-        
-        if not data_source_ids or len(data_source_ids) == 0:
-            raise Exception("No se encontraron Data Sources en el Knowledge Base")
-        
-        
-        ingestion_jobs = sincronizar_data_sources_secuencialmente(data_source_ids)
+        # force_sync=true en el evento ignora los fingerprints guardados
+        force_sync = bool((event or {}).get('force_sync', False))
+        # El ETL informa su manifiesto por referencia S3 (etl_manifest) en el payload
+        referencia_etl = (event or {}).get('etl_manifest')
+        manifiesto_etl = None if force_sync else cargar_manifiesto_etl(referencia_etl)
+        ingestion_jobs = sincronizar_data_sources_secuencialmente(
+            data_source_ids, manifiesto, force=force_sync, manifiesto_etl=manifiesto_etl
+        )
+        registrar_historial_ingestion(ingestion_jobs)
         
         results['steps']['ingestion_jobs'] = {
             'total': len(data_source_ids),
             'completed': sum(1 for job in ingestion_jobs if job.get('status') == 'COMPLETE'),
             'failed': sum(1 for job in ingestion_jobs if job.get('status') == 'error'),
+            'skipped': sum(1 for job in ingestion_jobs if job.get('status') == 'SKIPPED_UNCHANGED'),
             'jobs': ingestion_jobs
         }
         
+        # Preparar agente, crear alias y publicarlo solo si algo cambió en el índice
+        cambios = resumir_cambios_indexados(ingestion_jobs)
+        results['steps']['index_changes'] = cambios
+        LEDGER['records_out'] = cambios['indexed'] + cambios['deleted']
+        
+        if not cambios['changed']:
+            print("\n   💤 Ningún job indexó ni eliminó documentos: se omite preparación del agente y alias")
+            results['steps']['agent_preparation'] = {
+                'status': 'skipped',
+                'reason': 'no_index_changes'
+            }
+            results['status'] = 'no_op'
+            results['message'] = f'Sin cambios en el índice: {results["steps"]["ingestion_jobs"]["completed"]} jobs completados, {results["steps"]["ingestion_jobs"]["skipped"]} sin cambios; agente y alias sin modificar'
+            return {
+                'statusCode': 200,
+                'body': json.dumps(results)
+            }
+        
         try:
             prepare_response = bedrock_agent_client.prepare_agent(
                 agentId=AGENT_ID
@@ -79,7 +196,7 @@ def lambda_handler(event, context):
                 'status': agent_status,
                 'prepared_at': str(prepared_at_time)
             }
-            agent_ready = esperar_agente_preparado(timeout=300, check_interval=10)
+            agent_ready = esperar_agente_preparado(timeout=300)
             
             if not agent_ready:
                 results['steps']['agent_preparation']['warning'] = 'Agent did not reach PREPARED state'
@@ -94,10 +211,10 @@ def lambda_handler(event, context):
                     }
                     
 
-                    actualizar_lambda_chat(new_alias_id)
+                    publicar_alias_activo(new_alias_id)
                     
-                    results['steps']['lambda_update'] = {
-                        'lambda_function_name': CHAT_LAMBDA_FUNCTION_NAME,
+                    results['steps']['alias_config'] = {
+                        'parameter_name': AGENT_ALIAS_PARAMETER,
                         'new_alias_id': new_alias_id,
                         'updated_at': datetime.now().isoformat()
                     }
@@ -111,7 +228,7 @@ def lambda_handler(event, context):
             }
         
         results['status'] = 'success'
-        results['message'] = f'Sincronización completada: {results["steps"]["ingestion_jobs"]["completed"]} exitosos, {results["steps"]["ingestion_jobs"]["failed"]} fallidos'
+        results['message'] = f'Sincronización completada: {results["steps"]["ingestion_jobs"]["completed"]} exitosos, {results["steps"]["ingestion_jobs"]["failed"]} fallidos, {results["steps"]["ingestion_jobs"]["skipped"]} sin cambios'
         
         
         return {
@@ -130,62 +247,610 @@ def lambda_handler(event, context):
         }
 
 
-def sincronizar_data_sources_secuencialmente(data_sources):
+# ============================================================================
+# PASOS PARA STEP FUNCTIONS (espera nativa con Wait/Choice)
+# ============================================================================
+
+def planificar_ingestion(event):
     """
-    Sincroniza cada data source UNO POR UNO esperando que complete
-    AWS Bedrock solo permite 1 ingestion job concurrente por Knowledge Base
+    Lista los data sources y su manifiesto y retorna solo los que cambiaron.
+    La state machine inicia y espera sus ingestion jobs; los que el manifiesto
+    del ETL cubre (etl_manifest, ver cambios_directos) llevan sus documentos
+    en direct y usan la ingesta directa.
+    
+    knowledge_bases agrupa los pendientes por Knowledge Base: la state machine
+    recorre los grupos en paralelo y los data sources de cada uno en secuencia
+    (Bedrock permite 1 ingestion job a la vez por Knowledge Base)
     """
-    ingestion_jobs = []
+    data_sources = obtener_data_source_ids()
+    if not data_sources:
+        raise Exception("No se encontraron Data Sources en el Knowledge Base")
+    if event.get('s3_prefixes'):
+        data_sources = filtrar_por_prefijos(data_sources, event['s3_prefixes'])
+        # Igual que no_data_source en el flujo Lambda: no hay nada que sincronizar
+        if not data_sources:
+            raise Exception(f"Ningún data source cubre {', '.join(event['s3_prefixes'])}")
+    
+    manifiesto = listar_archivos_vectoriales(data_sources)
+    fingerprints = cargar_fingerprints()
+    force = bool(event.get('force_sync', False))
+    manifiesto_etl = None if force else cargar_manifiesto_etl(event.get('etl_manifest'))
     
-    for idx, ds in enumerate(data_sources, 1):
-        print(f"\n{'='*60}")
-        print(f"📥 [{idx}/{len(data_sources)}] Sincronizando: {ds['name']}")
-        print(f"{'='*60}")
+    pendientes = []
+    omitidos = []
+    for ds in data_sources:
+        fingerprint = calcular_fingerprint_data_source(manifiesto.get(ds['id']))
+        omitido = omitir_si_sin_cambios(ds, fingerprint, fingerprints, force)
+        if omitido:
+            omitidos.append(omitido)
+            continue
         
-        try:
-            # Iniciar ingestion job
-            print(f"   🚀 Iniciando job para data source: {ds['id']}")
-            ingestion_response = bedrock_agent_client.start_ingestion_job(
-                knowledgeBaseId=KNOWLEDGE_BASE_ID,
-                dataSourceId=ds['id'],
-                description=f"Sincronización automática secuencial - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            )
-            
-            job_id = ingestion_response['ingestionJob']['ingestionJobId']
-            job_status = ingestion_response['ingestionJob']['status']
-            
-            print(f"   ✓ Job iniciado: {job_id}")
-            print(f"   ⏱️  Status inicial: {job_status}")
-            
-            # Esperar a que el job complete
-            print(f"   ⏳ Esperando completación del job...")
-            final_status = esperar_completacion_job(ds['id'], job_id)
-            
-            ingestion_jobs.append({
-                'data_source_id': ds['id'],
-                'data_source_name': ds['name'],
-                'job_id': job_id,
-                'status': final_status,
-                'completed_at': datetime.now().isoformat()
-            })
-            
-            print(f"   ✅ Job completado con status: {final_status}")
-            
-        except Exception as e:
-            error_msg = str(e)
-            print(f"   ❌ Error al sincronizar {ds['name']}: {error_msg}")
-            
+        pendiente = {'id': ds['id'], 'name': ds['name'], 'kb_id': ds['kb_id'], 'fingerprint': fingerprint}
+        # Con direct el Map ingesta solo esos documentos en vez del prefijo completo
+        cambios = cambios_directos(manifiesto_etl, ds, fingerprints)
+        if cambios is not None:
+            pendiente.update(bucket=ds['bucket'], direct=cambios)
+        pendientes.append(pendiente)
+    
+    grupos = {}
+    for pendiente in pendientes:
+        grupos.setdefault(knowledge_base_de(pendiente), []).append(pendiente)
+    
+    return {
+        'archivos_encontrados': sum(len(m['objects']) for m in manifiesto.values()),
+        'data_sources': pendientes,
+        'knowledge_bases': [{'kb_id': kb_id, 'data_sources': grupo} for kb_id, grupo in grupos.items()],
+        'skipped': omitidos
+    }
+
+
+def registrar_ingestion(event):
+    """
+    Recibe el resultado del Map de ingestion jobs (una lista por Knowledge
+    Base), guarda fingerprints de los COMPLETE y decide si hay que preparar el
+    agente (mismo criterio que resumir_cambios_indexados en el flujo Lambda)
+    """
+    fingerprints = cargar_fingerprints()
+    ingestion_jobs = list(event.get('plan', {}).get('skipped', []))
+    items = [item for grupo in event.get('jobs', []) for item in (grupo if isinstance(grupo, list) else [grupo])]
+    
+    for item in items:
+        ds = item['data_source']
+        
+        if 'error' in item:
             ingestion_jobs.append({
                 'data_source_id': ds['id'],
                 'data_source_name': ds['name'],
+                'knowledge_base_id': ds.get('kb_id'),
                 'status': 'error',
-                'error': error_msg
+                'error': item['error'].get('Cause', item['error'].get('Error'))
             })
+            continue
+        
+        # Ingesta directa (sin fallback al job completo): la entrada ya viene armada
+        if 'direct' in item:
+            job_entry = item['direct']
+            job_entry.pop('ledger', None)
+            ingestion_jobs.append(job_entry)
+            if job_entry['status'] in ('COMPLETE', 'SKIPPED_UNCHANGED'):
+                registrar_fingerprint(fingerprints, ds['id'], ds.get('fingerprint'), job_entry['job_id'])
+            continue
+        
+        job_id = item['job']['ingestion_job_id']
+        ingestion_job = item['job_status']['IngestionJob']
+        final_status = ingestion_job['Status']
+        statistics = claves_camel_case(ingestion_job.get('Statistics'))
+        
+        job_entry = {
+            'data_source_id': ds['id'],
+            'data_source_name': ds['name'],
+            'knowledge_base_id': ds.get('kb_id'),
+            'job_id': job_id,
+            'status': final_status,
+            'statistics': statistics,
+            'started_at': ingestion_job.get('StartedAt'),
+            'ended_at': ingestion_job.get('UpdatedAt')
+        }
+        job_entry.update(calcular_metricas(job_entry))
+        ingestion_jobs.append(job_entry)
+        
+        if final_status == 'COMPLETE':
+            registrar_fingerprint(fingerprints, ds['id'], ds.get('fingerprint'), job_id)
+    
+    registrar_historial_ingestion(ingestion_jobs)
+    cambios = resumir_cambios_indexados(ingestion_jobs)
+    return {
+        'changed': cambios['changed'],
+        'failed': sum(1 for job in ingestion_jobs if job.get('status') == 'error'),
+        'index_changes': cambios,
+        'jobs': ingestion_jobs
+    }
+
+
+def ingestar_directo(event):
+    """
+    Ingesta directa de un data source planificado con direct. Un error
+    propaga y la state machine usa el ingestion job completo
+    """
+    ds = event['data_source']
+    return ingestar_documentos_directo(ds, ds['direct'])
+
+
+def publicar_alias(event):
+    """Crea el alias del agente ya PREPARED y lo publica en SSM"""
+    new_alias_id = crear_nuevo_alias('PREPARED', event.get('prepared_at'))
+    if not new_alias_id:
+        raise Exception("No se pudo crear el alias del agente")
+    
+    publicar_alias_activo(new_alias_id)
+    return {
+        'alias_id': new_alias_id,
+        'parameter_name': AGENT_ALIAS_PARAMETER,
+        'updated_at': datetime.now().isoformat()
+    }
+
+
+def claves_camel_case(statistics):
+    """Las integraciones SDK de Step Functions retornan claves en PascalCase"""
+    if not statistics:
+        return statistics
+    return {key[:1].lower() + key[1:]: value for key, value in statistics.items()}
+
+
+def registrar_historial_ingestion(ingestion_jobs):
+    """
+    Emite métricas de duración y docs/s por data source y guarda los jobs en
+    la tabla de historial. Un error aquí no interrumpe la sincronización.
+    """
+    emitir_metricas(ingestion_jobs)
+    
+    if not INGESTION_HISTORY_TABLE:
+        return
+    
+    try:
+        written = guardar_historial(dynamodb.Table(INGESTION_HISTORY_TABLE), KNOWLEDGE_BASE_ID, ingestion_jobs)
+        print(f"   🗂️  {written} jobs guardados en {INGESTION_HISTORY_TABLE}")
+    except Exception as e:
+        print(f"   ⚠️  Error al guardar historial de ingestion: {str(e)}")
+
+
+def formatear_fecha(value):
+    """datetime de boto3 → ISO 8601 (serializable en el resultado JSON)"""
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+STEP_FUNCTIONS_ACTIONS = {
+    'plan_ingestion': planificar_ingestion,
+    'ingest_direct': ingestar_directo,
+    'record_ingestion': registrar_ingestion,
+    'publish_alias': publicar_alias
+}
+
+
+def sincronizar_data_sources_secuencialmente(data_sources, manifiesto, force=False, manifiesto_etl=None):
+    """
+    Sincroniza cada data source UNO POR UNO esperando que complete
+    AWS Bedrock solo permite 1 ingestion job concurrente por Knowledge Base
+    
+    Los data sources cuyo prefijo S3 tiene el mismo fingerprint que en el último
+    job exitoso se omiten (status SKIPPED_UNCHANGED), salvo con force=True.
+    Si el manifiesto del ETL cubre los cambios del data source y no supera
+    DIRECT_INGEST_MAX_DOCUMENTS, se envían solo esos documentos (ingesta directa)
+    
+    Con varios Knowledge Bases cada uno sincroniza sus data sources en secuencia
+    y los Knowledge Bases corren en paralelo
+    """
+    fingerprints = cargar_fingerprints()
+    
+    grupos = {}
+    for ds in data_sources:
+        grupos.setdefault(knowledge_base_de(ds), []).append(ds)
+    
+    def sincronizar_grupo(grupo):
+        return [
+            sincronizar_data_source(ds, idx, len(grupo), manifiesto, fingerprints, force, manifiesto_etl)
+            for idx, ds in enumerate(grupo, 1)
+        ]
+    
+    if len(grupos) == 1:
+        return sincronizar_grupo(data_sources)
+    
+    print(f"\n   🔀 Sincronizando {len(grupos)} Knowledge Bases en paralelo")
+    with ThreadPoolExecutor(max_workers=len(grupos)) as executor:
+        resultados = list(executor.map(sincronizar_grupo, grupos.values()))
+    return [job for jobs in resultados for job in jobs]
+
+
+def sincronizar_data_source(ds, idx, total, manifiesto, fingerprints, force=False, manifiesto_etl=None):
+    """Sincroniza un data source y retorna la entrada de su ingestion job"""
+    knowledge_base_id = knowledge_base_de(ds)
+    
+    print(f"\n{'='*60}")
+    print(f"📥 [{idx}/{total}] Sincronizando: {ds['name']} (KB {knowledge_base_id})")
+    print(f"{'='*60}")
+    
+    fingerprint = calcular_fingerprint_data_source(manifiesto.get(ds['id']))
+    omitido = omitir_si_sin_cambios(ds, fingerprint, fingerprints, force)
+    if omitido:
+        return omitido
+    
+    cambios = cambios_directos(manifiesto_etl, ds, fingerprints)
+    if cambios is not None:
+        try:
+            job_entry = ingestar_documentos_directo(ds, cambios)
+            if job_entry['status'] in ('COMPLETE', 'SKIPPED_UNCHANGED'):
+                registrar_fingerprint(fingerprints, ds['id'], fingerprint, job_entry['job_id'])
+            return job_entry
+        except Exception as e:
+            print(f"   ⚠️  Ingesta directa falló ({str(e)}), se usa el ingestion job completo")
+    
+    try:
+        # Iniciar ingestion job
+        print(f"   🚀 Iniciando job para data source: {ds['id']}")
+        ingestion_response = bedrock_agent_client.start_ingestion_job(
+            knowledgeBaseId=knowledge_base_id,
+            dataSourceId=ds['id'],
+            description=f"Sincronización automática secuencial - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        )
+        
+        job_id = ingestion_response['ingestionJob']['ingestionJobId']
+        job_status = ingestion_response['ingestionJob']['status']
+        
+        print(f"   ✓ Job iniciado: {job_id}")
+        print(f"   ⏱️  Status inicial: {job_status}")
+        
+        # Esperar a que el job complete
+        print(f"   ⏳ Esperando completación del job...")
+        poller = crear_poller()
+        final_status, ingestion_job = esperar_completacion_job(
+            ds['id'], job_id, poller=poller, knowledge_base_id=knowledge_base_id
+        )
+        ingestion_job = ingestion_job or {}
+        
+        job_entry = {
+            'data_source_id': ds['id'],
+            'data_source_name': ds['name'],
+            'knowledge_base_id': knowledge_base_id,
+            'job_id': job_id,
+            'status': final_status,
+            'statistics': ingestion_job.get('statistics'),
+            'started_at': formatear_fecha(ingestion_job.get('startedAt')),
+            'ended_at': formatear_fecha(ingestion_job.get('updatedAt')),
+            'polls': poller.polls,
+            'wait_seconds': round(poller.elapsed, 1),
+            'completed_at': datetime.now().isoformat()
+        }
+        job_entry.update(calcular_metricas(job_entry))
+        
+        print(f"   ✅ Job completado con status: {final_status}")
+        
+        # Guardar fingerprint solo tras un job exitoso
+        if final_status == 'COMPLETE':
+            registrar_fingerprint(fingerprints, ds['id'], fingerprint, job_id)
+        
+        return job_entry
+        
+    except Exception as e:
+        error_msg = str(e)
+        print(f"   ❌ Error al sincronizar {ds['name']}: {error_msg}")
+        
+        return {
+            'data_source_id': ds['id'],
+            'data_source_name': ds['name'],
+            'knowledge_base_id': knowledge_base_id,
+            'status': 'error',
+            'error': error_msg
+        }
+
+
+def knowledge_base_de(ds):
+    """Knowledge Base al que pertenece el data source"""
+    return ds.get('kb_id') or KNOWLEDGE_BASE_ID
+
+
+# ============================================================================
+# INGESTA DIRECTA DE DOCUMENTOS (manifiesto de cambios del ETL)
+# ============================================================================
+
+# Estados de documento aún en proceso (get_knowledge_base_documents)
+DOCUMENT_PENDING_STATUSES = ('PENDING', 'STARTING', 'IN_PROGRESS', 'DELETING', 'DELETE_IN_PROGRESS')
+DOCUMENT_INDEXED_STATUSES = ('INDEXED', 'PARTIALLY_INDEXED', 'METADATA_PARTIALLY_INDEXED')
+
+
+def cargar_manifiesto_etl(referencia=None):
+    """
+    Lee el manifiesto de cambios de la última ejecución del ETL, o None
+    referencia: {'bucket', 'key'} recibido del ETL vía Step Functions; por
+    defecto ETL_CHANGE_MANIFEST_KEY en S3_BUCKET_NAME
+    """
+    if DIRECT_INGEST_MAX_DOCUMENTS <= 0:
+        return None
+    referencia = referencia or {}
+    try:
+        response = s3_client.get_object(
+            Bucket=referencia.get('bucket') or S3_BUCKET_NAME,
+            Key=referencia.get('key') or ETL_CHANGE_MANIFEST_KEY
+        )
+        manifiesto_etl = json.loads(response['Body'].read())
+        print(f"   🧾 Manifiesto ETL {manifiesto_etl.get('generated_at')} (base: {manifiesto_etl.get('base_generated_at')})")
+        return manifiesto_etl
+    except Exception as e:
+        print(f"   ℹ️  Sin manifiesto de cambios del ETL ({str(e)}): ingestion jobs completos")
+        return None
+
+
+def cambios_directos(manifiesto_etl, ds, fingerprints):
+    """
+    Documentos agregados, actualizados y eliminados del data source según el
+    manifiesto del ETL, o None si hay que sincronizar el prefijo completo:
+    - Sin manifiesto o sin un job exitoso previo del data source
+    - El KB no estaba al día con la ejecución base del manifiesto (p. ej. el ETL
+      corrió dos veces sin sincronizar), o el manifiesto ya se aplicó
+    - Más de DIRECT_INGEST_MAX_DOCUMENTS cambios
+    """
+    if not manifiesto_etl:
+        return None
+    
+    previous = fingerprints.get(ds['id'], {})
+    base = manifiesto_etl.get('base_generated_at')
+    synced_at = previous.get('synced_at')
+    if not base or not synced_at or not (base <= synced_at < manifiesto_etl['generated_at']):
+        print(f"   ℹ️  Manifiesto ETL no aplicable a {ds['name']} (base {base}, último sync {synced_at})")
+        return None
+    if manifiesto_etl.get('bucket') != ds.get('bucket'):
+        return None
+    
+    prefixes = ds.get('prefixes') or ['']
+    cambios = {'added': [], 'updated': [], 'deleted': []}
+    for change in manifiesto_etl.get('changes', {}).values():
+        for kind, keys in cambios.items():
+            keys.extend(key for key in change.get(kind, []) if any(key.startswith(p) for p in prefixes))
+    
+    total = sum(len(keys) for keys in cambios.values())
+    if total > DIRECT_INGEST_MAX_DOCUMENTS:
+        print(f"   ℹ️  {total} documentos cambiados > {DIRECT_INGEST_MAX_DOCUMENTS}: ingestion job completo")
+        return None
+    
+    cambios['run_id'] = manifiesto_etl['generated_at']
+    return cambios
+
+
+def ingestar_documentos_directo(ds, cambios, poller=None):
+    """
+    Envía los documentos agregados/actualizados y elimina los borrados con la
+    API de ingesta directa del KB, y espera su estado final.
+    Retorna una entrada con el mismo formato que un ingestion job.
+    """
+    job_id = f"direct-{cambios['run_id']}"
+    upserts = cambios['added'] + cambios['updated']
+    deletes = cambios['deleted']
+    
+    if not upserts and not deletes:
+        print(f"   ⏭️  El manifiesto ETL no tiene cambios para {ds['name']}, se omite")
+        return {
+            'data_source_id': ds['id'],
+            'data_source_name': ds['name'],
+            'knowledge_base_id': knowledge_base_de(ds),
+            'job_id': job_id,
+            'status': 'SKIPPED_UNCHANGED',
+            'reason': 'etl_manifest_unchanged'
+        }
+    
+    print(f"   📨 Ingesta directa: {len(cambios['added'])} nuevos, {len(cambios['updated'])} actualizados, {len(deletes)} eliminados")
+    started_at = datetime.now()
+    
+    for lote in dividir_en_lotes(upserts, DIRECT_INGEST_BATCH_SIZE):
+        bedrock_agent_client.ingest_knowledge_base_documents(
+            knowledgeBaseId=knowledge_base_de(ds),
+            dataSourceId=ds['id'],
+            documents=[
+                {
+                    'content': {
+                        'dataSourceType': 'S3',
+                        's3': {'s3Location': {'uri': uri_s3(ds['bucket'], key)}}
+                    },
+                    'metadata': {
+                        'type': 'S3_LOCATION',
+                        's3Location': {'uri': uri_s3(ds['bucket'], f"{key}.metadata.json")}
+                    }
+                }
+                for key in lote
+            ]
+        )
+    
+    for lote in dividir_en_lotes(deletes, DIRECT_INGEST_BATCH_SIZE):
+        bedrock_agent_client.delete_knowledge_base_documents(
+            knowledgeBaseId=knowledge_base_de(ds),
+            dataSourceId=ds['id'],
+            documentIdentifiers=[identificador_s3(ds['bucket'], key) for key in lote]
+        )
+    
+    poller = poller or crear_poller()
+    estados = esperar_documentos(ds, upserts + deletes, poller=poller)
+    
+    added = set(cambios['added'])
+    statistics = {
+        'numberOfDocumentsScanned': len(upserts) + len(deletes),
+        'numberOfNewDocumentsIndexed': sum(1 for k in upserts if k in added and estados[k] in DOCUMENT_INDEXED_STATUSES),
+        'numberOfModifiedDocumentsIndexed': sum(1 for k in upserts if k not in added and estados[k] in DOCUMENT_INDEXED_STATUSES),
+        'numberOfDocumentsDeleted': sum(1 for k in deletes if estados[k] == 'NOT_FOUND'),
+    }
+    statistics['numberOfDocumentsFailed'] = statistics['numberOfDocumentsScanned'] - sum(
+        statistics[field] for field in (
+            'numberOfNewDocumentsIndexed', 'numberOfModifiedDocumentsIndexed', 'numberOfDocumentsDeleted'
+        )
+    )
+    
+    # Con fallos no se guarda el fingerprint: la próxima ejecución reintenta
+    final_status = 'COMPLETE' if statistics['numberOfDocumentsFailed'] == 0 else 'FAILED'
+    print(f"   ✅ Ingesta directa {final_status}: {statistics['numberOfDocumentsFailed']} documentos fallidos")
+    
+    job_entry = {
+        'data_source_id': ds['id'],
+        'data_source_name': ds['name'],
+        'knowledge_base_id': knowledge_base_de(ds),
+        'job_id': job_id,
+        'mode': 'direct',
+        'status': final_status,
+        'statistics': statistics,
+        'started_at': started_at.isoformat(),
+        'ended_at': datetime.now().isoformat(),
+        'polls': poller.polls,
+        'wait_seconds': round(poller.elapsed, 1),
+        'completed_at': datetime.now().isoformat()
+    }
+    job_entry.update(calcular_metricas(job_entry))
+    return job_entry
+
+
+def esperar_documentos(ds, keys, timeout=600, poller=None):
+    """
+    Consulta get_knowledge_base_documents hasta que ningún documento quede en
+    proceso. Retorna {key: status}; los que no terminan quedan en TIMEOUT.
+    """
+    poller = poller or crear_poller()
+    estados = {key: 'PENDING' for key in keys}
+    
+    def check(elapsed):
+        pendientes = [key for key, status in estados.items() if status in DOCUMENT_PENDING_STATUSES]
+        try:
+            for lote in dividir_en_lotes(pendientes, DIRECT_INGEST_BATCH_SIZE):
+                response = bedrock_agent_client.get_knowledge_base_documents(
+                    knowledgeBaseId=knowledge_base_de(ds),
+                    dataSourceId=ds['id'],
+                    documentIdentifiers=[identificador_s3(ds['bucket'], key) for key in lote]
+                )
+                for detail in response.get('documentDetails', []):
+                    key = detail['identifier']['s3']['uri'].split(f"s3://{ds['bucket']}/", 1)[-1]
+                    if key in estados:
+                        estados[key] = detail['status']
+        except Exception as e:
+            print(f"      ❌ Error al verificar documentos: {str(e)}")
+            return False, None, None
+        
+        terminados = sum(1 for status in estados.values() if status not in DOCUMENT_PENDING_STATUSES)
+        if terminados == len(estados):
+            return True, True, None
+        print(f"      ⏳ {terminados}/{len(estados)} documentos procesados (esperando {int(elapsed)}s)")
+        return False, None, (terminados, len(estados))
+    
+    if not poller.wait(check, timeout, timeout_value=False):
+        print(f"   ⚠️  Timeout alcanzado ({timeout}s) en la ingesta directa")
+        for key, status in estados.items():
+            if status in DOCUMENT_PENDING_STATUSES:
+                estados[key] = 'TIMEOUT'
+    return estados
+
+
+def uri_s3(bucket, key):
+    return f"s3://{bucket}/{key}"
+
+
+def identificador_s3(bucket, key):
+    """Identificador de documento de un data source S3"""
+    return {'dataSourceType': 'S3', 's3': {'uri': uri_s3(bucket, key)}}
+
+
+def dividir_en_lotes(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def calcular_fingerprint_data_source(entrada_manifiesto):
+    """
+    Fingerprint del contenido de los prefijos de inclusión del data source:
+    hash SHA-256 de (key, ETag, tamaño) de todos los objetos, ordenados por key
+    
+    Args:
+        entrada_manifiesto: entrada del data source en listar_archivos_vectoriales()
     
-    return ingestion_jobs
+    Returns:
+        dict con fingerprint y cantidad de objetos, o None si el listado falló
+        (en ese caso el data source se sincroniza igual)
+    """
+    if not entrada_manifiesto or entrada_manifiesto.get('error'):
+        print(f"   ⚠️  Sin manifiesto completo, no se calcula fingerprint")
+        return None
+    
+    objetos = entrada_manifiesto['objects']
+    digest = hashlib.sha256()
+    for obj in objetos:
+        digest.update(f"{obj['key']}|{obj['etag']}|{obj['size']}\n".encode('utf-8'))
+    
+    print(f"   🔑 Fingerprint: {digest.hexdigest()[:12]} ({len(objetos)} objetos en {', '.join(entrada_manifiesto['prefixes'])})")
+    return {'fingerprint': digest.hexdigest(), 'objects': len(objetos)}
+
+
+def omitir_si_sin_cambios(ds, fingerprint, fingerprints, force=False):
+    """
+    Retorna la entrada SKIPPED_UNCHANGED del data source si su fingerprint
+    coincide con el del último job exitoso, o None si debe sincronizarse
+    """
+    previous = fingerprints.get(ds['id'], {})
+    
+    if force or not fingerprint or previous.get('fingerprint') != fingerprint['fingerprint']:
+        return None
+    
+    print(f"   ⏭️  {ds['name']}: sin cambios desde el job {previous.get('job_id')} ({fingerprint['objects']} objetos), se omite")
+    return {
+        'data_source_id': ds['id'],
+        'data_source_name': ds['name'],
+        'knowledge_base_id': knowledge_base_de(ds),
+        'status': 'SKIPPED_UNCHANGED',
+        'fingerprint': fingerprint['fingerprint'],
+        'last_job_id': previous.get('job_id')
+    }
+
+
+def registrar_fingerprint(fingerprints, data_source_id, fingerprint, job_id):
+    """Guarda el fingerprint de un job COMPLETE (si se pudo calcular)"""
+    if not fingerprint:
+        return
+    with fingerprints_lock:
+        fingerprints[data_source_id] = {
+            'fingerprint': fingerprint['fingerprint'],
+            'objects': fingerprint['objects'],
+            'job_id': job_id,
+            'synced_at': datetime.now().isoformat()
+        }
+        guardar_fingerprints(fingerprints)
+
+
+def cargar_fingerprints():
+    """Lee los fingerprints guardados (data_source_id -> último job exitoso)"""
+    try:
+        response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=SYNC_STATE_KEY)
+        return json.loads(response['Body'].read())
+    except s3_client.exceptions.NoSuchKey:
+        print(f"   ℹ️  Sin fingerprints previos en {SYNC_STATE_KEY}")
+        return {}
+    except Exception as e:
+        print(f"   ⚠️  Error al leer fingerprints: {str(e)}")
+        return {}
+
+
+def guardar_fingerprints(fingerprints):
+    """Persiste los fingerprints en S3"""
+    try:
+        s3_client.put_object(
+            Bucket=S3_BUCKET_NAME,
+            Key=SYNC_STATE_KEY,
+            Body=json.dumps(fingerprints, indent=2).encode('utf-8'),
+            ContentType='application/json'
+        )
+    except Exception as e:
+        print(f"   ⚠️  Error al guardar fingerprints: {str(e)}")
+
+
+def crear_poller():
+    """Poller adaptativo con el reloj y los intervalos configurados"""
+    return AdaptivePoller(
+        clock=clock,
+        initial_interval=POLL_INITIAL_INTERVAL,
+        max_interval=POLL_MAX_INTERVAL
+    )
 
 
-def esperar_completacion_job(data_source_id, job_id, timeout=600, check_interval=10):
+def esperar_completacion_job(data_source_id, job_id, timeout=600, poller=None, knowledge_base_id=None):
     """
     Espera a que un ingestion job complete
     
@@ -193,69 +858,100 @@ def esperar_completacion_job(data_source_id, job_id, timeout=600, check_interval
         data_source_id: ID del data source
         job_id: ID del job de ingestión
         timeout: Tiempo máximo de espera en segundos (default: 10 minutos)
-        check_interval: Intervalo entre checks en segundos (default: 10 segundos)
+        poller: AdaptivePoller a usar (default: crear_poller())
+        knowledge_base_id: Knowledge Base del data source (default: KNOWLEDGE_BASE_ID)
     
     Returns:
-        Status final del job
+        (status final del job, ingestionJob de la última consulta o None)
     """
-    start_time = time.time()
+    poller = poller or crear_poller()
     
-    while True:
-        # Verificar timeout
-        elapsed = time.time() - start_time
-        if elapsed > timeout:
-            print(f"   ⚠️  Timeout alcanzado ({timeout}s), job aún en progreso")
-            return 'TIMEOUT'
-        
+    def check(elapsed):
         try:
             # Consultar status del job
             response = bedrock_agent_client.get_ingestion_job(
-                knowledgeBaseId=KNOWLEDGE_BASE_ID,
+                knowledgeBaseId=knowledge_base_id or KNOWLEDGE_BASE_ID,
                 dataSourceId=data_source_id,
                 ingestionJobId=job_id
             )
             
-            job_status = response['ingestionJob']['status']
+            job = response['ingestionJob']
+            job_status = job['status']
             
             # Estados terminales
             if job_status in ['COMPLETE', 'FAILED', 'STOPPED']:
-                return job_status
+                return True, (job_status, job), None
             
-            # Estados en progreso
+            # Estados en progreso: las estadísticas permiten estimar el término
             if job_status in ['STARTING', 'IN_PROGRESS']:
-                print(f"      ⏳ Status: {job_status} (esperando {int(elapsed)}s)")
-                time.sleep(check_interval)
-                continue
+                progress = ingestion_progress(job.get('statistics'))
+                detalle = f", {progress[0]}/{progress[1]} docs" if progress else ""
+                print(f"      ⏳ Status: {job_status} (esperando {int(elapsed)}s{detalle})")
+                return False, None, progress
             
             # Status desconocido
             print(f"      ⚠️  Status desconocido: {job_status}")
-            return job_status
+            return True, (job_status, job), None
             
         except Exception as e:
             print(f"      ❌ Error al verificar status: {str(e)}")
-            time.sleep(check_interval)
+            return False, None, None
+    
+    final_status, ingestion_job = poller.wait(check, timeout, timeout_value=('TIMEOUT', None))
+    if final_status == 'TIMEOUT':
+        print(f"   ⚠️  Timeout alcanzado ({timeout}s), job aún en progreso")
+    print(f"   📈 {poller.polls} consultas en {poller.elapsed:.0f}s")
+    return final_status, ingestion_job
 
 
-def esperar_agente_preparado(timeout=300, check_interval=10):
+def resumir_cambios_indexados(ingestion_jobs):
+    """
+    Suma documentos indexados/eliminados según las estadísticas de los jobs.
+    Un job sin estadísticas (p. ej. TIMEOUT) cuenta como cambio posible, para
+    no dejar el agente desactualizado; los omitidos o que no iniciaron, no.
+    
+    Returns:
+        dict con indexed, deleted, failed, unknown_jobs y changed
+    """
+    resumen = {'indexed': 0, 'deleted': 0, 'failed': 0, 'unknown_jobs': 0}
+    
+    for job in ingestion_jobs:
+        if job.get('status') in ['SKIPPED_UNCHANGED', 'error']:
+            continue
+        
+        statistics = job.get('statistics')
+        if not statistics:
+            resumen['unknown_jobs'] += 1
+            continue
+        
+        resumen['indexed'] += (
+            statistics.get('numberOfNewDocumentsIndexed', 0)
+            + statistics.get('numberOfModifiedDocumentsIndexed', 0)
+            + statistics.get('numberOfMetadataDocumentsModified', 0)
+        )
+        resumen['deleted'] += statistics.get('numberOfDocumentsDeleted', 0)
+        resumen['failed'] += statistics.get('numberOfDocumentsFailed', 0)
+    
+    resumen['changed'] = resumen['indexed'] > 0 or resumen['deleted'] > 0 or resumen['unknown_jobs'] > 0
+    print(f"\n   📊 Cambios en el índice: {resumen['indexed']} indexados, {resumen['deleted']} eliminados, "
+          f"{resumen['failed']} fallidos, {resumen['unknown_jobs']} jobs sin estadísticas")
+    return resumen
+
+
+def esperar_agente_preparado(timeout=300, poller=None):
     """
     Espera a que el agente alcance el estado PREPARED
     
     Args:
         timeout: Tiempo máximo de espera en segundos (default: 5 minutos)
-        check_interval: Intervalo entre checks en segundos (default: 10 segundos)
+        poller: AdaptivePoller a usar (default: crear_poller())
     
     Returns:
         True si el agente está PREPARED, False si timeout o error
     """
-    start_time = time.time()
+    poller = poller or crear_poller()
     
-    while True:
-        # Verificar timeout
-        elapsed = time.time() - start_time
-        if elapsed > timeout:
-            print(f"   ⚠️  Timeout alcanzado ({timeout}s), agente no alcanzó estado PREPARED")
-            return False
-        
+    def check(elapsed):
         try:
             # Consultar estado del agente
             response = bedrock_agent_client.get_agent(
@@ -270,99 +966,128 @@ def esperar_agente_preparado(timeout=300, check_interval=10):
             if agent_status in ['PREPARED', 'NOT_PREPARED', 'FAILED', 'VERSIONING']:
                 if agent_status == 'PREPARED':
                     print(f"   ✅ Agente en estado PREPARED, listo para crear alias")
-                    return True
+                    return True, True, None
                 else:
                     print(f"   ⚠️  Agente en estado {agent_status}, no se puede crear alias")
-                    return False
+                    return True, False, None
             
             # Estados en progreso
             if agent_status in ['PREPARING', 'UPDATING', 'CREATING']:
-                time.sleep(check_interval)
-                continue
+                return False, None, None
             
             # Estado desconocido
             print(f"   ⚠️  Estado desconocido del agente: {agent_status}")
-            return False
+            return True, False, None
             
         except Exception as e:
             print(f"   ❌ Error al verificar estado del agente: {str(e)}")
-            time.sleep(check_interval)
+            return False, None, None
+    
+    ready = poller.wait(check, timeout, timeout_value=None)
+    if ready is None:
+        print(f"   ⚠️  Timeout alcanzado ({timeout}s), agente no alcanzó estado PREPARED")
+        return False
+    return ready
 
 
-def listar_archivos_vectoriales():
+def listar_archivos_vectoriales(data_sources):
     """
-    Lista archivos vectoriales en S3 validando las tres carpetas:
-    - eventos/
-    - restaurantes/
-    - stores/
-    Cada carpeta debe contener archivos .jsonl
+    Lista en paralelo y con paginación los prefijos de inclusión de cada data
+    source del Knowledge Base (ver obtener_data_source_ids)
+    
+    Returns:
+        Manifiesto por data source ID:
+        {'name', 'prefixes', 'objects': [{key, etag, size, last_modified}], 'error'}
+        con los objetos ordenados por key, reutilizable para detectar cambios
     """
-    archivos = []
-    carpetas_requeridas = ['eventos', 'restaurantes', 'stores']
+    manifiesto = {
+        ds['id']: {'name': ds['name'], 'prefixes': ds.get('prefixes', []), 'objects': [], 'error': None}
+        for ds in data_sources
+    }
+    tareas = [(ds, prefix) for ds in data_sources for prefix in ds.get('prefixes', [])]
     
-    try:
-        print(f"   📂 Validando carpetas requeridas: {', '.join(carpetas_requeridas)}")
-        
-        for carpeta in carpetas_requeridas:
-            # Construir el prefijo completo para cada carpeta
-            carpeta_prefix = f"{S3_VECTORIAL_PREFIX.rstrip('/')}/{carpeta}/"
-            
-            print(f"\n   📁 Verificando carpeta: {carpeta}/")
-            
-            response = s3_client.list_objects_v2(
-                Bucket=S3_BUCKET_NAME,
-                Prefix=carpeta_prefix
-            )
-            
-            archivos_carpeta = 0
-            if 'Contents' in response:
-                for obj in response['Contents']:
-                    # Solo contar archivos .jsonl, no las carpetas mismas
-                    if obj['Key'].endswith('.jsonl'):
-                        archivos.append({
-                            'key': obj['Key'],
-                            'carpeta': carpeta,
-                            'size': obj['Size'],
-                            'last_modified': obj['LastModified'].isoformat()
-                        })
-                        archivos_carpeta += 1
-                        print(f"      ✓ {obj['Key']} ({obj['Size']} bytes)")
-            
-            if archivos_carpeta == 0:
-                print(f"      ⚠️  No se encontraron archivos .jsonl en {carpeta}/")
-            else:
-                print(f"      ✅ {archivos_carpeta} archivo(s) .jsonl encontrado(s)")
-        
-        print(f"\n   📊 Total de archivos vectoriales: {len(archivos)}")
-        
-    except Exception as e:
-        print(f"   ❌ Error al listar archivos: {str(e)}")
-        import traceback
-        traceback.print_exc()
+    if not tareas:
+        print("   ⚠️  Ningún data source tiene prefijos de inclusión")
+        return manifiesto
+    
+    print(f"   📂 Listando {len(tareas)} prefijo(s) de {len(data_sources)} data source(s)")
+    
+    with ThreadPoolExecutor(max_workers=min(LIST_MAX_WORKERS, len(tareas))) as pool:
+        futures = {
+            pool.submit(listar_prefijo, ds['bucket'], prefix): (ds, prefix)
+            for ds, prefix in tareas
+        }
+        for future in as_completed(futures):
+            ds, prefix = futures[future]
+            try:
+                objetos = future.result()
+                manifiesto[ds['id']]['objects'].extend(objetos)
+                print(f"      ✓ s3://{ds['bucket']}/{prefix}: {len(objetos)} objeto(s)")
+            except Exception as e:
+                print(f"      ❌ Error al listar s3://{ds['bucket']}/{prefix}: {str(e)}")
+                manifiesto[ds['id']]['error'] = str(e)
     
-    return archivos
+    for entrada in manifiesto.values():
+        entrada['objects'].sort(key=lambda obj: obj['key'])
+    
+    total = sum(len(entrada['objects']) for entrada in manifiesto.values())
+    print(f"\n   📊 Total de archivos vectoriales: {total}")
+    
+    return manifiesto
+
+
+def listar_prefijo(bucket, prefix):
+    """Lista todos los objetos de un prefijo (paginado, sin límite de 1000 keys)"""
+    objetos = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            # Omitir marcadores de carpeta
+            if obj['Key'].endswith('/'):
+                continue
+            objetos.append({
+                'key': obj['Key'],
+                'etag': obj['ETag'].strip('"'),
+                'size': obj['Size'],
+                'last_modified': obj['LastModified'].isoformat()
+            })
+    
+    return objetos
 
 
 def obtener_data_source_ids():
-    """Obtiene TODOS los Data Source IDs del Knowledge Base"""
+    """
+    Obtiene TODOS los Data Sources de los Knowledge Bases (KNOWLEDGE_BASE_IDS)
+    con su bucket y prefijos de inclusión S3
+    """
     try:
-        # Listar data sources del Knowledge Base
-        response = bedrock_agent_client.list_data_sources(
-            knowledgeBaseId=KNOWLEDGE_BASE_ID
-        )
-        
         data_source_ids = []
-        if 'dataSourceSummaries' in response and len(response['dataSourceSummaries']) > 0:
-            for ds in response['dataSourceSummaries']:
-                data_source_ids.append({
-                    'id': ds['dataSourceId'],
-                    'name': ds.get('name', 'unknown'),
-                    'status': ds.get('status', 'unknown')
-                })
-            
+        paginator = bedrock_agent_client.get_paginator('list_data_sources')
+        
+        for knowledge_base_id in KNOWLEDGE_BASE_IDS:
+            for page in paginator.paginate(knowledgeBaseId=knowledge_base_id):
+                for ds in page.get('dataSourceSummaries', []):
+                    data_source_ids.append({
+                        'id': ds['dataSourceId'],
+                        'name': ds.get('name', 'unknown'),
+                        'status': ds.get('status', 'unknown'),
+                        'kb_id': knowledge_base_id
+                    })
+        
+        for ds in data_source_ids:
+            response = bedrock_agent_client.get_data_source(
+                knowledgeBaseId=ds['kb_id'],
+                dataSourceId=ds['id']
+            )
+            s3_config = response['dataSource']['dataSourceConfiguration'].get('s3Configuration', {})
+            ds['bucket'] = s3_config.get('bucketArn', f"arn:aws:s3:::{S3_BUCKET_NAME}").split(':::')[-1]
+            ds['prefixes'] = s3_config.get('inclusionPrefixes') or ['']
+        
+        if data_source_ids:
             print(f"   ℹ️  Encontrados {len(data_source_ids)} data sources:")
             for ds in data_source_ids:
-                print(f"      • {ds['name']} ({ds['id']}) - Status: {ds['status']}")
+                print(f"      • {ds['name']} ({ds['id']}) - Status: {ds['status']} - Prefijos: {', '.join(ds['prefixes'])}")
         
         return data_source_ids
         
@@ -373,6 +1098,20 @@ def obtener_data_source_ids():
         return []
 
 
+def filtrar_por_prefijos(data_sources, prefijos):
+    """
+    Data sources cuyos prefijos de inclusión se solapan con alguno de prefijos:
+    el del data source contiene al prefijo (p. ej. la raíz del KB) o está dentro
+    de él (p. ej. .../preguntas/)
+    """
+    seleccionados = [
+        ds for ds in data_sources
+        if any(p.startswith(ds_p) or ds_p.startswith(p) for p in prefijos for ds_p in ds['prefixes'])
+    ]
+    print(f"   🎯 Data sources para {', '.join(prefijos)}: {', '.join(ds['name'] for ds in seleccionados) or 'ninguno'}")
+    return seleccionados
+
+
 def crear_nuevo_alias(agent_status, prepared_at_time):
     """
     Crea un nuevo alias del agente con un nombre único basado en timestamp
@@ -415,47 +1154,33 @@ def crear_nuevo_alias(agent_status, prepared_at_time):
         return None
 
 
-def actualizar_lambda_chat(new_alias_id):
+def publicar_alias_activo(new_alias_id):
     """
-    Actualiza la variable de entorno AGENT_ALIAS_ID del Lambda Chat
+    Publica el alias activo en el parámetro SSM AGENT_ALIAS_PARAMETER.
+    El chat lo toma al expirar su cache, sin modificar la configuración de
+    ninguna función (las instancias activas no se reciclan)
     
     Args:
         new_alias_id: ID del nuevo alias a configurar
     """
     try:
-        if not CHAT_LAMBDA_FUNCTION_NAME:
-            print(f"   ⚠️  CHAT_LAMBDA_FUNCTION_NAME no configurado, saltando actualización")
+        if not AGENT_ALIAS_PARAMETER:
+            print(f"   ⚠️  AGENT_ALIAS_PARAMETER no configurado, saltando publicación")
             return
-            
-        print(f"   📝 Actualizando Lambda: {CHAT_LAMBDA_FUNCTION_NAME}")
-        print(f"   Nuevo AGENT_ALIAS_ID: {new_alias_id}")
         
-        # Obtener configuración actual del Lambda
-        response = lambda_client.get_function_configuration(
-            FunctionName=CHAT_LAMBDA_FUNCTION_NAME
-        )
+        print(f"   📝 Publicando alias activo en {AGENT_ALIAS_PARAMETER}: {new_alias_id}")
         
-        # Obtener variables de entorno actuales
-        current_env = response.get('Environment', {}).get('Variables', {})
-        
-        # Actualizar AGENT_ALIAS_ID
-        current_env['AGENT_ALIAS_ID'] = new_alias_id
-        
-        # Actualizar la configuración del Lambda
-        update_response = lambda_client.update_function_configuration(
-            FunctionName=CHAT_LAMBDA_FUNCTION_NAME,
-            Environment={
-                'Variables': current_env
-            }
+        response = ssm_client.put_parameter(
+            Name=AGENT_ALIAS_PARAMETER,
+            Value=new_alias_id,
+            Type='String',
+            Overwrite=True
         )
         
-        print(f"   ✓ Lambda actualizado exitosamente")
-        print(f"   Lambda ARN: {update_response.get('FunctionArn')}")
-        print(f"   Última modificación: {update_response.get('LastModified')}")
+        print(f"   ✓ Parámetro actualizado (versión {response.get('Version')})")
         
     except Exception as e:
-        print(f"   ❌ Error al actualizar Lambda: {str(e)}")
+        print(f"   ❌ Error al publicar alias: {str(e)}")
         import traceback
         traceback.print_exc()
         raise
-
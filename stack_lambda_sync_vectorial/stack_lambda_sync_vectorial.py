@@ -3,10 +3,13 @@ from aws_cdk import (
     CfnOutput,
     Aws,
     Duration,
+    RemovalPolicy,
     aws_lambda as _lambda,
     aws_lambda_python_alpha as _alambda,
     aws_s3 as s3,
     aws_iam as iam,
+    aws_ssm as ssm,
+    aws_dynamodb as dynamodb,
 )
 from constructs import Construct
 
@@ -16,14 +19,62 @@ class VectorialSyncLambdaStack(Stack):
     - Inicia ingestion jobs para: eventos, restaurantes, preguntas, stores
     - Sincroniza automáticamente con Pinecone (manejado por Bedrock internamente)
     - Prepara el agente Bedrock con datos actualizados
+    - Publica el alias activo en un parámetro SSM que lee el chat (cache TTL)
+    - Guarda estadísticas y throughput de cada ingestion job en DynamoDB
     """
 
-    def __init__(self, scope: Construct, construct_id: str, input_metadata, input_s3_bucket_arn, kb_id, agent_id, chat_lambda_fn=None, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str, input_metadata, input_s3_bucket_arn, kb_id, agent_id, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        # Con kb_sharding=per_type: IDs de los Knowledge Bases por tipo (se sincronizan en paralelo)
+        kb_ids = input_metadata.get('knowledge_base_ids') or [kb_id]
+
+        """
+        @ SSM Parameter: alias activo del agente
+        """
+        # El valor inicial solo aplica al crear el parámetro; luego lo actualiza la Lambda
+        self.agent_alias_parameter = ssm.StringParameter(
+            self,
+            "agent-alias-parameter",
+            parameter_name=input_metadata['agent_alias_parameter_name'],
+            string_value=input_metadata['agent_alias_id'],
+            description="Alias activo del agente Bedrock (publicado por la Lambda de sincronización)"
+        )
+
+        """
+        @ DynamoDB: historial de ingestion jobs
+        """
+        # Un registro por job: estadísticas, duración y docs/s por data source
+        self.ingestion_history_table = dynamodb.Table(
+            self,
+            "IngestionHistoryTable",
+            table_name="mut-ingestion-history",
+            partition_key=dynamodb.Attribute(
+                name="data_source_id",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="started_at",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.RETAIN,
+            time_to_live_attribute="ttl"
+        )
+
         """
         @ Lambda Function: Vectorial Sync
         """
+        # Ledger de ejecución compartido con la extracción y el ETL (pipeline_ledger.py)
+        ledger_layer = _alambda.PythonLayerVersion(
+            self,
+            "pipeline-ledger-layer",
+            entry="./lambda_shared",
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_12],
+            description="Ledger de ejecucion del pipeline (pipeline_ledger.py)",
+            bundling=_alambda.BundlingOptions(asset_excludes=["__pycache__"])
+        )
+
         self.lambda_fn = _alambda.PythonFunction(
             self,
             "vectorial-sync-lambda-fn",
@@ -38,9 +89,19 @@ class VectorialSyncLambdaStack(Stack):
                 "S3_BUCKET_NAME": f"raw-virtual-assistant-data-{Aws.ACCOUNT_ID}-{Aws.REGION}",
                 "S3_VECTORIAL_PREFIX": input_metadata['s3_knowledge_base_prefixes'][0].rstrip('/'),
                 "KNOWLEDGE_BASE_ID": kb_id,
+                "KNOWLEDGE_BASE_IDS": ",".join(kb_ids),
                 "AGENT_ID": agent_id,
-                "CHAT_LAMBDA_FUNCTION_NAME": chat_lambda_fn.function_name if chat_lambda_fn else ""
-            }
+                "AGENT_ALIAS_PARAMETER": self.agent_alias_parameter.parameter_name,
+                "SYNC_STATE_KEY": "sync-state/data_source_fingerprints.json",
+                "INGESTION_HISTORY_TABLE": self.ingestion_history_table.table_name,
+                # Ingesta directa de documentos desde el manifiesto de cambios del ETL
+                "ETL_CHANGE_MANIFEST_KEY": "sync-state/etl_change_manifest.json",
+                "DIRECT_INGEST_MAX_DOCUMENTS": str(input_metadata.get('direct_ingest_max_documents', 50)),
+                # Deshabilitado por defecto: el handler retorna antes de sincronizar
+                # (salvo las acciones de ingestion_wait=stepfunctions)
+                "LAMBDA_SYNC_ENABLED": "true" if input_metadata.get('lambda_sync_enabled', False) else "false"
+            },
+            layers=[ledger_layer]
         )
 
         """
@@ -52,6 +113,8 @@ class VectorialSyncLambdaStack(Stack):
             bucket_arn=input_s3_bucket_arn
         )
         s3_bucket.grant_read(self.lambda_fn)
+        # Fingerprints del último ingestion job exitoso por data source
+        s3_bucket.grant_put(self.lambda_fn, "sync-state/*")
 
         """
         @ Bedrock Permissions
@@ -65,6 +128,10 @@ class VectorialSyncLambdaStack(Stack):
                     "bedrock:ListIngestionJobs",
                     "bedrock:GetKnowledgeBase",
                     "bedrock:ListDataSources",  # Necesario para obtener Data Source ID
+                    "bedrock:GetDataSource",  # Prefijos de inclusión para el fingerprint
+                    "bedrock:IngestKnowledgeBaseDocuments",  # Ingesta directa de documentos cambiados
+                    "bedrock:DeleteKnowledgeBaseDocuments",
+                    "bedrock:GetKnowledgeBaseDocuments",
                     "bedrock:AssociateThirdPartyKnowledgeBase",  # Necesario para iniciar ingestion jobs
                     "bedrock:PrepareAgent",
                     "bedrock:GetAgent",
@@ -73,7 +140,9 @@ class VectorialSyncLambdaStack(Stack):
                     "bedrock:ListAgentAliases"   # Para listar aliases existentes
                 ],
                 resources=[
-                    f"arn:aws:bedrock:{Aws.REGION}:{Aws.ACCOUNT_ID}:knowledge-base/{kb_id}",
+                    f"arn:aws:bedrock:{Aws.REGION}:{Aws.ACCOUNT_ID}:knowledge-base/{shard_kb_id}"
+                    for shard_kb_id in dict.fromkeys([kb_id] + kb_ids)
+                ] + [
                     f"arn:aws:bedrock:{Aws.REGION}:{Aws.ACCOUNT_ID}:agent/{agent_id}",
                     f"arn:aws:bedrock:{Aws.REGION}:{Aws.ACCOUNT_ID}:agent-alias/{agent_id}/*"
                 ]
@@ -81,21 +150,15 @@ class VectorialSyncLambdaStack(Stack):
         )
 
         """
-        @ Lambda Update Permissions
-        """
-        # Permisos para actualizar la configuración del Lambda Chat
-        if chat_lambda_fn:
-            self.lambda_fn.add_to_role_policy(
-                iam.PolicyStatement(
-                    actions=[
-                        "lambda:UpdateFunctionConfiguration",
-                        "lambda:GetFunctionConfiguration"
-                    ],
-                    resources=[
-                        chat_lambda_fn.function_arn
-                    ]
-                )
-            )
+        @ SSM Permissions
+        """
+        # Publicar el nuevo alias sin modificar la configuración del chat
+        self.agent_alias_parameter.grant_write(self.lambda_fn)
+
+        """
+        @ DynamoDB Permissions
+        """
+        self.ingestion_history_table.grant_write_data(self.lambda_fn)
 
         """
         @ CloudWatch Logs Permissions
@@ -117,6 +180,13 @@ class VectorialSyncLambdaStack(Stack):
             description="ARN del Lambda de sincronización vectorial"
         )
 
+        CfnOutput(
+            self,
+            "output-ingestion-history-table",
+            value=self.ingestion_history_table.table_name,
+            description="Tabla DynamoDB con el historial de ingestion jobs"
+        )
+
         CfnOutput(
             self, 
             "output-sync-lambda-name", 
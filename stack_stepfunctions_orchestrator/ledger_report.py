@@ -0,0 +1,178 @@
+"""
+Reporte del ledger de ejecuciones del pipeline (tabla mut-pipeline-run-ledger)
+
+La state machine guarda un registro por etapa y ejecución con inicio/fin,
+registros de entrada/salida, bytes, llamadas a APIs y costo estimado. Este
+script resume:
+- Por etapa: ejecuciones, duración media / p95 / máxima, registros, KB
+  escritos (- si la etapa no los mide) y costo, y la tendencia de la duración
+  (mitad reciente vs. mitad anterior del período)
+- Las ejecuciones recientes con su duración y costo total
+- Las etapas más lentas del período
+
+USO (desde la raíz del repo, con credenciales AWS):
+    python stack_stepfunctions_orchestrator/ledger_report.py
+    python stack_stepfunctions_orchestrator/ledger_report.py --days 90 --top 15
+    python stack_stepfunctions_orchestrator/ledger_report.py --state-machine FaqFastPathStateMachine
+"""
+
+import sys
+import argparse
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict
+
+import boto3
+from boto3.dynamodb.conditions import Attr
+
+
+DEFAULT_TABLE = 'mut-pipeline-run-ledger'
+
+NUMERIC_FIELDS = ('duration_ms', 'records_in', 'records_out', 'bytes', 'api_calls', 'estimated_cost_usd')
+
+# Campos que no todas las etapas miden (la sincronización no informa bytes):
+# sin valor quedan en None y el reporte los muestra como desconocidos
+OPTIONAL_FIELDS = ('bytes',)
+
+
+def cargar_registros(table_name, days, state_machine=None, region=None):
+    """Registros del ledger con started_at dentro de los últimos days días."""
+    table = boto3.resource('dynamodb', region_name=region).Table(table_name)
+    desde = (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%S')
+
+    filtro = Attr('started_at').gte(desde)
+    if state_machine:
+        filtro = filtro & Attr('state_machine').contains(state_machine)
+
+    registros = []
+    kwargs = {'FilterExpression': filtro}
+    while True:
+        response = table.scan(**kwargs)
+        registros.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    for registro in registros:
+        for field in NUMERIC_FIELDS:
+            if field in OPTIONAL_FIELDS and registro.get(field) is None:
+                registro[field] = None
+            else:
+                registro[field] = float(registro.get(field, 0) or 0)
+    return sorted(registros, key=lambda r: r['started_at'])
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por el método del rango más cercano."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def resumir_etapas(registros):
+    """{stage_name: métricas} con la tendencia de la duración media."""
+    por_etapa = defaultdict(list)
+    for registro in registros:
+        por_etapa[registro.get('stage_name') or registro['stage']].append(registro)
+
+    resumen = {}
+    for etapa, items in por_etapa.items():
+        duraciones = [r['duration_ms'] / 1000 for r in items]
+        mitad = len(duraciones) // 2
+        anterior, reciente = duraciones[:mitad], duraciones[mitad:]
+        tendencia = None
+        if anterior and reciente:
+            media_anterior = sum(anterior) / len(anterior)
+            if media_anterior > 0:
+                tendencia = (sum(reciente) / len(reciente) - media_anterior) / media_anterior * 100
+
+        medidos = [r['bytes'] for r in items if r['bytes'] is not None]
+        resumen[etapa] = {
+            'runs': len(items),
+            'avg_s': sum(duraciones) / len(duraciones),
+            'p95_s': percentil(duraciones, 95),
+            'max_s': max(duraciones),
+            'records_in': sum(r['records_in'] for r in items) / len(items),
+            'records_out': sum(r['records_out'] for r in items) / len(items),
+            'api_calls': sum(r['api_calls'] for r in items) / len(items),
+            'bytes': sum(medidos) / len(medidos) if medidos else None,
+            'cost_usd': sum(r['estimated_cost_usd'] for r in items),
+            'trend_pct': tendencia
+        }
+    return resumen
+
+
+def resumir_ejecuciones(registros):
+    """Ejecuciones con inicio, etapas, duración sumada de etapas y costo total."""
+    por_run = defaultdict(list)
+    for registro in registros:
+        por_run[registro['run_id']].append(registro)
+
+    ejecuciones = []
+    for run_id, items in por_run.items():
+        ejecuciones.append({
+            'run_id': run_id,
+            'state_machine': items[0].get('state_machine', ''),
+            'started_at': min(r['started_at'] for r in items),
+            'stages': len(items),
+            'duration_s': sum(r['duration_ms'] for r in items) / 1000,
+            'cost_usd': sum(r['estimated_cost_usd'] for r in items)
+        })
+    return sorted(ejecuciones, key=lambda e: e['started_at'], reverse=True)
+
+
+def imprimir_reporte(registros, days, top):
+    if not registros:
+        print(f"ℹ️  Sin registros en el ledger en los últimos {days} días")
+        return
+
+    print("=" * 100)
+    print(f"📒 LEDGER DEL PIPELINE - últimos {days} días ({len(registros)} registros)")
+    print("=" * 100)
+
+    print("\n📊 Por etapa (duración en segundos; registros, llamadas y KB escritos promedio por ejecución)")
+    print(f"   {'etapa':<16}{'runs':>6}{'media':>9}{'p95':>9}{'máx':>9}{'in':>9}{'out':>9}"
+          f"{'api':>8}{'KB':>10}{'costo USD':>12}{'tendencia':>12}")
+    etapas = resumir_etapas(registros)
+    for etapa, m in sorted(etapas.items(), key=lambda kv: kv[1]['avg_s'], reverse=True):
+        tendencia = f"{m['trend_pct']:+.0f}%" if m['trend_pct'] is not None else '-'
+        kilobytes = f"{m['bytes'] / 1024:.0f}" if m['bytes'] is not None else '-'
+        print(f"   {etapa:<16}{m['runs']:>6}{m['avg_s']:>9.1f}{m['p95_s']:>9.1f}{m['max_s']:>9.1f}"
+              f"{m['records_in']:>9.0f}{m['records_out']:>9.0f}{m['api_calls']:>8.0f}"
+              f"{kilobytes:>10}{m['cost_usd']:>12.5f}{tendencia:>12}")
+
+    ejecuciones = resumir_ejecuciones(registros)
+    total_costo = sum(e['cost_usd'] for e in ejecuciones)
+    print(f"\n🗓️  Ejecuciones recientes ({len(ejecuciones)} en el período, costo estimado total {total_costo:.4f} USD)")
+    for e in ejecuciones[:top]:
+        print(f"   {e['started_at'][:19]}  {e['state_machine'][:28]:<28} {e['stages']:>3} etapas "
+              f"{e['duration_s']:>8.1f}s  {e['cost_usd']:.5f} USD  {e['run_id']}")
+
+    print(f"\n🐢 Etapas más lentas")
+    for r in sorted(registros, key=lambda r: r['duration_ms'], reverse=True)[:top]:
+        print(f"   {r['duration_ms'] / 1000:>8.1f}s  {r['stage']:<24} {r['started_at'][:19]}  "
+              f"in={r['records_in']:.0f} out={r['records_out']:.0f} api={r['api_calls']:.0f}  {r['run_id']}")
+    print("=" * 100)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resume el ledger de ejecuciones del pipeline de datos")
+    parser.add_argument('--table', default=DEFAULT_TABLE,
+                        help=f"Tabla DynamoDB del ledger (default: {DEFAULT_TABLE})")
+    parser.add_argument('--days', type=int, default=30,
+                        help="Días hacia atrás a considerar (default: 30)")
+    parser.add_argument('--top', type=int, default=10,
+                        help="Ejecuciones y etapas lentas a listar (default: 10)")
+    parser.add_argument('--state-machine',
+                        help="Filtra por nombre de state machine (p. ej. FaqFastPathStateMachine)")
+    parser.add_argument('--region', help="Región AWS (default: la del perfil)")
+    args = parser.parse_args(argv)
+
+    registros = cargar_registros(args.table, args.days, args.state_machine, args.region)
+    imprimir_reporte(registros, args.days, args.top)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
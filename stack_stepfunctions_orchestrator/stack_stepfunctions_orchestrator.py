@@ -8,6 +8,8 @@ from aws_cdk import (
     aws_events as events,
     aws_events_targets as targets,
     aws_iam as iam,
+    aws_dynamodb as dynamodb,
+    RemovalPolicy,
 )
 from constructs import Construct
 
@@ -18,9 +20,43 @@ class DataPipelineOrchestratorStack(Stack):
     2. Procesamiento ETL (Lambda ETL existente)
     3. Sincronización vectorial (Lambda de sincronización)
     
-    Incluye EventBridge para ejecución automática diaria a las 12 AM
+    Con fused_etl=True la Lambda de extracción ya escribe la salida KB y el
+    paso ETL se omite (extracción -> sincronización).
+    
+    Con ingestion_wait="stepfunctions" la espera de los ingestion jobs y de la
+    preparación del agente se modela con integraciones SDK de bedrock-agent
+    (Start -> Wait -> Get -> Choice); la Lambda de sincronización solo planifica,
+    registra resultados y publica el alias, sin bloquearse en sleeps.
+    
+    Extracción y ETL informan changed (y el ETL su manifiesto de cambios por
+    referencia S3): Choice omiten ETL y sincronización si nada cambió.
+    
+    Con pipeline_mode="per_dataset" la extracción y el ETL corren en un Map con
+    una rama por dataset (eventos, stores, restaurantes, preguntas), cada una con
+    sus propios reintentos, timeout y tiempos registrados; una fuente lenta o
+    fallida no bloquea a las demás. Tras el Map se consolida el manifiesto de
+    cambios y se sincroniza.
+    
+    Cada etapa Lambda reporta sus métricas (ledger) y la state machine las
+    guarda en la tabla mut-pipeline-run-ledger: inicio/fin, registros de
+    entrada/salida, bytes, llamadas a APIs y costo estimado. ledger_report.py
+    resume tendencias y etapas más lentas.
+    
+    Incluye EventBridge para ejecución automática diaria a las 12 AM y, con
+    faq_fast_path=True, una state machine liviana que procesa y sincroniza solo
+    las FAQs al subir raw/preguntas.csv
     """
 
+    # Ramas del Map por dataset (nombres del ETL)
+    PIPELINE_DATASETS = ["eventos", "stores", "restaurantes", "preguntas"]
+
+    # Esperas nativas: intervalo y máximo de consultas (mismos límites que la
+    # Lambda de sincronización: 600 s por ingestion job y 300 s el agente)
+    INGESTION_POLL_SECONDS = 15
+    INGESTION_MAX_POLLS = 40
+    AGENT_POLL_SECONDS = 10
+    AGENT_MAX_POLLS = 30
+
     def __init__(
         self, 
         scope: Construct, 
@@ -28,10 +64,53 @@ class DataPipelineOrchestratorStack(Stack):
         extraction_lambda: _lambda.Function,
         etl_lambda: _lambda.Function,
         sync_lambda: _lambda.Function,
+        fused_etl: bool = False,
+        ingestion_wait: str = "lambda",
+        kb_id: str = None,
+        agent_id: str = None,
+        kb_ids: list = None,
+        pipeline_mode: str = "sequential",
+        faq_fast_path: bool = False,
+        data_bucket_name: str = None,
+        kb_s3_prefix: str = None,
         **kwargs
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        """
+        @ DynamoDB - Ledger de ejecuciones del pipeline
+        """
+        
+        # Un registro por etapa y ejecución (run_id = nombre de la ejecución)
+        self.ledger_table = dynamodb.Table(
+            self,
+            "PipelineRunLedgerTable",
+            table_name="mut-pipeline-run-ledger",
+            partition_key=dynamodb.Attribute(
+                name="run_id",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="stage",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.RETAIN
+        )
+        
+        # Historial de una etapa ordenado por fecha (tendencias)
+        self.ledger_table.add_global_secondary_index(
+            index_name="stage-started_at-index",
+            partition_key=dynamodb.Attribute(
+                name="stage_name",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="started_at",
+                type=dynamodb.AttributeType.STRING
+            )
+        )
+
         """
         @ Step Functions Tasks
         """
@@ -89,15 +168,58 @@ class DataPipelineOrchestratorStack(Stack):
         etl_task.add_catch(failure_task, errors=["States.ALL"], result_path="$.error")
         sync_task.add_catch(failure_task, errors=["States.ALL"], result_path="$.error")
         
+        native_wait = ingestion_wait == "stepfunctions"
+        if native_wait:
+            # Referencia al manifiesto de cambios del ETL para la ingesta directa;
+            # la extracción fusionada no la reporta (la Lambda usa la key por defecto)
+            if pipeline_mode == "per_dataset":
+                manifest_path = "$.etl_changes.manifest"
+            else:
+                manifest_path = None if fused_etl else "$.etl_manifest"
+            # La espera corre en la state machine: sin Lambda bloqueada por data source
+            sync_chain = self._build_native_sync(
+                sync_lambda, kb_ids or [kb_id], agent_id, success_task, failure_task,
+                manifest_path=manifest_path
+            )
+        else:
+            sync_chain = sync_task.next(self._record_stage("LedgerSync", "sync", "$.ledger", success_task))
+        
+        # Sin cambios se omiten ETL y sincronización (la mayoría de las noches)
+        no_changes = sfn.Pass(
+            self,
+            "NoChangesDetected",
+            comment="Ningún dataset cambió desde el último ETL; el índice sigue al día"
+        ).next(success_task)
+        
         # Definir el flujo: extracción -> ETL -> sincronización -> éxito
-        definition = extraction_task.next(etl_task).next(sync_task).next(success_task)
+        if pipeline_mode == "per_dataset":
+            definition = self._build_per_dataset_pipeline(
+                extraction_lambda, etl_lambda, fused_etl, failure_task,
+                self._skip_if_unchanged("EtlChangesFound", "$.etl_changes.changed", sync_chain, no_changes)
+            )
+        elif fused_etl:
+            # La extracción ya transformó y escribió la salida KB en memoria
+            definition = extraction_task.next(self._record_stage(
+                "LedgerExtraction", "extraction", "$.ledger",
+                self._skip_if_unchanged("ExtractionChanged", "$.changed", sync_chain, no_changes)
+            ))
+        else:
+            etl_chain = etl_task.next(self._record_stage(
+                "LedgerEtl", "etl", "$.ledger",
+                self._skip_if_unchanged("EtlChanged", "$.changed", sync_chain, no_changes)
+            ))
+            definition = extraction_task.next(self._record_stage(
+                "LedgerExtraction", "extraction", "$.ledger",
+                self._skip_if_unchanged("ExtractionChanged", "$.changed", etl_chain, no_changes)
+            ))
         
         # Crear State Machine
         self.state_machine = sfn.StateMachine(
             self,
             "DataPipelineStateMachine",
             definition=definition,
-            timeout=Duration.minutes(60),  # Timeout de 1 hora
+            # Los Wait nativos no consumen cómputo; el límite ya no es la Lambda
+            timeout=Duration.hours(6) if native_wait else Duration.minutes(60),
             comment="Orquesta el pipeline de extracción, ETL y sincronización de datos"
         )
 
@@ -132,6 +254,16 @@ class DataPipelineOrchestratorStack(Stack):
             )
         )
 
+        """
+        @ FAQ fast path - S3 Object Created en raw/preguntas.csv
+        """
+        
+        if faq_fast_path:
+            self.faq_state_machine = self._build_faq_fast_path(
+                extraction_lambda, etl_lambda, sync_lambda, fused_etl, data_bucket_name, kb_s3_prefix,
+                native_wait, kb_ids or [kb_id], agent_id
+            )
+
         """
         @ Outputs
         """
@@ -157,9 +289,741 @@ class DataPipelineOrchestratorStack(Stack):
             description="Nombre de la regla EventBridge para ejecución diaria"
         )
         
+        CfnOutput(
+            self,
+            "output-ledger-table-name",
+            value=self.ledger_table.table_name,
+            description="Tabla DynamoDB con el ledger de ejecuciones del pipeline"
+        )
+        
         CfnOutput(
             self,
             "output-execution-schedule",
             value="Todos los días a las 12:00 AM (hora Chile)",
             description="Horario de ejecución automática"
         )
+        
+        if faq_fast_path:
+            CfnOutput(
+                self,
+                "output-faq-state-machine-arn",
+                value=self.faq_state_machine.state_machine_arn,
+                description="ARN de la State Machine del fast path de FAQs"
+            )
+
+    def _record_stage(
+        self,
+        construct_id: str,
+        stage: str,
+        ledger_path: str,
+        next_step: sfn.IChainable
+    ) -> sfn.Chain:
+        """
+        Guarda en el ledger las métricas que reportó la Lambda de la etapa
+        (ledger_path) y continúa con next_step; un error del ledger nunca
+        detiene el pipeline. Dentro del Map por dataset, stage se completa con
+        el dataset de la rama (p. ej. extraction#stores).
+        """
+        def number(field):
+            # DynamoDB recibe los números como string: States.Format los convierte
+            return tasks.DynamoAttributeValue.number_from_string(
+                sfn.JsonPath.format("{}", sfn.JsonPath.string_at(f"{ledger_path}.{field}"))
+            )
+
+        if stage.endswith("#"):
+            stage_name = sfn.JsonPath.format(f"{stage}{{}}", sfn.JsonPath.string_at("$.dataset"))
+        else:
+            stage_name = stage
+
+        item = {
+            "run_id": tasks.DynamoAttributeValue.from_string(sfn.JsonPath.string_at("$$.Execution.Name")),
+            "stage": tasks.DynamoAttributeValue.from_string(stage_name),
+            "stage_name": tasks.DynamoAttributeValue.from_string(stage.rstrip("#")),
+            "state_machine": tasks.DynamoAttributeValue.from_string(sfn.JsonPath.string_at("$$.StateMachine.Name")),
+            "execution_started_at": tasks.DynamoAttributeValue.from_string(sfn.JsonPath.string_at("$$.Execution.StartTime")),
+            "started_at": tasks.DynamoAttributeValue.from_string(sfn.JsonPath.string_at(f"{ledger_path}.started_at")),
+            "ended_at": tasks.DynamoAttributeValue.from_string(sfn.JsonPath.string_at(f"{ledger_path}.ended_at")),
+            "duration_ms": number("duration_ms"),
+            "records_in": number("records_in"),
+            "records_out": number("records_out"),
+            "bytes": number("bytes"),
+            "api_calls": number("api_calls"),
+            "memory_mb": number("memory_mb"),
+            "estimated_cost_usd": number("estimated_cost_usd")
+        }
+
+        # Las Lambdas que no miden bytes (sincronización) omiten el campo: el
+        # registro queda sin bytes y ledger_report.py lo muestra como desconocido
+        records = []
+        for suffix, fields in (("", item), ("WithoutBytes", {k: v for k, v in item.items() if k != "bytes"})):
+            record = tasks.DynamoPutItem(
+                self,
+                f"{construct_id}{suffix}",
+                table=self.ledger_table,
+                item=fields,
+                result_path=sfn.JsonPath.DISCARD,
+                comment=f"Ledger de la etapa {stage.rstrip('#')}"
+            )
+            record.add_catch(next_step, errors=["States.ALL"], result_path=sfn.JsonPath.DISCARD)
+            records.append(record.next(next_step))
+
+        has_bytes = sfn.Choice(self, f"{construct_id}HasBytes")
+        has_bytes.when(sfn.Condition.is_present(f"{ledger_path}.bytes"), records[0]).otherwise(records[1])
+        return sfn.Chain.start(has_bytes)
+
+    def _skip_if_unchanged(
+        self,
+        construct_id: str,
+        changed_path: str,
+        next_step: sfn.IChainable,
+        unchanged_step: sfn.IChainable
+    ) -> sfn.Choice:
+        """
+        Choice que sigue con next_step salvo que changed_path sea false.
+        Sin el campo (Lambdas anteriores, errores) se asume que hubo cambios.
+        """
+        choice = sfn.Choice(self, construct_id)
+        choice.when(
+            sfn.Condition.and_(
+                sfn.Condition.is_present(changed_path),
+                sfn.Condition.boolean_equals(changed_path, False)
+            ),
+            unchanged_step
+        ).otherwise(next_step)
+        return choice
+
+    def _build_per_dataset_pipeline(
+        self,
+        extraction_lambda: _lambda.Function,
+        etl_lambda: _lambda.Function,
+        fused_etl: bool,
+        failure_task: sfn.Fail,
+        next_step: sfn.IChainable,
+        datasets: list = None,
+        id_prefix: str = ""
+    ) -> sfn.Chain:
+        """
+        Extracción y ETL por dataset en paralelo:
+        Datasets -> Map(ExtractDataset -> EtlDataset) -> DatasetsFailed
+        -> FinishEtlChanges -> next_step
+
+        Las Lambdas propagan los errores en modo por dataset: cada rama reintenta
+        por su cuenta y, si agota los reintentos, queda registrada como fallida
+        sin detener a las demás. Cada paso guarda su ledger por dataset.
+        Con alguna rama fallida la ejecución termina en failure_task, sin
+        sincronizar: los cambios pendientes de las demás ramas se consolidan en
+        la siguiente ejecución.
+
+        id_prefix distingue los estados cuando otra state machine (fast path de
+        FAQs) reutiliza el mismo flujo con un subconjunto de datasets.
+        """
+        datasets = datasets or self.PIPELINE_DATASETS
+        datasets_list = sfn.Pass(
+            self,
+            f"{id_prefix}PipelineDatasets",
+            result=sfn.Result.from_array(datasets),
+            result_path="$.datasets"
+        )
+
+        extract_dataset = tasks.LambdaInvoke(
+            self,
+            f"{id_prefix}ExtractDatasetTask",
+            lambda_function=extraction_lambda,
+            payload=sfn.TaskInput.from_object({"dataset.$": "$.dataset"}),
+            result_selector={
+                "status_code.$": "$.Payload.statusCode",
+                "changed.$": "$.Payload.changed",
+                "changes.$": "$.Payload.changes",
+                "ledger.$": "$.Payload.ledger"
+            },
+            result_path="$.extraction",
+            retry_on_service_exceptions=True,
+            task_timeout=sfn.Timeout.duration(Duration.minutes(15)),
+            comment="Extrae y prepara un dataset"
+        )
+        branch_tasks = [extract_dataset]
+        # Resumen de la rama: estado y métricas de cada paso
+        summary = {
+            "dataset.$": "$.dataset",
+            "status": "success",
+            "extraction.$": "$.extraction"
+        }
+
+        if not fused_etl:
+            etl_dataset = tasks.LambdaInvoke(
+                self,
+                f"{id_prefix}EtlDatasetTask",
+                lambda_function=etl_lambda,
+                payload=sfn.TaskInput.from_object({"dataset.$": "$.dataset"}),
+                result_selector={
+                    "status_code.$": "$.Payload.statusCode",
+                    "statistics.$": "$.Payload.body.statistics",
+                    "ledger.$": "$.Payload.ledger"
+                },
+                result_path="$.etl",
+                retry_on_service_exceptions=True,
+                task_timeout=sfn.Timeout.duration(Duration.minutes(10)),
+                comment="Transforma un dataset a formato Bedrock KB"
+            )
+            branch_tasks.append(etl_dataset)
+            summary["etl.$"] = "$.etl"
+
+        dataset_failed = sfn.Pass(self, f"{id_prefix}DatasetFailed", parameters={
+            "dataset.$": "$.dataset",
+            "status": "failed",
+            "error.$": "$.error"
+        })
+        for task in branch_tasks:
+            task.add_retry(
+                errors=["States.TaskFailed", "States.Timeout"],
+                interval=Duration.seconds(30),
+                max_attempts=2,
+                backoff_rate=2
+            )
+            task.add_catch(dataset_failed, errors=["States.ALL"], result_path="$.error")
+
+        dataset_done = sfn.Pass(self, f"{id_prefix}DatasetDone", parameters=summary)
+        if fused_etl:
+            branch = extract_dataset.next(self._record_stage(
+                f"{id_prefix}LedgerExtractDataset", "extraction#", "$.extraction.ledger", dataset_done
+            ))
+        else:
+            # Sin cambios en el CSV vectorial del dataset no se repite su ETL
+            dataset_unchanged = sfn.Pass(self, f"{id_prefix}DatasetUnchanged", parameters={
+                "dataset.$": "$.dataset",
+                "status": "unchanged",
+                "extraction.$": "$.extraction"
+            })
+            etl_chain = etl_dataset.next(self._record_stage(
+                f"{id_prefix}LedgerEtlDataset", "etl#", "$.etl.ledger", dataset_done
+            ))
+            branch = extract_dataset.next(self._record_stage(
+                f"{id_prefix}LedgerExtractDataset", "extraction#", "$.extraction.ledger",
+                self._skip_if_unchanged(
+                    f"{id_prefix}DatasetChanged", "$.extraction.changed", etl_chain, dataset_unchanged
+                )
+            ))
+
+        datasets_map = sfn.Map(
+            self,
+            f"{id_prefix}DatasetsMap",
+            items_path="$.datasets",
+            item_selector={"dataset.$": "$$.Map.Item.Value"},
+            max_concurrency=len(datasets),
+            result_path="$.datasets_result"
+        )
+        datasets_map.item_processor(branch)
+
+        # Fan-in: un solo manifiesto de cambios con los datasets procesados
+        finish_changes = tasks.LambdaInvoke(
+            self,
+            f"{id_prefix}FinishEtlChangesTask",
+            lambda_function=etl_lambda,
+            payload=sfn.TaskInput.from_object({
+                "action": "finish_changes",
+                "datasets": datasets
+            }),
+            result_selector={
+                "changed.$": "$.Payload.changed",
+                "changes.$": "$.Payload.body.changes",
+                "manifest.$": "$.Payload.etl_manifest",
+                "ledger.$": "$.Payload.ledger"
+            },
+            result_path="$.etl_changes",
+            retry_on_service_exceptions=True,
+            comment="Consolida el manifiesto de cambios de todas las ramas"
+        )
+        finish_changes.add_catch(failure_task, errors=["States.ALL"], result_path="$.error")
+
+        finish_chain = finish_changes.next(self._record_stage(
+            f"{id_prefix}LedgerFinishEtlChanges", "etl_finish", "$.etl_changes.ledger", next_step
+        ))
+
+        # Las ramas fallidas terminan en DatasetFailed (Pass): sin este Choice
+        # una falla total terminaría en éxito como "sin cambios"
+        failed_datasets = sfn.Pass(self, f"{id_prefix}FailedDatasets", parameters={
+            "failed.$": "$.datasets_result[?(@.status == 'failed')].dataset"
+        }, result_path="$.datasets_failed")
+        datasets_failed = sfn.Choice(self, f"{id_prefix}DatasetsFailed")
+        datasets_failed.when(
+            sfn.Condition.is_present("$.datasets_failed.failed[0]"),
+            failure_task
+        ).otherwise(finish_chain)
+
+        return datasets_list.next(datasets_map).next(failed_datasets).next(datasets_failed)
+
+    def _build_faq_fast_path(
+        self,
+        extraction_lambda: _lambda.Function,
+        etl_lambda: _lambda.Function,
+        sync_lambda: _lambda.Function,
+        fused_etl: bool,
+        data_bucket_name: str,
+        kb_s3_prefix: str,
+        native_wait: bool = False,
+        kb_ids: list = None,
+        agent_id: str = None
+    ) -> sfn.StateMachine:
+        """
+        FAQs en minutos, sin extraer mut.cl:
+        S3 Object Created (raw/preguntas.csv) -> EventBridge -> state machine
+        FaqPipelineDatasets -> Map(preguntas) -> FaqFinishEtlChanges -> FaqSync
+
+        La sincronización se limita a los data sources cuyos prefijos cubren la
+        salida KB de preguntas (s3_prefixes en la Lambda de sincronización), con
+        la misma espera que el pipeline completo (ingestion_wait). Solo termina
+        en FaqFastPathSuccess si la sincronización corrió sin data sources con
+        error. Requiere notificaciones EventBridge en el bucket (stack S3).
+        """
+        success_task = sfn.Succeed(self, "FaqFastPathSuccess", comment="FAQs sincronizadas")
+        failure_task = sfn.Fail(self, "FaqFastPathFailure", comment="El fast path de FAQs falló")
+
+        faq_prefix = f"{kb_s3_prefix.rstrip('/')}/preguntas/"
+        if native_wait:
+            sync_chain = self._build_native_sync(
+                sync_lambda, kb_ids, agent_id, success_task, failure_task,
+                manifest_path="$.etl_changes.manifest",
+                s3_prefixes=[faq_prefix],
+                fail_on_errors=True,
+                id_prefix="Faq"
+            )
+        else:
+            sync_task = tasks.LambdaInvoke(
+                self,
+                "FaqSyncTask",
+                lambda_function=sync_lambda,
+                payload=sfn.TaskInput.from_object({
+                    "s3_prefixes": [faq_prefix],
+                    "etl_manifest.$": "$.etl_changes.manifest"
+                }),
+                # El body de la Lambda es un JSON serializado
+                result_selector={
+                    "status_code.$": "$.Payload.statusCode",
+                    "result.$": "States.StringToJson($.Payload.body)",
+                    "ledger.$": "$.Payload.ledger"
+                },
+                result_path="$.sync",
+                retry_on_service_exceptions=True,
+                comment="Sincroniza solo los data sources de preguntas frecuentes"
+            )
+            sync_task.add_catch(failure_task, errors=["States.ALL"], result_path="$.error")
+
+            # success o no_op (todo al día) con jobs; no_data_source, no_data o
+            # un data source con error no son una sincronización exitosa
+            faq_synced = sfn.Choice(self, "FaqSynced")
+            faq_synced.when(
+                sfn.Condition.and_(
+                    sfn.Condition.number_equals("$.sync.status_code", 200),
+                    sfn.Condition.or_(
+                        sfn.Condition.string_equals("$.sync.result.status", "success"),
+                        sfn.Condition.string_equals("$.sync.result.status", "no_op")
+                    ),
+                    sfn.Condition.is_present("$.sync.result.steps.ingestion_jobs.failed"),
+                    sfn.Condition.number_equals("$.sync.result.steps.ingestion_jobs.failed", 0)
+                ),
+                success_task
+            ).otherwise(failure_task)
+            sync_chain = sync_task.next(self._record_stage("FaqLedgerSync", "sync", "$.sync.ledger", faq_synced))
+
+        no_changes = sfn.Pass(
+            self,
+            "FaqNoChanges",
+            comment="El archivo de preguntas no cambió el contenido indexado"
+        ).next(success_task)
+
+        # Una rama fallida ya termina en FaqFastPathFailure (FaqDatasetsFailed)
+        faq_changes_found = self._skip_if_unchanged(
+            "FaqChangesFound", "$.etl_changes.changed", sync_chain, no_changes
+        )
+
+        definition = self._build_per_dataset_pipeline(
+            extraction_lambda, etl_lambda, fused_etl, failure_task, faq_changes_found,
+            datasets=["preguntas"], id_prefix="Faq"
+        )
+
+        state_machine = sfn.StateMachine(
+            self,
+            "FaqFastPathStateMachine",
+            definition=definition,
+            timeout=Duration.hours(1) if native_wait else Duration.minutes(30),
+            comment="Procesa y sincroniza solo las preguntas frecuentes"
+        )
+
+        faq_rule = events.Rule(
+            self,
+            "FaqUploadedRule",
+            description="Inicia el fast path de FAQs al subir raw/preguntas.csv",
+            event_pattern=events.EventPattern(
+                source=["aws.s3"],
+                detail_type=["Object Created"],
+                detail={
+                    "bucket": {"name": [data_bucket_name]},
+                    "object": {"key": ["raw/preguntas.csv"]}
+                }
+            )
+        )
+        faq_rule.add_target(
+            targets.SfnStateMachine(
+                state_machine,
+                input=events.RuleTargetInput.from_object({
+                    "triggered_by": "s3_faq_upload",
+                    "execution_time": events.EventField.time,
+                    "s3_key": events.EventField.from_path("$.detail.object.key")
+                })
+            )
+        )
+
+        return state_machine
+
+    def _build_native_sync(
+        self,
+        sync_lambda: _lambda.Function,
+        kb_ids: list,
+        agent_id: str,
+        success_task: sfn.Succeed,
+        failure_task: sfn.Fail,
+        manifest_path: str = None,
+        s3_prefixes: list = None,
+        fail_on_errors: bool = False,
+        id_prefix: str = ""
+    ) -> sfn.IChainable:
+        """
+        Sincronización con esperas nativas de Step Functions:
+        PlanIngestion -> Map por KB(Map por data source(DirectIngest | StartIngestionJob
+        -> Wait -> GetIngestionJob -> Choice)) -> RecordIngestion -> PrepareAgent
+        -> Wait -> GetAgent -> Choice -> PublishAlias
+
+        El plan agrupa los data sources por kb_id: los Knowledge Bases se
+        ingestan en paralelo y los data sources de cada uno en secuencia.
+        Los loops de espera cuentan sus consultas (States.MathAdd): un job que
+        supera INGESTION_MAX_POLLS queda en TIMEOUT y un agente que supera
+        AGENT_MAX_POLLS mantiene el alias actual.
+        Los data sources que el manifiesto del ETL (manifest_path) cubre usan la
+        ingesta directa de documentos; si falla, el ingestion job completo.
+
+        s3_prefixes limita la sincronización a los data sources que los cubren
+        (fast path de FAQs) y, con fail_on_errors, un data source con error
+        termina en failure_task. id_prefix distingue los estados de cada
+        state machine.
+        """
+        kb_arns = [f"arn:aws:bedrock:{self.region}:{self.account}:knowledge-base/{kb_id}" for kb_id in kb_ids]
+        agent_arn = f"arn:aws:bedrock:{self.region}:{self.account}:agent/{agent_id}"
+
+        plan_payload = {"action": "plan_ingestion"}
+        if manifest_path:
+            plan_payload["etl_manifest.$"] = manifest_path
+        if s3_prefixes:
+            plan_payload["s3_prefixes"] = s3_prefixes
+
+        # Data sources con cambios (fingerprint distinto al del último job exitoso)
+        plan_task = tasks.LambdaInvoke(
+            self,
+            f"{id_prefix}PlanIngestionTask",
+            lambda_function=sync_lambda,
+            payload=sfn.TaskInput.from_object(plan_payload),
+            result_selector={
+                "data_sources.$": "$.Payload.data_sources",
+                "knowledge_bases.$": "$.Payload.knowledge_bases",
+                "skipped.$": "$.Payload.skipped",
+                "archivos_encontrados.$": "$.Payload.archivos_encontrados"
+            },
+            result_path="$.plan",
+            retry_on_service_exceptions=True,
+            comment="Lista data sources y omite los que no cambiaron"
+        )
+
+        """
+        @ Ingestion job por data source (uno a la vez por Knowledge Base)
+        """
+
+        start_job = tasks.CallAwsService(
+            self,
+            f"{id_prefix}StartIngestionJob",
+            service="bedrockagent",
+            action="startIngestionJob",
+            parameters={
+                "KnowledgeBaseId.$": "$.data_source.kb_id",
+                "DataSourceId.$": "$.data_source.id",
+                "Description.$": "States.Format('Sync automático {}', $$.Execution.StartTime)"
+            },
+            iam_action="bedrock:StartIngestionJob",
+            iam_resources=kb_arns,
+            result_selector={"ingestion_job_id.$": "$.IngestionJob.IngestionJobId"},
+            result_path="$.job"
+        )
+
+        wait_job = sfn.Wait(
+            self,
+            f"{id_prefix}WaitIngestionJob",
+            time=sfn.WaitTime.duration(Duration.seconds(self.INGESTION_POLL_SECONDS))
+        )
+
+        get_job = tasks.CallAwsService(
+            self,
+            f"{id_prefix}GetIngestionJob",
+            service="bedrockagent",
+            action="getIngestionJob",
+            parameters={
+                "KnowledgeBaseId.$": "$.data_source.kb_id",
+                "DataSourceId.$": "$.data_source.id",
+                "IngestionJobId.$": "$.job.ingestion_job_id"
+            },
+            iam_action="bedrock:GetIngestionJob",
+            iam_resources=kb_arns,
+            result_path="$.job_status"
+        )
+
+        # Un job del mismo KB iniciado fuera de esta ejecución (consola, Lambda)
+        start_job.add_retry(
+            errors=["BedrockAgent.ConflictException"],
+            interval=Duration.seconds(30),
+            max_attempts=6,
+            backoff_rate=2
+        )
+        for task in (start_job, get_job):
+            task.add_retry(
+                errors=["BedrockAgent.ThrottlingException"],
+                interval=Duration.seconds(5),
+                max_attempts=5,
+                backoff_rate=2
+            )
+            # Un data source con error no detiene a los demás
+            task.add_catch(
+                sfn.Pass(self, f"{task.node.id}Error"),
+                errors=["States.ALL"],
+                result_path="$.error"
+            )
+
+        # Contador de consultas: el loop Wait -> Get termina tras INGESTION_MAX_POLLS
+        init_job_polls = sfn.Pass(
+            self,
+            f"{id_prefix}InitIngestionJobPolls",
+            result=sfn.Result.from_object({"count": 0}),
+            result_path="$.job_polls"
+        )
+        count_job_poll = sfn.Pass(
+            self,
+            f"{id_prefix}CountIngestionJobPoll",
+            parameters={"count.$": "States.MathAdd($.job_polls.count, 1)"},
+            result_path="$.job_polls"
+        )
+
+        # Igual que esperar_completacion_job: TIMEOUT sin estadísticas cuenta
+        # como cambio posible en record_ingestion
+        job_timeout = sfn.Pass(
+            self,
+            f"{id_prefix}IngestionJobTimeout",
+            parameters={
+                "IngestionJob": {
+                    "Status": "TIMEOUT",
+                    "StartedAt.$": "$.job_status.IngestionJob.StartedAt",
+                    "UpdatedAt.$": "$.job_status.IngestionJob.UpdatedAt"
+                }
+            },
+            result_path="$.job_status",
+            comment=f"El job no terminó en {self.INGESTION_POLL_SECONDS * self.INGESTION_MAX_POLLS}s"
+        )
+
+        job_finished = sfn.Choice(self, f"{id_prefix}IngestionJobFinished")
+        job_finished.when(
+            sfn.Condition.or_(
+                sfn.Condition.string_equals("$.job_status.IngestionJob.Status", "COMPLETE"),
+                sfn.Condition.string_equals("$.job_status.IngestionJob.Status", "FAILED"),
+                sfn.Condition.string_equals("$.job_status.IngestionJob.Status", "STOPPED")
+            ),
+            sfn.Pass(self, f"{id_prefix}IngestionJobDone")
+        ).when(
+            sfn.Condition.number_greater_than_equals("$.job_polls.count", self.INGESTION_MAX_POLLS),
+            job_timeout
+        ).otherwise(wait_job)
+
+        job_chain = (
+            start_job.next(init_job_polls).next(wait_job).next(get_job)
+            .next(count_job_poll).next(job_finished)
+        )
+
+        # Solo los documentos del manifiesto ETL; la Lambda espera su estado final
+        direct_task = tasks.LambdaInvoke(
+            self,
+            f"{id_prefix}DirectIngestTask",
+            lambda_function=sync_lambda,
+            payload=sfn.TaskInput.from_object({
+                "action": "ingest_direct",
+                "data_source.$": "$.data_source"
+            }),
+            payload_response_only=True,
+            result_path="$.direct",
+            retry_on_service_exceptions=True,
+            task_timeout=sfn.Timeout.duration(Duration.minutes(15)),
+            comment="Ingesta directa de los documentos cambiados del data source"
+        )
+        direct_task.add_catch(start_job, errors=["States.ALL"], result_path="$.direct_error")
+
+        ingestion_mode = sfn.Choice(self, f"{id_prefix}IngestionMode")
+        ingestion_mode.when(
+            sfn.Condition.is_present("$.data_source.direct"),
+            direct_task
+        ).otherwise(job_chain)
+
+        # Bedrock permite 1 ingestion job a la vez por Knowledge Base: los data
+        # sources de un KB van en secuencia y los KBs en paralelo
+        data_sources_map = sfn.Map(
+            self,
+            f"{id_prefix}DataSourcesMap",
+            items_path="$.knowledge_base.data_sources",
+            item_selector={"data_source.$": "$$.Map.Item.Value"},
+            max_concurrency=1
+        )
+        data_sources_map.item_processor(ingestion_mode)
+
+        ingestion_map = sfn.Map(
+            self,
+            f"{id_prefix}IngestionJobsMap",
+            items_path="$.plan.knowledge_bases",
+            item_selector={"knowledge_base.$": "$$.Map.Item.Value"},
+            max_concurrency=len(kb_ids),
+            result_path="$.jobs"
+        )
+        ingestion_map.item_processor(data_sources_map)
+
+        no_jobs = sfn.Pass(
+            self,
+            f"{id_prefix}NoIngestionJobs",
+            result=sfn.Result.from_array([]),
+            result_path="$.jobs"
+        )
+
+        # Guarda fingerprints y decide si el índice cambió
+        record_task = tasks.LambdaInvoke(
+            self,
+            f"{id_prefix}RecordIngestionTask",
+            lambda_function=sync_lambda,
+            payload=sfn.TaskInput.from_object({
+                "action": "record_ingestion",
+                "plan.$": "$.plan",
+                "jobs.$": "$.jobs"
+            }),
+            result_selector={
+                "changed.$": "$.Payload.changed",
+                "failed.$": "$.Payload.failed",
+                "index_changes.$": "$.Payload.index_changes"
+            },
+            result_path="$.record",
+            retry_on_service_exceptions=True,
+            comment="Registra los ingestion jobs y resume los cambios del índice"
+        )
+
+        """
+        @ Preparación del agente y nuevo alias (solo si el índice cambió)
+        """
+
+        prepare_agent = tasks.CallAwsService(
+            self,
+            f"{id_prefix}PrepareAgent",
+            service="bedrockagent",
+            action="prepareAgent",
+            parameters={"AgentId": agent_id},
+            iam_action="bedrock:PrepareAgent",
+            iam_resources=[agent_arn],
+            result_selector={"prepared_at.$": "$.PreparedAt"},
+            result_path="$.prepare"
+        )
+
+        wait_agent = sfn.Wait(
+            self,
+            f"{id_prefix}WaitAgentPrepared",
+            time=sfn.WaitTime.duration(Duration.seconds(self.AGENT_POLL_SECONDS))
+        )
+
+        get_agent = tasks.CallAwsService(
+            self,
+            f"{id_prefix}GetAgent",
+            service="bedrockagent",
+            action="getAgent",
+            parameters={"AgentId": agent_id},
+            iam_action="bedrock:GetAgent",
+            iam_resources=[agent_arn],
+            result_selector={"status.$": "$.Agent.AgentStatus"},
+            result_path="$.agent"
+        )
+
+        publish_task = tasks.LambdaInvoke(
+            self,
+            f"{id_prefix}PublishAliasTask",
+            lambda_function=sync_lambda,
+            payload=sfn.TaskInput.from_object({
+                "action": "publish_alias",
+                "prepared_at.$": "$.prepare.prepared_at"
+            }),
+            result_selector={"alias_id.$": "$.Payload.alias_id"},
+            result_path="$.alias",
+            retry_on_service_exceptions=True,
+            comment="Crea el alias del agente preparado y lo publica en SSM"
+        )
+        publish_task.add_catch(failure_task, errors=["States.ALL"], result_path="$.error")
+
+        # Igual que el flujo Lambda: un agente sin preparar no falla el pipeline
+        agent_not_prepared = sfn.Pass(
+            self,
+            f"{id_prefix}AgentNotPrepared",
+            comment="El agente no alcanzó PREPARED; se mantiene el alias actual"
+        ).next(success_task)
+        for task in (prepare_agent, get_agent):
+            task.add_catch(agent_not_prepared, errors=["States.ALL"], result_path="$.agent_error")
+
+        init_agent_polls = sfn.Pass(
+            self,
+            f"{id_prefix}InitAgentPolls",
+            result=sfn.Result.from_object({"count": 0}),
+            result_path="$.agent_polls"
+        )
+        count_agent_poll = sfn.Pass(
+            self,
+            f"{id_prefix}CountAgentPoll",
+            parameters={"count.$": "States.MathAdd($.agent_polls.count, 1)"},
+            result_path="$.agent_polls"
+        )
+
+        # Tras AGENT_MAX_POLLS consultas se trata como agente no preparado
+        agent_prepared = sfn.Choice(self, f"{id_prefix}AgentPrepared")
+        agent_prepared.when(
+            sfn.Condition.string_equals("$.agent.status", "PREPARED"),
+            publish_task.next(success_task)
+        ).when(
+            sfn.Condition.number_greater_than_equals("$.agent_polls.count", self.AGENT_MAX_POLLS),
+            agent_not_prepared
+        ).when(
+            sfn.Condition.or_(
+                sfn.Condition.string_equals("$.agent.status", "PREPARING"),
+                sfn.Condition.string_equals("$.agent.status", "UPDATING"),
+                sfn.Condition.string_equals("$.agent.status", "CREATING")
+            ),
+            wait_agent
+        ).otherwise(agent_not_prepared)
+
+        index_changed = sfn.Choice(self, f"{id_prefix}IndexChanged")
+        index_changed.when(
+            sfn.Condition.boolean_equals("$.record.changed", True),
+            prepare_agent.next(init_agent_polls).next(wait_agent).next(get_agent)
+            .next(count_agent_poll).next(agent_prepared)
+        ).otherwise(success_task)
+
+        plan_task.add_catch(failure_task, errors=["States.ALL"], result_path="$.error")
+        record_task.add_catch(failure_task, errors=["States.ALL"], result_path="$.error")
+        if fail_on_errors:
+            ingestion_failed = sfn.Choice(self, f"{id_prefix}IngestionFailed")
+            ingestion_failed.when(
+                sfn.Condition.number_greater_than("$.record.failed", 0),
+                failure_task
+            ).otherwise(index_changed)
+            record_task.next(ingestion_failed)
+        else:
+            record_task.next(index_changed)
+
+        has_data_sources = sfn.Choice(self, f"{id_prefix}HasDataSourcesToSync")
+        has_data_sources.when(
+            sfn.Condition.is_present("$.plan.data_sources[0]"),
+            ingestion_map.next(record_task)
+        ).otherwise(no_jobs.next(record_task))
+
+        return plan_task.next(has_data_sources)
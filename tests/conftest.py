@@ -0,0 +1,103 @@
+"""
+Configuración común de los tests
+
+Los módulos de las Lambdas no son paquetes: se importan agregando sus
+carpetas al path, como las empaqueta CDK. La del ETL va primero porque su
+lambda_function.py es el motor pandas que comparan los tests de paridad.
+Los módulos de los stacks se importan desde la raíz, igual que en app.py.
+La Lambda de sincronización (fixture sync) se carga por ruta con otro nombre.
+"""
+
+import os
+import sys
+import json
+import importlib.util
+from io import BytesIO
+from pathlib import Path
+from datetime import datetime, timezone
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+for folder in reversed((
+    "stack_backend_lambda_light_etl",
+    "stack_lambda_sync_vectorial/lambda",
+    # Capa compartida de las Lambdas (/opt/python)
+    "lambda_shared",
+)):
+    sys.path.insert(0, str(ROOT_DIR / folder))
+sys.path.append(str(ROOT_DIR))
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+
+# ============================================================================
+# LAMBDA DE SINCRONIZACIÓN
+# ============================================================================
+
+class MemoryS3Client:
+    """get/put_object y el paginador de list_objects_v2 sobre un dict en memoria."""
+
+    class exceptions:
+        NoSuchKey = type('NoSuchKey', (Exception,), {})
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.objects[(Bucket, Key)] = Body.encode('utf-8') if isinstance(Body, str) else Body
+        return {}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        return {'Body': BytesIO(self.objects[(Bucket, Key)])}
+
+    def put_json(self, Bucket, Key, data):
+        self.put_object(Bucket, Key, json.dumps(data))
+
+    def get_json(self, Bucket, Key):
+        return json.loads(self.get_object(Bucket, Key)['Body'].read())
+
+    def get_paginator(self, operation):
+        client = self
+
+        class _Paginator:
+            def paginate(self, Bucket, Prefix=''):
+                yield {'Contents': [
+                    {'Key': key, 'ETag': f'"{len(body)}"', 'Size': len(body),
+                     'LastModified': datetime(2025, 1, 1, tzinfo=timezone.utc)}
+                    for (bucket, key), body in sorted(client.objects.items())
+                    if bucket == Bucket and key.startswith(Prefix)
+                ]}
+
+        return _Paginator()
+
+
+@pytest.fixture(scope='session')
+def sync_module():
+    """lambda_function de la sincronización, importado con otro nombre (el ETL usa el mismo)."""
+    pytest.importorskip('boto3')
+    os.environ.setdefault('S3_BUCKET_NAME', 'local')
+    os.environ.setdefault('KNOWLEDGE_BASE_ID', 'LOCALKB')
+    os.environ.setdefault('AGENT_ID', 'LOCALAGENT')
+    path = ROOT_DIR / "stack_lambda_sync_vectorial" / "lambda" / "lambda_function.py"
+    spec = importlib.util.spec_from_file_location('sync_lambda_function', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def sync(sync_module, monkeypatch):
+    """Lambda de sincronización con S3 en memoria, bedrock-agent simulado y ManualClock."""
+    from bedrock_local import LocalBedrockAgentClient, ManualClock
+
+    clock = ManualClock()
+    monkeypatch.setattr(sync_module, 's3_client', MemoryS3Client())
+    monkeypatch.setattr(sync_module, 'bedrock_agent_client', LocalBedrockAgentClient(clock))
+    monkeypatch.setattr(sync_module, 'clock', clock)
+    monkeypatch.setattr(sync_module, 'INGESTION_HISTORY_TABLE', '')
+    return sync_module
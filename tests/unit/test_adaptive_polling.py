@@ -0,0 +1,72 @@
+"""
+Polling adaptativo de la Lambda de sincronización con el reloj simulado de bedrock_local.py
+"""
+
+import pytest
+
+from adaptive_polling import AdaptivePoller, ingestion_progress
+from bedrock_local import ManualClock
+
+
+def test_backoff_until_finished():
+    clock = ManualClock()
+    poller = AdaptivePoller(clock, initial_interval=2.0, max_interval=5.0, backoff=1.5)
+
+    result = poller.wait(lambda elapsed: (elapsed >= 10, 'COMPLETE', None), timeout=60)
+
+    assert result == 'COMPLETE'
+    assert clock.sleeps == [2.0, 3.0, 4.5, 5.0]
+    assert poller.polls == 5
+    assert poller.elapsed == pytest.approx(14.5)
+
+
+def test_timeout_returns_timeout_value():
+    clock = ManualClock()
+    poller = AdaptivePoller(clock, initial_interval=2.0, max_interval=20.0)
+
+    result = poller.wait(lambda elapsed: (False, 'IN_PROGRESS', None), timeout=30, timeout_value='TIMEOUT')
+
+    assert result == 'TIMEOUT'
+    # No duerme más allá del timeout (más el intervalo mínimo)
+    assert 30 < clock.now() <= 30 + poller.min_interval
+
+
+def test_progress_prediction_shortens_the_wait():
+    clock = ManualClock()
+    poller = AdaptivePoller(clock, initial_interval=2.0, max_interval=60.0, backoff=3.0)
+
+    # 100 documentos a 10 por segundo desde t=0
+    def check(elapsed):
+        done = min(100, int(elapsed * 10))
+        return done >= 100, 'COMPLETE', (done, 100)
+
+    assert poller.wait(check, timeout=300) == 'COMPLETE'
+    # Sin predicción el backoff iría 2, 6, 18; con ella se espera hasta el término previsto
+    assert clock.sleeps[:2] == [2.0, 6.0]
+    assert clock.sleeps[2] == pytest.approx(2.0)
+    assert clock.now() == pytest.approx(10.0)
+
+
+def test_prediction_never_extends_the_wait():
+    clock = ManualClock()
+    poller = AdaptivePoller(clock, initial_interval=2.0, max_interval=2.0, backoff=1.0)
+
+    # Muy lento: la predicción (cientos de segundos) no alarga el intervalo
+    def check(elapsed):
+        return elapsed >= 8, 'COMPLETE', (int(elapsed), 1000)
+
+    poller.wait(check, timeout=60)
+
+    assert set(clock.sleeps) == {2.0}
+    assert poller.predicted > 2.0
+
+
+@pytest.mark.parametrize('statistics, expected', [
+    (None, None),
+    ({}, None),
+    ({'numberOfDocumentsScanned': 0}, None),
+    ({'numberOfDocumentsScanned': 10, 'numberOfNewDocumentsIndexed': 3, 'numberOfDocumentsFailed': 1}, (4, 10)),
+    ({'numberOfDocumentsScanned': 5, 'numberOfModifiedDocumentsIndexed': 4, 'numberOfDocumentsDeleted': 3}, (5, 5)),
+])
+def test_ingestion_progress(statistics, expected):
+    assert ingestion_progress(statistics) == expected
@@ -0,0 +1,54 @@
+"""
+Agent instruction compiler (stack_backend_bedrock/agent_instruction.py)
+"""
+
+import pytest
+
+from stack_backend_bedrock.agent_instruction import InstructionSection, compile_instruction, estimate_tokens
+
+
+def test_sections_are_rendered_and_minified():
+    compiled = compile_instruction([
+        InstructionSection("", ["Eres el asistente   de MUT.  "]),
+        InstructionSection("  REGLAS ", ["  Responde   breve", "Usa *negritas*"], bullet="- "),
+    ])
+
+    assert compiled.text == "Eres el asistente de MUT.\n## REGLAS\n- Responde breve\n- Usa *negritas*"
+    assert compiled.tokens == estimate_tokens(compiled.text)
+    assert compiled.removed_duplicates == []
+
+
+def test_duplicates_across_sections_are_removed():
+    compiled = compile_instruction([
+        InstructionSection("IDENTIDAD", ["No inventes información."]),
+        InstructionSection("REGLAS", ["⚠️ NO INVENTES INFORMACION", "Responde en español"], bullet="- "),
+    ])
+
+    assert compiled.text == "## IDENTIDAD\nNo inventes información.\n## REGLAS\n- Responde en español"
+    assert compiled.removed_duplicates == ["⚠️ NO INVENTES INFORMACION"]
+    assert compiled.source_tokens > compiled.tokens
+
+
+def test_sections_without_dedupe_keep_repeated_lines():
+    compiled = compile_instruction([
+        InstructionSection("REGLAS", ["Saluda una vez"]),
+        InstructionSection("EJEMPLOS", ["Saluda una vez"], dedupe=False),
+    ])
+
+    assert compiled.text.count("Saluda una vez") == 2
+
+
+def test_multiline_examples_get_the_bullet_once():
+    compiled = compile_instruction([
+        InstructionSection("EJEMPLOS", ["P: ¿Dónde está Nike?\n  R: Piso -2, local 101\n\n"], bullet="- "),
+    ])
+
+    assert compiled.text == "## EJEMPLOS\n- P: ¿Dónde está Nike?\nR: Piso -2, local 101"
+
+
+def test_token_budget():
+    sections = [InstructionSection("REGLAS", [f"Regla número {i} del asistente" for i in range(50)])]
+
+    assert compile_instruction(sections, max_tokens=0).tokens > 100
+    with pytest.raises(ValueError, match="agent_instruction_max_tokens=100"):
+        compile_instruction(sections, max_tokens=100)
@@ -0,0 +1,144 @@
+"""
+Manifiesto de cambios del ETL (etl_changes.ChangeTracker) sobre un bucket local
+"""
+
+import json
+
+import pytest
+
+from etl_changes import ChangeTracker, describe_outputs, has_changes
+from etl_datasets import DATASET_CONFIGS
+from etl_local import LocalS3Client
+from etl_stdlib import delete_stale_outputs, document_file_stem
+
+
+CONFIG = DATASET_CONFIGS['stores']
+PREFIX = 'kb/stores'
+
+
+def doc(titulo, texto, document_id=None, **fields):
+    return {
+        'titulo': titulo,
+        'bedrock_text': texto,
+        'document_type': 'tienda',
+        'search_category': 'comercios_y_tiendas',
+        'document_id': document_id or f"stores_0_{titulo}",
+        **fields
+    }
+
+
+@pytest.fixture
+def s3(tmp_path):
+    return LocalS3Client(str(tmp_path))
+
+
+def file_name(titulo):
+    return f"{document_file_stem({'titulo': titulo}, 'stores', CONFIG, set())}.txt"
+
+
+def run(s3, records, output_mode='chunks'):
+    """Una ejecución del ETL: escribe los archivos descritos y cierra el manifiesto."""
+    outputs = describe_outputs(records, 'stores', CONFIG, PREFIX, output_mode, num_rows_per_file=1)
+    for key in outputs:
+        s3.put_object(Bucket='local', Key=key, Body='x')
+        s3.put_object(Bucket='local', Key=f"{key}.metadata.json", Body='{}')
+    tracker = ChangeTracker(s3, 'local', output_mode)
+    tracker.record('stores', outputs)
+    return tracker.finish()
+
+
+def manifest(s3):
+    return json.loads(s3.get_object(Bucket='local', Key='sync-state/etl_change_manifest.json')['Body'].read())
+
+
+def test_first_run_adds_everything(s3):
+    summary = run(s3, [doc('Nike', 'Nike nivel 1'), doc('Adidas', 'Adidas nivel 2')])
+
+    assert summary == {'stores': {'added': 2, 'updated': 0, 'deleted': 0}}
+    assert manifest(s3)['base_generated_at'] is None
+
+
+def test_added_updated_and_deleted(s3, tmp_path):
+    run(s3, [doc('Nike', 'Nike nivel 1'), doc('Adidas', 'Adidas nivel 2')])
+    summary = run(s3, [doc('Nike', 'Nike nivel 3')])
+
+    assert summary == {'stores': {'added': 0, 'updated': 1, 'deleted': 1}}
+    changes = manifest(s3)['changes']['stores']
+    assert changes['updated'] == [f"{PREFIX}/stores_chunk_001.jsonl"]
+    assert changes['deleted'] == [f"{PREFIX}/stores_chunk_002.jsonl"]
+    # El archivo eliminado y su sidecar se borran de S3
+    assert not (tmp_path / PREFIX / 'stores_chunk_002.jsonl').exists()
+    assert not (tmp_path / PREFIX / 'stores_chunk_002.jsonl.metadata.json').exists()
+
+
+def test_unchanged_content_with_new_document_ids(s3):
+    run(s3, [doc('Nike', 'Nike nivel 1', 'stores_1700000000_0_Nike')])
+    summary = run(s3, [doc('Nike', 'Nike nivel 1', 'stores_1800000000_0_Nike')])
+
+    assert summary == {'stores': {'added': 0, 'updated': 0, 'deleted': 0}}
+    assert not has_changes(summary)
+
+
+def test_documents_mode_uses_stable_file_names(s3):
+    run(s3, [doc('Nike', 'Nike'), doc('Adidas', 'Adidas')], 'documents')
+    summary = run(s3, [doc('Nike', 'Nike renovada'), doc('Puma', 'Puma')], 'documents')
+
+    changes = manifest(s3)['changes']['stores']
+    assert summary == {'stores': {'added': 1, 'updated': 1, 'deleted': 1}}
+    assert changes['added'] == [f"{PREFIX}/{file_name('Puma')}"]
+    assert changes['updated'] == [f"{PREFIX}/{file_name('Nike')}"]
+    assert changes['deleted'] == [f"{PREFIX}/{file_name('Adidas')}"]
+
+
+def test_documents_mode_ignores_row_order(s3):
+    # Dos tiendas con el mismo nombre: el archivo depende de titulo, nivel y local, no del orden
+    records = [doc('Nike', 'Nike local 101', local='101'), doc('Nike', 'Nike local 202', local='202'), doc('Puma', 'Puma')]
+    run(s3, records, 'documents')
+
+    summary = run(s3, records[::-1], 'documents')
+
+    assert summary == {'stores': {'added': 0, 'updated': 0, 'deleted': 0}}
+
+
+def test_output_mode_change_replaces_all_files(s3, tmp_path):
+    records = [doc('Nike', 'Nike'), doc('Adidas', 'Adidas')]
+    run(s3, records, 'chunks')
+    summary = run(s3, records, 'documents')
+
+    assert summary == {'stores': {'added': 2, 'updated': 0, 'deleted': 2}}
+    data = manifest(s3)
+    assert data['output_modes'] == {'stores': 'documents'}
+    assert sorted(p.name for p in (tmp_path / PREFIX).iterdir() if not p.name.endswith('.metadata.json')) == sorted([
+        file_name('Adidas'), file_name('Nike')
+    ])
+
+
+def test_pending_changes_are_consolidated(s3):
+    branch = ChangeTracker(s3, 'local', 'chunks')
+    branch.record('stores', describe_outputs([doc('Nike', 'Nike')], 'stores', CONFIG, PREFIX, 'chunks', 1))
+    branch.record_source('stores', 'sha-1')
+    assert branch.save_pending() == {'stores': 1}
+
+    final = ChangeTracker(s3, 'local', 'chunks')
+    final.load_pending(['stores', 'eventos'])
+    summary = final.finish()
+
+    assert summary == {'stores': {'added': 1, 'updated': 0, 'deleted': 0}}
+    assert manifest(s3)['sources'] == {'stores': 'sha-1'}
+    with pytest.raises(FileNotFoundError):
+        s3.get_object(Bucket='local', Key=final.pending_key('stores'))
+
+
+def test_delete_stale_outputs_keeps_written_files(s3, tmp_path, monkeypatch):
+    monkeypatch.setenv('ETL_LOCAL_ROOT', str(tmp_path))
+    for name in ('stores_Nike.txt', 'stores_chunk_001.jsonl'):
+        s3.put_object(Bucket='local', Key=f"{PREFIX}/{name}", Body='x')
+        s3.put_object(Bucket='local', Key=f"{PREFIX}/{name}.metadata.json", Body='{}')
+    s3.put_object(Bucket='local', Key='kb/storesx/otro.txt', Body='x')
+
+    stale = delete_stale_outputs('local', PREFIX, [f"{PREFIX}/stores_Nike.txt"])
+
+    assert sorted(stale) == [f"{PREFIX}/stores_chunk_001.jsonl", f"{PREFIX}/stores_chunk_001.jsonl.metadata.json"]
+    assert sorted(p.name for p in (tmp_path / PREFIX).iterdir()) == ['stores_Nike.txt', 'stores_Nike.txt.metadata.json']
+    # Solo el prefijo del dataset, no los que comparten el comienzo del nombre
+    assert (tmp_path / 'kb' / 'storesx' / 'otro.txt').exists()
@@ -0,0 +1,62 @@
+"""
+Directorio de tiendas y restaurantes del ETL (etl_directory.py): nombres principales y alias
+"""
+
+from etl_directory import build_directory_items, name_aliases
+
+
+def by_key(items):
+    return {item['name_key']: item for item in items}
+
+
+def test_name_aliases():
+    assert name_aliases('La Fête') == {'fete', 'lafete'}
+    assert name_aliases('Café & Libros') == {'cafe y libros', 'cafelibros'}
+    assert name_aliases('Nike (Nivel 1)') == {'nike', 'nikenivel1'}
+
+
+def test_principal_items_merge_locations():
+    items = by_key(build_directory_items([
+        {'titulo': 'La Fête', 'nivel': '-3.0', 'local': '101'},
+        {'titulo': 'la fete', 'nivel': '2', 'local': 'nan'},
+        {'titulo': 'La Fête', 'nivel': '-3', 'local': '101'},
+        {'titulo': '', 'nivel': '1'},
+    ], 'restaurantes', 'build-1'))
+
+    principal = items['la fete']
+    assert principal['titulo'] == 'La Fête'
+    assert principal['document_type'] == 'restaurante'
+    assert principal['build_id'] == 'build-1'
+    assert principal['locations'] == [{'nivel': '-3', 'local': '101'}, {'nivel': '2'}]
+    assert 'alias_of' not in principal
+
+
+def test_alias_with_a_single_owner_points_to_it():
+    items = by_key(build_directory_items([{'titulo': 'La Fête', 'local': '101'}], 'restaurantes', 'b'))
+
+    assert items['fete']['alias_of'] == 'la fete'
+    assert items['lafete']['alias_of'] == 'la fete'
+    assert items['fete']['locations'] == items['la fete']['locations']
+
+
+def test_ambiguous_aliases_are_dropped():
+    items = by_key(build_directory_items([
+        {'titulo': 'Nike (Nivel 1)', 'local': '101'},
+        {'titulo': 'Nike - Outlet', 'local': '202'},
+    ], 'stores', 'b'))
+
+    # "nike" pertenece a dos tiendas: el chat no debe elegir una al azar
+    assert 'nike' not in items
+    assert items['nikenivel1']['alias_of'] == 'nike nivel 1'
+    assert items['nikeoutlet']['alias_of'] == 'nike outlet'
+
+
+def test_alias_never_replaces_a_principal_name():
+    items = by_key(build_directory_items([
+        {'titulo': 'Nike', 'local': '100'},
+        {'titulo': 'Nike (Nivel 1)', 'local': '101'},
+    ], 'stores', 'b'))
+
+    assert 'alias_of' not in items['nike']
+    assert items['nike']['locations'] == [{'local': '100'}]
+    assert [item['name_key'] for item in items.values() if item.get('alias_of')] == ['nikenivel1']
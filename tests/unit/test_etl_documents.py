@@ -0,0 +1,101 @@
+"""
+Modo documents del ETL (etl_stdlib.py): partición de documentos largos y nombres de archivo estables
+"""
+
+from etl_datasets import DATASET_CONFIGS
+from etl_stdlib import document_file_stem, estimate_tokens, split_oversized_documents
+
+
+CONFIG = DATASET_CONFIGS['stores']
+
+
+def doc(text, document_id='stores_0_Nike', **fields):
+    return {
+        'bedrock_text': text,
+        'document_type': 'tienda',
+        'search_category': 'comercios_y_tiendas',
+        'document_id': document_id,
+        **fields
+    }
+
+
+def test_small_documents_are_not_split():
+    docs = [doc('Nike | Nivel 1 | Local 101')]
+
+    assert split_oversized_documents(docs, 50) == docs
+
+
+def test_oversized_document_is_split_within_budget():
+    sections = ' | '.join(f"Sección {i}: " + ' '.join(f"palabra{j}" for j in range(20)) for i in range(10))
+    text = f"TIENDA: Nike | {sections}"
+
+    parts = split_oversized_documents([doc(text, titulo='Nike')], 60)
+
+    assert len(parts) > 1
+    assert all(estimate_tokens(part['bedrock_text']) <= 60 for part in parts)
+    # Cada parte repite el título, conserva la metadata y tiene su propio id
+    assert all(part['bedrock_text'].startswith('TIENDA: Nike | ') for part in parts)
+    assert all(part['titulo'] == 'Nike' for part in parts)
+    assert [part['document_id'] for part in parts] == [f"stores_0_Nike_p{n}" for n in range(1, len(parts) + 1)]
+    assert [part['document_part'] for part in parts] == list(range(1, len(parts) + 1))
+    # No se pierde texto
+    body = ' | '.join(part['bedrock_text'][len('TIENDA: Nike | '):] for part in parts)
+    assert body.split() == sections.split()
+
+
+def test_single_long_section_is_split_by_words():
+    text = ' '.join(f"palabra{j}" for j in range(200))
+
+    parts = split_oversized_documents([doc(text)], 40)
+
+    assert len(parts) > 1
+    assert all(estimate_tokens(part['bedrock_text']) <= 40 for part in parts)
+    assert ' '.join(part['bedrock_text'] for part in parts).split() == text.split()
+
+
+def test_long_token_is_split_by_characters():
+    url = 'https://mut.cl/' + 'a' * 1985
+
+    parts = split_oversized_documents([doc(f"TIENDA: Nike | Web: {url}")], 300)
+
+    assert all(estimate_tokens(part['bedrock_text']) <= 300 for part in parts)
+    assert ''.join(part['bedrock_text'][len('TIENDA: Nike | '):] for part in parts) == f"Web:{url}"
+
+
+def test_document_file_stem_depends_on_identity_not_order():
+    nike_101 = {'titulo': 'Nike', 'nivel': '1', 'local': '101'}
+    nike_202 = {'titulo': 'Nike', 'nivel': '2', 'local': '202'}
+
+    first = [document_file_stem(row, 'stores', CONFIG, set()) for row in (nike_101, nike_202)]
+    used = set()
+    second = [document_file_stem(row, 'stores', CONFIG, used) for row in (nike_202, nike_101)]
+
+    assert first[0] != first[1]
+    assert all(stem.startswith('stores_Nike_') for stem in first)
+    assert second == first[::-1]
+    # pandas lee los números como float
+    assert document_file_stem({'titulo': 'Nike', 'nivel': '1.0', 'local': '101.0'}, 'stores', CONFIG, set()) == first[0]
+
+
+def test_document_file_stem_parts_and_duplicates():
+    row = {'titulo': 'Café & Libros', 'nivel': '1', 'local': '101'}
+    stem = document_file_stem(row, 'stores', CONFIG, set())
+    used = set()
+
+    stems = [
+        document_file_stem(dict(row, document_part=1), 'stores', CONFIG, used),
+        document_file_stem(dict(row, document_part=2), 'stores', CONFIG, used),
+        document_file_stem(row, 'stores', CONFIG, used),
+        document_file_stem(row, 'stores', CONFIG, used),
+    ]
+
+    assert stem.startswith('stores_Caf_Libros_')
+    # Solo filas con la misma identidad se numeran por orden
+    assert stems == [f"{stem}_p1", f"{stem}_p2", stem, f"{stem}_2"]
+
+
+def test_document_file_stem_defaults():
+    stem = document_file_stem({'titulo': 'x' * 100}, 'eventos', {'id_field': 'titulo'}, set())
+
+    assert stem.startswith(f"eventos_{'x' * 60}_")
+    assert document_file_stem({}, 'stores', CONFIG, set()).startswith('stores_documento_')
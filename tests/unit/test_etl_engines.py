@@ -0,0 +1,74 @@
+"""
+Paridad de los motores ETL: pandas (lambda_function.py) y stdlib (etl_stdlib.py)
+deben escribir los mismos archivos KB a partir del mismo CSV vectorial.
+"""
+
+import re
+import json
+import shutil
+
+import pytest
+
+pytest.importorskip('pandas')
+pytest.importorskip('boto3')
+
+import etl_stdlib  # noqa: E402
+import lambda_function as pandas_engine  # noqa: E402
+from etl_datasets import DATASET_CONFIGS, NUM_ROWS_PER_FILE, VECTORIAL_FILENAMES  # noqa: E402
+
+from conftest import FIXTURES_DIR  # noqa: E402
+
+
+@pytest.fixture
+def local_root(tmp_path, monkeypatch):
+    """Bucket local (ETL_LOCAL_ROOT) con los CSV vectoriales de fixtures/ en vectorial/."""
+    shutil.copytree(FIXTURES_DIR, tmp_path / "vectorial")
+    monkeypatch.setenv('ETL_LOCAL_ROOT', str(tmp_path))
+    return tmp_path
+
+
+def run_engine(engine, file_type, output_s3_key):
+    config = dict(DATASET_CONFIGS[file_type], filename=VECTORIAL_FILENAMES[file_type])
+    df = engine.read_csv_robust(f"s3://local/vectorial/{VECTORIAL_FILENAMES[file_type]}", 'utf-8', file_type)
+    df = engine.transform_for_bedrock_kb(df, file_type, config)
+    engine.write_bedrock_kb_format(df, file_type, config, 'local', output_s3_key, NUM_ROWS_PER_FILE[file_type])
+    return engine.to_records(df)
+
+
+def read_output(folder):
+    """{archivo: contenido} sin lo que depende del momento de ejecución."""
+    files = {}
+    for path in sorted(folder.iterdir()):
+        if path.name.endswith('.metadata.json'):
+            metadata = json.loads(path.read_text(encoding='utf-8'))
+            metadata['metadataAttributes'].pop('processing_date')
+            files[path.name] = metadata
+        else:
+            files[path.name] = re.sub(r'"document_id": "(\w+?)_\d+_', r'"document_id": "\1_T_', path.read_text(encoding='utf-8'))
+    return files
+
+
+@pytest.mark.parametrize('file_type', sorted(VECTORIAL_FILENAMES))
+def test_engines_write_the_same_files(local_root, file_type):
+    pandas_docs = run_engine(pandas_engine, file_type, 'out/pandas')
+    stdlib_docs = run_engine(etl_stdlib, file_type, 'out/stdlib')
+
+    assert [doc['bedrock_text'] for doc in pandas_docs] == [doc['bedrock_text'] for doc in stdlib_docs]
+    pandas_files = read_output(local_root / 'out/pandas')
+    assert pandas_files
+    assert pandas_files == read_output(local_root / 'out/stdlib')
+
+
+def test_short_documents_are_dropped(local_root):
+    docs = run_engine(etl_stdlib, 'stores', 'out/stdlib')
+
+    assert 'Vacía' not in [doc['titulo'] for doc in docs]
+    assert len(docs) == 4
+
+
+def test_fallback_text_without_texto_embedding(local_root):
+    docs = run_engine(etl_stdlib, 'restaurantes', 'out/stdlib')
+
+    assert all(doc['document_type'] == 'restaurante' for doc in docs)
+    assert all(doc['search_category'] == 'gastronomia' for doc in docs)
+    assert docs[0]['bedrock_text'].startswith('🍽️ RESTAURANTE: Sushi Nikkei')
@@ -0,0 +1,27 @@
+"""
+Lectura de CSV del motor stdlib (mismo comportamiento que pandas con on_bad_lines='skip')
+"""
+
+from etl_stdlib import iter_chunks, iter_csv_rows
+
+
+def test_iter_csv_rows_skips_long_rows_and_pads_short_ones():
+    content = '﻿titulo,nivel,telefono\nNike,1,22\nAdidas\nPuma,1,2,extra\n\n'
+
+    rows = list(iter_csv_rows(content, 'stores'))
+
+    assert rows == [
+        {'titulo': 'Nike', 'nivel': '1', 'telefono': '22'},
+        {'titulo': 'Adidas', 'nivel': '', 'telefono': ''}
+    ]
+
+
+def test_iter_csv_rows_cleans_restaurant_phones():
+    rows = list(iter_csv_rows('titulo,telefono\nSushi,56912345678.0\nPizza,nan\n', 'restaurantes'))
+
+    assert [row['telefono'] for row in rows] == ['56912345678', '']
+
+
+def test_iter_chunks():
+    assert list(iter_chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(iter_chunks([], 2)) == []
@@ -0,0 +1,83 @@
+"""
+Índice FAQ del ETL (etl_faq_index.py): la normalización y los n-gramas deben
+coincidir con los del chat (stack_chat_runner/runner/faqIndex.js)
+"""
+
+import re
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from etl_faq_index import build_faq_index, normalize_question, signature
+
+from conftest import ROOT_DIR
+
+
+FAQ_INDEX_JS = ROOT_DIR / "stack_chat_runner" / "runner" / "faqIndex.js"
+PREGUNTAS_CSV = ROOT_DIR / "datasetmut" / "preguntas.csv"
+
+SAMPLES = [
+    "¿Dónde están los baños de MUT?",
+    "  ¿¿Hay WIFI   gratuito??  ",
+    "Cuál es la estación de metro más cercana",
+    "Señor, ¿venden pingüinos de peluche?",
+    "Café & Libros - Nivel -2 (Local 101)",
+    "horario de starbucks 🕐☕",
+    "ÁÉÍÓÚ ÑÜ àèìòù",
+    "Torre A\tnivel\n3",
+    "İstanbul Kebab",
+    "",
+]
+
+
+def js_function(source, name):
+    """Código de una función de faqIndex.js (hasta la llave de cierre en columna 0)."""
+    match = re.search(rf"^function {name}\(.*?^}}", source, re.S | re.M)
+    assert match, f"{name} no encontrada en {FAQ_INDEX_JS.name}"
+    return match.group(0)
+
+
+def run_js(texts):
+    """[normalized, signature] de cada texto según faqIndex.js."""
+    source = FAQ_INDEX_JS.read_text(encoding='utf-8')
+    script = "\n".join([
+        js_function(source, 'normalizeQuestion'),
+        js_function(source, 'signature'),
+        "const texts = JSON.parse(require('fs').readFileSync(0, 'utf-8'));",
+        "console.log(JSON.stringify(texts.map(t => {",
+        "    const normalized = normalizeQuestion(t);",
+        "    return [normalized, [...signature(normalized, 3)].sort()];",
+        "})));",
+    ])
+    result = subprocess.run(
+        ['node', '-e', script], input=json.dumps(texts), capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="requiere node")
+def test_normalization_matches_chat():
+    texts = SAMPLES + [line.split(';')[0] for line in PREGUNTAS_CSV.read_text(encoding='utf-8-sig').splitlines()[1:]]
+
+    expected = [[normalize_question(t), signature(normalize_question(t))] for t in texts]
+
+    # Los n-gramas son ASCII: sort() de JS y sorted() de Python ordenan igual
+    assert run_js(texts) == expected
+
+
+def test_normalize_question():
+    assert normalize_question("¿Dónde están los BAÑOS de MUT?") == "donde estan los banos de mut"
+    assert normalize_question(None) == ""
+
+
+def test_build_faq_index_keeps_first_answer():
+    index = build_faq_index([
+        {'pregunta': '¿Hay wifi?', 'respuesta': 'Sí, MUT_Free', 'categoria_nombre': 'Servicios'},
+        {'pregunta': 'hay WIFI', 'respuesta': 'Otra respuesta', 'categoria_nombre': 'Servicios'},
+        {'pregunta': 'Sin respuesta', 'respuesta': 'nan'},
+    ])
+
+    assert [entry['normalized'] for entry in index['entries']] == ['hay wifi']
+    assert index['entries'][0]['answer'] == 'Sí, MUT_Free'
@@ -0,0 +1,46 @@
+"""
+Ledger de ejecución compartido por las Lambdas del pipeline (lambda_shared/pipeline_ledger.py)
+"""
+
+from types import SimpleNamespace
+
+import pipeline_ledger
+from pipeline_ledger import LEDGER, contar_bytes, contar_llamada, iniciar_ledger, resumen_ledger
+
+
+CONTEXT = SimpleNamespace(memory_limit_in_mb=1024)
+
+
+def test_resumen_with_bytes():
+    inicio, started_at = iniciar_ledger()
+    contar_llamada()
+    contar_bytes({'Body': b'12345'})
+    contar_bytes({'Body': 'abc'})
+    contar_bytes({'Body': None})
+
+    resumen = resumen_ledger(CONTEXT, inicio, started_at, records_in=10, records_out=4)
+
+    assert resumen['started_at'] == started_at
+    assert (resumen['records_in'], resumen['records_out']) == (10, 4)
+    assert resumen['bytes'] == 8
+    assert resumen['api_calls'] == 1
+    assert resumen['memory_mb'] == 1024
+    assert resumen['estimated_cost_usd'] >= pipeline_ledger.LAMBDA_REQUEST_USD
+
+
+def test_bytes_are_omitted_when_not_measured():
+    inicio, started_at = iniciar_ledger(medir_bytes=False)
+    contar_bytes({'Body': b'12345'})
+    LEDGER['records_in'] = 7
+
+    resumen = resumen_ledger(CONTEXT, inicio, started_at)
+
+    assert 'bytes' not in resumen
+    assert (resumen['records_in'], resumen['records_out']) == (7, 0)
+
+
+def test_iniciar_ledger_resets_the_counters():
+    contar_llamada()
+    iniciar_ledger()
+
+    assert LEDGER == {'api_calls': 0, 'bytes': 0, 'records_in': 0, 'records_out': 0}
@@ -0,0 +1,86 @@
+"""
+Ingesta directa de la Lambda de sincronización a partir del manifiesto de cambios del ETL
+"""
+
+DS = {'id': 'DS1', 'name': 'stores', 'bucket': 'local', 'prefixes': ['datasets/stores/']}
+
+
+def manifiesto(**changes):
+    return {
+        'bucket': 'local',
+        'base_generated_at': '2025-01-01T00:00:00',
+        'generated_at': '2025-01-02T00:00:00',
+        'changes': {'stores': changes},
+    }
+
+
+def fingerprints(synced_at='2025-01-01T12:00:00'):
+    return {'DS1': {'fingerprint': 'abc', 'job_id': 'JOB1', 'synced_at': synced_at}}
+
+
+def test_cambios_directos_filters_by_prefix(sync):
+    cambios = sync.cambios_directos(
+        manifiesto(added=['datasets/stores/a.txt', 'datasets/eventos/b.txt'], deleted=['datasets/stores/c.txt']),
+        DS, fingerprints()
+    )
+
+    assert cambios == {
+        'added': ['datasets/stores/a.txt'], 'updated': [], 'deleted': ['datasets/stores/c.txt'],
+        'run_id': '2025-01-02T00:00:00'
+    }
+
+
+def test_cambios_directos_requires_the_base_run(sync):
+    changes = manifiesto(added=['datasets/stores/a.txt'])
+
+    assert sync.cambios_directos(None, DS, fingerprints()) is None
+    assert sync.cambios_directos(changes, DS, {}) is None
+    # El KB no estaba al día con la ejecución base, o el manifiesto ya se aplicó
+    assert sync.cambios_directos(changes, DS, fingerprints('2024-12-31T00:00:00')) is None
+    assert sync.cambios_directos(changes, DS, fingerprints('2025-01-02T00:00:00')) is None
+    assert sync.cambios_directos(dict(changes, bucket='otro'), DS, fingerprints()) is None
+
+
+def test_cambios_directos_falls_back_to_a_full_job(sync, monkeypatch):
+    monkeypatch.setattr(sync, 'DIRECT_INGEST_MAX_DOCUMENTS', 2)
+    keys = [f'datasets/stores/{i}.txt' for i in range(3)]
+
+    assert sync.cambios_directos(manifiesto(updated=keys), DS, fingerprints()) is None
+    assert sync.cambios_directos(manifiesto(updated=keys[:2]), DS, fingerprints()) is not None
+
+
+def test_ingestar_documentos_directo(sync, monkeypatch):
+    monkeypatch.setattr(sync, 'DIRECT_INGEST_BATCH_SIZE', 2)
+    cambios = {
+        'added': ['datasets/stores/a.txt', 'datasets/stores/b.txt'],
+        'updated': ['datasets/stores/c.txt'],
+        'deleted': ['datasets/stores/d.txt'],
+        'run_id': '2025-01-02T00:00:00',
+    }
+
+    entry = sync.ingestar_documentos_directo(DS, cambios)
+
+    assert entry['status'] == 'COMPLETE'
+    assert entry['mode'] == 'direct'
+    assert entry['job_id'] == 'direct-2025-01-02T00:00:00'
+    assert entry['statistics'] == {
+        'numberOfDocumentsScanned': 4,
+        'numberOfNewDocumentsIndexed': 2,
+        'numberOfModifiedDocumentsIndexed': 1,
+        'numberOfDocumentsDeleted': 1,
+        'numberOfDocumentsFailed': 0,
+    }
+    calls = sync.bedrock_agent_client.calls
+    assert calls['ingest_knowledge_base_documents'] == 2
+    assert calls['delete_knowledge_base_documents'] == 1
+    # Espera con el reloj simulado, sin llamadas a start_ingestion_job
+    assert 'start_ingestion_job' not in calls
+    assert sync.clock.sleeps
+
+
+def test_ingestar_documentos_directo_without_changes(sync):
+    entry = sync.ingestar_documentos_directo(DS, {'added': [], 'updated': [], 'deleted': [], 'run_id': 'r'})
+
+    assert entry['status'] == 'SKIPPED_UNCHANGED'
+    assert entry['knowledge_base_id'] == sync.KNOWLEDGE_BASE_ID
+    assert sync.bedrock_agent_client.calls == {}
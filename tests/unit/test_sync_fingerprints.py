@@ -0,0 +1,48 @@
+"""
+Omisión de data sources sin cambios en su prefijo S3 (fingerprints de la Lambda de sincronización)
+"""
+
+DS = {'id': 'DS1', 'name': 'stores', 'kb_id': 'KB2', 'bucket': 'local', 'prefixes': ['datasets/stores/']}
+
+
+def entrada(*objects):
+    return {'prefixes': DS['prefixes'], 'objects': [
+        {'key': key, 'etag': etag, 'size': 1, 'last_modified': '2025-01-01T00:00:00'} for key, etag in objects
+    ]}
+
+
+def test_fingerprint_depends_on_keys_and_etags(sync):
+    base = sync.calcular_fingerprint_data_source(entrada(('a.txt', '1'), ('b.txt', '1')))
+
+    assert base['objects'] == 2
+    assert sync.calcular_fingerprint_data_source(entrada(('a.txt', '1'), ('b.txt', '2')))['fingerprint'] != base['fingerprint']
+    assert sync.calcular_fingerprint_data_source(dict(entrada(), error='AccessDenied')) is None
+
+
+def test_omitir_si_sin_cambios(sync):
+    fingerprint = sync.calcular_fingerprint_data_source(entrada(('a.txt', '1')))
+    fingerprints = {}
+    sync.registrar_fingerprint(fingerprints, 'DS1', fingerprint, 'JOB1')
+
+    omitido = sync.omitir_si_sin_cambios(DS, fingerprint, fingerprints)
+
+    assert omitido == {
+        'data_source_id': 'DS1',
+        'data_source_name': 'stores',
+        'knowledge_base_id': 'KB2',
+        'status': 'SKIPPED_UNCHANGED',
+        'fingerprint': fingerprint['fingerprint'],
+        'last_job_id': 'JOB1'
+    }
+    assert sync.omitir_si_sin_cambios(DS, fingerprint, fingerprints, force=True) is None
+    assert sync.omitir_si_sin_cambios(DS, None, fingerprints) is None
+    assert sync.omitir_si_sin_cambios(DS, fingerprint, {}) is None
+
+
+def test_fingerprints_round_trip_through_s3(sync):
+    assert sync.cargar_fingerprints() == {}
+
+    fingerprints = {}
+    sync.registrar_fingerprint(fingerprints, 'DS1', {'fingerprint': 'abc', 'objects': 3}, 'JOB1')
+
+    assert sync.cargar_fingerprints()['DS1']['job_id'] == 'JOB1'
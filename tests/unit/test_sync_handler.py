@@ -0,0 +1,29 @@
+"""
+Interruptor LAMBDA_SYNC_ENABLED del flujo completo de la Lambda de sincronización
+"""
+
+import json
+
+
+def test_handler_is_disabled_by_default(sync):
+    response = sync.lambda_handler({}, None)
+
+    assert json.loads(response['body'])['status'] == 'disabled'
+    assert sync.bedrock_agent_client.calls == {}
+
+
+def test_step_functions_actions_ignore_the_switch(sync):
+    sync.s3_client.put_object(Bucket='local', Key='datasets/eventos/a.txt', Body='a')
+
+    plan = sync.lambda_handler({'action': 'plan_ingestion'}, None)
+
+    assert [ds['id'] for ds in plan['data_sources']] == ['LOCALDS001']
+
+
+def test_enabled_handler_runs_the_sync(sync, monkeypatch):
+    monkeypatch.setattr(sync, 'LAMBDA_SYNC_ENABLED', True)
+
+    response = sync.lambda_handler({}, None)
+
+    assert json.loads(response['body'])['status'] == 'no_data'
+    assert sync.bedrock_agent_client.calls['list_data_sources'] == 1
@@ -0,0 +1,78 @@
+"""
+Acciones de la state machine nativa: plan_ingestion y record_ingestion
+"""
+
+import pytest
+
+from bedrock_local import LocalBedrockAgentClient
+
+
+DATA_SOURCES = [
+    {'dataSourceId': 'DS1', 'name': 'stores', 'status': 'AVAILABLE', 'knowledgeBaseId': 'KB1',
+     'inclusionPrefixes': ['datasets/stores/']},
+    {'dataSourceId': 'DS2', 'name': 'eventos', 'status': 'AVAILABLE', 'knowledgeBaseId': 'KB2',
+     'inclusionPrefixes': ['datasets/eventos/']},
+    {'dataSourceId': 'DS3', 'name': 'restaurantes', 'status': 'AVAILABLE', 'knowledgeBaseId': 'KB1',
+     'inclusionPrefixes': ['datasets/restaurantes/']},
+]
+
+
+@pytest.fixture
+def plan_sync(sync, monkeypatch):
+    monkeypatch.setattr(sync, 'KNOWLEDGE_BASE_IDS', ['KB1', 'KB2'])
+    monkeypatch.setattr(sync, 'bedrock_agent_client', LocalBedrockAgentClient(sync.clock, data_sources=DATA_SOURCES))
+    for name in ('stores', 'eventos', 'restaurantes'):
+        sync.s3_client.put_object(Bucket='local', Key=f'datasets/{name}/{name}.txt', Body=name)
+    return sync
+
+
+def test_plan_groups_data_sources_by_knowledge_base(plan_sync):
+    plan = plan_sync.planificar_ingestion({})
+
+    assert plan['archivos_encontrados'] == 3
+    assert [ds['id'] for ds in plan['data_sources']] == ['DS1', 'DS3', 'DS2']
+    assert [(kb['kb_id'], [ds['id'] for ds in kb['data_sources']]) for kb in plan['knowledge_bases']] == [
+        ('KB1', ['DS1', 'DS3']), ('KB2', ['DS2'])
+    ]
+    assert plan['skipped'] == []
+
+
+def test_plan_skips_unchanged_and_filters_prefixes(plan_sync):
+    plan = plan_sync.planificar_ingestion({})
+    fingerprints = {}
+    for ds in plan['data_sources']:
+        plan_sync.registrar_fingerprint(fingerprints, ds['id'], ds['fingerprint'], 'JOB1')
+    plan_sync.s3_client.put_object(Bucket='local', Key='datasets/eventos/eventos.txt', Body='nuevo')
+
+    plan = plan_sync.planificar_ingestion({})
+
+    assert [kb['kb_id'] for kb in plan['knowledge_bases']] == ['KB2']
+    assert sorted((s['data_source_id'], s['knowledge_base_id']) for s in plan['skipped']) == [('DS1', 'KB1'), ('DS3', 'KB1')]
+    assert plan_sync.planificar_ingestion({'force_sync': True})['skipped'] == []
+    with pytest.raises(Exception, match='Ningún data source'):
+        plan_sync.planificar_ingestion({'s3_prefixes': ['datasets/otros/']})
+
+
+def test_record_flattens_jobs_per_knowledge_base(plan_sync):
+    plan = plan_sync.planificar_ingestion({})
+    ds1, ds3, ds2 = plan['data_sources']
+
+    def job(ds, status):
+        return {
+            'data_source': ds,
+            'job': {'ingestion_job_id': f"JOB-{ds['id']}"},
+            'job_status': {'IngestionJob': {'Status': status, 'Statistics': {'NumberOfNewDocumentsIndexed': 1}}}
+        }
+
+    record = plan_sync.registrar_ingestion({'plan': plan, 'jobs': [
+        [job(ds1, 'COMPLETE'), {'data_source': ds3, 'error': {'Error': 'BedrockAgent.ConflictException'}}],
+        [job(ds2, 'FAILED')],
+    ]})
+
+    assert record['changed'] is True
+    assert record['failed'] == 1
+    assert [(j['data_source_id'], j['knowledge_base_id'], j['status']) for j in record['jobs']] == [
+        ('DS1', 'KB1', 'COMPLETE'), ('DS3', 'KB1', 'error'), ('DS2', 'KB2', 'FAILED')
+    ]
+    # Solo el job COMPLETE guarda su fingerprint
+    assert list(plan_sync.cargar_fingerprints()) == ['DS1']